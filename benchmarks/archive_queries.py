@@ -0,0 +1,94 @@
+"""
+Write throughput and query latency of the local SQLite lap archive
+
+Archives synthetic sessions on a few tracks (see receiver/archive.py), then
+times typical queries, e.g. the best valid time trial lap at Spa.
+
+    python -m benchmarks.archive_queries --laps 5000 --telemetry-frames 600
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import logging
+
+from receiver import archive, events
+from receiver.archive import ArchiveWriter
+from receiver.events import EventBus
+from receiver.f12022.session import F12022Session
+
+TRACK_IDS = (10, 11, 7, 13, 3) # Spa, Monza, Silverstone, Suzuka, Bahrain
+SESSION_TYPES = (13, 10, 8) # Time trial, race, short qualifying
+LAPS_PER_SESSION = 25
+
+
+def archive_laps(path, lap_count, telemetry_frames):
+    rng = random.Random(48)
+    bus = EventBus()
+    writer = bus.subscribe(ArchiveWriter(path, queue_size=lap_count + lap_count // LAPS_PER_SESSION * 2))
+    start = time.perf_counter()
+    for session_number in range(lap_count // LAPS_PER_SESSION):
+        session = F12022Session("api_key", True, session_number, rng.choice(SESSION_TYPES), rng.choice(TRACK_IDS),
+                                False, 90, 0, 5, team_id=rng.randrange(10))
+        bus.publish(events.SESSION_STARTED, session)
+        for lap_number in range(1, LAPS_PER_SESSION + 1):
+            lap = session.add_lap(lap_number)
+            lap.sector_1_ms, lap.sector_2_ms, lap.sector_3_ms = (rng.randint(25000, 35000) for _ in range(3))
+            lap.is_valid = rng.random() < 0.8
+            if telemetry_frames:
+                lap.init_telemetry()
+                for frame in range(telemetry_frames):
+                    lap.telemetry.update({"frame_identifier": frame, "lap_distance": frame * 7.0,
+                                          "speed": rng.randint(80, 330), "throttle": rng.random()})
+                lap.finish_telemetry()
+            bus.publish(events.LAP_COMPLETED, session, lap_number=lap_number, lap=lap)
+        bus.publish(events.SESSION_ENDED, session, reason="final_classification")
+    publish_seconds = time.perf_counter() - start
+    bus.unsubscribe(writer, timeout=None)
+    return publish_seconds, time.perf_counter() - start
+
+
+def time_query(query, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = query()
+    return (time.perf_counter() - start) / runs * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--laps", type=int, default=5000)
+    parser.add_argument("--telemetry-frames", type=int, default=0, help="telemetry frames archived per lap")
+    parser.add_argument("--runs", type=int, default=100)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "archive.sqlite")
+        publish_seconds, archive_seconds = archive_laps(path, args.laps, args.telemetry_frames)
+        print("Archived %s laps in %.2fs (%.0f laps/s, %.2fs publishing), %.1f MB" % (
+            args.laps, archive_seconds, args.laps / archive_seconds, publish_seconds,
+            os.path.getsize(path) / 2 ** 20))
+        connection = archive.open_archive(path)
+        month_ago = time.time() - 30 * 24 * 3600
+        queries = (
+            ("best valid lap at Spa in time trial", lambda: archive.get_best_lap(connection, "Spa", "time_trial")),
+            ("best valid lap at Monza for team 3", lambda: archive.get_best_lap(connection, "Monza", team_id=3)),
+            ("best race lap at Suzuka this month",
+             lambda: archive.get_best_lap(connection, "Suzuka", "race", since=month_ago)),
+            ("latest 100 laps at Silverstone", lambda: archive.get_laps(connection, "Silverstone")),
+        )
+        print("%-38s %10s" % ("query", "ms"))
+        for name, query in queries:
+            milliseconds, _ = time_query(query, args.runs)
+            print("%-38s %10.3f" % (name, milliseconds))
+        best_lap = archive.get_best_lap(connection, "Spa", "time_trial")
+        if best_lap is not None and args.telemetry_frames:
+            milliseconds, _ = time_query(lambda: archive.get_lap_telemetry(connection, best_lap["id"]), args.runs)
+            print("%-38s %10.3f" % ("telemetry of that Spa lap", milliseconds))
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Batch decoding a capture file with NumPy vs. unpacking its datagrams one by one
+
+Writes a capture of synthetic F1 22 frames (a session packet twice a second,
+and lap, car telemetry, car status and car damage packets every frame), then
+times the NumPy batch decoder (see receiver/f12022/capture_decoder.py) against
+reading the capture's records, unpacking every car packet into its ctypes
+structure as the receiver does, and collecting the speed of every car.
+
+    python -m benchmarks.capture_decoder --frames 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import logging
+
+from benchmarks.synthetic import build_f12022_stream, set_header
+from receiver.capture import CAPTURE_MAGIC, RECORD_HEADER, iter_records
+from receiver.f12022 import capture_decoder
+from receiver.f12022.packets.car_status import PacketCarStatusData
+from receiver.f12022.packets.car_damage import PacketCarDamageData
+
+# Distinct frames, written over and over
+FRAME_VARIANTS = 600
+
+
+def build_frames():
+    packets = build_f12022_stream(FRAME_VARIANTS)
+    for frame_identifier in range(1, FRAME_VARIANTS + 1):
+        for packet_class, packet_id in ((PacketCarStatusData, 7), (PacketCarDamageData, 10)):
+            packet = packet_class()
+            set_header(packet, packet_id, 1, frame_identifier)
+            packets.append(bytes(packet))
+    return packets
+
+
+def write_capture(path, packets, frame_count):
+    """ Returns the number of datagrams written """
+    records = b"".join(RECORD_HEADER.pack(time.time(), len(packet)) + packet for packet in packets)
+    repeats = frame_count // FRAME_VARIANTS
+    with open(path, "wb") as capture_file:
+        capture_file.write(CAPTURE_MAGIC)
+        for _ in range(repeats):
+            capture_file.write(records)
+    return len(packets) * repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100000)
+    parser.add_argument("--ctypes-frames", type=int, default=10000, help="frames unpacked one by one")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    if capture_decoder.numpy is None:
+        parser.error("the batch decoder needs NumPy")
+
+    packets = build_frames()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "race.f1cap")
+        packet_count = write_capture(path, packets, args.frames)
+        size = os.path.getsize(path)
+        print("Capture of %s packets, %.1f MB" % (packet_count, size / 2 ** 20))
+
+        start = time.perf_counter()
+        decoded = capture_decoder.decode_capture(path)
+        decode_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        telemetry_only = capture_decoder.decode_capture(path, ["telemetry"])
+        telemetry_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        mean_speeds = telemetry_only["telemetry"].column("speed").mean(axis=0)
+        column_seconds = time.perf_counter() - start
+        assert len(mean_speeds) == 22
+
+        ctypes_path = os.path.join(directory, "short.f1cap")
+        ctypes_packet_count = write_capture(ctypes_path, packets, args.ctypes_frames)
+        start = time.perf_counter()
+        speeds = []
+        for _, packet in iter_records(ctypes_path):
+            car_packet = capture_decoder.CAR_PACKETS.get(packet[5])
+            if car_packet is not None:
+                structure = car_packet[0].from_buffer_copy(packet)
+                if packet[5] == 6:
+                    speeds.append([car.speed for car in structure.carTelemetryData])
+        ctypes_seconds = time.perf_counter() - start
+
+    print("%-44s %12s %10s" % ("", "packets/s", "MB/s"))
+    for name, seconds, count in (
+            ("NumPy, lap, telemetry, status and damage", decode_seconds, packet_count),
+            ("NumPy, telemetry only", telemetry_seconds, packet_count),
+            ("ctypes one by one, speed of every car", ctypes_seconds, ctypes_packet_count)):
+        print("%-44s %12.0f %10.0f" % (name, count / seconds, size * count / packet_count / 2 ** 20 / seconds))
+    print("Mean speed of every car from the decoded columns: %.1f ms" % (column_seconds * 1000))
+    print("Decoded: %s" % ", ".join("%s %s" % (name, len(packets)) for name, packets in decoded.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Opening and slicing many laps from the memory-mapped lap store vs. parsing their JSON
+
+Stores a few hundred full laps (about 6300 noisy frames each, see
+benchmarks/race_memory.py) with the lap store writer, then times opening the
+store, reading every lap's speed channel and averaging it, against parsing the
+laps' telemetry JSON (as synced to F1Laps or kept in the SQLite archive).
+
+    python -m benchmarks.lap_store --laps 500
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import logging
+
+from benchmarks.race_memory import build_lap
+from receiver import events, lap_store
+from receiver.events import EventBus
+from receiver.f12022.session import F12022Session
+from receiver.lap_store import LapStore, LapStoreWriter
+
+# Distinct laps, stored over and over
+LAP_VARIANTS = 10
+
+
+def mean(values):
+    return sum(values) / len(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--laps", type=int, default=500)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    rng = random.Random(49)
+    session = F12022Session("api_key", True, 1, 13, 10, False, 90, 0, 5, team_id=1)
+    laps = []
+    for lap_number in range(1, LAP_VARIANTS + 1):
+        lap = session.add_lap(lap_number)
+        lap.telemetry = build_lap(rng, lap_number, lap_number * 10000)
+        lap.finish_telemetry()
+        laps.append(lap)
+    telemetry_strings = [lap.get_telemetry_string() for lap in laps]
+
+    with tempfile.TemporaryDirectory() as directory:
+        bus = EventBus()
+        writer = bus.subscribe(LapStoreWriter(directory, queue_size=args.laps))
+        start = time.perf_counter()
+        for lap_index in range(args.laps):
+            lap = laps[lap_index % LAP_VARIANTS]
+            bus.publish(events.LAP_COMPLETED, session, lap_number=lap.lap_number, lap=lap)
+        bus.unsubscribe(writer, timeout=None)
+        write_seconds = time.perf_counter() - start
+        data_bytes = os.path.getsize(os.path.join(directory, lap_store.DATA_FILE_NAME))
+        print("Stored %s laps in %.2fs, %.1f MB (%.0f KB per lap)" % (
+            args.laps, write_seconds, data_bytes / 2 ** 20, data_bytes / args.laps / 1024))
+
+        start = time.perf_counter()
+        store = LapStore(directory)
+        open_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        speeds = [lap.channel("speed") for lap in store]
+        slice_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        mean_speeds = [speed.mean() if lap_store.numpy is not None else mean(speed) for speed in speeds]
+        mean_seconds = time.perf_counter() - start
+        del speeds
+
+        start = time.perf_counter()
+        json_mean_speeds = []
+        for lap_index in range(args.laps):
+            frames = json.loads(telemetry_strings[lap_index % LAP_VARIANTS])
+            json_mean_speeds.append(mean([frame[2] for frame in frames.values()]))
+        json_seconds = time.perf_counter() - start
+        assert [round(speed, 6) for speed in mean_speeds] == [round(speed, 6) for speed in json_mean_speeds]
+
+    print("%-34s %10s" % ("", "ms"))
+    print("%-34s %10.1f" % ("open store (index + mmap)", open_seconds * 1000))
+    print("%-34s %10.1f" % ("speed channel of every lap", slice_seconds * 1000))
+    print("%-34s %10.1f" % ("mean speed of every lap (%s)" % ("NumPy" if lap_store.numpy is not None else "Python"),
+                            mean_seconds * 1000))
+    print("%-34s %10.1f" % ("same from telemetry JSON", json_seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
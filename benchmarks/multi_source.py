@@ -0,0 +1,90 @@
+"""
+Load test of multi-source mode: several games sending to one receiver
+
+Each source sends a synthetic F1 22 stream from its own socket (so its own
+source address), all with the same session UID like drivers in one online
+lobby, at the game's frame rate. Checks that every source got its own session
+without frames of other sources, and reports how many packets got lost; with
+--burst, sources send as fast as possible, which overflows the socket buffer
+and loses packets by design.
+
+    python -m benchmarks.multi_source --sources 20 --frames 600
+"""
+import argparse
+import logging
+import socket
+import time
+
+from benchmarks.synthetic import build_f12022_stream, FRAMES_PER_SECOND
+from benchmarks.receiver_modes import get_free_port, wait_for_completions
+from receiver.receiver import RaceReceiver
+
+
+class LoadTestReceiver(RaceReceiver):
+    completions = None
+
+    def process_udp_packet(self, incoming_udp_packet, source_address=None):
+        super(LoadTestReceiver, self).process_udp_packet(incoming_udp_packet, source_address)
+        self.completions.append(source_address)
+
+    def start_sentry(self):
+        pass
+
+
+def send_streams(senders, streams, frame_count, port, realtime):
+    """ Interleave the sources packet by packet, optionally at the game's frame rate """
+    start = time.perf_counter()
+    packets_per_frame = len(streams[0]) / frame_count
+    for index, packets in enumerate(zip(*streams)):
+        if realtime:
+            delay = start + index / packets_per_frame / FRAMES_PER_SECOND - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        for sender, packet in zip(senders, packets):
+            sender.sendto(packet, ("127.0.0.1", port))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=600, help="game frames per source")
+    parser.add_argument("--burst", action="store_true", help="send as fast as possible instead of at 60 frames/sec")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    receiver = LoadTestReceiver("benchmark", host_ip="127.0.0.1", host_port=get_free_port(), demultiplex_sources=True)
+    receiver.completions = []
+    receiver.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+    senders = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(args.sources)]
+    streams = [build_f12022_stream(args.frames, session_uid=42) for _ in range(args.sources)]
+    expected = sum(len(stream) for stream in streams)
+    receiver.start()
+    try:
+        send_seconds = send_streams(senders, streams, args.frames, receiver.host_port, not args.burst)
+        wait_for_completions(receiver.completions, expected)
+    finally:
+        receiver.kill(timeout=5)
+        for sender in senders:
+            sender.close()
+
+    processors = receiver.get_processors()
+    frames_per_source = sorted(
+        sum(len(lap.telemetry.frame_dict) for lap in processor.session.lap_list.values())
+        for processor in processors if processor.session
+    )
+    print("sources:            %s" % args.sources)
+    print("processors:         %s" % len(processors))
+    print("packets sent:       %s in %.2fs" % (expected, send_seconds))
+    print("packets processed:  %s (%.0f packets/s)" % (len(receiver.completions), len(receiver.completions) / send_seconds))
+    print("packets lost:       %s (%.1f%%)" % (expected - len(receiver.completions),
+                                              100 * (expected - len(receiver.completions)) / expected))
+    print("frames per source:  min %s, max %s (sent %s)" % (frames_per_source[0], frames_per_source[-1], args.frames)
+          if frames_per_source else "frames per source: no sessions")
+    # Lost packets only cost frames; frames of other sources in a session would be a mismatch
+    ok = len(processors) == args.sources and frames_per_source and frames_per_source[-1] <= args.frames
+    print("result:             %s" % ("OK" if ok else "MISMATCH"))
+
+
+if __name__ == '__main__':
+    main()
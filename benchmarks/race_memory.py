@@ -0,0 +1,94 @@
+"""
+Memory of a long race's lap telemetry: frames, columns and compressed columns
+
+Fills the telemetry of a 70 lap race (about 6300 frames per lap at 60Hz) with
+noisy, game-like values, and reports the process RSS growth, the time to
+complete a lap and the time to serialize all laps (like a session sync) for:
+- frames: completed laps keep their frame dicts
+- columns: completed laps are packed into typed arrays
+- compressed: the arrays are compressed too
+
+Every mode runs in its own process, so RSS isn't shared between them.
+
+    python -m benchmarks.race_memory --laps 70 --budget-mb 100
+"""
+import argparse
+import json
+import random
+import struct
+import subprocess
+import sys
+import time
+
+from receiver.lap_telemetry_base import TelemetrySettings
+from receiver.f12022.telemetry import F12022LapTelemetry
+from receiver.helpers import get_process_rss_bytes
+
+MODES = ("frames", "columns", "compressed")
+FRAMES_PER_LAP = 6300
+TRACK_LENGTH = 7004
+
+
+def to_float32(value):
+    return struct.unpack("<f", struct.pack("<f", value))[0]
+
+
+def build_lap(rng, lap_number, first_frame, settings):
+    telemetry = F12022LapTelemetry(lap_number, 10, settings)
+    speed = 200.0
+    for lap_frame in range(FRAMES_PER_LAP):
+        speed = min(max(speed + rng.uniform(-4, 4), 60), 330)
+        throttle = rng.random() if rng.random() < 0.3 else 1.0
+        telemetry.update({"frame_identifier": first_frame + lap_frame,
+                          "lap_distance": to_float32(TRACK_LENGTH * lap_frame / FRAMES_PER_LAP),
+                          "lap_time": lap_frame * 1000 // 60})
+        telemetry.update({"frame_identifier": first_frame + lap_frame, "speed": int(speed),
+                          "brake": to_float32(1 - throttle), "throttle": to_float32(throttle),
+                          "gear": int(speed // 45) + 1, "steer": to_float32(rng.uniform(-0.3, 0.3)),
+                          "drs": 0})
+    return telemetry
+
+
+def run_mode(mode, laps):
+    settings = TelemetrySettings(compression=mode == "compressed")
+    rng = random.Random(70)
+    rss_before = get_process_rss_bytes()
+    lap_list = {}
+    finish_seconds = 0
+    for lap_number in range(1, laps + 1):
+        telemetry = lap_list[lap_number] = build_lap(rng, lap_number, lap_number * FRAMES_PER_LAP, settings)
+        start = time.perf_counter()
+        if mode != "frames":
+            telemetry.finish()
+        finish_seconds += time.perf_counter() - start
+    rss_growth = get_process_rss_bytes() - rss_before
+    start = time.perf_counter()
+    for telemetry in lap_list.values():
+        json.dumps(telemetry.frame_dict)
+    sync_seconds = time.perf_counter() - start
+    print(json.dumps({"mode": mode, "rss_mb": rss_growth / 2 ** 20, "finish_ms": finish_seconds / laps * 1000,
+                      "sync_s": sync_seconds}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--laps", type=int, default=70)
+    parser.add_argument("--budget-mb", type=float, default=None, help="flag modes whose RSS growth exceeds this")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        run_mode(args.mode, args.laps)
+        return
+
+    print("%-11s %12s %16s %18s %8s" % ("mode", "RSS MB", "finish ms/lap", "serialize all s", "budget"))
+    for mode in MODES:
+        output = subprocess.run([sys.executable, "-m", "benchmarks.race_memory", "--mode", mode,
+                                 "--laps", str(args.laps)], capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        within_budget = "-" if args.budget_mb is None else ("ok" if result["rss_mb"] <= args.budget_mb else "over")
+        print("%-11s %12.1f %16.2f %18.2f %8s" % (
+            mode, result["rss_mb"], result["finish_ms"], result["sync_s"], within_budget))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Compare packets/sec and latency of the thread-based and asyncio-based receivers
+
+Sends a synthetic F1 22 stream over loopback UDP to each receiver and measures
+the time from sendto() until the processor has finished with the packet.
+
+    python -m benchmarks.receiver_modes --frames 6000 --rate 0
+"""
+import argparse
+import asyncio
+import logging
+import socket
+import threading
+import time
+
+from benchmarks.synthetic import build_f12022_stream, get_frame_identifier
+from receiver.async_receiver import AsyncRaceReceiver
+from receiver.game_version import get_packet_id
+from receiver.latency import LatencyHistogram
+from receiver.receiver import RaceReceiver
+
+
+def get_packet_key(packet):
+    return get_packet_id(packet), get_frame_identifier(packet)
+
+
+def instrument(receiver_class):
+    """ Subclass a receiver to timestamp every processed packet, without Sentry """
+    class InstrumentedReceiver(receiver_class):
+        completions = None
+
+        def process_udp_packet(self, incoming_udp_packet, source_address=None):
+            super(InstrumentedReceiver, self).process_udp_packet(incoming_udp_packet, source_address)
+            self.completions.append((get_packet_key(incoming_udp_packet), time.perf_counter_ns()))
+
+        def start_sentry(self):
+            pass
+
+    return InstrumentedReceiver
+
+
+def make_receiver(receiver_class, rcvbuf):
+    receiver = instrument(receiver_class)("benchmark", host_ip="127.0.0.1", host_port=get_free_port())
+    receiver.completions = []
+    if rcvbuf:
+        # A bigger buffer measures processing capacity rather than the OS default buffer size
+        receiver.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    return receiver
+
+
+def get_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        return free_socket.getsockname()[1]
+
+
+def send_packets(packets, port, rate):
+    """ Send packets to the receiver; rate is packets/sec, 0 sends as fast as possible """
+    send_times = {}
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    start = time.perf_counter()
+    try:
+        for index, packet in enumerate(packets):
+            if rate:
+                delay = start + index / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            send_times[get_packet_key(packet)] = time.perf_counter_ns()
+            sender.sendto(packet, ("127.0.0.1", port))
+    finally:
+        sender.close()
+    return send_times
+
+
+def wait_for_completions(completions, expected, timeout=5):
+    """ Wait until all packets are processed, or no progress is made for a while """
+    last_count, last_progress = -1, time.monotonic()
+    while len(completions) < expected and time.monotonic() - last_progress < timeout:
+        if len(completions) != last_count:
+            last_count, last_progress = len(completions), time.monotonic()
+        time.sleep(0.01)
+
+
+def run_thread_mode(packets, rate, rcvbuf):
+    receiver = make_receiver(RaceReceiver, rcvbuf)
+    receiver.start()
+    try:
+        send_times = send_packets(packets, receiver.host_port, rate)
+        wait_for_completions(receiver.completions, len(packets))
+    finally:
+        receiver.kill(timeout=5)
+    return send_times, receiver.completions
+
+
+def run_async_mode(packets, rate, rcvbuf):
+    receiver = make_receiver(AsyncRaceReceiver, rcvbuf)
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    loop_thread.start()
+    asyncio.run_coroutine_threadsafe(receiver.start(), loop).result()
+    try:
+        send_times = send_packets(packets, receiver.host_port, rate)
+        wait_for_completions(receiver.completions, len(packets))
+    finally:
+        asyncio.run_coroutine_threadsafe(receiver.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        loop_thread.join()
+        loop.close()
+    return send_times, receiver.completions
+
+
+def summarize(mode, packet_count, send_times, completions):
+    histogram = LatencyHistogram()
+    for key, completed_at in completions:
+        histogram.record(completed_at - send_times[key])
+    if completions:
+        elapsed_s = (completions[-1][1] - min(send_times.values())) / 1e9
+        throughput = len(completions) / elapsed_s
+    else:
+        throughput = 0
+    summary = histogram.summary()
+    return "%-7s %8s %8s %12.0f %10.1f %10.1f %10.1f" % (
+        mode, packet_count, packet_count - len(completions), throughput,
+        (summary["p50"] or 0) / 1000, (summary["p99"] or 0) / 1000, (summary["max"] or 0) / 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=6000, help="game frames to send (about 2 packets each)")
+    parser.add_argument("--rate", type=int, default=0, help="packets/sec to send at, 0 for as fast as possible")
+    parser.add_argument("--rcvbuf", type=int, default=8 * 1024 * 1024,
+                        help="receive buffer size in bytes (capped by the OS), 0 for the OS default")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    packets = build_f12022_stream(args.frames)
+    print("%-7s %8s %8s %12s %10s %10s %10s" % ("mode", "packets", "lost", "packets/s", "p50 us", "p99 us", "max us"))
+    for _ in range(args.runs):
+        for mode, run in (("thread", run_thread_mode), ("asyncio", run_async_mode)):
+            send_times, completions = run(packets, args.rate, args.rcvbuf)
+            print(summarize(mode, len(packets), send_times, completions))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Scaling of the sharded receiver with 1 to 8 worker processes
+
+Each source sends a synthetic F1 22 stream from its own socket to a
+ShardSupervisor, and the aggregated worker metrics are polled until every
+packet is counted (or no progress is made). Throughput only scales up to
+the number of CPU cores. Lost packets that the dispatcher dropped because a
+worker's queue was full are also shown on their own; the rest overflowed a
+socket buffer.
+
+    python -m benchmarks.sharding --sources 20 --frames 600 --workers 1 2 4 8
+"""
+import argparse
+import logging
+import socket
+import time
+
+from benchmarks.multi_source import send_streams
+from benchmarks.receiver_modes import get_free_port
+from benchmarks.synthetic import build_f12022_stream
+from receiver.sharding import ShardSupervisor, MODE_DISPATCHER, MODE_REUSEPORT, dispatch_dropped_packets
+
+
+def wait_for_total(supervisor, expected, timeout=5):
+    """ Wait until the workers reported all packets, or no progress is made for a while """
+    last_total, last_progress = -1, time.monotonic()
+    while time.monotonic() - last_progress < timeout:
+        total = supervisor.registry.get_total("f1laps_packets_received_total")
+        if total >= expected:
+            break
+        if total != last_total:
+            last_total, last_progress = total, time.monotonic()
+        time.sleep(0.01)
+    return time.perf_counter(), supervisor.registry.get_total("f1laps_packets_received_total")
+
+
+def run(worker_count, mode, streams, frame_count, realtime):
+    supervisor = ShardSupervisor("benchmark", worker_count=worker_count, host_ip="127.0.0.1",
+                                 host_port=get_free_port(), mode=mode, snapshot_interval=0.05)
+    senders = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in streams]
+    expected = sum(len(stream) for stream in streams)
+    dropped_before = sum(dispatch_dropped_packets.values.values())
+    supervisor.start()
+    try:
+        supervisor.wait_until_ready()
+        start = time.perf_counter()
+        send_streams(senders, streams, frame_count, supervisor.host_port, realtime)
+        finished, received = wait_for_total(supervisor, expected)
+    finally:
+        supervisor.stop()
+        for sender in senders:
+            sender.close()
+    dropped = sum(dispatch_dropped_packets.values.values()) - dropped_before
+    return "%-10s %8s %8s %8s %12s %12.0f" % (
+        mode, worker_count, expected, expected - received, dropped, received / (finished - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=600, help="game frames per source")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--mode", choices=(MODE_DISPATCHER, MODE_REUSEPORT), default=MODE_DISPATCHER)
+    parser.add_argument("--realtime", action="store_true", help="send at 60 frames/sec instead of as fast as possible")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    streams = [build_f12022_stream(args.frames, session_uid=42) for _ in range(args.sources)]
+    print("%-10s %8s %8s %8s %12s %12s" % ("mode", "workers", "packets", "lost", "queue drops", "packets/s"))
+    for worker_count in args.workers:
+        print(run(worker_count, args.mode, streams, args.frames, args.realtime))
+
+
+if __name__ == '__main__':
+    main()
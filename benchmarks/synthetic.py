@@ -0,0 +1,86 @@
+"""
+Synthetic F1 22 UDP packets for benchmarks and load tests
+
+A stream is what the game sends for a single car at the default 60Hz rate:
+a lap data and a car telemetry packet every frame, and a session packet
+twice a second. Without a participants packet the session has no team ID,
+so completed laps are never synced to F1Laps.
+"""
+from receiver.game_version import CrossGamePacketHeader
+from receiver.f12022.packets.session import PacketSessionData
+from receiver.f12022.packets.lap import PacketLapData
+from receiver.f12022.packets.telemetry import PacketCarTelemetryData
+
+PACKET_FORMAT = 2022
+FRAMES_PER_SECOND = 60
+SESSION_PACKET_INTERVAL = 30
+FRAME_IDENTIFIER_OFFSET = CrossGamePacketHeader.frameIdentifier.offset
+TRACK_ID = 10 # Spa
+TRACK_LENGTH = 7004
+SESSION_TYPE = 10 # Race
+LAP_TIME_MS = 105000
+
+
+def set_header(packet, packet_id, session_uid, frame_identifier):
+    header = packet.header
+    header.packetFormat = PACKET_FORMAT
+    header.gameMajorVersion = 1
+    header.packetVersion = 1
+    header.packetId = packet_id
+    header.sessionUID = session_uid
+    header.sessionTime = frame_identifier / FRAMES_PER_SECOND
+    header.frameIdentifier = frame_identifier
+    header.playerCarIndex = 0
+
+
+def build_session_packet(session_uid, frame_identifier, track_id=TRACK_ID, session_type=SESSION_TYPE):
+    packet = PacketSessionData()
+    set_header(packet, 1, session_uid, frame_identifier)
+    packet.trackId = track_id
+    packet.sessionType = session_type
+    packet.trackLength = TRACK_LENGTH
+    return bytes(packet)
+
+
+def build_lap_packet(session_uid, frame_identifier, lap_number, lap_distance, lap_time_ms):
+    packet = PacketLapData()
+    set_header(packet, 2, session_uid, frame_identifier)
+    lap_data = packet.lapData[0]
+    lap_data.currentLapNum = lap_number
+    lap_data.lapDistance = lap_distance
+    lap_data.currentLapTimeInMS = lap_time_ms
+    lap_data.carPosition = 1
+    lap_data.driverStatus = 1
+    lap_data.resultStatus = 2
+    return bytes(packet)
+
+
+def build_telemetry_packet(session_uid, frame_identifier, speed, throttle):
+    packet = PacketCarTelemetryData()
+    set_header(packet, 6, session_uid, frame_identifier)
+    telemetry_data = packet.carTelemetryData[0]
+    telemetry_data.speed = speed
+    telemetry_data.throttle = throttle
+    telemetry_data.gear = 6
+    return bytes(packet)
+
+
+def build_f12022_stream(frame_count, session_uid=1, first_frame=1):
+    """ Return the datagrams of frame_count frames of a race, in the order the game sends them """
+    frames_per_lap = LAP_TIME_MS * FRAMES_PER_SECOND // 1000
+    packets = []
+    for frame_identifier in range(first_frame, first_frame + frame_count):
+        lap_index, lap_frame = divmod(frame_identifier - 1, frames_per_lap)
+        if frame_identifier % SESSION_PACKET_INTERVAL == 1:
+            packets.append(build_session_packet(session_uid, frame_identifier))
+        packets.append(build_lap_packet(
+            session_uid, frame_identifier, lap_index + 1,
+            TRACK_LENGTH * lap_frame / frames_per_lap, lap_frame * 1000 // FRAMES_PER_SECOND))
+        packets.append(build_telemetry_packet(
+            session_uid, frame_identifier, 150 + lap_frame % 150, (lap_frame % 60) / 60))
+    return packets
+
+
+def get_frame_identifier(packet):
+    """ Read the frame identifier from a datagram's header """
+    return int.from_bytes(packet[FRAME_IDENTIFIER_OFFSET:FRAME_IDENTIFIER_OFFSET + 4], "little")
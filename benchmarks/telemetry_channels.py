@@ -0,0 +1,76 @@
+"""
+Memory and throughput of lap telemetry as extra channels get enabled
+
+Runs a synthetic F1 22 lap through the F1 22 processor with more and more
+extra channels (see receiver/telemetry_channels.py), and reports packets/sec,
+the memory of the running lap's frames and the size of the completed lap's
+columns.
+
+    python -m benchmarks.telemetry_channels --runs 3
+"""
+import argparse
+import logging
+import time
+import tracemalloc
+
+from benchmarks.synthetic import build_f12022_stream, LAP_TIME_MS, FRAMES_PER_SECOND
+from receiver.lap_telemetry_base import TelemetrySettings
+from receiver.f12022.processor import F12022Processor
+from receiver.telemetry_channels import EXTRA_CHANNELS
+
+FRAMES_PER_LAP = LAP_TIME_MS * FRAMES_PER_SECOND // 1000
+
+
+def get_extra_channel_counts():
+    counts = [0, 1, 5, 9, 13, len(EXTRA_CHANNELS)]
+    return sorted(set(count for count in counts if count <= len(EXTRA_CHANNELS)))
+
+
+def run_lap(packets, lap_packet_count, settings, trace_memory=False):
+    """ 
+    Returns seconds spent in the processor, the running lap's bytes (if traced, which slows
+    the processor down) and the completed lap's column bytes
+    """
+    processor = F12022Processor("api_key", True, settings)
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    for packet in packets[:lap_packet_count]:
+        processor.process(packet)
+    seconds = time.perf_counter() - start
+    running_bytes = None
+    if trace_memory:
+        running_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    # The next lap's first frame completes (and packs) the lap
+    for packet in packets[lap_packet_count:]:
+        processor.process(packet)
+    telemetry = processor.session.lap_list[1].telemetry
+    return seconds, running_bytes, telemetry.columns.nbytes() if telemetry.columns is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--sample-every", type=int, default=None,
+                        help="sample every extra channel every N frames instead of its default rate")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    packets = build_f12022_stream(FRAMES_PER_LAP + 1)
+    # The stream starts with a session packet, the last frame is the next lap's lap and telemetry packet
+    lap_packet_count = len(packets) - 2
+    print("%-9s %10s %12s %14s %14s" % ("channels", "packets/s", "us/packet", "running lap KB", "columns KB"))
+    for extra_count in get_extra_channel_counts():
+        extra_channels = [channel.name if args.sample_every is None else (channel.name, args.sample_every)
+                          for channel in EXTRA_CHANNELS[:extra_count]]
+        settings = TelemetrySettings(extra_channels)
+        seconds = min(run_lap(packets, lap_packet_count, settings)[0] for _ in range(args.runs))
+        _, running_bytes, column_bytes = run_lap(packets, lap_packet_count, settings, trace_memory=True)
+        print("%-9s %10.0f %12.2f %14.0f %14s" % (
+            len(settings.channels), lap_packet_count / seconds, seconds / lap_packet_count * 1e6,
+            running_bytes / 1024, "%.0f" % (column_bytes / 1024) if column_bytes is not None else "-"))
+
+
+if __name__ == '__main__':
+    main()
@@ -16,3 +16,66 @@ App Config
 #################################################################"""
 
 VERSION = "3.2.1"
+
+# Record per-stage latency histograms and summarize them in the log (race.py only)
+# On Mac/Linux, send SIGUSR1 to the process to log a summary on demand
+LATENCY_HISTOGRAMS_ENABLED = False
+
+# Serve Prometheus metrics on http://127.0.0.1:<port>/metrics (race.py only); None disables it
+METRICS_PORT = None
+
+# Give each source address its own session, for several games sending to one receiver
+# (e.g. a league host collecting drivers via UDP redirect) (race.py only)
+MULTI_SOURCE_MODE = False
+
+# Spread sources over this many worker processes, one process per CPU core if 0 (race.py only)
+# Only used together with MULTI_SOURCE_MODE; send SIGHUP on Mac/Linux for a rolling restart of the workers
+SHARD_WORKERS = None
+
+# Forward received packets to other telemetry apps (race.py only), as (host, port) or
+# (host, port, packet types) with packet type names like "lap" or "telemetry", e.g.
+# REDIRECT_TARGETS = [("127.0.0.1", 20778), ("192.168.1.20", 20777, ["session", "lap"])]
+REDIRECT_TARGETS = []
+
+# Store lap telemetry as it arrives and clean it in one pass when the lap is synced,
+# instead of cleaning every frame on arrival (race.py only; uses NumPy if it's installed)
+DEFER_TELEMETRY_CLEANING = False
+
+# Resample telemetry of completed laps every this many metres of lap distance, so its size
+# depends on track length instead of lap time and UDP rate; None keeps every frame (race.py only).
+# Channels are interpolated linearly, gear and DRS hold their last value; override per channel
+# with e.g. TELEMETRY_RESAMPLE_METHODS = {"speed": "hold"}
+TELEMETRY_RESAMPLE_STEP = None
+TELEMETRY_RESAMPLE_METHODS = {}
+
+# F1 22: only store telemetry of every Nth frame and/or every N ms of lap time, e.g. 3 frames
+# to store 20 Hz of a 60 Hz UDP rate. The first frame of every lap and sector is always stored.
+# None stores every frame (race.py only)
+TELEMETRY_DECIMATION_FRAMES = None
+TELEMETRY_DECIMATION_MS = None
+
+# Only store frames that got both their lap and telemetry packet, waiting up to this many frames
+# for the other one; None stores packet values as they come (race.py only)
+TELEMETRY_JOIN_WINDOW = None
+
+# F1 22: store extra car telemetry channels next to the default ones, by name, or (name, N) to
+# sample a channel every N frames, e.g. ["engine_rpm", ("brake_temperature_front_left", 5)].
+# See EXTRA_CHANNELS in receiver/telemetry_channels.py for the names (race.py only)
+TELEMETRY_EXTRA_CHANNELS = []
+
+# Hold telemetry of completed laps compressed in memory, e.g. for long races on a modest machine;
+# recently read laps are kept decompressed (race.py only)
+COMPRESS_COMPLETED_LAPS = False
+
+# Archive sessions, laps (with compressed telemetry) and penalties to this local SQLite file,
+# e.g. "f1laps.sqlite"; see receiver/archive.py for queries. None doesn't archive (race.py only)
+ARCHIVE_PATH = None
+
+# Append the telemetry of completed laps as memory-mappable arrays to this directory, e.g. "laps",
+# for offline analysis with receiver/lap_store.py's LapStore. None doesn't store them
+# (race.py only, and not with SHARD_WORKERS, as workers would append to the same files)
+LAP_STORE_PATH = None
+
+# Record every received datagram to this capture file, e.g. "race.f1cap", to replay it or batch decode
+# it with receiver/f12022/capture_decoder.py. None doesn't record (race.py only, and not with SHARD_WORKERS)
+CAPTURE_PATH = None
@@ -1,20 +1,154 @@
 #!/usr/bin/env python3
+"""
+App-wide logging setup
+
+Records are rate limited per message key and handed to a bounded queue,
+so a background thread does the formatting and I/O instead of the packet loop.
+Log with lazy arguments - log.debug("Lap #%s", lap.lap_number) - so that
+messages are only formatted when they're actually written, and so that the
+unformatted message can serve as the rate limiting key. Pass plain values
+(numbers, strings) rather than objects: records with object arguments are
+formatted by the caller (see AsyncQueueHandler.prepare), so the packet path
+shouldn't log any.
+"""
+import atexit
 import logging
+import logging.handlers
+import queue
 
 
 LOG_LEVEL  = "INFO"
 LOG_FORMAT = "%(asctime)s - %(levelname)-8s - %(message)s"
 
+# Per message key, let through at most LOG_RATE_LIMIT_BURST records every LOG_RATE_LIMIT_INTERVAL seconds
+LOG_RATE_LIMIT_INTERVAL = 10
+LOG_RATE_LIMIT_BURST = 5
+# Records waiting for the log thread; further records get dropped (and counted)
+LOG_QUEUE_SIZE = 10000
+
+
+# Log args of these types can't change after the call, so their records are formatted lazily
+# (exceptions count too: they're logged once they've been raised)
+FROZEN_ARG_TYPES = (str, bytes, int, float, bool, type(None), BaseException)
+
+
+def get_arg_values(args):
+    return args.values() if isinstance(args, dict) else args
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Rate limits records per message key
+    The key is the logger, level and unformatted message, unless a record sets
+    its own via extra={"rate_limit_key": ...}; extra={"rate_limit": False} opts out.
+    Once a key's window re-opens, the next record reports how many similar records
+    were suppressed.
+    """
+    MAX_TRACKED_KEYS = 2048
+
+    def __init__(self, interval=LOG_RATE_LIMIT_INTERVAL, burst=LOG_RATE_LIMIT_BURST):
+        super(RateLimitFilter, self).__init__()
+        self.interval = interval
+        self.burst = burst
+        # key -> [window start, records in window, suppressed in window]
+        self.windows = {}
+
+    def filter(self, record):
+        if getattr(record, "rate_limit", True) is False:
+            return True
+        key = getattr(record, "rate_limit_key", None) or (record.name, record.levelno, record.msg)
+        window = self.windows.get(key)
+        if window is None:
+            if len(self.windows) >= self.MAX_TRACKED_KEYS:
+                # Eagerly formatted messages make unique keys; don't grow forever
+                self.windows.clear()
+            self.windows[key] = [record.created, 1, 0]
+            return True
+        if record.created - window[0] >= self.interval:
+            suppressed = window[2]
+            window[0], window[1], window[2] = record.created, 1, 0
+            if suppressed:
+                self.add_suppressed_count(record, suppressed)
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+    def add_suppressed_count(self, record, suppressed):
+        message = str(record.msg)
+        if not record.args:
+            # Messages without args are never %-formatted, so escape literal % signs first
+            message = message.replace("%", "%%")
+            record.args = ()
+        elif not isinstance(record.args, tuple):
+            # Mapping args can't be extended; keep the message as it is
+            return
+        record.msg = message + " (%s similar messages suppressed)"
+        record.args = record.args + (suppressed,)
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller and leaves formatting to the listener thread
+    If the queue is full, records are dropped; the count is logged once there's room again
+    """
+
+    def __init__(self, log_queue):
+        super(AsyncQueueHandler, self).__init__(log_queue)
+        self.dropped_records = 0
+
+    def prepare(self, record):
+        # The default implementation formats every record in the calling thread - that's what we want to avoid.
+        # Objects passed as args (laps, sessions...) may change before the listener gets to them though,
+        # so messages with such args are formatted here, while they still show the state at the call.
+        # That's for the odd log call off the packet path, which logs plain values only
+        if record.args and not all(isinstance(arg, FROZEN_ARG_TYPES) for arg in get_arg_values(record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.dropped_records:
+                dropped_record = logging.LogRecord(
+                    record.name, logging.WARNING, __file__, 0,
+                    "Dropped %s log records because the log queue was full", (self.dropped_records,), None)
+                self.queue.put_nowait(dropped_record)
+                self.dropped_records = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_records += 1
+
+
+def setup_logging(level=LOG_LEVEL, log_format=LOG_FORMAT, handlers=None,
+                  rate_limit_interval=LOG_RATE_LIMIT_INTERVAL, rate_limit_burst=LOG_RATE_LIMIT_BURST,
+                  queue_size=LOG_QUEUE_SIZE):
+    """
+    Route all root logger records through a rate limiting queue handler
+    The given handlers (default: stderr) are run by a QueueListener thread
+    Returns the listener, which is also stopped (and flushed) at exit
+    """
+    handlers = handlers or [logging.StreamHandler()]
+    formatter = logging.Formatter(log_format)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    queue_handler = AsyncQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(RateLimitFilter(rate_limit_interval, rate_limit_burst))
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
 # create main logger
-logging.basicConfig(
-    level    = LOG_LEVEL,
-    format   = LOG_FORMAT,
-    handlers = [
-        logging.StreamHandler()
-    ]
-)
+log_listener = setup_logging()
 log = logging.getLogger(__name__)
 
 # disable logging of modules
 logging.getLogger("requests").setLevel(logging.WARNING)
-logging.getLogger("urllib3" ).setLevel(logging.WARNING)
\ No newline at end of file
+logging.getLogger("urllib3" ).setLevel(logging.WARNING)
@@ -1,12 +1,39 @@
+import signal
+
 from receiver.receiver import RaceReceiver
+from receiver.sharding import ShardSupervisor
+from receiver.settings import ReceiverSettings
 from receiver.helpers import asciiart
+from receiver import latency
 
 import config
 
 
 if __name__ == '__main__':
     asciiart()
-    # Initiative receiver
-    race_receiver = RaceReceiver(f1laps_api_key=config.F1LAPS_API_KEY, run_as_daemon=False)
-    # Listen to packages
-    race_receiver.start()
+    settings = ReceiverSettings(enable_latency_histograms=config.LATENCY_HISTOGRAMS_ENABLED,
+                                metrics_port=config.METRICS_PORT,
+                                demultiplex_sources=config.MULTI_SOURCE_MODE,
+                                redirect_targets=config.REDIRECT_TARGETS,
+                                defer_telemetry_cleaning=config.DEFER_TELEMETRY_CLEANING,
+                                telemetry_resample_step=config.TELEMETRY_RESAMPLE_STEP,
+                                telemetry_resample_methods=config.TELEMETRY_RESAMPLE_METHODS,
+                                telemetry_decimation_frames=config.TELEMETRY_DECIMATION_FRAMES,
+                                telemetry_decimation_ms=config.TELEMETRY_DECIMATION_MS,
+                                telemetry_join_window=config.TELEMETRY_JOIN_WINDOW,
+                                telemetry_extra_channels=config.TELEMETRY_EXTRA_CHANNELS,
+                                compress_completed_laps=config.COMPRESS_COMPLETED_LAPS,
+                                archive_path=config.ARCHIVE_PATH,
+                                lap_store_path=config.LAP_STORE_PATH,
+                                capture_path=config.CAPTURE_PATH)
+    if config.MULTI_SOURCE_MODE and config.SHARD_WORKERS is not None:
+        # Spread sources over worker processes
+        ShardSupervisor(config.F1LAPS_API_KEY, config.SHARD_WORKERS, settings).run_forever()
+    else:
+        # Initiative receiver
+        race_receiver = RaceReceiver(config.F1LAPS_API_KEY, settings, run_as_daemon=False)
+        # Dump latency histograms on demand (not available on Windows)
+        if config.LATENCY_HISTOGRAMS_ENABLED and hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: latency.recorder.log_summary())
+        # Listen to packages
+        race_receiver.start()
@@ -2,9 +2,12 @@ import platform
 import requests
 import json
 import config
+from time import perf_counter_ns
 import logging
 log = logging.getLogger(__name__)
 
+from receiver import metrics
+
 
 class F1LapsAPIBase:
     """ Communicate with F1Laps API """
@@ -18,12 +21,16 @@ class F1LapsAPIBase:
     def call_api(self, method, endpoint, params=None):
         headers = self._get_headers()
         path = self.base_url + self.game_version + "/" + endpoint 
-        if method == "GET":
-            return self.call_api_get(path , headers=headers)
-        elif method == "POST":
-            return self.call_api_post(path, headers=headers, json=params)
-        elif method == "PUT":
-            return self.call_api_put(path , headers=headers, json=params)
+        call_start = perf_counter_ns()
+        try:
+            if method == "GET":
+                return self.call_api_get(path , headers=headers)
+            elif method == "POST":
+                return self.call_api_post(path, headers=headers, json=params)
+            elif method == "PUT":
+                return self.call_api_put(path , headers=headers, json=params)
+        finally:
+            metrics.upload_latency.observe_ns(perf_counter_ns() - call_start)
 
     def call_api_get(self, path, headers):
         try:
@@ -0,0 +1,242 @@
+"""
+Local SQLite archive of sessions, laps and penalties
+
+ArchiveWriter is an event subscriber (see receiver/events.py): it writes what
+sessions publish from its own thread, in one transaction per batch of queued
+events, to a SQLite database in WAL mode, so it can be read (e.g. with the
+queries below) while the receiver writes. Lap telemetry is stored as a zlib
+compressed blob of the JSON that's synced to F1Laps, extra channels included.
+
+    receiver = RaceReceiver(api_key, archive_path="f1laps.sqlite")
+    ...
+    connection = archive.open_archive("f1laps.sqlite")
+    archive.get_best_lap(connection, "Spa", "time_trial")
+"""
+import json
+import sqlite3
+import time
+import zlib
+import logging
+log = logging.getLogger(__name__)
+
+from receiver import events
+
+# Events written in one transaction at most
+ARCHIVE_BATCH_SIZE = 100
+# Archived events waiting for the writer; further events get dropped (and counted)
+ARCHIVE_QUEUE_SIZE = 1024
+# How long a write waits for another process (e.g. a sharded worker) to release the database
+ARCHIVE_BUSY_TIMEOUT = 5
+TELEMETRY_ENCODING = "json+zlib"
+
+TYRES = ("front_left", "front_right", "rear_left", "rear_right")
+TYRE_WEAR_COLUMNS = tuple("%s_tyre_wear_%s" % (stage, tyre)
+                          for stage in ("lap_start", "sector_1", "sector_2", "sector_3") for tyre in TYRES)
+LAP_COLUMNS = (
+    "lap_number", "lap_time_ms", "sector_1_ms", "sector_2_ms", "sector_3_ms", "is_valid", "pit_status",
+    "car_race_position", "tyre_compound_visual", "weather_id", "air_temperature", "track_temperature",
+    "rain_percentage_forecast",
+) + TYRE_WEAR_COLUMNS + ("data_quality", "completed_at")
+PENALTY_COLUMNS = ("lap_number", "frame_id", "penalty_type", "infringement_type", "vehicle_index",
+                   "other_vehicle_index", "time_spent_gained", "places_gained")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    game_version TEXT NOT NULL,
+    -- UDP session UIDs are unsigned 64 bit
+    session_uid TEXT NOT NULL,
+    track_id INTEGER,
+    track TEXT,
+    session_type TEXT,
+    team_id INTEGER,
+    game_mode TEXT,
+    is_online_game INTEGER,
+    ai_difficulty INTEGER,
+    conditions TEXT,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    end_reason TEXT,
+    finish_position INTEGER,
+    points INTEGER,
+    result_status INTEGER,
+    UNIQUE (game_version, session_uid)
+);
+CREATE INDEX IF NOT EXISTS sessions_track ON sessions (track, session_type);
+CREATE INDEX IF NOT EXISTS sessions_session_type ON sessions (session_type);
+CREATE INDEX IF NOT EXISTS sessions_team ON sessions (team_id);
+CREATE INDEX IF NOT EXISTS sessions_started_at ON sessions (started_at);
+
+CREATE TABLE IF NOT EXISTS laps (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    %s,
+    UNIQUE (session_id, lap_number)
+);
+CREATE INDEX IF NOT EXISTS laps_lap_time ON laps (session_id, is_valid, lap_time_ms);
+CREATE INDEX IF NOT EXISTS laps_completed_at ON laps (completed_at);
+
+CREATE TABLE IF NOT EXISTS lap_telemetry (
+    lap_id INTEGER PRIMARY KEY REFERENCES laps (id),
+    encoding TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS penalties (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    %s,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS penalties_session ON penalties (session_id, lap_number);
+""" % (",\n    ".join(LAP_COLUMNS), ",\n    ".join(PENALTY_COLUMNS))
+
+
+def open_archive(path):
+    """ Open (and if needed create) an archive; connections are only used from the thread that opened them """
+    connection = sqlite3.connect(path, timeout=ARCHIVE_BUSY_TIMEOUT)
+    connection.row_factory = sqlite3.Row
+    # Readers don't block the writer and vice versa
+    connection.execute("PRAGMA journal_mode=WAL")
+    # WAL stays consistent without syncing every commit; a power cut may lose the latest laps only
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def get_lap_time_ms(lap_values):
+    sectors = (lap_values["sector_1_ms"], lap_values["sector_2_ms"], lap_values["sector_3_ms"])
+    return sum(sectors) if all(sectors) else None
+
+
+class ArchiveWriter(events.Subscriber):
+    """ Archives the events of all sessions to the SQLite database at path """
+
+    def __init__(self, path, name="archive", queue_size=ARCHIVE_QUEUE_SIZE, batch_size=ARCHIVE_BATCH_SIZE):
+        super(ArchiveWriter, self).__init__(self.write_event, (
+            events.SESSION_STARTED, events.SESSION_ENDED, events.LAP_COMPLETED, events.PENALTY
+        ), name, queue_size)
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = None
+        # Session rows by session object, so events don't need a lookup
+        self.session_ids = {}
+
+    def run(self):
+        self.connection = open_archive(self.path)
+        running = True
+        while running:
+            batch = []
+            event = self.queue.get()
+            # None stops the writer once the events before it are written, wherever it is in the batch
+            while event is not None:
+                batch.append(event)
+                if len(batch) >= self.batch_size or self.queue.empty():
+                    break
+                event = self.queue.get_nowait()
+            running = event is not None
+            try:
+                with self.connection:
+                    for event in batch:
+                        self.handle(event)
+            except sqlite3.Error as ex:
+                events.subscriber_errors.inc(self.name)
+                log.warning("Could not archive %s events: %s", len(batch), ex)
+        self.connection.close()
+
+    def write_event(self, event):
+        session_id = self.get_session_id(event.session)
+        if event.event_type == events.LAP_COMPLETED:
+            self.write_lap(session_id, event.session, event.data["lap"])
+        elif event.event_type == events.PENALTY:
+            penalty = event.data["penalty"]
+            self.connection.execute(
+                "INSERT INTO penalties (session_id, %s, created_at) VALUES (?, %s, ?)" % (
+                    ", ".join(PENALTY_COLUMNS), ", ".join("?" * len(PENALTY_COLUMNS))),
+                [session_id] + [getattr(penalty, column) for column in PENALTY_COLUMNS] + [time.time()])
+        elif event.event_type == events.SESSION_ENDED:
+            session = event.session
+            self.connection.execute(
+                "UPDATE sessions SET ended_at = ?, end_reason = ?, finish_position = ?, points = ?, "
+                "result_status = ?, team_id = ?, conditions = ? WHERE id = ?",
+                (time.time(), event.data.get("reason"), session.finish_position, session.points,
+                 session.result_status, session.team_id, session.map_weather_ids_to_f1laps_token(), session_id))
+            del self.session_ids[session]
+
+    def get_session_id(self, session):
+        """ Row id of the session, which gets added unless it's archived already (e.g. by an earlier run) """
+        session_id = self.session_ids.get(session)
+        if session_id is not None:
+            return session_id
+        key = (session.game_version, str(session.session_udp_uid))
+        self.connection.execute(
+            "INSERT OR IGNORE INTO sessions (game_version, session_uid, track_id, track, session_type, team_id, "
+            "game_mode, is_online_game, ai_difficulty, conditions, started_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            key + (session.track_id, session.get_track_name(), session.get_session_type(), session.team_id,
+                   getattr(session, "game_mode", None), session.is_online_game, session.ai_difficulty,
+                   session.map_weather_ids_to_f1laps_token(), time.time()))
+        session_id = self.connection.execute(
+            "SELECT id FROM sessions WHERE game_version = ? AND session_uid = ?", key).fetchone()[0]
+        self.session_ids[session] = session_id
+        return session_id
+
+    def write_lap(self, session_id, session, lap):
+        """ Archive a LapSnapshot (see receiver/lap_base.py) """
+        values = {column: lap.values.get(column) for column in LAP_COLUMNS}
+        values.update(lap_time_ms=get_lap_time_ms(lap.values), data_quality=lap.data_quality, completed_at=time.time())
+        self.connection.execute(
+            "INSERT INTO laps (session_id, %s) VALUES (?, %s) ON CONFLICT (session_id, lap_number) DO UPDATE SET %s" % (
+                ", ".join(LAP_COLUMNS), ", ".join("?" * len(LAP_COLUMNS)),
+                ", ".join("%s = excluded.%s" % (column, column) for column in LAP_COLUMNS)),
+            [session_id] + [values[column] for column in LAP_COLUMNS])
+        lap_id = self.connection.execute("SELECT id FROM laps WHERE session_id = ? AND lap_number = ?",
+                                         (session_id, lap.lap_number)).fetchone()[0]
+        # The session's team often isn't known yet when it starts
+        self.connection.execute("UPDATE sessions SET team_id = ? WHERE id = ? AND team_id IS NULL",
+                                (session.team_id, session_id))
+        if lap.values["telemetry_enabled"] and lap.telemetry is not None and lap.telemetry.has_frames():
+            # Extra channels (see receiver/telemetry_channels.py) are archived too
+            telemetry = json.dumps(lap.telemetry.frame_dict)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO lap_telemetry (lap_id, encoding, data) VALUES (?, ?, ?)",
+                (lap_id, TELEMETRY_ENCODING, zlib.compress(telemetry.encode())))
+
+
+def get_laps(connection, track=None, session_type=None, team_id=None, since=None, valid_only=False,
+             order_by_lap_time=False, limit=100):
+    """ Archived laps (with their session's track, session type and team), newest first unless ordered by lap time """
+    conditions, parameters = ["1"], []
+    for column, value in (("sessions.track", track), ("sessions.session_type", session_type),
+                          ("sessions.team_id", team_id)):
+        if value is not None:
+            conditions.append("%s = ?" % column)
+            parameters.append(value)
+    if since is not None:
+        conditions.append("sessions.started_at >= ?")
+        parameters.append(since)
+    if valid_only:
+        conditions.append("laps.is_valid AND laps.lap_time_ms IS NOT NULL")
+    order = "laps.lap_time_ms" if order_by_lap_time else "laps.completed_at DESC"
+    return connection.execute(
+        "SELECT laps.*, sessions.track, sessions.session_type, sessions.team_id, sessions.game_version "
+        "FROM laps JOIN sessions ON sessions.id = laps.session_id WHERE %s ORDER BY %s LIMIT ?" % (
+            " AND ".join(conditions), order), parameters + [limit]).fetchall()
+
+
+def get_best_lap(connection, track, session_type=None, team_id=None, since=None):
+    """ Fastest valid lap at a track (by name, e.g. "Spa"), or None """
+    laps = get_laps(connection, track, session_type, team_id, since, valid_only=True, order_by_lap_time=True, limit=1)
+    return laps[0] if laps else None
+
+
+def get_lap_telemetry(connection, lap_id):
+    """ 
+    Frames of an archived lap as synced to F1Laps (frame numbers are strings), with the values of any
+    extra channels after the default ones; None if the lap has no telemetry
+    """
+    row = connection.execute("SELECT encoding, data FROM lap_telemetry WHERE lap_id = ?", (lap_id,)).fetchone()
+    if row is None:
+        return None
+    if row["encoding"] != TELEMETRY_ENCODING:
+        raise ValueError("Unknown telemetry encoding %s" % row["encoding"])
+    return json.loads(zlib.decompress(row["data"]))
@@ -0,0 +1,137 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+log = logging.getLogger(__name__)
+
+from receiver.receiver_base import ReceiverBase
+from receiver import metrics
+
+# Datagrams waiting for the processor; further datagrams get dropped (and counted)
+PACKET_QUEUE_SIZE = 4096
+# Max datagrams handed to the processor worker in one go
+MAX_PACKETS_PER_BATCH = 64
+
+dropped_packets = metrics.REGISTRY.counter(
+    "f1laps_async_receiver_dropped_packets_total", "Datagrams dropped because the asyncio receiver queue was full")
+
+
+class ReceiverProtocol(asyncio.DatagramProtocol):
+    """ Hands incoming datagrams to the AsyncRaceReceiver """
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data, addr):
+        self.receiver.enqueue_packet(data, addr)
+
+    def error_received(self, exc):
+        # e.g. ICMP port unreachable errors surfacing on Windows
+        log.info("Receiver socket error: %s", exc)
+
+
+class AsyncRaceReceiver(ReceiverBase):
+    """
+    asyncio alternative to the thread-based RaceReceiver, for embedding the receiver
+    in an app that already runs an event loop (overlays, bots, ...)
+
+    Datagrams are received on the event loop. The game processors are shared with
+    RaceReceiver and sync to F1Laps with blocking HTTP calls, so they run on a single
+    worker thread: packets keep their order, uploads are awaited by the consumer task,
+    and the loop is never blocked by the F1Laps API.
+
+        receiver = AsyncRaceReceiver(api_key)
+        await receiver.start()
+        ...
+        await receiver.stop()
+    """
+
+    def __init__(self, f1laps_api_key, settings=None, queue_size=PACKET_QUEUE_SIZE, **options):
+        super(AsyncRaceReceiver, self).__init__(f1laps_api_key, settings, **options)
+        self.queue_size = queue_size
+        self.queue = None
+        self.transport = None
+        self.consumer_task = None
+        self.executor = None
+
+    async def start(self):
+        """ Start receiving on the running event loop """
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.udp_socket.setblocking(False)
+        self.transport, _ = await loop.create_datagram_endpoint(lambda: ReceiverProtocol(self), sock=self.udp_socket)
+        self.consumer_task = loop.create_task(self.consume_packets())
+        log.info("Async receiver started running")
+        return self
+
+    async def stop(self):
+        """ Stop receiving, process the datagrams already queued and close the sockets """
+        if self.transport is None:
+            if self.consumer_task is None:
+                # Never started
+                self.udp_socket.close()
+                self.stop_redirect()
+                self.stop_event_subscribers()
+                self.stop_metrics()
+            return
+        # Closing the transport closes the UDP socket
+        self.transport.close()
+        self.transport = None
+        # Wakes up the consumer if it's idle, and marks the end of the queue otherwise
+        await self.queue.put(None)
+        await self.consumer_task
+        self.executor.shutdown(wait=True)
+        self.report_shutdown()
+        self.stop_redirect()
+        self.stop_event_subscribers()
+        self.stop_metrics()
+        log.info("Async receiver finished running")
+
+    async def serve_forever(self):
+        """ Receive until cancelled """
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    def enqueue_packet(self, data, source_address=None):
+        if self.transport is None:
+            # Stopping; the end-of-queue marker may already be queued
+            return
+        try:
+            self.queue.put_nowait((data, source_address))
+        except asyncio.QueueFull:
+            dropped_packets.inc()
+
+    async def consume_packets(self):
+        """ Hand queued datagrams to the processor worker in batches, until stop() """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < MAX_PACKETS_PER_BATCH and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            stopping = batch[-1] is None
+            if stopping:
+                batch.pop()
+            if batch:
+                await loop.run_in_executor(self.executor, self.handle_udp_packets, batch)
+            if stopping:
+                return
+
+    def handle_udp_packets(self, batch):
+        for incoming_udp_packet, source_address in batch:
+            self.handle_udp_packet(incoming_udp_packet, source_address)
+
+    async def run_in_processor(self, function, *args):
+        """
+        Run function on the processor worker, e.g. to read session state
+        without racing the packets being processed
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
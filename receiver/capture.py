@@ -0,0 +1,158 @@
+"""
+Capture files: the raw datagrams a receiver got, for replays and offline analysis
+
+A capture file starts with CAPTURE_MAGIC, followed by one record per datagram:
+its receive time (seconds since the epoch, little endian double), its length
+(little endian uint32), and the datagram as it came off the socket.
+
+CaptureTarget is a redirect target (see receiver/redirect.py) that appends to
+a capture file from its own thread, so recording never delays the receiver:
+
+    receiver = RaceReceiver(api_key, capture_path="race.f1cap")
+
+iter_records() reads a capture one datagram at a time; iter_blocks() maps it and
+hands out the offsets of its records a block at a time, for batch decoders such
+as receiver/f12022/capture_decoder.py.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+import logging
+log = logging.getLogger(__name__)
+
+from receiver.redirect import RedirectTarget, REDIRECT_QUEUE_SIZE, redirected_packets, redirect_errors
+
+CAPTURE_MAGIC = b"F1LCAP\x00\x01"
+# Receive time, datagram length
+RECORD_HEADER = struct.Struct("<dI")
+RECORD_LENGTH = struct.Struct("<I")
+RECORD_LENGTH_OFFSET = RECORD_HEADER.size - RECORD_LENGTH.size
+# Bytes of records scanned at a time by iter_blocks()
+CAPTURE_BLOCK_SIZE = 16 * 2 ** 20
+
+
+class CaptureTarget(RedirectTarget):
+    """ Appends datagrams, optionally only of some packet types, to the capture file at path """
+
+    def __init__(self, path, packet_types=None, queue_size=REDIRECT_QUEUE_SIZE):
+        super(CaptureTarget, self).__init__(None, 0, packet_types, queue_size)
+        self.path = path
+        self.name = "capture:%s" % path
+        self.capture_file = None
+
+    def __repr__(self):
+        return "CaptureTarget(%s)" % self.path
+
+    def start(self):
+        self.capture_file = open(self.path, "ab")
+        if self.capture_file.tell() == 0:
+            self.capture_file.write(CAPTURE_MAGIC)
+        self.thread = threading.Thread(target=self.run, name="capture-%s" % os.path.basename(self.path), daemon=True)
+        self.thread.start()
+        return self
+
+    def offer(self, packet):
+        """ Queue a datagram (with the time it was received) for writing; never blocks """
+        super(CaptureTarget, self).offer((time.time(), packet))
+
+    def run(self):
+        running = True
+        while running:
+            records = [self.queue.get()]
+            # Write everything that's queued at once, with a single flush
+            while not self.queue.empty():
+                records.append(self.queue.get_nowait())
+            if records[-1] is None:
+                records.pop()
+                running = False
+            self.write(records)
+        self.capture_file.close()
+
+    def write(self, records):
+        try:
+            for received_at, packet in records:
+                self.capture_file.write(RECORD_HEADER.pack(received_at, len(packet)))
+                self.capture_file.write(packet)
+            self.capture_file.flush()
+            redirected_packets.inc(self.name, amount=len(records))
+        except OSError as ex:
+            redirect_errors.inc(self.name, amount=len(records))
+            log.info("Could not write %s packets to %s: %s", len(records), self.path, ex)
+
+
+def check_magic(capture_file):
+    if capture_file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+        raise ValueError("%s is not a capture file" % capture_file.name)
+
+
+def iter_records(path):
+    """ (receive time, datagram) of every datagram in a capture """
+    with open(path, "rb") as capture_file:
+        check_magic(capture_file)
+        while True:
+            header = capture_file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            received_at, length = RECORD_HEADER.unpack(header)
+            packet = capture_file.read(length)
+            if len(packet) < length:
+                # The capture was cut off while writing this record
+                break
+            yield received_at, packet
+
+
+def scan_records(buffer, position, stop):
+    """
+    Offsets of the complete records in buffer that start from position up to stop, followed by the end
+    of the last one. Datagram i is buffer[offsets[i] + RECORD_HEADER.size:offsets[i + 1]].
+    """
+    offsets = [position]
+    append = offsets.append
+    unpack_length = RECORD_LENGTH.unpack_from
+    header_size = RECORD_HEADER.size
+    stop = min(stop, len(buffer) - header_size + 1)
+    while position < stop:
+        position += header_size + unpack_length(buffer, position + RECORD_LENGTH_OFFSET)[0]
+        append(position)
+    if position > len(buffer):
+        # The capture was cut off while writing this record
+        offsets.pop()
+    return offsets
+
+
+def map_capture(path):
+    """ Read-only mapping of a capture, or None if it has no records yet """
+    with open(path, "rb") as capture_file:
+        check_magic(capture_file)
+        if os.fstat(capture_file.fileno()).st_size == len(CAPTURE_MAGIC):
+            return None
+        # Stays valid after the file is closed
+        return mmap.mmap(capture_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def iter_record_offsets(mapping, block_size=CAPTURE_BLOCK_SIZE):
+    """ Scan a capture's mapping in blocks of about block_size bytes; yields the record offsets of every block """
+    position = len(CAPTURE_MAGIC)
+    while position < len(mapping):
+        offsets = scan_records(mapping, position, position + block_size)
+        if len(offsets) == 1:
+            log.info("Skipping %s bytes of an incomplete record at the end of the capture", len(mapping) - position)
+            break
+        yield offsets
+        position = offsets[-1]
+
+
+def iter_blocks(path, block_size=CAPTURE_BLOCK_SIZE):
+    """
+    Map a capture and yield (mapping, record offsets) for every block of about block_size bytes
+    (see scan_records). A record starts with its receive time.
+    Views of the mapping must be released before the next block is read.
+    """
+    mapping = map_capture(path)
+    if mapping is None:
+        return
+    with mapping:
+        for offsets in iter_record_offsets(mapping, block_size):
+            yield mapping, offsets
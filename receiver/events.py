@@ -0,0 +1,176 @@
+"""
+Internal bus for session and lap events, e.g. for local exports, overlays or analytics
+
+Sessions publish events (see the event types below) on BUS. Every subscriber
+has its own worker thread and bounded queue, like redirect targets, so a slow
+subscriber only ever drops its own events and never delays the packet path.
+Publishing without subscribers is a no-op.
+
+Laps are handed over as snapshots taken when the event is published (see
+LapBase.snapshot), so subscribers read them as they were, from their own
+threads, while the session goes on. Sessions and penalties are the session's
+own objects, which the packet path keeps updating: subscribers should only
+read them, and copy what they need.
+
+    def export_lap(event):
+        ...
+
+    events.BUS.subscribe(export_lap, [events.LAP_COMPLETED])
+"""
+import queue
+import threading
+import time
+import logging
+log = logging.getLogger(__name__)
+
+from receiver import metrics
+
+LAP_STARTED = "lap_started"
+LAP_COMPLETED = "lap_completed"
+SESSION_STARTED = "session_started"
+SESSION_ENDED = "session_ended"
+FLASHBACK = "flashback"
+PENALTY = "penalty"
+EVENT_TYPES = (LAP_STARTED, LAP_COMPLETED, SESSION_STARTED, SESSION_ENDED, FLASHBACK, PENALTY)
+
+# Events waiting for a subscriber; further events get dropped (and counted)
+SUBSCRIBER_QUEUE_SIZE = 256
+# How long stop() waits for a subscriber to handle what's queued
+SUBSCRIBER_STOP_TIMEOUT = 1
+
+delivered_events = metrics.REGISTRY.counter(
+    "f1laps_events_delivered_total", "Events handled by subscribers, by subscriber and event type",
+    ("subscriber", "event_type"))
+dropped_events = metrics.REGISTRY.counter(
+    "f1laps_events_dropped_total", "Events dropped because a subscriber's queue was full, by subscriber",
+    ("subscriber",))
+subscriber_errors = metrics.REGISTRY.counter(
+    "f1laps_event_subscriber_errors_total", "Exceptions raised by subscribers, by subscriber", ("subscriber",))
+subscriber_lag = metrics.REGISTRY.gauge(
+    "f1laps_event_subscriber_lag_seconds", "Time between publishing and handling of a subscriber's latest event",
+    ("subscriber",))
+
+
+class Event:
+    """ Something that happened in a session; data depends on the event type """
+    __slots__ = ("event_type", "session", "data", "published_at")
+
+    def __init__(self, event_type, session, data):
+        self.event_type = event_type
+        self.session = session
+        self.data = data
+        self.published_at = time.monotonic()
+
+    def __repr__(self):
+        return "Event(%s, %s)" % (self.event_type, self.data)
+
+
+class Subscriber:
+    """ Calls callback(event) from its own thread for the events of the given types (None means all) """
+
+    def __init__(self, callback, event_types=None, name=None, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        if event_types is not None:
+            unknown_types = set(event_types) - set(EVENT_TYPES)
+            if unknown_types:
+                raise ValueError("Unknown event types %s" % ", ".join(sorted(unknown_types)))
+            event_types = frozenset(event_types)
+        self.callback = callback
+        self.event_types = event_types
+        self.name = name or getattr(callback, "__name__", repr(callback))
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+
+    def __repr__(self):
+        return "Subscriber(%s)" % self.name
+
+    def accepts(self, event_type):
+        return self.event_types is None or event_type in self.event_types
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="events-%s" % self.name, daemon=True)
+        self.thread.start()
+        return self
+
+    def offer(self, event):
+        """ Queue an event; never blocks """
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            dropped_events.inc(self.name)
+
+    def run(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                break
+            self.handle(event)
+
+    def handle(self, event):
+        subscriber_lag.set(time.monotonic() - event.published_at, self.name)
+        try:
+            self.callback(event)
+            delivered_events.inc(self.name, event.event_type)
+        except Exception as ex:
+            subscriber_errors.inc(self.name)
+            log.warning("Event subscriber %s failed on %s: %s", self.name, event, ex)
+
+    def stop(self, timeout=SUBSCRIBER_STOP_TIMEOUT):
+        """ Handle what's queued (for up to timeout seconds) and end the thread """
+        if self.thread is None:
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            log.info("Event subscriber %s is not keeping up, dropping its queued events", self.name)
+            return
+        self.thread.join(timeout)
+        self.thread = None
+
+
+class EventBus:
+    """ Hands every event to the subscribers of its type """
+
+    def __init__(self):
+        self.subscribers = []
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    def subscribe(self, callback, event_types=None, name=None, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        """ Start a subscriber (see Subscriber) and return it """
+        subscriber = callback if isinstance(callback, Subscriber) else \
+            Subscriber(callback, event_types, name, queue_size)
+        log.info("Event subscriber %s receives %s events", subscriber.name,
+                 ", ".join(sorted(subscriber.event_types)) if subscriber.event_types is not None else "all")
+        # Replaced rather than appended to, so publish() can iterate without a lock
+        self.subscribers = self.subscribers + [subscriber.start()]
+        return subscriber
+
+    def unsubscribe(self, subscriber, timeout=SUBSCRIBER_STOP_TIMEOUT):
+        self.subscribers = [subscribed for subscribed in self.subscribers if subscribed is not subscriber]
+        subscriber.stop(timeout)
+
+    def publish(self, event_type, session=None, **data):
+        subscribers = [subscriber for subscriber in self.subscribers if subscriber.accepts(event_type)]
+        if not subscribers:
+            return
+        # Snapshots (e.g. of laps) are taken here, on the publishing thread, and shared by the subscribers
+        data = {name: value.snapshot() if hasattr(value, "snapshot") else value for name, value in data.items()}
+        event = Event(event_type, session, data)
+        for subscriber in subscribers:
+            subscriber.offer(event)
+
+    def get_queue_depths(self):
+        return {(subscriber.name,): subscriber.queue.qsize() for subscriber in self.subscribers}
+
+    def stop(self, timeout=SUBSCRIBER_STOP_TIMEOUT):
+        """ Let every subscriber handle what's queued, and remove them """
+        subscribers, self.subscribers = self.subscribers, []
+        for subscriber in subscribers:
+            subscriber.stop(timeout)
+
+
+BUS = EventBus()
+
+metrics.REGISTRY.gauge("f1laps_event_queue_depth", "Events waiting for a subscriber, by subscriber", ("subscriber",),
+                       callback=BUS.get_queue_depths)
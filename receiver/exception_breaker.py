@@ -0,0 +1,99 @@
+"""
+Deduplicating circuit breaker for exceptions reported to Sentry
+
+A malformed stream or a bug in one packet type can raise on every packet,
+which would mean thousands of Sentry events per second. Exceptions are
+fingerprinted by type and the location they were raised at; only the first
+few of each fingerprint are sent per window, and the next event sent for
+that fingerprint carries the number of occurrences suppressed in between.
+"""
+from time import monotonic
+import os
+import sentry_sdk
+import logging
+log = logging.getLogger(__name__)
+
+from receiver import metrics
+
+
+exceptions_captured = metrics.REGISTRY.counter(
+    "f1laps_exceptions_total", "Receiver exceptions, by whether they were sent to Sentry or suppressed", ("result",))
+
+
+def get_exception_fingerprint(ex):
+    """ Fingerprint an exception by its type and the innermost frame of its traceback """
+    tb = ex.__traceback__
+    if tb is None:
+        return (type(ex).__name__, None, None)
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    return (type(ex).__name__, os.path.basename(tb.tb_frame.f_code.co_filename), tb.tb_lineno)
+
+
+class ExceptionWindow:
+    """ Capture state of a single fingerprint """
+
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.sent = 0
+        self.suppressed = 0
+
+
+class ExceptionCircuitBreaker:
+    """ Sends the first max_events_per_window exceptions of a fingerprint per window, counts the rest """
+    WINDOW_SECONDS = 60
+    MAX_EVENTS_PER_WINDOW = 3
+    # Don't grow forever if every exception has its own fingerprint
+    MAX_TRACKED_FINGERPRINTS = 256
+
+    def __init__(self, window_seconds=WINDOW_SECONDS, max_events_per_window=MAX_EVENTS_PER_WINDOW):
+        self.window_seconds = window_seconds
+        self.max_events_per_window = max_events_per_window
+        self.windows = {}
+
+    def capture(self, ex):
+        """ Send the exception to Sentry unless its fingerprint is over the limit; returns whether it was sent """
+        fingerprint = get_exception_fingerprint(ex)
+        now = monotonic()
+        window = self.windows.get(fingerprint)
+        if window is None:
+            if len(self.windows) >= self.MAX_TRACKED_FINGERPRINTS:
+                self.flush()
+                self.windows.clear()
+            window = self.windows[fingerprint] = ExceptionWindow(now)
+        elif now - window.started_at >= self.window_seconds:
+            suppressed = window.suppressed
+            window.started_at, window.sent, window.suppressed = now, 0, 0
+            if suppressed:
+                window.sent += 1
+                self.send(ex, fingerprint, suppressed)
+                return True
+        if window.sent < self.max_events_per_window:
+            window.sent += 1
+            self.send(ex, fingerprint)
+            return True
+        if not window.suppressed:
+            log.info("Suppressing further Sentry events for %s at %s:%s for up to %ss",
+                     fingerprint[0], fingerprint[1], fingerprint[2], self.window_seconds)
+        window.suppressed += 1
+        exceptions_captured.inc("suppressed")
+        return False
+
+    def send(self, ex, fingerprint, suppressed=0):
+        exceptions_captured.inc("sent")
+        with sentry_sdk.push_scope() as scope:
+            scope.set_extra("exception_fingerprint", "%s at %s:%s" % fingerprint)
+            if suppressed:
+                scope.set_extra("suppressed_occurrences", suppressed)
+            sentry_sdk.capture_exception(ex)
+
+    def flush(self):
+        """ Report suppressed counts that haven't been sent yet, e.g. on shutdown """
+        for fingerprint, window in self.windows.items():
+            if not window.suppressed:
+                continue
+            with sentry_sdk.push_scope() as scope:
+                scope.set_extra("exception_fingerprint", "%s at %s:%s" % fingerprint)
+                scope.set_extra("suppressed_occurrences", window.suppressed)
+                sentry_sdk.capture_message("Suppressed %s occurrences of %s at %s:%s" % ((window.suppressed,) + fingerprint))
+            window.suppressed = 0
@@ -0,0 +1,340 @@
+"""
+F1 2020 packet decoding
+
+Per-car packets (lap, telemetry, ...) carry data for all 22 cars, but we only
+ever use the player's car. Those are decoded into a PlayerCarPacket holding the
+header and only the player car's entry, read at its offset in the buffer.
+Packet types we don't process (motion, event, lobby info) aren't decoded at all.
+"""
+import ctypes
+import logging
+log = logging.getLogger(__name__)
+
+from receiver.game_version import CrossGamePacketHeader
+from lib.packets.representation import packet_representation
+
+
+class PacketBase(ctypes.LittleEndianStructure):
+    _pack_ = 1
+
+    def __repr__(self):
+        return packet_representation(self)
+
+
+class PacketHeader(CrossGamePacketHeader):
+    """ The F1 2020 header is the cross-game header """
+    pass
+
+
+class MarshalZone(PacketBase):
+    _fields_ = [
+        ("zoneStart", ctypes.c_float),
+        ("zoneFlag", ctypes.c_int8),
+    ]
+
+
+class WeatherForecastSample(PacketBase):
+    _fields_ = [
+        ("sessionType", ctypes.c_uint8),
+        ("timeOffset", ctypes.c_uint8),
+        ("weather", ctypes.c_uint8),
+        ("trackTemperature", ctypes.c_int8),
+        ("airTemperature", ctypes.c_int8),
+    ]
+
+
+class PacketSessionData(PacketBase):
+    """ Size: 251 bytes """
+    _fields_ = [
+        ("header", PacketHeader),
+        ("weather", ctypes.c_uint8),
+        ("trackTemperature", ctypes.c_int8),
+        ("airTemperature", ctypes.c_int8),
+        ("totalLaps", ctypes.c_uint8),
+        ("trackLength", ctypes.c_uint16),
+        ("sessionType", ctypes.c_uint8),
+        ("trackId", ctypes.c_int8),
+        ("formula", ctypes.c_uint8),
+        ("sessionTimeLeft", ctypes.c_uint16),
+        ("sessionDuration", ctypes.c_uint16),
+        ("pitSpeedLimit", ctypes.c_uint8),
+        ("gamePaused", ctypes.c_uint8),
+        ("isSpectating", ctypes.c_uint8),
+        ("spectatorCarIndex", ctypes.c_uint8),
+        ("sliProNativeSupport", ctypes.c_uint8),
+        ("numMarshalZones", ctypes.c_uint8),
+        ("marshalZones", MarshalZone * 21),
+        ("safetyCarStatus", ctypes.c_uint8),
+        ("networkGame", ctypes.c_uint8),
+        ("numWeatherForecastSamples", ctypes.c_uint8),
+        ("weatherForecastSamples", WeatherForecastSample * 20),
+    ]
+
+
+class LapData(PacketBase):
+    _fields_ = [
+        ("lastLapTime", ctypes.c_float),
+        ("currentLapTime", ctypes.c_float),
+        ("sector1TimeInMS", ctypes.c_uint16),
+        ("sector2TimeInMS", ctypes.c_uint16),
+        ("bestLapTime", ctypes.c_float),
+        ("bestLapNum", ctypes.c_uint8),
+        ("bestLapSector1TimeInMS", ctypes.c_uint16),
+        ("bestLapSector2TimeInMS", ctypes.c_uint16),
+        ("bestLapSector3TimeInMS", ctypes.c_uint16),
+        ("bestOverallSector1TimeInMS", ctypes.c_uint16),
+        ("bestOverallSector1LapNum", ctypes.c_uint8),
+        ("bestOverallSector2TimeInMS", ctypes.c_uint16),
+        ("bestOverallSector2LapNum", ctypes.c_uint8),
+        ("bestOverallSector3TimeInMS", ctypes.c_uint16),
+        ("bestOverallSector3LapNum", ctypes.c_uint8),
+        ("lapDistance", ctypes.c_float),
+        ("totalDistance", ctypes.c_float),
+        ("safetyCarDelta", ctypes.c_float),
+        ("carPosition", ctypes.c_uint8),
+        ("currentLapNum", ctypes.c_uint8),
+        ("pitStatus", ctypes.c_uint8),
+        ("sector", ctypes.c_uint8),
+        ("currentLapInvalid", ctypes.c_uint8),
+        ("penalties", ctypes.c_uint8),
+        ("gridPosition", ctypes.c_uint8),
+        ("driverStatus", ctypes.c_uint8),
+        ("resultStatus", ctypes.c_uint8),
+    ]
+
+
+class PacketLapData(PacketBase):
+    """ Size: 1190 bytes """
+    _fields_ = [
+        ("header", PacketHeader),
+        ("lapData", LapData * 22),
+    ]
+
+
+class ParticipantData(PacketBase):
+    _fields_ = [
+        ("aiControlled", ctypes.c_uint8),
+        ("driverId", ctypes.c_uint8),
+        ("teamId", ctypes.c_uint8),
+        ("raceNumber", ctypes.c_uint8),
+        ("nationality", ctypes.c_uint8),
+        ("name", ctypes.c_char * 48),
+        ("yourTelemetry", ctypes.c_uint8),
+    ]
+
+
+class PacketParticipantsData(PacketBase):
+    """ Size: 1213 bytes """
+    _fields_ = [
+        ("header", PacketHeader),
+        ("numActiveCars", ctypes.c_uint8),
+        ("participants", ParticipantData * 22),
+    ]
+
+
+class CarSetupData(PacketBase):
+    _fields_ = [
+        ("frontWing", ctypes.c_uint8),
+        ("rearWing", ctypes.c_uint8),
+        ("onThrottle", ctypes.c_uint8),
+        ("offThrottle", ctypes.c_uint8),
+        ("frontCamber", ctypes.c_float),
+        ("rearCamber", ctypes.c_float),
+        ("frontToe", ctypes.c_float),
+        ("rearToe", ctypes.c_float),
+        ("frontSuspension", ctypes.c_uint8),
+        ("rearSuspension", ctypes.c_uint8),
+        ("frontAntiRollBar", ctypes.c_uint8),
+        ("rearAntiRollBar", ctypes.c_uint8),
+        ("frontSuspensionHeight", ctypes.c_uint8),
+        ("rearSuspensionHeight", ctypes.c_uint8),
+        ("brakePressure", ctypes.c_uint8),
+        ("brakeBias", ctypes.c_uint8),
+        ("rearLeftTyrePressure", ctypes.c_float),
+        ("rearRightTyrePressure", ctypes.c_float),
+        ("frontLeftTyrePressure", ctypes.c_float),
+        ("frontRightTyrePressure", ctypes.c_float),
+        ("ballast", ctypes.c_uint8),
+        ("fuelLoad", ctypes.c_float),
+    ]
+
+
+class PacketCarSetupData(PacketBase):
+    """ Size: 1102 bytes """
+    _fields_ = [
+        ("header", PacketHeader),
+        ("carSetups", CarSetupData * 22),
+    ]
+
+
+class CarTelemetryData(PacketBase):
+    _fields_ = [
+        ("speed", ctypes.c_uint16),
+        ("throttle", ctypes.c_float),
+        ("steer", ctypes.c_float),
+        ("brake", ctypes.c_float),
+        ("clutch", ctypes.c_uint8),
+        ("gear", ctypes.c_int8),
+        ("engineRPM", ctypes.c_uint16),
+        ("drs", ctypes.c_uint8),
+        ("revLightsPercent", ctypes.c_uint8),
+        ("brakesTemperature", ctypes.c_uint16 * 4),
+        ("tyresSurfaceTemperature", ctypes.c_uint8 * 4),
+        ("tyresInnerTemperature", ctypes.c_uint8 * 4),
+        ("engineTemperature", ctypes.c_uint16),
+        ("tyresPressure", ctypes.c_float * 4),
+        ("surfaceType", ctypes.c_uint8 * 4),
+    ]
+
+
+class PacketCarTelemetryData(PacketBase):
+    """ Size: 1307 bytes """
+    _fields_ = [
+        ("header", PacketHeader),
+        ("carTelemetryData", CarTelemetryData * 22),
+        ("buttonStatus", ctypes.c_uint32),
+        ("mfdPanelIndex", ctypes.c_uint8),
+        ("mfdPanelIndexSecondaryPlayer", ctypes.c_uint8),
+        ("suggestedGear", ctypes.c_int8),
+    ]
+
+
+class CarStatusData(PacketBase):
+    _fields_ = [
+        ("tractionControl", ctypes.c_uint8),
+        ("antiLockBrakes", ctypes.c_uint8),
+        ("fuelMix", ctypes.c_uint8),
+        ("frontBrakeBias", ctypes.c_uint8),
+        ("pitLimiterStatus", ctypes.c_uint8),
+        ("fuelInTank", ctypes.c_float),
+        ("fuelCapacity", ctypes.c_float),
+        ("fuelRemainingLaps", ctypes.c_float),
+        ("maxRPM", ctypes.c_uint16),
+        ("idleRPM", ctypes.c_uint16),
+        ("maxGears", ctypes.c_uint8),
+        ("drsAllowed", ctypes.c_uint8),
+        ("drsActivationDistance", ctypes.c_uint16),
+        ("tyresWear", ctypes.c_uint8 * 4),
+        ("actualTyreCompound", ctypes.c_uint8),
+        ("visualTyreCompound", ctypes.c_uint8),
+        ("tyresAgeLaps", ctypes.c_uint8),
+        ("tyresDamage", ctypes.c_uint8 * 4),
+        ("frontLeftWingDamage", ctypes.c_uint8),
+        ("frontRightWingDamage", ctypes.c_uint8),
+        ("rearWingDamage", ctypes.c_uint8),
+        ("drsFault", ctypes.c_uint8),
+        ("engineDamage", ctypes.c_uint8),
+        ("gearBoxDamage", ctypes.c_uint8),
+        ("vehicleFiaFlags", ctypes.c_int8),
+        ("ersStoreEnergy", ctypes.c_float),
+        ("ersDeployMode", ctypes.c_uint8),
+        ("ersHarvestedThisLapMGUK", ctypes.c_float),
+        ("ersHarvestedThisLapMGUH", ctypes.c_float),
+        ("ersDeployedThisLap", ctypes.c_float),
+    ]
+
+
+class PacketCarStatusData(PacketBase):
+    """ Size: 1344 bytes """
+    _fields_ = [
+        ("header", PacketHeader),
+        ("carStatusData", CarStatusData * 22),
+    ]
+
+
+class FinalClassificationData(PacketBase):
+    _fields_ = [
+        ("position", ctypes.c_uint8),
+        ("numLaps", ctypes.c_uint8),
+        ("gridPosition", ctypes.c_uint8),
+        ("points", ctypes.c_uint8),
+        ("numPitStops", ctypes.c_uint8),
+        ("resultStatus", ctypes.c_uint8),
+        ("bestLapTime", ctypes.c_float),
+        ("totalRaceTime", ctypes.c_double),
+        ("penaltiesTime", ctypes.c_uint8),
+        ("numPenalties", ctypes.c_uint8),
+        ("numTyreStints", ctypes.c_uint8),
+        ("tyreStintsActual", ctypes.c_uint8 * 8),
+        ("tyreStintsVisual", ctypes.c_uint8 * 8),
+    ]
+
+
+class PacketFinalClassificationData(PacketBase):
+    """ Size: 839 bytes """
+    _fields_ = [
+        ("header", PacketHeader),
+        ("numCars", ctypes.c_uint8),
+        ("classificationData", FinalClassificationData * 22),
+    ]
+
+
+class PlayerCarPacket:
+    """
+    Header and the player car's entry of a per-car packet
+    The entry is exposed under the packet's array field name, indexed by
+    playerCarIndex, so packet.lapData[packet.header.playerCarIndex] works as usual
+    """
+
+    def __init__(self, header, array_field, entry):
+        self.header = header
+        setattr(self, array_field, {header.playerCarIndex: entry})
+
+
+class PlayerCarDecoder:
+    """ Decodes only the player car's entry of a per-car packet """
+
+    def __init__(self, packet_class, array_field):
+        array = getattr(packet_class, array_field)
+        self.array_field = array_field
+        self.array_offset = array.offset
+        self.entry_class = dict(packet_class._fields_)[array_field]._type_
+        self.entry_size = ctypes.sizeof(self.entry_class)
+        self.car_count = array.size // self.entry_size
+        self.packet_size = ctypes.sizeof(packet_class)
+
+    def decode(self, packet, header):
+        if header.playerCarIndex >= self.car_count:
+            raise ValueError("Player car index %s out of range" % header.playerCarIndex)
+        entry = self.entry_class.from_buffer_copy(packet, self.array_offset + header.playerCarIndex * self.entry_size)
+        return PlayerCarPacket(header, self.array_field, entry)
+
+
+class WholePacketDecoder:
+    """ Decodes the whole packet, for packets that aren't per car """
+
+    def __init__(self, packet_class):
+        self.packet_class = packet_class
+        self.packet_size = ctypes.sizeof(packet_class)
+
+    def decode(self, packet, header):
+        return self.packet_class.from_buffer_copy(packet)
+
+
+HeaderFieldsToDecoder = {
+    # Motion (0), event (3) and lobby info (9) packets aren't used, so they're skipped
+    1: WholePacketDecoder(PacketSessionData),
+    2: PlayerCarDecoder(PacketLapData, "lapData"),
+    4: PlayerCarDecoder(PacketParticipantsData, "participants"),
+    5: PlayerCarDecoder(PacketCarSetupData, "carSetups"),
+    6: PlayerCarDecoder(PacketCarTelemetryData, "carTelemetryData"),
+    7: PlayerCarDecoder(PacketCarStatusData, "carStatusData"),
+    8: PlayerCarDecoder(PacketFinalClassificationData, "classificationData"),
+}
+
+
+def unpack_udp_packet(packet):
+    """
+    Reads the header, which maps to the right decoder
+    Returns the decoded packet, or None for packet types we don't process
+    Raises ValueError for packets of the wrong size
+    """
+    header = PacketHeader.from_buffer_copy(packet)
+    decoder = HeaderFieldsToDecoder.get(header.packetId)
+    if not decoder:
+        log.debug("Skipping packet ID %s", header.packetId)
+        return None
+    if len(packet) != decoder.packet_size:
+        raise ValueError("Bad size for packet ID %s: expected %s bytes, received %s" % (
+            header.packetId, decoder.packet_size, len(packet)))
+    return decoder.decode(packet, header)
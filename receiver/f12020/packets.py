@@ -71,8 +71,8 @@ class LapPacket:
         if new_lap_started:
             last_lap_number = session.lap_number_current - 1
             log.debug("*************************************************")
-            log.info("New lap started (#%s in current session)" % session.lap_number_current)
-            log.debug("Lap time of last lap #%s: %s" % (last_lap_number, lap_data.lastLapTime))
+            log.info("New lap started (#%s in current session)", session.lap_number_current)
+            log.debug("Lap time of last lap #%s: %s", last_lap_number, lap_data.lastLapTime)
             log.debug("*************************************************")
             
             # Check if we know about the last lap 
@@ -134,7 +134,7 @@ class LapPacket:
         return session
 
     def process_lap_in_f1laps(self, session, lap_number):
-        log.debug("Creating lap #%s in F1Laps" % lap_number)
+        log.debug("Creating lap #%s in F1Laps", lap_number)
         return session.process_lap_in_f1laps(lap_number)
 
 
@@ -1,64 +1,49 @@
-import f1_2020_telemetry.packets
-from lib.logger import log
-
+from receiver.processor_base import ProcessorBase
+from receiver.f12020.decoder import unpack_udp_packet
 from receiver.f12020.packets import SessionPacket, ParticipantsPacket, CarSetupPacket, \
                                     FinalClassificationPacket, LapPacket, CarStatusPacket, \
                                     TelemetryPacket
 
-class F12020Processor:
-    session = None
-    f1laps_api_key = None
-    telemetry_enabled = True
-
-    def __init__(self, f1laps_api_key, enable_telemetry):
-        self.f1laps_api_key = f1laps_api_key
-        self.telemetry_enabled = enable_telemetry
-        log.info("Started F1 2020 game processor")
-        super(F12020Processor, self).__init__()
-
-    def process(self, unpacked_packet):
-        try:
-            packet = f1_2020_telemetry.packets.unpack_udp_packet(unpacked_packet)
-        except Exception as ex:
-            log.info("Couldn't unpack packet due to %s" % ex)
-            packet = None
-
+# Packet ID of the session packet, which creates sessions
+SESSION_PACKET_ID = 1
+
+
+class F12020Processor(ProcessorBase):
+    game_name = "F1 2020"
+
+    def __init__(self, f1laps_api_key, enable_telemetry, telemetry_settings=None):
+        # F1 2020 laps store the default channels as they come (see receiver/telemetry_base.py),
+        # telemetry_settings don't apply to them
+        super(F12020Processor, self).__init__(f1laps_api_key, enable_telemetry, telemetry_settings)
+        # The packet handlers are stateless, so one of each is created up front
+        self.session_handler = SessionPacket()
+        self.handlers = {
+            2: LapPacket(),
+            4: ParticipantsPacket(),
+            5: CarSetupPacket(),
+            6: TelemetryPacket(),
+            7: CarStatusPacket(),
+            8: FinalClassificationPacket(),
+        }
+
+    def unpack_udp_packet(self, incoming_udp_packet):
+        return unpack_udp_packet(incoming_udp_packet)
+
+    def process_packet(self, packet, lost_packets):
+        packet_id = packet.header.packetId
         # process session packets first
         # the session packet class returns a session object 
         # it doesn't change the session for existing sessions
         # it returns a new session object for new sessions
-        if packet and isinstance(packet, f1_2020_telemetry.packets.PacketSessionData_V1):
-            self.session = SessionPacket().process(packet, self.session)
+        if packet_id == SESSION_PACKET_ID:
+            self.session = self.session_handler.process(packet, self.session)
             if self.session:
                 self.session.f1laps_api_key = self.f1laps_api_key
                 self.session.telemetry_enabled = self.telemetry_enabled
 
         # dont do anything else if there isnt a session set
-        if packet and self.session:
-
-            # Now we listen to the actual race information
-            # Each package gets processed in real-time as it comes in
-
-            # Participants
-            if isinstance(packet, f1_2020_telemetry.packets.PacketParticipantsData_V1):
-                ParticipantsPacket().process(packet, self.session)
-
-            # Setup
-            if isinstance(packet, f1_2020_telemetry.packets.PacketCarSetupData_V1):
-                CarSetupPacket().process(packet, self.session)
-
-            # Lap Data
-            if isinstance(packet, f1_2020_telemetry.packets.PacketLapData_V1):
-                LapPacket().process(packet, self.session)
-
-            # Car Status Data
-            if isinstance(packet, f1_2020_telemetry.packets.PacketCarStatusData_V1):
-                CarStatusPacket().process(packet, self.session)
-
-            # Telemetry Data
-            if isinstance(packet, f1_2020_telemetry.packets.PacketCarTelemetryData_V1):
-                TelemetryPacket().process(packet, self.session)
-
-            # Final Classification
-            if isinstance(packet, f1_2020_telemetry.packets.PacketFinalClassificationData_V1):
-                FinalClassificationPacket().process(packet, self.session)
\ No newline at end of file
+        # Each package gets processed in real-time as it comes in
+        elif self.session:
+            handler = self.handlers.get(packet_id)
+            if handler:
+                handler.process(packet, self.session)
@@ -1,10 +1,11 @@
 import json
-import f1_2020_telemetry.types
 
 from receiver.session_base import SessionBase
 from receiver.f12020.api import F1LapsAPI
 from receiver.f12020.telemetry import Telemetry
+from receiver.f12020.types import Track
 from lib.logger import log
+from receiver import metrics
 
 
 class Session(SessionBase):
@@ -82,16 +83,17 @@ class Session(SessionBase):
                         is_valid              = self.lap_list[lap_number].get("is_valid", True),
                         telemetry_data_string = self.get_lap_telemetry_data(lap_number)
                     )
+        metrics.record_sync_result(metrics.lap_syncs, bool(response and response.status_code == 201))
         if response and response.status_code == 201:
-            log.info("Lap #%s successfully created in F1Laps" % lap_number)
+            log.info("Lap #%s successfully created in F1Laps", lap_number)
             return True
         else:
-            log.error("Error creating lap %s in F1Laps" % lap_number)
-            log.error("F1Laps API response: %s" % json.loads(response.content))
+            log.error("Error creating lap %s in F1Laps", lap_number)
+            log.error("F1Laps API response: %s", json.loads(response.content))
             return False
 
     def create_or_update_session_in_f1laps(self):
-        log.info("Updating session (%s) in F1Laps" % self.map_udp_session_id_to_f1laps_token())
+        log.info("Updating session (%s) in F1Laps", self.map_udp_session_id_to_f1laps_token())
         success,self.f1_laps_session_id = F1LapsAPI(self.f1laps_api_key, "f12020").session_create_or_update(
                     f1laps_session_id = self.f1_laps_session_id,
                     track_id          = self.track_id,
@@ -106,8 +108,9 @@ class Session(SessionBase):
                     setup_data        = self.setup,
                     is_online_game    = self.is_online_game
                 )
+        metrics.record_sync_result(metrics.session_syncs, success)
         if success:
-            log.info("Session (%s) successfully updated in F1Laps" % self.map_udp_session_id_to_f1laps_token())
+            log.info("Session (%s) successfully updated in F1Laps", self.map_udp_session_id_to_f1laps_token())
             return True
         else:
             log.info("Session not updated in F1Laps")
@@ -150,6 +153,6 @@ class Session(SessionBase):
         return lap_times
 
     def get_track_name(self):
-        return f1_2020_telemetry.types.TrackIDs.get(self.track_id)
+        return Track.get(self.track_id)
 
 
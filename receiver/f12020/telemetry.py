@@ -59,14 +59,14 @@ class TelemetryLap(TelemetryLapBase):
                     first_frame_distance_frame, first_frame_distance_values = frame_dict_sorted_by_distance[0]
                     first_frame_distance_value = first_frame_distance_values[KEY_INDEX_MAP["lap_distance"]]
                     if first_frame_distance_value < self.MAX_DISTANCE_COUNT_AS_NEW_LAP:
-                        log.info("Assuming an outlap started based on distance delta - killing all new frames (current distance %s, last distance %s, first frame distance %s)" % \
-                            (current_distance, self.last_lap_distance, first_frame_distance_value))
+                        log.info("Assuming an outlap started based on distance delta - killing all new frames (current distance %s, last distance %s, first frame distance %s)",
+                            current_distance, self.last_lap_distance, first_frame_distance_value)
                         self.remove_frame(frame_number)
                         # Important to return here to not set the last_lap_distance to the current_distance
                         return
                     else:
-                        log.info("Assuming a new lap started based on distance delta - killing all old frames (current distance %s, last distance %s, first frame distance %s)" % \
-                            (current_distance, self.last_lap_distance, first_frame_distance_value))
+                        log.info("Assuming a new lap started based on distance delta - killing all old frames (current distance %s, last distance %s, first frame distance %s)",
+                            current_distance, self.last_lap_distance, first_frame_distance_value)
                         self.frame_dict = {frame_number: frame}
         
         # Set the last distance value for future frames
@@ -0,0 +1,53 @@
+import json
+import logging
+log = logging.getLogger(__name__)
+
+from receiver.lap_base import LapBase
+from receiver.lap_telemetry_base import LapTelemetryBase
+
+
+class F12021LapTelemetry(LapTelemetryBase):
+    """Telemetry for a lap in F1 2021"""
+    # F1 2021 quali sessions have outlaps that need cleaning up, unlike F1 22
+    SESSION_TYPES_WITHOUT_OUTLAP = [1, 2, 3, 4, 13]
+
+    __slots__ = ()
+
+
+class F12021Lap(LapBase):
+    """
+    A lap in F1 2021
+    The in- and outlap logic stays in the Lap packet, so update() isn't used
+    """
+    telemetry_model = F12021LapTelemetry
+
+    __slots__ = ()
+
+    def __init__(self, lap_number, session_type, telemetry_enabled, telemetry_settings=None):
+        super(F12021Lap, self).__init__(lap_number, session_type, telemetry_enabled, telemetry_settings)
+        # Telemetry is recorded from the start of the lap
+        self.init_telemetry()
+
+    def update_telemetry(self, frame_identifier, **telemetry_values):
+        telemetry_values["frame_identifier"] = frame_identifier
+        self.telemetry.update(telemetry_values)
+
+    def get_telemetry_string(self, all_channels=False):
+        """ Get telemetry string of this lap for F1Laps sync (see LapBase), None if there are no frames """
+        if self.telemetry_enabled and self.telemetry and self.telemetry.has_frames():
+            return json.dumps(self.telemetry.frame_dict if all_channels else self.telemetry.get_sync_frame_dict())
+        return None
+
+    def json_serialize(self, include_telemetry=True):
+        """ Convert self to JSON, F1 2021 doesn't sync lap conditions and tyre wear """
+        return {
+            "lap_number": self.lap_number,
+            "sector_1_time_ms": self.sector_1_ms,
+            "sector_2_time_ms": self.sector_2_ms,
+            "sector_3_time_ms": self.sector_3_ms,
+            "car_race_position": self.car_race_position,
+            "pit_status": self.pit_status,
+            "tyre_compound_visual": self.tyre_compound_visual,
+            "telemetry_data_string": self.get_telemetry_string() if include_telemetry else None,
+            "penalties": [penalty.json_serialize() for penalty in self.penalties],
+        }
@@ -9,8 +9,13 @@ class PacketBase(ctypes.LittleEndianStructure):
     _pack_ = 1
     creates_session_object = False
 
+    @classmethod
+    def unpack(cls, packet):
+        """ Decode a packet from its UDP bytes """
+        return cls.from_buffer_copy(packet)
+
     def process(self, session):
-        log.debug("Skipping incoming %s because it doesn't have a '.process()' method" % self.__class__.__name__)
+        log.debug("Skipping incoming %s because it doesn't have a '.process()' method", self.__class__.__name__)
         return session
 
     def __repr__(self):
@@ -63,7 +63,7 @@ class PacketCarStatusData(PacketBase):
             car_status = self.carStatusData[self.header.playerCarIndex]
         except:
             return session
-        if session.lap_list:
-            current_lap = max(session.lap_list)
-            session.lap_list[current_lap]['tyre_compound_visual'] = car_status.visualTyreCompound
+        current_lap = session.get_current_lap()
+        if current_lap:
+            current_lap.tyre_compound_visual = car_status.visualTyreCompound
         return session
@@ -4,6 +4,7 @@ log = logging.getLogger(__name__)
 
 from .base import PacketBase, PacketHeader
 from receiver.f12021.penalty import F12021Penalty
+from receiver import events
 
 
 class FlashbackData(PacketBase):
@@ -62,8 +63,11 @@ class PacketEventData(PacketBase):
     def process_flashback(self, session):
         frame_id = self.eventDetails.flashback.flashbackFrameIdentifier
         session_time = self.eventDetails.flashback.flashbackSessionTime
-        log.info("Event: Flashback happened to frame %s and session time %s. Deleting frames." % (frame_id, session_time))
-        session.telemetry.process_flashback_event(frame_id)
+        log.info("Event: Flashback happened to frame %s and session time %s. Deleting frames.", frame_id, session_time)
+        current_lap = session.get_current_lap()
+        if current_lap:
+            current_lap.process_flashback_event(frame_id)
+        session.publish_event(events.FLASHBACK, frame_identifier=frame_id, session_time=session_time)
     
     def process_pentalty(self, session):
         penalty = F12021Penalty()
@@ -76,6 +80,7 @@ class PacketEventData(PacketBase):
         penalty.places_gained = self.eventDetails.penalty.placesGained
         penalty.session = session
         penalty.frame_id = self.header.frameIdentifier
-        log.info("Processing %s" % penalty)
+        log.info("Processing penalty (type %s, infringement %s, vehicle %s, lap %s)",
+                 penalty.penalty_type, penalty.infringement_type, penalty.vehicle_index, penalty.lap_number)
         penalty.add_to_lap()
         return penalty
@@ -74,7 +74,7 @@ class PacketLapData(PacketBase):
         
         if is_out_or_inlap:
             if not session.current_lap_in_outlap_logging_status:
-                log.info("Skipping lap #%s because it's an in-/outlap" % lap_number)
+                log.info("Skipping lap #%s because it's an in-/outlap", lap_number)
                 # In normal quali, the inlap is #n+1; In race it's #n
                 last_valid_lap_number = lap_number if not session.is_qualifying_non_one_shot() else lap_number - 1
                 self.update_previous_lap(session, last_valid_lap_number+1) # +1 because we're updating the previous lap
@@ -110,15 +110,16 @@ class PacketLapData(PacketBase):
         lap_number = self.get_lap_number()
         # Update lap list data
         if not self.packet_should_update_lap(session, lap_number):
-            log.info("Not updating lap #%s with 0 value because it's already set" % lap_number)
+            log.info("Not updating lap #%s with 0 value because it's already set", lap_number)
             return session
-        session.lap_list[lap_number]["lap_number"]        = lap_data.currentLapNum
-        session.lap_list[lap_number]["car_race_position"] = lap_data.carPosition
-        session.lap_list[lap_number]["pit_status"]        = self.get_pit_value(session, lap_data, lap_number)
-        session.lap_list[lap_number]["is_valid"]          = False if lap_data.currentLapInvalid == 1 else True
-        session.lap_list[lap_number]["sector_1_ms"]       = lap_data.sector1TimeInMS
-        session.lap_list[lap_number]["sector_2_ms"]       = lap_data.sector2TimeInMS
-        session.lap_list[lap_number]["sector_3_ms"]       = self.get_sector_3_ms(lap_data)
+        lap = session.lap_list[lap_number]
+        lap.lap_number        = lap_data.currentLapNum
+        lap.car_race_position = lap_data.carPosition
+        lap.pit_status        = self.get_pit_value(session, lap_data, lap_number)
+        lap.is_valid          = False if lap_data.currentLapInvalid == 1 else True
+        lap.sector_1_ms       = lap_data.sector1TimeInMS
+        lap.sector_2_ms       = lap_data.sector2TimeInMS
+        lap.sector_3_ms       = self.get_sector_3_ms(lap_data)
         return session
 
     def packet_should_update_lap(self, session, lap_number):
@@ -131,8 +132,8 @@ class PacketLapData(PacketBase):
             return True
         null_values = ["0", 0, None, ""]
         lap_data = self.lapData[self.header.playerCarIndex]
-        lap_list = session.lap_list[lap_number]
-        all_sectors_set = lap_list.get("sector_1_ms") and lap_list.get("sector_2_ms") and lap_list.get("sector_3_ms")
+        lap = session.lap_list[lap_number]
+        all_sectors_set = lap.sector_1_ms and lap.sector_2_ms and lap.sector_3_ms
         if all_sectors_set and lap_data.sector1TimeInMS in null_values:
             return False
         return True
@@ -140,13 +141,12 @@ class PacketLapData(PacketBase):
     def update_previous_lap(self, session, lap_number):
         lap_data = self.lapData[self.header.playerCarIndex]
         prev_lap_num = lap_number - 1
-        if not session.lap_list.get(prev_lap_num) or \
-           not (session.lap_list[prev_lap_num]["sector_1_ms"] and session.lap_list[prev_lap_num]["sector_2_ms"]):
-            log.info("Lap packet: not updating previous lap %s because it doesn't exist" % prev_lap_num)
+        prev_lap = session.lap_list.get(prev_lap_num)
+        if not prev_lap or not (prev_lap.sector_1_ms and prev_lap.sector_2_ms):
+            log.info("Lap packet: not updating previous lap %s because it doesn't exist", prev_lap_num)
             return
         # Calculate sector 3 time (so that it adds up to actual last lap time)
-        sector_3_ms = lap_data.lastLapTimeInMS - session.lap_list[prev_lap_num]["sector_1_ms"] - session.lap_list[prev_lap_num]["sector_2_ms"]
-        session.lap_list[prev_lap_num]["sector_3_ms"] = sector_3_ms
+        prev_lap.sector_3_ms = lap_data.lastLapTimeInMS - prev_lap.sector_1_ms - prev_lap.sector_2_ms
 
     def get_lap_number(self):
         try:
@@ -160,18 +160,18 @@ class PacketLapData(PacketBase):
         return round(sector_3_ms) if sector_3_ms else None 
 
     def is_new_lap(self, session, lap_number):
-        """ Empty dict {} should not count as new lap, so test for None only """
+        """ A lap that was dropped (reset) should not count as new lap, so test for None only """
         return session.lap_list.get(lap_number) is None
 
     def is_race_inlap(self, session, lap_number):
         # For race or OSQ inlaps (lap after last lap), the lap number doesn't increment
         # We use the following test to ignore the inlap
-        lap_list = session.lap_list.get(lap_number)
+        lap = session.lap_list.get(lap_number)
         current_distance = self.get_lap_distance()
         # If we're in the first x meters of a lap and also have all sector data -- it's an inlap
         if (current_distance and current_distance < MAX_DISTANCE_COUNT_AS_NEW_LAP) and \
-           (lap_list and lap_list.get("sector_1_ms") and lap_list.get("sector_2_ms") and lap_list.get("sector_3_ms")):
-            log.info("Skipping lap #%s because it's an inlap" % lap_number)
+           (lap and lap.sector_1_ms and lap.sector_2_ms and lap.sector_3_ms):
+            log.info("Skipping lap #%s because it's an inlap", lap_number)
             return True
         return False
 
@@ -187,9 +187,13 @@ class PacketLapData(PacketBase):
 
     def update_telemetry(self, session):
         lap_data = self.lapData[self.header.playerCarIndex]
-        frame = self.header.frameIdentifier
-        session.telemetry.set(frame, lap_time     = lap_data.currentLapTimeInMS,
-                                     lap_distance = lap_data.lapDistance)
+        lap = session.get_current_lap()
+        if not lap:
+            log.debug("Attempted to set telemetry without a current lap")
+            return session
+        lap.update_telemetry(self.header.frameIdentifier,
+                             lap_time     = lap_data.currentLapTimeInMS,
+                             lap_distance = lap_data.lapDistance)
         return session
 
     def get_pit_value(self, session, lap_data, lap_number):
@@ -197,8 +201,9 @@ class PacketLapData(PacketBase):
         # we want to keep the highest number of 
         # 0 = no pit; 1 = pit entry/exit; 2 = pitting
         # so that we store the "slowest" pit value
-        if session.lap_list.get(lap_number) and session.lap_list[lap_number].get("pit_status"):
-            return max(session.lap_list[lap_number]["pit_status"], lap_data.pitStatus)
+        lap = session.lap_list.get(lap_number)
+        if lap and lap.pit_status:
+            return max(lap.pit_status, lap_data.pitStatus)
         else:
             return lap_data.pitStatus
 
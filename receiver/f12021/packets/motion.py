@@ -73,20 +73,20 @@ class PacketMotionData(PacketBase):
         zpos = car_motion.worldPositionZ
         if xpos and zpos and session.lap_distance:
             if not session.last_logged_distance:
-                log.info("WPMAP: %s,%s,%s" % (
+                log.info("WPMAP: %s,%s,%s",
                     round(session.lap_distance, MINIMAP_ROUNDING), 
                     round(xpos, MINIMAP_ROUNDING), 
-                    round(zpos, MINIMAP_ROUNDING)
-                ))
+                    round(zpos, MINIMAP_ROUNDING),
+                    extra={"rate_limit": False})
                 session.last_logged_distance = session.lap_distance
             else:
                 spacing = session.lap_distance - session.last_logged_distance
                 if spacing < 0 or spacing > MINIMAP_SPACING_M:
-                    log.info("WPMAP: %s,%s,%s" % (
+                    log.info("WPMAP: %s,%s,%s",
                         round(session.lap_distance, MINIMAP_ROUNDING), 
                         round(xpos, MINIMAP_ROUNDING), 
-                        round(zpos, MINIMAP_ROUNDING)
-                    ))
+                        round(zpos, MINIMAP_ROUNDING),
+                        extra={"rate_limit": False})
                     session.last_logged_distance = session.lap_distance
         return session
         
\ No newline at end of file
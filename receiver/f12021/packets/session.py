@@ -75,6 +75,8 @@ class PacketSessionData(PacketBase):
             log.debug("Session is in spectating mode")
             return None
         if not self.is_active_session(session):
+            if session:
+                session.publish_end("replaced")
             return self.create_session()
         else:
             return self.update_session(session)
@@ -103,12 +105,11 @@ class PacketSessionData(PacketBase):
         if self.weather not in session.weather_ids:
             session.weather_ids.append(self.weather)
         session.start()
-        log.debug("Session vals: season %s weekend %s session %s UID %s" % (
+        log.debug("Session vals: season %s weekend %s session %s UID %s",
             self.seasonLinkIdentifier,
             self.weekendLinkIdentifier,
             self.sessionLinkIdentifier,
-            self.header.sessionUID
-            ))
+            self.header.sessionUID)
         return session
 
     def update_session(self, session):
@@ -3,6 +3,10 @@ import ctypes
 from lib.logger import log
 from .base import PacketBase, PacketHeader
 
+# Lap history and tyre stint slots in the packet
+MAX_LAP_HISTORY_COUNT = 100
+MAX_TYRE_STINT_COUNT = 8
+
 
 class LapHistoryData(PacketBase):
     _fields_ = [
@@ -31,6 +35,10 @@ class PacketSessionHistoryData(PacketBase):
     To reduce CPU and bandwidth, each packet relates to a specific vehicle and is sent every 1/20 s, 
     and the vehicle being sent is cycled through. 
     Therefore in a 20 car race you should receive an update for each vehicle at least once per second.
+
+    Only the header and summary are decoded up front. The packet is followed by
+    LapHistoryData * 100 and TyreStintsHistoryData * 8, of which we only decode
+    the player's laps, on demand (see get_lap_history).
     """
     _fields_ = [
         ("header", PacketHeader),  # Header
@@ -41,9 +49,23 @@ class PacketSessionHistoryData(PacketBase):
         ("bestSector1LapNum", ctypes.c_uint8),  # Lap the best Sector 1 time was achieved on
         ("bestSector2LapNum", ctypes.c_uint8),  # Lap the best Sector 2 time was achieved on
         ("bestSector3LapNum", ctypes.c_uint8),  # Lap the best Sector 3 time was achieved on
-        ("lapHistoryData", LapHistoryData * 100),
-        ("tyreStintsHistoryData", TyreStintsHistoryData * 8),
     ]
+    raw_packet = None
+
+    @classmethod
+    def unpack(cls, packet):
+        """ 
+        Copy the header and summary only
+        For the player's car, keep the bytes to decode its lap history from later
+        Raises ValueError for packets shorter than the full layout
+        """
+        if len(packet) < SESSION_HISTORY_PACKET_SIZE:
+            raise ValueError("Session history packet too short: expected %s bytes, received %s" % (
+                SESSION_HISTORY_PACKET_SIZE, len(packet)))
+        unpacked = cls.from_buffer_copy(packet)
+        if unpacked.is_current_player():
+            unpacked.raw_packet = packet
+        return unpacked
 
     def process(self, session):
         if not self.is_current_player():
@@ -51,8 +73,44 @@ class PacketSessionHistoryData(PacketBase):
         session = self.update_laps(session)
         return session
 
+    def get_lap_history(self, lap_number):
+        """ Decode the history of one lap (starting at 1), None if the packet doesn't have it """
+        if not 1 <= lap_number <= min(self.numLaps, MAX_LAP_HISTORY_COUNT) or self.raw_packet is None:
+            return None
+        # unpack() checked that the packet has every slot
+        offset = ctypes.sizeof(PacketSessionHistoryData) + (lap_number - 1) * ctypes.sizeof(LapHistoryData)
+        return LapHistoryData.from_buffer_copy(self.raw_packet, offset)
+
     def update_laps(self, session):
+        """
+        Reconcile the sector 3 times we computed from Lap packets with the game's lap times
+        Only completed laps with matching sector 1 and 2 times get updated, so that
+        in-/outlaps we dropped or reset are left alone. Each lap is reconciled once, as soon
+        as the game has its lap time, so a packet only decodes laps that weren't yet
+        """
+        current_lap = session.get_current_lap()
+        if not current_lap:
+            return session
+        for lap_number, lap in session.lap_list.items():
+            if lap_number >= current_lap.lap_number or lap_number in session.reconciled_lap_numbers or \
+                    not (lap.sector_1_ms and lap.sector_2_ms):
+                continue
+            lap_history = self.get_lap_history(lap_number)
+            if not lap_history or not lap_history.lapTimeInMS:
+                continue
+            session.reconciled_lap_numbers.add(lap_number)
+            if lap_history.sector1TimeInMS != lap.sector_1_ms or lap_history.sector2TimeInMS != lap.sector_2_ms:
+                continue
+            sector_3_ms = lap_history.lapTimeInMS - lap.sector_1_ms - lap.sector_2_ms
+            if sector_3_ms > 0 and sector_3_ms != lap.sector_3_ms:
+                log.info("Session history: updating sector 3 of lap #%s from %s to %s", lap_number, lap.sector_3_ms, sector_3_ms)
+                lap.sector_3_ms = sector_3_ms
         return session
 
     def is_current_player(self):
         return self.carIdx == self.header.playerCarIndex
+
+
+# Header and summary, followed by every lap history and tyre stint slot
+SESSION_HISTORY_PACKET_SIZE = ctypes.sizeof(PacketSessionHistoryData) + \
+    MAX_LAP_HISTORY_COUNT * ctypes.sizeof(LapHistoryData) + MAX_TYRE_STINT_COUNT * ctypes.sizeof(TyreStintsHistoryData)
@@ -50,12 +50,15 @@ class PacketCarTelemetryData(PacketBase):
             telemetry_data = self.carTelemetryData[self.header.playerCarIndex]
         except:
             return session
-        frame = self.header.frameIdentifier
-        session.telemetry.set(frame, speed    = telemetry_data.speed,
-                                     brake    = telemetry_data.brake,
-                                     throttle = telemetry_data.throttle,
-                                     gear     = telemetry_data.gear,
-                                     steer    = telemetry_data.steer,
-                                     drs      = telemetry_data.drs)
+        lap = session.get_current_lap()
+        if not lap:
+            return session
+        lap.update_telemetry(self.header.frameIdentifier,
+                             speed    = telemetry_data.speed,
+                             brake    = telemetry_data.brake,
+                             throttle = telemetry_data.throttle,
+                             gear     = telemetry_data.gear,
+                             steer    = telemetry_data.steer,
+                             drs      = telemetry_data.drs)
         return session
 
@@ -4,7 +4,8 @@ log = logging.getLogger(__name__)
 from receiver.session_base import SessionBase, ParticipantBase
 from .types import SessionType, Track
 from .api import F1LapsAPI2021
-from .telemetry import F12021Telemetry
+from .lap import F12021Lap
+from receiver import latency, metrics, events
 
 
 class F12021Session(SessionBase):
@@ -15,6 +16,8 @@ class F12021Session(SessionBase):
         # Meta
         self.f1laps_api_key = None
         self.telemetry_enabled = True
+        # Set by the processor, like the API key (see receiver/lap_telemetry_base.py)
+        self.telemetry_settings = None
         self.game_version = "f12021"
         
         # Session
@@ -29,13 +32,12 @@ class F12021Session(SessionBase):
         # Laps
         self.lap_list = {}
         self.current_lap_in_outlap_logging_status = False
+        # Laps whose times were reconciled with the session history packet
+        self.reconciled_lap_numbers = set()
 
         # Setup 
         self.setup = {}
 
-        # Telemetry
-        self.telemetry = F12021Telemetry()
-
         # Final classification
         self.participants = []
         self.finish_position = None
@@ -55,6 +57,7 @@ class F12021Session(SessionBase):
                                                          self.get_session_type(),
                                                          self.session_udp_uid))
         log.info("*************************************************")
+        self.publish_event(events.SESSION_STARTED)
 
     def set_session_type(self, session_type):
         """
@@ -63,7 +66,6 @@ class F12021Session(SessionBase):
         F1 Feature only = 10 (R)
         """
         self.session_type = session_type
-        self.telemetry.session_type = session_type
 
     def get_track_name(self):
         return Track.get(self.track_id)
@@ -76,11 +78,28 @@ class F12021Session(SessionBase):
         As set by the Lap packet, this method is called 
         when the currentLap number was increased 
         """
-        log.info("Session (via Lap packet): start new lap %s" % lap_number)
-        # Add new lap to lap list
-        self.lap_list[lap_number] = {}
-        # Update telemetry
-        self.telemetry.start_new_lap(lap_number)
+        log.info("Session (via Lap packet): start new lap %s", lap_number)
+        # Add new lap to lap list, which in turn starts its telemetry
+        self.lap_list[lap_number] = F12021Lap(lap_number, self.session_type, self.telemetry_enabled,
+                                              self.telemetry_settings)
+        self.reconciled_lap_numbers.discard(lap_number)
+        self.publish_event(events.LAP_STARTED, lap_number=lap_number, lap=self.lap_list[lap_number])
+        self.drop_old_telemetry()
+
+    def drop_old_telemetry(self):
+        """ 
+        Only the current and the previous lap keep their telemetry: older laps have been synced
+        (or never will be), and session syncs would otherwise re-send the telemetry of every lap
+        """
+        current_lap_number = max(self.lap_list)
+        for old_lap_number, lap in self.lap_list.items():
+            if lap.telemetry and old_lap_number < current_lap_number - 1:
+                lap.telemetry = None
+                log.info("Session: deleted telemetry of lap %s", old_lap_number)
+
+    def get_current_lap(self):
+        """ Return the most recent (highest) Lap object in self.lap_list """
+        return self.lap_list[max(self.lap_list)] if self.lap_list else None
 
     def complete_lap_v2(self, lap_number):
         """ 
@@ -88,17 +107,22 @@ class F12021Session(SessionBase):
         The Session History packet turned out to be too buggy, which is why the original complete_lap
         isn't used currently anymore.
         """
-        log.info("Session (via Lap packet): complete lap %s" % lap_number)
+        log.info("Session (via Lap packet): complete lap %s", lap_number)
+        if lap_number in self.lap_list:
+            self.lap_list[lap_number].finish_telemetry()
+            self.publish_event(events.LAP_COMPLETED, lap_number=lap_number, lap=self.lap_list[lap_number])
         self.post_process(lap_number)
 
     def post_process(self, lap_number):
         # Send to F1Laps
         if self.lap_should_be_sent_to_f1laps(lap_number):
-            log.info("Session: post process lap %s" % lap_number)
+            log.info("Session: post process lap %s", lap_number)
+            sync_start = latency.timer_start()
             if self.lap_should_be_sent_as_session():
                 self.send_session_to_f1laps()
             else:
                 self.send_lap_to_f1laps(lap_number)
+            latency.timer_stop(sync_start, latency.STAGE_SYNC)
     
     def drop_lap_data(self, lap_number):
         """ 
@@ -107,30 +131,32 @@ class F12021Session(SessionBase):
         so make sure to only update if it already exists
         """ 
         if self.lap_list.get(lap_number):
-            # Drop telemetry
-            self.telemetry.drop_lap(lap_number)
-            # Remove data from lap dict (but keep it in there so that it doesn't need to be started again)
-            self.lap_list[lap_number] = {}
-            log.info("Session (via Lap packet): dropped lap %s" % lap_number)
+            # Replace the lap with an empty one, including its telemetry 
+            # (but keep it in the lap list so that it doesn't need to be started again)
+            self.lap_list[lap_number] = F12021Lap(lap_number, self.session_type, self.telemetry_enabled,
+                                                  self.telemetry_settings)
+            log.info("Session (via Lap packet): dropped lap %s", lap_number)
 
     def complete_session(self):
         log.info("Session: complete session")
+        sync_start = latency.timer_start()
         self.send_session_to_f1laps()
+        latency.timer_stop(sync_start, latency.STAGE_SYNC)
+        self.publish_end("final_classification")
 
     def lap_should_be_sent_to_f1laps(self, lap_number):
         lap = self.lap_list.get(lap_number)
-        lap_f1laps_status_key = "has_been_sent_to_f1laps"
         if not lap:
-            log.info("Not sending lap #%s to F1Laps because it doesn't exist" % lap_number)
+            log.info("Not sending lap #%s to F1Laps because it doesn't exist", lap_number)
             return False
-        if not bool(lap.get('sector_1_ms') and lap.get('sector_2_ms') and lap.get('sector_3_ms')):
-            log.info("Not sending lap #%s to F1Laps because it doesn't have non-zero values for all sectors" % lap_number)
+        if not bool(lap.sector_1_ms and lap.sector_2_ms and lap.sector_3_ms):
+            log.info("Not sending lap #%s to F1Laps because it doesn't have non-zero values for all sectors", lap_number)
             return False
-        if lap.get(lap_f1laps_status_key):
-            log.debug("Not sending lap #%s to F1Laps because it has already been posted" % lap_number)
+        if lap.has_been_synced_to_f1l:
+            log.debug("Not sending lap #%s to F1Laps because it has already been posted", lap_number)
             return False
-        # Mark this session as "already sent to F1Laps, don't send again"
-        lap[lap_f1laps_status_key] = True
+        # Mark this lap as "already sent to F1Laps, don't send again"
+        lap.has_been_synced_to_f1l = True
         return True
 
     def lap_should_be_sent_as_session(self):
@@ -138,30 +164,32 @@ class F12021Session(SessionBase):
 
     def is_valid_for_f1laps(self):
         if self.session_type is None:
-            log.warning("Attempted to send session to F1Laps without session type: %s" % self)
+            log.warning("Attempted to send session to F1Laps without session type: %s", self)
             return False
         if self.team_id is None:
-            log.warning("Attempted to send session to F1Laps without team ID: %s" % self)
+            log.warning("Attempted to send session to F1Laps without team ID: %s", self)
             return False
         return True
 
     def send_lap_to_f1laps(self, lap_number):
         if not self.is_valid_for_f1laps():
             return 
+        lap = self.lap_list[lap_number]
         api = F1LapsAPI2021(self.f1laps_api_key, self.game_version)
         success = api.lap_create(
             track_id              = self.track_id,
             team_id               = self.team_id,
             conditions            = self.map_weather_ids_to_f1laps_token(),
             game_mode             = "time_trial",
-            sector_1_time         = self.lap_list[lap_number]["sector_1_ms"],
-            sector_2_time         = self.lap_list[lap_number]["sector_2_ms"],
-            sector_3_time         = self.lap_list[lap_number]["sector_3_ms"],
+            sector_1_time         = lap.sector_1_ms,
+            sector_2_time         = lap.sector_2_ms,
+            sector_3_time         = lap.sector_3_ms,
             setup_data            = self.setup,
-            is_valid              = self.lap_list[lap_number].get("is_valid", True),
-            telemetry_data_string = self.get_lap_telemetry_data(lap_number)
+            is_valid              = lap.is_valid,
+            telemetry_data_string = lap.get_telemetry_string()
         )
-        log.info("Lap %s successfully created in F1Laps" % lap_number) if success else log.info("Lap %s not created in F1Laps" % lap_number)
+        log.info("Lap %s successfully created in F1Laps", lap_number) if success else log.info("Lap %s not created in F1Laps", lap_number)
+        metrics.record_sync_result(metrics.lap_syncs, success)
 
     def send_session_to_f1laps(self):
         if not self.is_valid_for_f1laps():
@@ -183,6 +211,7 @@ class F12021Session(SessionBase):
             ai_difficulty     = self.ai_difficulty or None,
             classifications   = self.get_classification_list()
         )
+        metrics.record_sync_result(metrics.session_syncs, success)
         if success:
             log.info("Session successfully updated in F1Laps")
             return True
@@ -193,22 +222,8 @@ class F12021Session(SessionBase):
     def get_f1laps_lap_times_list(self):
         lap_times = []
         for lap_number, lap_object in self.lap_list.items():
-            if lap_object.get('sector_1_ms') and lap_object.get('sector_2_ms') and lap_object.get('sector_3_ms'):
-                serialized_lap = {
-                        "lap_number"           : lap_number,
-                        "sector_1_time_ms"     : lap_object['sector_1_ms'],
-                        "sector_2_time_ms"     : lap_object['sector_2_ms'],
-                        "sector_3_time_ms"     : lap_object['sector_3_ms'],
-                        "car_race_position"    : lap_object.get('car_race_position'),
-                        "pit_status"           : lap_object.get('pit_status'),
-                        "tyre_compound_visual" : lap_object.get('tyre_compound_visual'),
-                        "telemetry_data_string": self.get_lap_telemetry_data(lap_number),
-                        "penalties"            : []
-                    }
-                if lap_object.get("penalties"):
-                    for penalty in lap_object["penalties"]:
-                        serialized_lap["penalties"].append(penalty.json_serialize())
-                lap_times.append(serialized_lap)
+            if lap_object.sector_1_ms and lap_object.sector_2_ms and lap_object.sector_3_ms:
+                lap_times.append(lap_object.json_serialize())
         return lap_times
 
     def get_classification_list(self):
@@ -256,7 +271,7 @@ class F12021Session(SessionBase):
     def add_participant(self, **kwargs):
         participant = ParticipantBase(**kwargs)
         self.participants.append(participant)
-        log.debug("Added Participant: %s" % participant)
+        log.debug("Added Participant: %s", participant)
     
     def has_ended(self):
         return bool(self.finish_position is not None)
@@ -0,0 +1,209 @@
+"""
+Batch decoder of the F1 22 car packets in capture files (see receiver/capture.py)
+
+Instead of unpacking datagrams one by one into ctypes structures, this maps a
+capture, scans its records and decodes all lap, car telemetry, car status and
+car damage packets at once with NumPy: the packet structures are mapped to
+structured dtypes with the same layout, so the packets of one type are gathered
+into one array and viewed as that dtype.
+
+Every packet type decodes to CarPackets, with per packet header values and the
+data of every car, indexed by packet and car:
+
+    packets = decode_capture("race.f1cap", ["lap", "telemetry"])
+    telemetry = packets["telemetry"]
+    telemetry.frame_identifier        # (packets,)
+    telemetry.column("speed")         # (packets, 22)
+    telemetry.player("throttle")      # (packets,), the player's car, masked where there is none
+
+Needs NumPy.
+"""
+import ctypes
+import logging
+log = logging.getLogger(__name__)
+
+try:
+    import numpy
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:
+    numpy = None
+
+from receiver.capture import iter_blocks, iter_record_offsets, map_capture, CAPTURE_BLOCK_SIZE, CAPTURE_MAGIC, \
+    RECORD_HEADER
+from receiver.game_version import PACKET_ID_OFFSET, get_packet_type_name
+from receiver.redirect import get_packet_ids
+from receiver.f12022.packets.base import PacketHeader
+from receiver.f12022.packets.lap import PacketLapData
+from receiver.f12022.packets.telemetry import PacketCarTelemetryData
+from receiver.f12022.packets.car_status import PacketCarStatusData
+from receiver.f12022.packets.car_damage import PacketCarDamageData
+
+PACKET_FORMAT = 2022
+# Packet id: (packet structure, field with the data of every car)
+CAR_PACKETS = {
+    2: (PacketLapData, "lapData"),
+    6: (PacketCarTelemetryData, "carTelemetryData"),
+    7: (PacketCarStatusData, "carStatusData"),
+    10: (PacketCarDamageData, "carDamageData"),
+}
+# ctypes type codes by NumPy kind
+UNSIGNED_CODES = "BHILQ"
+SIGNED_CODES = "bhilq"
+FLOAT_CODES = "fd"
+
+
+def get_dtype(ctype):
+    """ NumPy dtype with the layout of a little endian ctypes structure, array or simple type """
+    if issubclass(ctype, ctypes.Structure):
+        names, formats, offsets = [], [], []
+        for field in ctype._fields_:
+            if len(field) > 2:
+                raise ValueError("Bit fields (%s.%s) have no NumPy dtype" % (ctype.__name__, field[0]))
+            names.append(field[0])
+            formats.append(get_dtype(field[1]))
+            offsets.append(getattr(ctype, field[0]).offset)
+        return numpy.dtype({"names": names, "formats": formats, "offsets": offsets,
+                            "itemsize": ctypes.sizeof(ctype)})
+    if issubclass(ctype, ctypes.Array):
+        if ctype._type_ is ctypes.c_char:
+            return numpy.dtype("S%s" % ctype._length_)
+        return numpy.dtype((get_dtype(ctype._type_), (ctype._length_,)))
+    code = ctype._type_
+    if code in UNSIGNED_CODES:
+        return numpy.dtype("<u%s" % ctypes.sizeof(ctype))
+    if code in SIGNED_CODES:
+        return numpy.dtype("<i%s" % ctypes.sizeof(ctype))
+    if code in FLOAT_CODES:
+        return numpy.dtype("<f%s" % ctypes.sizeof(ctype))
+    if code == "?":
+        return numpy.dtype("?")
+    if code == "c":
+        return numpy.dtype("S1")
+    raise ValueError("No NumPy dtype for ctypes type %s" % ctype.__name__)
+
+
+PACKET_DTYPES = {packet_id: get_dtype(packet_class)
+                 for packet_id, (packet_class, _) in CAR_PACKETS.items()} if numpy is not None else {}
+
+
+class CarPackets:
+    """ Decoded packets of one type: header values per packet, and the data of every car per packet """
+    __slots__ = ("packet_id", "packets", "received_at")
+
+    def __init__(self, packet_id, packets, received_at):
+        self.packet_id = packet_id
+        # Structured array with the packet structure's fields, e.g. packets["header"]["frameIdentifier"]
+        self.packets = packets
+        self.received_at = received_at
+
+    def __repr__(self):
+        return "CarPackets(%s, %s packets)" % (get_packet_type_name(self.packet_id), len(self))
+
+    def __len__(self):
+        return len(self.packets)
+
+    @property
+    def frame_identifier(self):
+        return self.packets["header"]["frameIdentifier"]
+
+    @property
+    def session_uid(self):
+        return self.packets["header"]["sessionUID"]
+
+    @property
+    def session_time(self):
+        return self.packets["header"]["sessionTime"]
+
+    @property
+    def player_car_index(self):
+        return self.packets["header"]["playerCarIndex"]
+
+    @property
+    def cars(self):
+        """ Structured array of shape (packets, 22) with the car structure's fields, e.g. LapData """
+        return self.packets[CAR_PACKETS[self.packet_id][1]]
+
+    def column(self, field):
+        """ A car field (e.g. "speed") as a contiguous (packets, 22) array, or (packets, 22, 4) for tyres """
+        return numpy.ascontiguousarray(self.cars[field])
+
+    def player(self, field):
+        """
+        A car field of the player's car only, as a masked array with a value per packet (so it lines up
+        with the header values); packets without a player car are masked
+        """
+        player_car_index = self.player_car_index
+        # Spectating or invalid packets may point past the cars (255)
+        no_player = player_car_index >= self.cars.shape[1]
+        values = self.cars[field][numpy.arange(len(self)), numpy.where(no_player, 0, player_car_index)]
+        mask = numpy.broadcast_to(no_player.reshape((-1,) + (1,) * (values.ndim - 1)), values.shape)
+        return numpy.ma.masked_array(values, mask=mask)
+
+
+def check_numpy():
+    if numpy is None:
+        raise ImportError("Decoding captures needs NumPy")
+
+
+def get_car_packet_ids(packet_types):
+    """ Ids of the car packet types to decode (by name, e.g. "telemetry", or id); None means all """
+    packet_ids = get_packet_ids(packet_types)
+    if packet_ids is None:
+        return sorted(CAR_PACKETS)
+    for packet_id in packet_ids:
+        if packet_id not in CAR_PACKETS:
+            raise ValueError("Can't batch decode %s packets" % get_packet_type_name(packet_id))
+    return sorted(packet_ids)
+
+
+def decode_block(buffer, record_offsets, packet_ids):
+    """ CarPackets by packet id, of the records at record_offsets in buffer (see receiver.capture.iter_blocks) """
+    data = numpy.frombuffer(buffer, dtype=numpy.uint8)
+    record_offsets = numpy.asarray(record_offsets, dtype=numpy.int64)
+    offsets = record_offsets[:-1] + RECORD_HEADER.size
+    lengths = record_offsets[1:] - offsets
+    has_header = lengths >= ctypes.sizeof(PacketHeader)
+    offsets, lengths = offsets[has_header], lengths[has_header]
+    packet_formats = data[offsets] | data[offsets + 1].astype(numpy.uint16) << 8
+    packet_type_ids = data[offsets + PACKET_ID_OFFSET]
+    is_packet_format = packet_formats == PACKET_FORMAT
+    decoded = {}
+    for packet_id in packet_ids:
+        dtype = PACKET_DTYPES[packet_id]
+        selected = offsets[is_packet_format & (packet_type_ids == packet_id) & (lengths >= dtype.itemsize)]
+        if not len(selected):
+            decoded[packet_id] = CarPackets(packet_id, numpy.empty(0, dtype=dtype), numpy.empty(0))
+            continue
+        # Copy every packet's bytes into a row of its own; the rows then are an array of the packet dtype
+        rows = sliding_window_view(data, dtype.itemsize)[selected]
+        # Receive times start the records
+        received_at = sliding_window_view(data, 8)[selected - RECORD_HEADER.size]
+        decoded[packet_id] = CarPackets(packet_id, rows.view(dtype)[:, 0], received_at.view("<f8")[:, 0])
+    return decoded
+
+
+def iter_decoded(path, packet_types=None, block_size=CAPTURE_BLOCK_SIZE):
+    """ CarPackets by packet type name for every block of a capture, so captures needn't fit in memory """
+    check_numpy()
+    packet_ids = get_car_packet_ids(packet_types)
+    for buffer, record_offsets in iter_blocks(path, block_size):
+        # Decoded packets are copies, so they outlive the capture's mapping
+        decoded = decode_block(buffer, record_offsets, packet_ids)
+        yield {get_packet_type_name(packet_id): packets for packet_id, packets in decoded.items()}
+
+
+def decode_capture(path, packet_types=None, block_size=CAPTURE_BLOCK_SIZE):
+    """ CarPackets by packet type name (e.g. "telemetry") of a whole capture """
+    check_numpy()
+    packet_ids = get_car_packet_ids(packet_types)
+    mapping = map_capture(path)
+    if mapping is None:
+        decoded = decode_block(b"", [0], packet_ids)
+    else:
+        with mapping:
+            # Scan the whole capture first, so every packet type is gathered at once, without concatenating
+            blocks = [numpy.asarray(offsets, dtype=numpy.int64) for offsets in iter_record_offsets(mapping, block_size)]
+            record_offsets = numpy.concatenate([offsets[:-1] for offsets in blocks] + [blocks[-1][-1:]]) \
+                if blocks else [len(CAPTURE_MAGIC)]
+            decoded = decode_block(mapping, record_offsets, packet_ids)
+    return {get_packet_type_name(packet_id): packets for packet_id, packets in decoded.items()}
@@ -6,4 +6,4 @@ from receiver.lap_base import LapBase
 
 class F12022Lap(LapBase):
     """A lap in the game"""
-    pass
\ No newline at end of file
+    __slots__ = ()
\ No newline at end of file
@@ -11,7 +11,7 @@ class PacketBase(ctypes.LittleEndianStructure):
     creates_session_object = False
 
     def serialize(self, session):
-        log.debug("Skipping incoming %s because it doesn't have a '.serialize()' method" % self.__class__.__name__)
+        log.debug("Skipping incoming %s because it doesn't have a '.serialize()' method", self.__class__.__name__)
         return session
 
     def __repr__(self):
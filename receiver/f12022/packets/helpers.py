@@ -39,9 +39,9 @@ def unpack_udp_packet(packet):
     """
     header = PacketHeader.from_buffer_copy(packet)
     packet_type = HeaderFieldsToPacketType.get(header.packetId)
-    log.debug("Found packet type %s ID %s" % (packet_type, header.packetId))
+    log.debug("Found packet type %s ID %s", packet_type, header.packetId)
     if packet_type:
         return packet_type.from_buffer_copy(packet)
     else:
-        log.debug("Received unknown packet_type %s" % packet_type)
+        log.debug("Received unknown packet_type %s", packet_type)
         return None
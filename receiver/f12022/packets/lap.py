@@ -70,6 +70,7 @@ class PacketLapData(PacketBase):
             "sector_1_ms": lap_data.sector1TimeInMS,
             "sector_2_ms": lap_data.sector2TimeInMS,
             "sector_3_ms": self.get_sector_3_ms(lap_data),
+            "sector": lap_data.sector,
             "lap_distance": lap_data.lapDistance,
             "frame_identifier": self.header.frameIdentifier
         }
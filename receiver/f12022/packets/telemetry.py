@@ -55,5 +55,7 @@ class PacketCarTelemetryData(PacketBase):
             "gear": telemetry_data.gear,
             "steer": telemetry_data.steer,
             "drs": telemetry_data.drs,
+            # For extra channels (see receiver/telemetry_channels.py)
+            "car_telemetry_data": telemetry_data,
         }
     
\ No newline at end of file
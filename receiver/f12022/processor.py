@@ -5,41 +5,57 @@ from receiver.f12022.packets.helpers import unpack_udp_packet
 from receiver.f12022.session import F12022Session
 from receiver.f12022.penalty import F12022Penalty
 from receiver.f12022.types import SESSION_TYPE_OSQ
+from receiver import events
+from receiver.processor_base import ProcessorBase
+from receiver.telemetry_channels import ChannelSampler
 
+# Packets that feed a lap's telemetry, and hence its data quality score
+LAP_DATA_QUALITY_PACKET_IDS = (2, 6)
+TELEMETRY_PACKET_ID = 6
 
-class F12022Processor:
-    session = None
-    f1laps_api_key = None
-    telemetry_enabled = True
 
-    def __init__(self, f1laps_api_key, enable_telemetry):
-        self.f1laps_api_key = f1laps_api_key
-        self.telemetry_enabled = enable_telemetry
-        log.info("Started F1 2022 game processor")
-        super(F12022Processor, self).__init__()
+class F12022Processor(ProcessorBase):
+    game_name = "F1 2022"
 
-    def process(self, unpacked_packet):
-        try:
-            packet = unpack_udp_packet(unpacked_packet)
-        except Exception as ex:
-            log.info("Couldn't unpack packet due to %s" % ex)
-            packet = None
+    def __init__(self, f1laps_api_key, enable_telemetry, telemetry_settings=None):
+        super(F12022Processor, self).__init__(f1laps_api_key, enable_telemetry, telemetry_settings)
+        # Optional ingest-time decimation of telemetry frames (see receiver/telemetry_decimation.py)
+        self.decimator = self.telemetry_settings.get_decimator()
+        # Extra telemetry channels, each at its sampling rate (see receiver/telemetry_channels.py)
+        self.channel_sampler = ChannelSampler(self.telemetry_settings.channels)
+
+    def unpack_udp_packet(self, incoming_udp_packet):
+        return unpack_udp_packet(incoming_udp_packet)
+
+    def process_packet(self, packet, lost_packets):
+        # If we don't have a session yet, we only process the 
+        # Session packet (identified via packet.creates_session_object)
+        if not self.session:
+            if packet.creates_session_object:
+                session_data = packet.serialize()
+                # Create a new session if the user is not spectating
+                if not session_data['is_spectating']:
+                    self.session = self.create_session(session_data)
+        # If we already have a session, process packet data
+        if self.session:
+            packet_data = None if self.is_decimated(packet) else packet.serialize()
+            if packet_data:
+                self.process_serialized_packet(packet_data)
+            self.update_lap_data_quality(packet.header.packetId, lost_packets)
+
+    def is_decimated(self, packet):
+        """ Telemetry packets of frames dropped by decimation don't need to be serialized """
+        return self.decimator is not None and packet.header.packetId == TELEMETRY_PACKET_ID and \
+            not self.decimator.keep_telemetry_frame(packet.header.frameIdentifier)
+
+    def update_lap_data_quality(self, packet_id, lost_packets):
+        """ Attribute lap/telemetry packets (and frame gaps before them, or late ones counted as lost) to the current lap """
+        if packet_id not in LAP_DATA_QUALITY_PACKET_IDS:
+            return
+        current_lap = self.session.get_current_lap()
+        if current_lap:
+            current_lap.record_packet_loss(lost_packets)
 
-        if packet:
-            # If we don't have a session yet, we only process the 
-            # Session packet (identified via packet.creates_session_object)
-            if not self.session:
-                if packet.creates_session_object:
-                    session_data = packet.serialize()
-                    # Create a new session if the user is not spectating
-                    if not session_data['is_spectating']:
-                        self.session = self.create_session(session_data)
-            # If we already have a session, process packet data
-            if self.session:
-                packet_data = packet.serialize()
-                if packet_data:
-                    self.process_serialized_packet(packet_data)
-            
     def process_serialized_packet(self, packet_data):
         """ Given a serialized packet, process it """
         if not packet_data.get("packet_type"):
@@ -75,6 +91,7 @@ class F12022Processor:
             # Update session if UDP changed
             log.info("Session UDP has changed from %s to %s. Creating new session." \
                 % (self.session.session_udp_uid, packet_data["session_uid"]))
+            self.session.publish_end("replaced")
             self.session = self.create_session(packet_data)
         else:
             # Update session weather 
@@ -100,7 +117,8 @@ class F12022Processor:
                              packet_data["ai_difficulty"],
                              packet_data["weather_id"],
                              packet_data["game_mode"],
-                             packet_data["season_link_identifier"]
+                             packet_data["season_link_identifier"],
+                             telemetry_settings=self.telemetry_settings,
                             )
     
     def process_lap_packet(self, packet_data):
@@ -111,6 +129,9 @@ class F12022Processor:
         # Get lap object 
         last_lap_time = packet_data.get("last_laptime_ms")
         lap = self.session.get_lap(lap_number, last_lap_time)
+        store_telemetry = self.decimator is None or self.decimator.keep_lap_frame(
+            packet_data.get("frame_identifier"), lap_number, packet_data.get("sector"),
+            packet_data.get("current_laptime_ms"))
         # Update lap
         lap.update(
             lap_values = {
@@ -125,7 +146,8 @@ class F12022Processor:
                 "lap_distance": packet_data.get("lap_distance"),
                 "frame_identifier": packet_data.get("frame_identifier"),
                 "lap_time": packet_data.get("current_laptime_ms"),
-            }
+            },
+            store_telemetry = store_telemetry
         )
     
     def process_telemetry_packet(self, packet_data):
@@ -133,17 +155,21 @@ class F12022Processor:
         lap = self.session.get_current_lap()
         if not lap:
             return
+        telemetry_values = {
+            "frame_identifier": packet_data.get("frame_identifier"),
+            "speed": packet_data.get("speed"),
+            "brake": packet_data.get("brake"),
+            "throttle": packet_data.get("throttle"),
+            "gear": packet_data.get("gear"),
+            "steer": packet_data.get("steer"),
+            "drs": packet_data.get("drs"),
+        }
+        if self.channel_sampler and packet_data.get("car_telemetry_data") is not None:
+            telemetry_values.update(self.channel_sampler.read(
+                packet_data["car_telemetry_data"], telemetry_values["frame_identifier"]))
         lap.update(
             lap_values = {},
-            telemetry_values = {
-                "frame_identifier": packet_data.get("frame_identifier"),
-                "speed": packet_data.get("speed"),
-                "brake": packet_data.get("brake"),
-                "throttle": packet_data.get("throttle"),
-                "gear": packet_data.get("gear"),
-                "steer": packet_data.get("steer"),
-                "drs": packet_data.get("drs"),
-            }
+            telemetry_values = telemetry_values
         )
     
     def process_participant_data(self, packet_data):
@@ -217,6 +243,7 @@ class F12022Processor:
             self.session.recompute_sector_3_lap_time(osq_lap_number, best_lap_time)
         # Sync to F1L
         self.session.sync_to_f1laps(lap_number=None, sync_entire_session=True)
+        self.session.publish_end("final_classification")
     
     def process_event_packet(self, packet_data):
         """ Process various types of ad-hoc game events """
@@ -231,8 +258,12 @@ class F12022Processor:
         """ Call current lap's process_flashback_event_packet method """
         frame_id = packet_data.get("frame_identifier")
         session_time = packet_data.get("session_time")
-        log.info("Event: Flashback happened to frame %s and session time %s. Deleting frames." % (frame_id, session_time))
+        log.info("Event: Flashback happened to frame %s and session time %s. Deleting frames.", frame_id, session_time)
+        self.sequence_tracker.reset()
+        if self.decimator:
+            self.decimator.reset()
         self.session.get_current_lap().process_flashback_event(frame_id)
+        self.session.publish_event(events.FLASHBACK, frame_identifier=frame_id, session_time=session_time)
     
     def process_penalty_event_packet(self, packet_data):
         """ Create Penalty object and send it to F1Laps """
@@ -246,7 +277,8 @@ class F12022Processor:
         penalty.places_gained = packet_data.get("places_gained")
         penalty.frame_id = packet_data.get("frame_identifier")
         penalty.session = self.session
-        log.info("Processing %s" % penalty)
+        log.info("Processing penalty (type %s, infringement %s, vehicle %s, lap %s)",
+                 penalty.penalty_type, penalty.infringement_type, penalty.vehicle_index, penalty.lap_number)
         penalty.add_to_lap()
     
     def process_car_status_packet(self, packet_data):
@@ -298,10 +330,10 @@ class F12022Processor:
                 return False
         
         # Log and update last_logged_distance
-        log.info("WPMAP: %s,%s,%s" % (
+        log.info("WPMAP: %s,%s,%s",
             round(current_lap_distance, MINIMAP_ROUNDING), 
             round(xpos, MINIMAP_ROUNDING), 
-            round(zpos, MINIMAP_ROUNDING)
-        ))
+            round(zpos, MINIMAP_ROUNDING),
+            extra={"rate_limit": False})
         self.session.last_logged_distance = current_lap_distance
         return True
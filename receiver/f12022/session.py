@@ -5,6 +5,7 @@ from receiver.session_base import SessionBase, ParticipantBase
 from receiver.f12022.lap import F12022Lap
 from receiver.f12022.types import SessionType, Track, map_game_mode_to_f1laps
 from receiver.f12022.api import F1LapsAPI2022
+from receiver import latency, metrics, events
 
 
 class F12022Session(SessionBase):
@@ -23,10 +24,13 @@ class F12022Session(SessionBase):
                  game_mode,
                  season_identifier=None,
                  team_id=None,
+                 telemetry_settings=None,
                 ):
         # Meta
         self.f1laps_api_key = f1laps_api_key
         self.telemetry_enabled = telemetry_enabled
+        # How laps store telemetry (see receiver/lap_telemetry_base.py)
+        self.telemetry_settings = telemetry_settings
         # Game version also defines API base URL
         self.game_version = "f12022"
         
@@ -61,8 +65,9 @@ class F12022Session(SessionBase):
 
         # Log session init
         log.info("*************************************************")
-        log.info("New session started: %s" % self)
+        log.info("New session started: %s", self)
         log.info("*************************************************")
+        self.publish_event(events.SESSION_STARTED)
     
     def get_session_type(self):
         return SessionType.get(self.session_type)
@@ -133,8 +138,10 @@ class F12022Session(SessionBase):
     
     def add_lap(self, lap_number):
         """ Start a new lap by creating the Lap object and adding it to the lap_list """
-        new_lap = F12022Lap(lap_number=lap_number, session_type=self.session_type, telemetry_enabled=self.telemetry_enabled)
+        new_lap = F12022Lap(lap_number=lap_number, session_type=self.session_type,
+                            telemetry_enabled=self.telemetry_enabled, telemetry_settings=self.telemetry_settings)
         self.lap_list[lap_number] = new_lap
+        self.publish_event(events.LAP_STARTED, lap_number=lap_number, lap=new_lap)
         return new_lap
     
     def finish_completed_lap(self, lap_number, last_lap_time):
@@ -146,6 +153,8 @@ class F12022Session(SessionBase):
             return
         # Update sector 3 time
         self.recompute_sector_3_lap_time(lap_number, last_lap_time)
+        self.lap_list[lap_number].finish_telemetry()
+        self.publish_event(events.LAP_COMPLETED, lap_number=lap_number, lap=self.lap_list[lap_number])
         # Send to F1Laps
         return self.sync_to_f1laps(lap_number)
     
@@ -191,13 +200,14 @@ class F12022Session(SessionBase):
         if not sync_entire_session:
             lap = self.lap_list.get(lap_number)
             if not lap:
-                log.info("Skipping sync of lap %s, lap not found" % lap_number)
+                log.info("Skipping sync of lap %s, lap not found", lap_number)
                 return
         # For entire session syncs, or for validated individual lap syncs, proceed now
         if not self.is_valid_for_f1laps() or (lap and not lap.can_be_synced_to_f1laps()):
-            log.info("Skipping sync of lap %s, not ready for sync" % lap_number)
+            log.info("Skipping sync of lap %s, not ready for sync", lap_number)
             return
         # Send lap to F1Laps
+        sync_start = latency.timer_start()
         api = F1LapsAPI2022(self.f1laps_api_key, self.game_version)
         if self.is_multi_lap_session():
             # Sync entire session
@@ -206,6 +216,7 @@ class F12022Session(SessionBase):
         else:
             # Sync individual lap
             success = self.sync_lap_to_f1laps(lap, api)
+        latency.timer_stop(sync_start, latency.STAGE_SYNC)
         return success
     
     def sync_lap_to_f1laps(self, lap, api):
@@ -253,11 +264,13 @@ class F12022Session(SessionBase):
             sector_3_tyre_wear_front_right = lap.sector_3_tyre_wear_front_right,
             sector_3_tyre_wear_rear_left = lap.sector_3_tyre_wear_rear_left,
             sector_3_tyre_wear_rear_right = lap.sector_3_tyre_wear_rear_right,
+            data_quality = lap.get_data_quality(),
         )
         if success:
-            log.info("%s successfully synced to F1Laps" % lap)
+            log.info("Lap #%s successfully synced to F1Laps", lap.lap_number)
         else:
-            log.info("%s failed sync to F1Laps" % lap)
+            log.info("Lap #%s failed sync to F1Laps", lap.lap_number)
+        metrics.record_sync_result(metrics.lap_syncs, success)
         return success
     
     def send_session_to_f1laps(self):
@@ -288,9 +301,10 @@ class F12022Session(SessionBase):
             season_identifier = self.season_identifier
         )
         if success:
-            log.info("%s successfully synced to F1Laps" % self)
+            log.info("%s successfully synced to F1Laps", self)
         else:
-            log.info("%s failed sync to F1Laps" % self)
+            log.info("%s failed sync to F1Laps", self)
+        metrics.record_sync_result(metrics.session_syncs, success)
         return success, f1l_session_id
     
     def get_f1laps_lap_times_list(self):
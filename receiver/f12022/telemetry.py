@@ -6,4 +6,4 @@ from receiver.lap_telemetry_base import LapTelemetryBase
 
 class F12022LapTelemetry(LapTelemetryBase):
     """Telemetry for a lap in the game"""
-    pass
\ No newline at end of file
+    __slots__ = ()
\ No newline at end of file
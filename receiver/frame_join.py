@@ -0,0 +1,86 @@
+"""
+Bounded join of lap and telemetry packet values by frame id
+
+Lap packets bring a frame's lap distance and lap time, telemetry packets its
+speed, pedals, gear etc. Without a join, both get written into the frame as
+they arrive, and a frame whose other packet got lost stays half empty. The join
+buffer holds one half per frame until the other half arrives and only then
+emits the complete row. Halves older than the window (in frames) get evicted
+and counted as orphans, and the buffer never holds more than twice the window,
+so its memory use doesn't depend on packet loss.
+"""
+from receiver import metrics
+
+orphan_frames = metrics.REGISTRY.counter(
+    "f1laps_orphan_frames_total", "Frames evicted from the lap/telemetry join buffer, by the missing half",
+    ("missing",))
+
+LAP_HALF = "lap"
+TELEMETRY_HALF = "telemetry"
+
+
+def get_half(update):
+    """ Lap packets set the lap distance, telemetry packets don't """
+    return LAP_HALF if "lap_distance" in update else TELEMETRY_HALF
+
+
+class FrameJoinBuffer:
+    """ Pairs lap and telemetry halves of frames within a window of frame ids """
+    __slots__ = ("window", "max_size", "pending", "orphans")
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("Join window must be at least 1 frame, got %s" % window)
+        self.window = window
+        self.max_size = 2 * window
+        # frame_identifier -> (half, values), in arrival order
+        self.pending = {}
+        # Evicted halves, by missing half
+        self.orphans = {LAP_HALF: 0, TELEMETRY_HALF: 0}
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, update):
+        """ Add a packet's values, returns the complete row once both halves arrived, None until then """
+        if "lap_distance" in update and "speed" in update:
+            # Already complete
+            return update
+        frame_number = update["frame_identifier"]
+        half = get_half(update)
+        entry = self.pending.pop(frame_number, None)
+        if entry is not None:
+            pending_half, values = entry
+            values.update(update)
+            if pending_half != half:
+                return values
+            # Same half again (a duplicate packet), keep its latest values
+            update = values
+        self.pending[frame_number] = (half, update)
+        self.evict_stale(frame_number)
+        return None
+
+    def evict_stale(self, frame_number):
+        """ Evict halves more than window frames before frame_number, and the oldest above max_size """
+        pending = self.pending
+        while pending:
+            oldest_frame = next(iter(pending))
+            if oldest_frame >= frame_number - self.window and len(pending) <= self.max_size:
+                break
+            self.count_orphan(pending.pop(oldest_frame)[0])
+
+    def count_orphan(self, half):
+        missing = TELEMETRY_HALF if half == LAP_HALF else LAP_HALF
+        self.orphans[missing] += 1
+        orphan_frames.inc(missing)
+
+    def discard_from(self, frame_number):
+        """ Drop halves of frames from frame_number on, e.g. after a flashback to it """
+        for pending_frame in [pending_frame for pending_frame in self.pending if pending_frame >= frame_number]:
+            del self.pending[pending_frame]
+
+    def flush(self):
+        """ Evict everything, e.g. when the lap is completed """
+        for half, _ in self.pending.values():
+            self.count_orphan(half)
+        self.pending.clear()
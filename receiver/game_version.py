@@ -23,6 +23,28 @@ UDP_PACKET_FORMAT_TO_GAME_VERSION_MAP = {
     2022: "f12022"
 }
 
+# Packet IDs are shared across game versions (F1 2020 stops at 9)
+PACKET_ID_TO_NAME_MAP = {
+    0: "motion",
+    1: "session",
+    2: "lap",
+    3: "event",
+    4: "participants",
+    5: "setup",
+    6: "telemetry",
+    7: "car_status",
+    8: "final_classification",
+    9: "lobby_info",
+    10: "car_damage",
+    11: "session_history",
+}
+
+# Byte offsets of header fields, to read them without decoding the header
+PACKET_FORMAT_END = CrossGamePacketHeader.packetFormat.size
+PACKET_ID_OFFSET = CrossGamePacketHeader.packetId.offset
+SESSION_UID_OFFSET = CrossGamePacketHeader.sessionUID.offset
+SESSION_UID_END = SESSION_UID_OFFSET + CrossGamePacketHeader.sessionUID.size
+
 
 def parse_game_version_from_udp_packet(packet):
     """ 
@@ -31,4 +53,35 @@ def parse_game_version_from_udp_packet(packet):
     """
     header = CrossGamePacketHeader.from_buffer_copy(packet)
     return UDP_PACKET_FORMAT_TO_GAME_VERSION_MAP.get(header.packetFormat)
-    
\ No newline at end of file
+
+
+def get_game_version(packet):
+    """
+    Input : UDP packet in bytes
+    Output: Game Version as string, from the header packetFormat read straight
+            from the buffer (None if unknown or too short)
+    """
+    return UDP_PACKET_FORMAT_TO_GAME_VERSION_MAP.get(int.from_bytes(packet[:PACKET_FORMAT_END], "little"))
+
+
+def get_packet_id(packet):
+    """
+    Input : UDP packet in bytes
+    Output: header packetId, read straight from the buffer (None if too short)
+    """
+    return packet[PACKET_ID_OFFSET] if len(packet) > PACKET_ID_OFFSET else None
+
+
+def get_packet_type_name(packet_id):
+    """ Map a header packetId to a readable packet type name """
+    return PACKET_ID_TO_NAME_MAP.get(packet_id, "unknown_%s" % packet_id)
+
+
+def get_session_uid(packet):
+    """
+    Input : UDP packet in bytes
+    Output: header sessionUID, read straight from the buffer (None if too short)
+    """
+    if len(packet) < SESSION_UID_END:
+        return None
+    return int.from_bytes(packet[SESSION_UID_OFFSET:SESSION_UID_END], "little")
@@ -1,4 +1,7 @@
+import ctypes
+import platform
 import socket
+import sys
 
 from lib.logger import log
 
@@ -15,6 +18,55 @@ def get_local_ip():
         raise Exception("Local host IP couldn't be found")
 
 
+def get_process_rss_bytes():
+    """
+    Returns the resident set size of this process in bytes, or None if unknown.
+    Linux reads /proc, Windows asks the Win32 API, other systems (Mac)
+    fall back to getrusage, which reports the peak instead of the current value.
+    """
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm") as f:
+                resident_pages = int(f.read().split()[1])
+            import resource
+            return resident_pages * resource.getpagesize()
+        elif platform.system() == "Windows":
+            return _get_windows_process_rss_bytes()
+        else:
+            import resource
+            # ru_maxrss is in bytes on Mac, kilobytes elsewhere
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss if sys.platform == "darwin" else max_rss * 1024
+    except Exception as ex:
+        log.debug("Could not read process memory (%s)", ex)
+        return None
+
+
+def _get_windows_process_rss_bytes():
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process_handle = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process_handle, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+
 def asciiart():
     log.critical("")
     log.critical("Welcome to F1 Telemetry!")
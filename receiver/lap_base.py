@@ -12,8 +12,29 @@ class LapBase:
     """Holds all information about a lap""" 
     # Settings
     MAX_DISTANCE_COUNT_AS_NEW_LAP = 200
+    # Telemetry class that init_telemetry() creates
+    telemetry_model = LapTelemetryBase
 
-    def __init__(self, lap_number, session_type, telemetry_enabled):
+    # A session holds one of these per lap, so don't give every lap its own __dict__
+    # Subclasses need to define __slots__ too (empty if they don't add attributes)
+    __slots__ = (
+        "session_type",
+        "lap_number", "sector_1_ms", "sector_2_ms", "sector_3_ms", "pit_status", "car_race_position",
+        "is_valid", "tyre_compound_visual",
+        "air_temperature", "track_temperature", "rain_percentage_forecast", "weather_id",
+        "lap_start_tyre_wear_front_left", "lap_start_tyre_wear_front_right",
+        "lap_start_tyre_wear_rear_left", "lap_start_tyre_wear_rear_right",
+        "sector_1_tyre_wear_front_left", "sector_1_tyre_wear_front_right",
+        "sector_1_tyre_wear_rear_left", "sector_1_tyre_wear_rear_right",
+        "sector_2_tyre_wear_front_left", "sector_2_tyre_wear_front_right",
+        "sector_2_tyre_wear_rear_left", "sector_2_tyre_wear_rear_right",
+        "sector_3_tyre_wear_front_left", "sector_3_tyre_wear_front_right",
+        "sector_3_tyre_wear_rear_left", "sector_3_tyre_wear_rear_right",
+        "telemetry", "penalties", "packets_received", "packets_lost",
+        "has_been_synced_to_f1l", "telemetry_enabled", "telemetry_settings",
+    )
+
+    def __init__(self, lap_number, session_type, telemetry_enabled, telemetry_settings=None):
         # Session info
         self.session_type = session_type
 
@@ -51,25 +72,29 @@ class LapBase:
         self.sector_3_tyre_wear_rear_left = None
         self.sector_3_tyre_wear_rear_right = None
 
-        # Telemetry
+        # Telemetry, stored as the receiver's TelemetrySettings say (see receiver/lap_telemetry_base.py)
         self.telemetry = None
-        self.telemetry_model = LapTelemetryBase
+        self.telemetry_settings = telemetry_settings
 
         # Penalties
         self.penalties = []
 
+        # Data quality: lap and telemetry packets received vs. lost (frame gaps) during this lap
+        self.packets_received = 0
+        self.packets_lost = 0
+
         # F1Laps sync
         self.has_been_synced_to_f1l = False
         self.telemetry_enabled = telemetry_enabled
 
         # Log lap init
-        log.info("-----> %s started" % self)
+        log.info("-----> Lap #%s started", self.lap_number)
 
     def __str__(self):
         return "Lap #%s" % self.lap_number
     
-    def update(self, lap_values=None, telemetry_values=None):
-        """Update the lap with new data"""
+    def update(self, lap_values=None, telemetry_values=None, store_telemetry=True):
+        """Update the lap with new data, store_telemetry=False only updates the lap values"""
         # Get certain values that are needed later on 
         current_distance = telemetry_values.get("lap_distance")
         new_sector_1_time = lap_values.get("sector_1_ms")
@@ -79,13 +104,13 @@ class LapBase:
         # Check in/out lap
         if self.is_in_or_outlap(current_distance, new_pit_value):
             # Don't update values for in or outlaps
-            log.debug("%s is an inlap or outlap, not storing data" % self)
+            log.debug("Lap #%s is an inlap or outlap, not storing data", self.lap_number)
             
         elif lap_values and not self.new_lap_data_should_be_written(new_sector_1_time, total_lap_time):
             # Don't update values for laps that already have full data
             # This only applies to payloads with lap_data
             # Telemetry data should be written regardless
-            log.debug("%s has all values set, not storing data" % self)
+            log.debug("Lap #%s has all values set, not storing data", self.lap_number)
             self.reset_lap_telemetry()
             
         elif not lap_values and not self.telemetry:
@@ -93,7 +118,7 @@ class LapBase:
             # Lap packages -> has lap data and hence knows if telemetry data should be written
             # Telemetry package -> has no lap data and hence doesn't know if we can write it
             # So if we get telemetry data only, we only write if we had started to write already
-            log.debug("%s has no telemetry data yet, not adding new telemetry data" % self)
+            log.debug("Lap #%s has no telemetry data yet, not adding new telemetry data", self.lap_number)
             self.reset_lap_telemetry()
             
         else:
@@ -103,12 +128,13 @@ class LapBase:
             # Update this lap object
             for key, value in lap_values.items():
                 setattr(self, key, value)
-            # Update linked LapTelemetry object
-            self.telemetry.update(telemetry_values)
+            # Update linked LapTelemetry object, unless the frame got decimated
+            if store_telemetry:
+                self.telemetry.update(telemetry_values)
         
     def init_telemetry(self):
         """ Init telemetry object """
-        self.telemetry = self.telemetry_model(self.lap_number, self.session_type)
+        self.telemetry = self.telemetry_model(self.lap_number, self.session_type, self.telemetry_settings)
     
     def reset_lap_telemetry(self):
         """ 
@@ -119,7 +145,7 @@ class LapBase:
         if self.session_type in SESSION_TYPES_TIME_TRIAL:
             # Reset telemetry
             self.telemetry = None
-            log.debug("Reset telemetry for %s" % self)
+            log.debug("Reset telemetry for Lap #%s", self.lap_number)
 
     def new_lap_data_should_be_written(self, new_sector_1_time, total_lap_time):
         """
@@ -163,7 +189,7 @@ class LapBase:
         """
         if (current_distance and current_distance < self.MAX_DISTANCE_COUNT_AS_NEW_LAP) and \
            self.sector_1_ms and self.sector_2_ms and self.sector_3_ms:
-            log.debug("%s is a race inlap" % self)
+            log.debug("Lap #%s is a race inlap", self.lap_number)
             return True
         return False
     
@@ -186,6 +212,11 @@ class LapBase:
         self.pit_status = max((self.pit_status or 0), (pit_status or 0))
         return self.pit_status
     
+    def finish_telemetry(self):
+        """ Finish telemetry of a completed lap (e.g. resample it) """
+        if self.telemetry:
+            self.telemetry.finish()
+
     def process_flashback_event(self, frame_id_flashed_back_to):
         """ Update telemetry frame dict after a flashback """
         # Update telemetry data
@@ -207,8 +238,8 @@ class LapBase:
             return None
         self.sector_3_ms = last_lap_time - self.sector_1_ms - self.sector_2_ms
     
-    def json_serialize(self):
-        """ Convert self to JSON """
+    def json_serialize(self, include_telemetry=True):
+        """ Convert self to JSON; without telemetry, e.g. for stores that keep it in their own format """
         serialized_lap = {
             "lap_number": self.lap_number,
             "sector_1_time_ms": self.sector_1_ms,
@@ -217,7 +248,7 @@ class LapBase:
             "pit_status": self.pit_status,
             "car_race_position": self.car_race_position,
             "tyre_compound_visual" : self.tyre_compound_visual,
-            "telemetry_data_string": self.get_telemetry_string(),
+            "telemetry_data_string": self.get_telemetry_string() if include_telemetry else None,
             "penalties": [],
             "air_temperature": self.air_temperature,
             "track_temperature": self.track_temperature,
@@ -239,14 +270,51 @@ class LapBase:
             "sector_3_tyre_wear_front_right": self.sector_3_tyre_wear_front_right,
             "sector_3_tyre_wear_rear_left": self.sector_3_tyre_wear_rear_left,
             "sector_3_tyre_wear_rear_right": self.sector_3_tyre_wear_rear_right,
+            "data_quality": self.get_data_quality(),
         }
         for penalty in self.penalties:
             serialized_lap["penalties"].append(penalty.json_serialize())
         return serialized_lap
 
-    def get_telemetry_string(self):
-        """ Get telemetry string of this lap for F1Laps sync """
-        return json.dumps(self.telemetry.frame_dict) if self.telemetry and self.telemetry_enabled else None
+    def record_packet_loss(self, lost_packets):
+        """
+        Count a received lap/telemetry packet and the packets lost right before it;
+        -1 means it's a late packet that was counted as lost
+        """
+        self.packets_received += 1
+        # The late packet may have been counted as lost in the previous lap
+        self.packets_lost = max(self.packets_lost + lost_packets, 0)
+
+    def get_data_quality(self):
+        """ Share of this lap's lap/telemetry packets that arrived (1.0 = no loss), None if unknown """
+        packets_total = self.packets_received + self.packets_lost
+        if not packets_total:
+            return None
+        return round(self.packets_received / packets_total, 3)
+
+    def snapshot(self):
+        """ 
+        A LapSnapshot of this lap, taken when an event hands the lap to subscribers (see receiver/events.py),
+        so they can read it from their own threads
+        """
+        metadata = self.json_serialize(include_telemetry=False)
+        del metadata["telemetry_data_string"]
+        return LapSnapshot(
+            self.lap_number,
+            {name: getattr(self, name) for name in LAP_SNAPSHOT_ATTRIBUTES},
+            metadata,
+            self.get_data_quality(),
+            self.telemetry.snapshot() if self.telemetry is not None else None,
+        )
+
+    def get_telemetry_string(self, all_channels=False):
+        """ 
+        Get telemetry string of this lap for F1Laps sync, which only has the default channels;
+        local consumers can ask for all_channels, the extra ones following the default ones
+        """
+        if not self.telemetry or not self.telemetry_enabled:
+            return None
+        return json.dumps(self.telemetry.frame_dict if all_channels else self.telemetry.get_sync_frame_dict())
     
     def get_current_sector_number(self):
         """ Return the current sector number as an integer """
@@ -277,4 +345,28 @@ class LapBase:
             self.lap_start_tyre_wear_front_left = tyre_wear_front_left
             self.lap_start_tyre_wear_front_right = tyre_wear_front_right
             self.lap_start_tyre_wear_rear_left = tyre_wear_rear_left
-            self.lap_start_tyre_wear_rear_right = tyre_wear_rear_right
\ No newline at end of file
+            self.lap_start_tyre_wear_rear_right = tyre_wear_rear_right
+
+
+# Lap values a LapSnapshot has, i.e. everything but the lap's objects
+LAP_SNAPSHOT_ATTRIBUTES = tuple(name for name in LapBase.__slots__
+                                if name not in ("telemetry", "penalties", "telemetry_settings"))
+
+
+class LapSnapshot:
+    """
+    A lap as it was when an event was published: its values (by attribute name), its metadata as synced to
+    F1Laps (see json_serialize, without telemetry), its data quality and a TelemetrySnapshot (or None).
+    Subscribers share it, so they shouldn't change it.
+    """
+    __slots__ = ("lap_number", "values", "metadata", "data_quality", "telemetry")
+
+    def __init__(self, lap_number, values, metadata, data_quality, telemetry):
+        self.lap_number = lap_number
+        self.values = values
+        self.metadata = metadata
+        self.data_quality = data_quality
+        self.telemetry = telemetry
+
+    def __str__(self):
+        return "Lap #%s" % self.lap_number
@@ -0,0 +1,211 @@
+"""
+Memory-mappable columnar store of completed laps, for offline analysis
+
+LapStoreWriter is an event subscriber (see receiver/events.py): from its own
+thread, it appends every completed lap's telemetry columns (see
+receiver/telemetry_columns.py) to a data file, as fixed-point arrays of each
+channel's type aligned to 8 bytes, followed by one line per lap in a JSON
+lines index with the arrays' offsets, the lap's metadata (see
+LapBase.json_serialize) and its session.
+
+LapStore maps the data file once, so thousands of laps open near-instantly, and
+hands out channels as zero-copy views: NumPy arrays if NumPy is installed,
+memoryviews otherwise. Values are fixed point (divide by 10 ** decimals, see
+StoredLap.values), with the lowest value of the type for missing values.
+
+    store = LapStore("laps")
+    for lap in store.find(track="Spa", session_type="time_trial"):
+        speed = lap.channel("speed")
+"""
+from array import array
+import json
+import mmap
+import os
+import sys
+import time
+import logging
+log = logging.getLogger(__name__)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from receiver import events
+from receiver.telemetry_columns import get_markers
+
+DATA_FILE_NAME = "telemetry.bin"
+INDEX_FILE_NAME = "index.jsonl"
+# Arrays start at multiples of this, so views of any type can be cast from the mapping
+ARRAY_ALIGNMENT = 8
+# Laps waiting for the writer; further laps get dropped (and counted)
+LAP_STORE_QUEUE_SIZE = 64
+
+
+def get_session_metadata(session):
+    return {
+        "game_version": session.game_version,
+        "session_uid": str(session.session_udp_uid),
+        "track": session.get_track_name(),
+        "session_type": session.get_session_type(),
+        "team_id": session.team_id,
+        "game_mode": getattr(session, "game_mode", None),
+    }
+
+
+class LapStoreWriter(events.Subscriber):
+    """ Appends the telemetry of completed laps to the lap store in directory path """
+
+    def __init__(self, path, name="lap_store", queue_size=LAP_STORE_QUEUE_SIZE):
+        super(LapStoreWriter, self).__init__(self.write_event, (events.LAP_COMPLETED,), name, queue_size)
+        self.path = path
+        self.data_file = None
+        self.index_file = None
+
+    def run(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, DATA_FILE_NAME), "ab") as self.data_file, \
+                open(os.path.join(self.path, INDEX_FILE_NAME), "a") as self.index_file:
+            super(LapStoreWriter, self).run()
+
+    def write_event(self, event):
+        # A LapSnapshot (see receiver/lap_base.py)
+        lap = event.data["lap"]
+        columns = lap.telemetry.get_columns() if lap.telemetry is not None else None
+        if not columns:
+            log.info("Lap store: %s has no telemetry columns, not storing it", lap)
+            return
+        self.write_lap(get_session_metadata(event.session), lap, columns)
+
+    def write_lap(self, session_metadata, lap, columns):
+        """ Append the arrays, then their index line, so readers never see a lap without its data """
+        channels = lap.telemetry.channels
+        arrays = {}
+        offset = self.data_file.tell()
+        for name, decimals, values in [("frame_number", 0, columns.frame_numbers)] + [
+                (channel.name, channel.decimals, column) for channel, column in zip(channels, columns.columns)]:
+            padding = -offset % ARRAY_ALIGNMENT
+            self.data_file.write(bytes(padding))
+            offset += padding
+            arrays[name] = (values.typecode, offset, decimals)
+            self.data_file.write(values.tobytes())
+            offset += len(values) * values.itemsize
+        self.data_file.flush()
+        self.index_file.write(json.dumps({
+            "frame_count": len(columns),
+            "byteorder": sys.byteorder,
+            "resampled": lap.telemetry.resampled,
+            "arrays": arrays,
+            "session": session_metadata,
+            "lap": lap.metadata,
+            "stored_at": time.time(),
+        }) + "\n")
+        self.index_file.flush()
+
+
+def get_data_end(entry):
+    """ Offset after the last array of an index entry """
+    return max(offset + entry["frame_count"] * array(dtype).itemsize for dtype, offset, _ in entry["arrays"].values())
+
+
+class StoredLap:
+    """ A lap in a LapStore: its session and lap metadata, and its channels """
+    __slots__ = ("store", "session", "lap", "frame_count", "arrays", "resampled")
+
+    def __init__(self, store, entry):
+        self.store = store
+        self.session = entry["session"]
+        self.lap = entry["lap"]
+        self.frame_count = entry["frame_count"]
+        self.arrays = entry["arrays"]
+        self.resampled = entry["resampled"]
+
+    def __repr__(self):
+        return "StoredLap(%s %s lap %s)" % (self.session["track"], self.session["session_type"],
+                                            self.lap["lap_number"])
+
+    @property
+    def channel_names(self):
+        return [name for name in self.arrays if name != "frame_number"]
+
+    def get_decimals(self, name):
+        return self.arrays[name][2]
+
+    def channel(self, name, use_numpy=True):
+        """ Zero-copy view of a channel's fixed-point values, a NumPy array if NumPy is installed """
+        dtype, offset, _ = self.arrays[name]
+        if use_numpy and numpy is not None:
+            return numpy.frombuffer(self.store.data, dtype=numpy.dtype(dtype), count=self.frame_count, offset=offset)
+        return memoryview(self.store.data)[offset:offset + self.frame_count * array(dtype).itemsize].cast(dtype)
+
+    def frame_numbers(self):
+        """ Frame numbers, or grid points (lap distance / resampling step) of resampled laps """
+        return self.channel("frame_number")
+
+    def values(self, name):
+        """
+        A channel's plain values (a copy): a float array with NaN for missing values if NumPy is
+        installed, a list with None otherwise
+        """
+        raw_values = self.channel(name)
+        null, negative_zero = get_markers(self.arrays[name][0])
+        scale = 10 ** self.get_decimals(name)
+        if numpy is not None:
+            values = raw_values.astype(numpy.float64)
+            if scale != 1:
+                values /= scale
+            values[raw_values == null] = numpy.nan
+            values[raw_values == negative_zero] = -0.0
+            return values
+        return [None if value == null else -0.0 if value == negative_zero else value / scale if scale != 1 else value
+                for value in raw_values]
+
+
+class LapStore:
+    """ Reads a lap store directory; refresh() picks up laps written since """
+
+    def __init__(self, path):
+        self.path = path
+        self.laps = []
+        self.data = None
+        self.index_position = 0
+        self.refresh()
+
+    def __len__(self):
+        return len(self.laps)
+
+    def __iter__(self):
+        return iter(self.laps)
+
+    def refresh(self):
+        """ Map the data file and read the index lines added since the last refresh """
+        data_path = os.path.join(self.path, DATA_FILE_NAME)
+        if os.path.exists(data_path) and os.path.getsize(data_path) and \
+                (self.data is None or os.path.getsize(data_path) > len(self.data)):
+            # The previous mapping stays valid for views handed out already
+            with open(data_path, "rb") as data_file:
+                self.data = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        index_path = os.path.join(self.path, INDEX_FILE_NAME)
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, "rb") as index_file:
+            index_file.seek(self.index_position)
+            for line in index_file:
+                if not line.endswith(b"\n"):
+                    # The writer is halfway through this line
+                    break
+                self.index_position += len(line)
+                entry = json.loads(line)
+                if entry["byteorder"] != sys.byteorder:
+                    log.info("Skipping stored lap with %s endian arrays", entry["byteorder"])
+                    continue
+                if self.data is None or get_data_end(entry) > len(self.data):
+                    # Written after the data file was mapped
+                    self.index_position -= len(line)
+                    break
+                self.laps.append(StoredLap(self, entry))
+
+    def find(self, **criteria):
+        """ Laps whose session or lap metadata matches all criteria, e.g. track="Spa", is_valid=True """
+        return [lap for lap in self.laps
+                if all(lap.session.get(key, lap.lap.get(key)) == value for key, value in criteria.items())]
@@ -1,28 +1,140 @@
+from itertools import islice
 import logging
 log = logging.getLogger(__name__)
 
+from receiver.frame_join import FrameJoinBuffer
+from receiver.telemetry_cleaning import find_first_cleaning_index, is_flashback
+from receiver.telemetry_channels import DEFAULT_CHANNELS, get_channels
+from receiver.telemetry_columns import TelemetryColumns, CompressedColumns
+from receiver.telemetry_decimation import get_decimator
+from receiver.telemetry_resampling import resample_frames, RESAMPLE_METHODS
 
-KEY_INDEX_MAP = {
-    "lap_distance": 0,
-    "lap_time"    : 1,
-    "speed"       : 2,
-    "brake"       : 3,
-    "throttle"    : 4,
-    "gear"        : 5,
-    "steer"       : 6,
-    "drs"         : 7,
-}
-
-KEY_ROUND_MAP = {
-    "lap_distance": 2,
-    "lap_time"    : 0,
-    "speed"       : 0,
-    "brake"       : 3,
-    "throttle"    : 3,
-    "gear"        : 0,
-    "steer"       : 3,
-    "drs"         : 0,
-}
+
+def build_channel_maps(channels):
+    """ 
+    Index, decimals, resampling method, scale and storage (index and scale) per channel name, and
+    the (index, scale) of the scaled channels: new maps for the given channels
+    """
+    key_index_map, key_round_map, resample_method_map, key_scale_map, key_storage_map = {}, {}, {}, {}, {}
+    for index, channel in enumerate(channels):
+        key_index_map[channel.name] = index
+        key_round_map[channel.name] = channel.decimals
+        resample_method_map[channel.name] = channel.resample_method
+        if channel.decimals:
+            key_scale_map[channel.name] = 10 ** channel.decimals
+        key_storage_map[channel.name] = (index, key_scale_map.get(channel.name))
+    scaled_indexes = tuple((index, scale) for index, scale in key_storage_map.values() if scale)
+    return key_index_map, key_round_map, resample_method_map, key_scale_map, key_storage_map, scaled_indexes
+
+
+# Maps of the default channels; laps with extra channels use the maps of their TelemetrySettings.
+# Frames store fixed-point integers: float channels are multiplied by 10 ** decimals (KEY_SCALE_MAP)
+# and rounded once, integer channels (lap time, speed, gear, DRS) are stored as they come.
+# Values are only divided back in frame_dict, i.e. for serialization.
+# The game sends 32 bit floats, which makes value * scale exact, so the dequantized values
+# are the same as round(value, decimals). Small negative values are stored as -0.0, which
+# round() keeps and the serialized telemetry shows.
+# KEY_STORAGE_MAP has the index and scale (None for integer channels) per key, so that updates
+# need one lookup per value.
+KEY_INDEX_MAP, KEY_ROUND_MAP, RESAMPLE_METHOD_MAP, KEY_SCALE_MAP, KEY_STORAGE_MAP, SCALED_INDEXES = \
+    build_channel_maps(DEFAULT_CHANNELS)
+# Lap distance is a default channel, so every lap has it at the same index and scale
+DISTANCE_SCALE = KEY_SCALE_MAP["lap_distance"]
+DISTANCE_INDEX = KEY_INDEX_MAP["lap_distance"]
+# Pending updates scanned at a time for the next one that needs cleaning (deferred cleaning)
+CLEANING_SCAN_WINDOW = 64
+
+
+def quantize(value, scale):
+    quantized = round(value * scale)
+    return quantized if quantized or value >= 0 else -0.0
+
+
+def quantize_frame(frame, scaled_indexes=SCALED_INDEXES):
+    """ Fixed-point frame (list of values in channel order) from a frame of plain values """
+    frame = list(frame)
+    for index, scale in scaled_indexes:
+        if frame[index] is not None:
+            frame[index] = quantize(frame[index], scale)
+    return frame
+
+
+def dequantize_frame(frame, scaled_indexes=SCALED_INDEXES):
+    """ Frame of plain values from a fixed-point frame """
+    frame = list(frame)
+    for index, scale in scaled_indexes:
+        if frame[index] is not None:
+            frame[index] = frame[index] / scale
+    return frame
+
+
+class TelemetrySettings:
+    """
+    How laps store telemetry. Each receiver has its own (see ReceiverBase), which its processors
+    hand to their sessions and laps; a lap keeps the settings it started with.
+
+    extra_channels: channels stored on top of the default ones, names or (name, sample_every)
+        (see receiver/telemetry_channels.py); frames and columns get sized accordingly
+    deferred_cleaning: store raw updates and clean them when frame_dict is read, instead of
+        cleaning every frame as it arrives (see receiver/telemetry_cleaning.py)
+    join_window: join lap and telemetry packet values of a frame within this many frames, and only
+        store complete frames (see receiver/frame_join.py); None stores them as they come
+    compression: compress the columns of completed laps (see receiver/telemetry_columns.py)
+    resample_step: resample completed laps onto a grid of this many metres, None keeps every frame;
+        resample_methods overrides RESAMPLE_METHOD_MAP for some channels, e.g. {"speed": "hold"}
+    decimation_frames, decimation_ms: only store F1 22 telemetry of every decimation_frames-th frame
+        and/or every decimation_ms of lap time (see receiver/telemetry_decimation.py)
+    """
+    __slots__ = ("extra_channels", "channels", "key_index_map", "resample_method_map", "key_storage_map",
+                 "scaled_indexes", "deferred_cleaning", "join_window", "compression", "resample_step",
+                 "resample_methods", "decimation_frames", "decimation_ms")
+
+    def __init__(self, extra_channels=(), deferred_cleaning=False, join_window=None, compression=False,
+                 resample_step=None, resample_methods=None, decimation_frames=None, decimation_ms=None):
+        self.extra_channels = tuple(extra_channels or ())
+        self.channels = tuple(get_channels(self.extra_channels))
+        self.key_index_map, _, self.resample_method_map, _, self.key_storage_map, self.scaled_indexes = \
+            build_channel_maps(self.channels)
+        self.deferred_cleaning = bool(deferred_cleaning)
+
+        if join_window is not None and join_window < 1:
+            raise ValueError("Join window must be at least 1 frame, got %s" % join_window)
+        self.join_window = join_window
+        self.compression = bool(compression)
+
+        if resample_step is not None and resample_step <= 0:
+            raise ValueError("Resampling step must be positive, got %s" % resample_step)
+        channel_methods = dict(self.resample_method_map)
+        for key, method in (resample_methods or {}).items():
+            if key not in channel_methods:
+                raise ValueError("Unknown telemetry channel %s" % key)
+            if method not in RESAMPLE_METHODS:
+                raise ValueError("Unknown resampling method %s for %s" % (method, key))
+            channel_methods[key] = method
+        self.resample_step = resample_step
+        self.resample_methods = channel_methods
+
+        for interval in (decimation_frames, decimation_ms):
+            if interval is not None and interval < 1:
+                raise ValueError("Decimation intervals must be at least 1, got %s" % interval)
+        self.decimation_frames = decimation_frames
+        self.decimation_ms = decimation_ms
+
+    @classmethod
+    def from_receiver_settings(cls, settings):
+        """ The telemetry settings of a receiver's ReceiverSettings (see receiver/settings.py) """
+        return cls(settings.telemetry_extra_channels, settings.defer_telemetry_cleaning, settings.telemetry_join_window,
+                   settings.compress_completed_laps, settings.telemetry_resample_step,
+                   settings.telemetry_resample_methods, settings.telemetry_decimation_frames,
+                   settings.telemetry_decimation_ms)
+
+    def get_decimator(self):
+        """ A new decimator for one car's packets, None if decimation is off """
+        return get_decimator(self.decimation_frames, self.decimation_ms)
+
+
+# Settings of laps that aren't given any, e.g. laps of sessions created outside of a receiver
+DEFAULT_SETTINGS = TelemetrySettings()
 
 
 class LapTelemetryBase:
@@ -31,7 +143,10 @@ class LapTelemetryBase:
     MAX_DISTANCE_COUNT_AS_NEW_LAP = 200
     SESSION_TYPES_WITHOUT_OUTLAP = [1, 2, 3, 4, 5, 6, 7, 8, 13]
 
-    def __init__(self, lap_number, session_type=None):
+    __slots__ = ("lap_number", "session_type", "_frame_dict", "_last_lap_distance", "frames_popped_list",
+                 "settings", "deferred_cleaning", "pending_updates", "resampled", "join_buffer", "columns")
+
+    def __init__(self, lap_number, session_type=None, settings=None):
         # Lap number
         self.lap_number = lap_number
 
@@ -44,54 +159,237 @@ class LapTelemetryBase:
 
         # Main frame dict
         # Each frame is a key in this dict
-        # Each holds a list of the telemetry values
-        self.frame_dict = {}
+        # Each holds a list of the telemetry values, in fixed point (see KEY_SCALE_MAP)
+        self._frame_dict = {}
 
-        # Last lap distance
+        # Last lap distance, in fixed point
         # Ensure we're incrementing lap distance
         # If we don't, we need to remove the dict
-        self.last_lap_distance = None
+        self._last_lap_distance = None
 
         # Popped frames list
         # Store which frames got popped 
         self.frames_popped_list = []
+
+        # How this lap stores telemetry (see TelemetrySettings), for its whole life
+        self.settings = settings = settings or DEFAULT_SETTINGS
+
+        # Deferred cleaning: updates and flashbacks not applied to the frame dict yet
+        self.deferred_cleaning = settings.deferred_cleaning
+        self.pending_updates = []
+
+        # Whether frames were resampled onto the distance grid, their keys are grid points then
+        self.resampled = False
+
+        # Lap and telemetry halves of frames waiting for their other half
+        self.join_buffer = FrameJoinBuffer(settings.join_window) if settings.join_window is not None else None
+
+        # The frames packed into (optionally compressed) columns once the lap is completed
+        self.columns = None
+
+    @property
+    def channels(self):
+        """ Channels of the frames, in order """
+        return self.settings.channels
+
+    @property
+    def frame_dict(self):
+        """ Cleaned frames with plain (dequantized) values, applying any pending updates first """
+        if self.pending_updates:
+            self.apply_pending_updates()
+        frames = self.columns.get_columns().iter_frames() if self.columns is not None else self._frame_dict.items()
+        scaled_indexes = self.settings.scaled_indexes
+        return {frame_number: dequantize_frame(frame, scaled_indexes) for frame_number, frame in frames}
+
+    @frame_dict.setter
+    def frame_dict(self, frame_dict):
+        self.columns = None
+        scaled_indexes = self.settings.scaled_indexes
+        self._frame_dict = {frame_number: quantize_frame(frame, scaled_indexes)
+                            for frame_number, frame in frame_dict.items()}
+
+    def get_sync_frame_dict(self):
+        """ Cleaned frames of the default channels only, which is what F1Laps gets whatever else is stored """
+        frame_dict = self.frame_dict
+        default_channel_count = len(DEFAULT_CHANNELS)
+        if len(self.channels) == default_channel_count:
+            return frame_dict
+        return {frame_number: frame[:default_channel_count] for frame_number, frame in frame_dict.items()}
+
+    @property
+    def last_lap_distance(self):
+        if self._last_lap_distance is None:
+            return None
+        return self._last_lap_distance / DISTANCE_SCALE
+
+    @last_lap_distance.setter
+    def last_lap_distance(self, last_lap_distance):
+        self._last_lap_distance = quantize(last_lap_distance, DISTANCE_SCALE) if last_lap_distance is not None else None
+
+    def has_frames(self):
+        """ Whether there are any (cleaned) frames, without dequantizing them """
+        if self.pending_updates:
+            self.apply_pending_updates()
+        if self.columns is not None:
+            return bool(len(self.columns))
+        return bool(self._frame_dict)
     
     def update(self, telemetry_dict):
         """ Update this LapTelemetry object's frame dict"""
+        if self.columns is not None:
+            self.unpack_columns()
+        if self.join_buffer is not None:
+            telemetry_dict = self.join_buffer.add(telemetry_dict)
+            if telemetry_dict is None:
+                return
+        if self.deferred_cleaning:
+            self.pending_updates.append(telemetry_dict)
+            return
+        frame_number = self.set_frame_values(telemetry_dict)
+        self.clean_frame(frame_number)
+
+    def set_frame_values(self, telemetry_dict):
+        """ Write an update's values into its frame, without cleaning """
         # Pop frame_id out of the dict because we'll set all attributes later and cant set the id
         frame_number = telemetry_dict.pop("frame_identifier")
         frame = self.get_frame(frame_number)
+        key_storage_map = self.settings.key_storage_map
         for key, value in telemetry_dict.items():
-            frame_index    = KEY_INDEX_MAP[key]
-            decimal_points = KEY_ROUND_MAP[key]
-            frame[frame_index] = round(value, decimal_points)
-        self.clean_frame(frame_number)
-    
+            frame_index, scale = key_storage_map[key]
+            if scale:
+                quantized = round(value * scale)
+                frame[frame_index] = quantized if quantized or value >= 0 else -0.0
+            else:
+                frame[frame_index] = value
+        return frame_number
+
+    def apply_pending_updates(self):
+        """ 
+        Apply the updates stored in deferred mode, with the same result as cleaning frame by frame:
+        updates before the next one clean_frame would act on are merged without cleaning, that one
+        is cleaned, and the search goes on from the update after it
+        """
+        updates, self.pending_updates = self.pending_updates, []
+        max_new_lap_distance = self.MAX_DISTANCE_COUNT_AS_NEW_LAP * DISTANCE_SCALE
+        position = 0
+        window = CLEANING_SCAN_WINDOW
+        while position < len(updates):
+            # Scan a window at a time, so that runs of updates that all need cleaning (e.g. an outlap's
+            # frames) don't each scan every update after them; it grows while nothing needs cleaning
+            scanned = updates[position:position + window]
+            cleaning_index, self._last_lap_distance = find_first_cleaning_index(
+                scanned, self._frame_dict, self._last_lap_distance, self.frames_popped_list, max_new_lap_distance)
+            for telemetry_dict in islice(scanned, cleaning_index):
+                self.set_frame_values(telemetry_dict)
+            position += cleaning_index
+            if cleaning_index == len(scanned):
+                window *= 2
+                continue
+            update = updates[position]
+            if is_flashback(update):
+                self.remove_flashback_frames(update)
+            else:
+                self.clean_frame(self.set_frame_values(update))
+            position += 1
+            window = CLEANING_SCAN_WINDOW
+
+    def finish(self):
+        """ Called when the lap is completed: evict unjoined halves, resample frames if resampling is on """
+        if self.join_buffer is not None:
+            self.join_buffer.flush()
+        if self.settings.resample_step is not None and not self.resampled:
+            self.resample(self.settings.resample_step, self.settings.resample_methods)
+        self.pack_columns()
+
+    def pack_columns(self):
+        """ Hold the frames in one array per channel, sized by the channels' types """
+        if self.pending_updates:
+            self.apply_pending_updates()
+        if self.columns is not None:
+            return
+        try:
+            columns = TelemetryColumns.pack(self._frame_dict, self.channels)
+        except (OverflowError, TypeError) as ex:
+            log.info("Keeping lap %s telemetry frames unpacked: %s", self.lap_number, ex)
+            return
+        self.columns = CompressedColumns.compress(columns) if self.settings.compression else columns
+        self._frame_dict = {}
+
+    def get_columns(self):
+        """ 
+        The frames as (uncompressed) TelemetryColumns of fixed-point values, without changing how the
+        lap holds them; None if they don't fit the channels' types
+        """
+        if self.pending_updates:
+            self.apply_pending_updates()
+        if self.columns is not None:
+            return self.columns.get_columns()
+        try:
+            return TelemetryColumns.pack(self._frame_dict, self.channels)
+        except (OverflowError, TypeError):
+            return None
+
+    def snapshot(self):
+        """ A TelemetrySnapshot of the (cleaned) frames as they are now """
+        if self.pending_updates:
+            self.apply_pending_updates()
+        # Packed columns are never changed, so the snapshot can share them
+        columns = self.columns if self.columns is not None else self.get_columns()
+        if columns is None:
+            frames = {frame_number: list(frame) for frame_number, frame in self._frame_dict.items()}
+            return TelemetrySnapshot(self.settings, self.resampled, None, frames)
+        return TelemetrySnapshot(self.settings, self.resampled, columns)
+
+    def unpack_columns(self):
+        """ Back to a frame dict, e.g. when a completed lap gets updated again """
+        self._frame_dict = self.columns.unpack()
+        self.columns = None
+
+    def resample(self, step, methods=None):
+        """ 
+        Replace the frames with frames every step metres of lap distance, keyed by grid point
+        (distance / step). methods has the method per channel, the channels' own by default.
+        """
+        if self.columns is not None:
+            self.unpack_columns()
+        if self.pending_updates:
+            self.apply_pending_updates()
+        methods = methods or {}
+        resample_method_map = self.settings.resample_method_map
+        channel_methods = [None] * len(self.channels)
+        for key, index in self.settings.key_index_map.items():
+            channel_methods[index] = methods.get(key) or resample_method_map[key]
+        frame_count = len(self._frame_dict)
+        self._frame_dict = resample_frames(
+            self._frame_dict, round(step * DISTANCE_SCALE), DISTANCE_INDEX, channel_methods)
+        self.resampled = True
+        log.debug("Resampled lap %s telemetry every %sm (%s frames, was %s)",
+            self.lap_number, step, len(self._frame_dict), frame_count)
+
     def get_frame(self, frame_number):
         """ 
         Helper function that returns a given frame from frame_dict or creates it
         If frame doesn't exist in frame dict yet, create it with empty values 
         """
-        if frame_number not in self.frame_dict:
-            self.frame_dict[frame_number] = []
-            for _ in range(0, len(KEY_INDEX_MAP)):
-                self.frame_dict[frame_number].append(None)
-        return self.frame_dict[frame_number]
+        frame = self._frame_dict.get(frame_number)
+        if frame is None:
+            frame = self._frame_dict[frame_number] = [None] * len(self.settings.channels)
+        return frame
 
     def clean_frame(self, frame_number):
         """ 
         Clean up frame dict with various annoyances that the F1 game telemetry has
         """
-        frame = self.frame_dict.get(frame_number)
+        frame = self._frame_dict.get(frame_number)
         current_distance = None
 
         # Check if we popped this frame before - if so, don't populate it again
         if frame_number in self.frames_popped_list:
-            self.frame_dict.pop(frame_number)
+            self._frame_dict.pop(frame_number)
             return 
 
         # Get lap distance of current frame
-        current_distance = frame[KEY_INDEX_MAP["lap_distance"]]
+        current_distance = frame[DISTANCE_INDEX]
 
         # The telemetry packet doesn't set lap distance, so we may not have distance yet - return if so
         if not current_distance:
@@ -104,11 +402,11 @@ class LapTelemetryBase:
         # Reset telemetry when we are pre session FIRST LINE CROSS start
         if current_distance < 0:
             log.debug("Resetting telemetry because we are pre session first line cross")
-            self.frame_dict = {}
+            self._frame_dict = {}
             # In F1 2021, in an outlap in TT, the first frame sends a positive value (e.g. distance of 126)
             # Then switches to negative values as expected in an outlap
             # So we need to manually reset the last lap distance to None here
-            self.last_lap_distance = None
+            self._last_lap_distance = None
             return
 
         """
@@ -117,49 +415,91 @@ class LapTelemetryBase:
         We need to manually remove the telemetry pre-line cross.
         """
         # Check if last distance was higher (unexpected)
-        if self.last_lap_distance and self.last_lap_distance > current_distance:
+        if self._last_lap_distance and self._last_lap_distance > current_distance:
             # So if we drop the current distance down to a super small number, we assume a NEW LAP was started
-            if current_distance < self.MAX_DISTANCE_COUNT_AS_NEW_LAP:
+            max_new_lap_distance = self.MAX_DISTANCE_COUNT_AS_NEW_LAP * DISTANCE_SCALE
+            if current_distance < max_new_lap_distance:
                 # New in F1 2021:
                 # Sometimes, the Lap Package gets sent after finish line cross (inlap) without incrementing the lapnumber
                 # In that case, the following code would remove the entire last lap. We dont want that. 
                 # So we add the condition that we only clean the pre-line frames if that pre-line frame_dict didn't contain
                 # frames that are early in the lap (meaning it wasnt a full lap)
-                frame_dict_sorted_by_distance = sorted(self.frame_dict.copy().items(), key=lambda kv: kv[KEY_INDEX_MAP["lap_distance"]])
+                frame_dict_sorted_by_distance = sorted(self._frame_dict.copy().items(), key=lambda kv: kv[DISTANCE_INDEX])
                 first_frame_distance_frame, first_frame_distance_values = frame_dict_sorted_by_distance[0]
-                first_frame_distance_value = first_frame_distance_values[KEY_INDEX_MAP["lap_distance"]] or 0
-                if self.session_type not in self.SESSION_TYPES_WITHOUT_OUTLAP and first_frame_distance_value < self.MAX_DISTANCE_COUNT_AS_NEW_LAP:
-                    log.info("Assuming an outlap started based on distance delta - killing all new frames (current distance %s, last distance %s, first frame distance %s)" % \
-                        (current_distance, self.last_lap_distance, first_frame_distance_value))
+                first_frame_distance_value = first_frame_distance_values[DISTANCE_INDEX] or 0
+                if self.session_type not in self.SESSION_TYPES_WITHOUT_OUTLAP and first_frame_distance_value < max_new_lap_distance:
+                    log.info("Assuming an outlap started based on distance delta - killing all new frames (current distance %s, last distance %s, first frame distance %s)",
+                        current_distance / DISTANCE_SCALE, self.last_lap_distance, first_frame_distance_value / DISTANCE_SCALE)
                     self.remove_frame(frame_number)
                     # Important to return here to not set the last_lap_distance to the current_distance
                     return
                 else:
-                    log.info("Assuming a new lap started based on distance delta - killing all old frames (current distance %s, last distance %s, first frame distance %s)" % \
-                        (current_distance, self.last_lap_distance, first_frame_distance_value))
-                    self.frame_dict = {frame_number: frame}
+                    log.info("Assuming a new lap started based on distance delta - killing all old frames (current distance %s, last distance %s, first frame distance %s)",
+                        current_distance / DISTANCE_SCALE, self.last_lap_distance, first_frame_distance_value / DISTANCE_SCALE)
+                    self._frame_dict = {frame_number: frame}
         
         # Set the last distance value for future frames
-        self.last_lap_distance = current_distance
+        self._last_lap_distance = current_distance
 
     def remove_frame(self, frame_number):
-        self.frame_dict.pop(frame_number)
+        self._frame_dict.pop(frame_number)
         self.frames_popped_list.append(frame_number)
 
     def process_flashback_event(self, frame_id_flashed_back_to):
-        current_frame_max = max(self.frame_dict) if self.frame_dict else None
+        if self.columns is not None:
+            self.unpack_columns()
+        if self.join_buffer is not None:
+            self.join_buffer.discard_from(frame_id_flashed_back_to)
+        if self.deferred_cleaning:
+            self.pending_updates.append(frame_id_flashed_back_to)
+            return
+        self.remove_flashback_frames(frame_id_flashed_back_to)
+
+    def remove_flashback_frames(self, frame_id_flashed_back_to):
+        current_frame_max = max(self._frame_dict) if self._frame_dict else None
         deleted_frame_count = 0
 
         # Delete frames until we get to the frame we flashed back to
-        for frame_id, _ in self.frame_dict.copy().items():
+        for frame_id, _ in self._frame_dict.copy().items():
             if frame_id >= frame_id_flashed_back_to:
                 deleted_frame_count += 1
-                self.frame_dict.pop(frame_id)
+                self._frame_dict.pop(frame_id)
         
         # Reset last lap distance
-        self.last_lap_distance = None
-        log.debug("Removed frames that were flashbacked away (flbk to %s; max was %s; deleted %s)" % (
-            frame_id_flashed_back_to,
-            current_frame_max,
-            deleted_frame_count
-            ))
\ No newline at end of file
+        self._last_lap_distance = None
+        log.debug("Removed frames that were flashbacked away (flbk to %s; max was %s; deleted %s)",
+            frame_id_flashed_back_to, current_frame_max, deleted_frame_count)
+
+
+class TelemetrySnapshot:
+    """
+    Lap telemetry as it was when LapTelemetryBase.snapshot() was taken, for reading from other threads:
+    the lap's packed columns, which laps replace rather than change, or a copy of its frames if they don't
+    fit the channels' types
+    """
+    __slots__ = ("settings", "resampled", "columns", "frames")
+
+    def __init__(self, settings, resampled, columns, frames=None):
+        self.settings = settings
+        self.resampled = resampled
+        # TelemetryColumns or CompressedColumns
+        self.columns = columns
+        self.frames = frames
+
+    @property
+    def channels(self):
+        return self.settings.channels
+
+    def has_frames(self):
+        return bool(len(self.columns)) if self.columns is not None else bool(self.frames)
+
+    def get_columns(self):
+        """ The frames as (uncompressed) TelemetryColumns of fixed-point values, None if they don't fit """
+        return self.columns.get_columns() if self.columns is not None else None
+
+    @property
+    def frame_dict(self):
+        """ Frames with plain (dequantized) values, every channel """
+        frames = self.columns.get_columns().iter_frames() if self.columns is not None else self.frames.items()
+        scaled_indexes = self.settings.scaled_indexes
+        return {frame_number: dequantize_frame(frame, scaled_indexes) for frame_number, frame in frames}
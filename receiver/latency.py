@@ -0,0 +1,175 @@
+"""
+Per-stage latency histograms for the receiver pipeline
+
+Stages are timed with perf_counter_ns and recorded into HDR-style histograms,
+keyed by (stage, packet type). Recording is off by default; every call site
+checks recorder.enabled first, so the disabled cost is one attribute lookup.
+"""
+from time import monotonic, perf_counter_ns
+import logging
+log = logging.getLogger(__name__)
+
+from receiver.game_version import get_packet_type_name
+
+
+# Pipeline stages, in the order a datagram passes through them
+STAGE_RECV = "recv"
+STAGE_GAME_VERSION = "parse_game_version"
+STAGE_UNPACK = "unpack"
+STAGE_PROCESS = "process"
+STAGE_SYNC = "sync"
+
+# Percentiles included in dumps and log summaries
+SUMMARY_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of nanosecond durations
+    Each power of two is split into 2^SUB_BUCKET_BITS linear sub-buckets,
+    so the relative error stays below 1/2^SUB_BUCKET_BITS at any magnitude
+    while memory is bounded by the number of distinct magnitudes seen
+    """
+    SUB_BUCKET_BITS = 5
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        """ Add a single duration (in ns) to the histogram """
+        value = max(int(value), 0)
+        shift = max(value.bit_length() - self.SUB_BUCKET_BITS - 1, 0)
+        bucket = (shift << (self.SUB_BUCKET_BITS + 1)) | (value >> shift)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def bucket_upper_bound(self, bucket):
+        """ Highest value that maps into the given bucket """
+        shift = bucket >> (self.SUB_BUCKET_BITS + 1)
+        mantissa = bucket & ((1 << (self.SUB_BUCKET_BITS + 1)) - 1)
+        return ((mantissa + 1) << shift) - 1
+
+    def percentile(self, percentile):
+        """ Return the value at the given percentile (0-100), capped at the recorded max """
+        if not self.count:
+            return None
+        threshold = self.count * percentile / 100.0
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= threshold:
+                return min(self.bucket_upper_bound(bucket), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def merge(self, other):
+        """ Add all values of another histogram to this one """
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def summary(self):
+        """ Return count, mean, min, max and percentiles as a dict (values in ns) """
+        summary = {
+            "count": self.count,
+            "mean": self.mean(),
+            "min": self.min,
+            "max": self.max if self.count else None,
+        }
+        for percentile in SUMMARY_PERCENTILES:
+            summary["p%s" % percentile] = self.percentile(percentile)
+        return summary
+
+
+class LatencyRecorder:
+    """ Collects one LatencyHistogram per (stage, packet type) """
+    DEFAULT_SUMMARY_INTERVAL_SECONDS = 60
+
+    def __init__(self, enabled=False, summary_interval=None):
+        self.enabled = enabled
+        self.summary_interval = summary_interval or self.DEFAULT_SUMMARY_INTERVAL_SECONDS
+        self.histograms = {}
+        self.last_summary_time = monotonic()
+
+    def enable(self, summary_interval=None):
+        if summary_interval:
+            self.summary_interval = summary_interval
+        self.last_summary_time = monotonic()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.histograms = {}
+
+    def record(self, stage, packet_id, duration_ns):
+        """
+        Record a duration for a stage
+        packet_id is the header packetId, or None for stages that aren't packet specific
+        """
+        key = (stage, packet_id)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.record(duration_ns)
+
+    def dump(self):
+        """
+        Return all histograms as a nested dict: {stage: {packet type name: summary}}
+        Safe to call from another thread while the receiver keeps recording
+        """
+        dumped = {}
+        for (stage, packet_id), histogram in list(self.histograms.items()):
+            packet_type = get_packet_type_name(packet_id) if packet_id is not None else "all"
+            dumped.setdefault(stage, {})[packet_type] = histogram.summary()
+        return dumped
+
+    def log_summary(self):
+        """ Write one line per (stage, packet type) to the log """
+        self.last_summary_time = monotonic()
+        dumped = self.dump()
+        if not dumped:
+            log.info("Latency summary: no samples recorded")
+            return
+        for stage, packet_types in dumped.items():
+            for packet_type, summary in sorted(packet_types.items()):
+                log.info("Latency %s/%s: n=%s mean=%.1fus p50=%.1fus p90=%.1fus p99=%.1fus max=%.1fus",
+                    stage, packet_type, summary["count"], summary["mean"] / 1000.0,
+                    summary["p50"] / 1000.0, summary["p90"] / 1000.0, summary["p99"] / 1000.0,
+                    summary["max"] / 1000.0)
+
+    def maybe_log_summary(self):
+        """ Log a summary if the summary interval has passed; called from the receive loop """
+        if self.enabled and monotonic() - self.last_summary_time >= self.summary_interval:
+            self.log_summary()
+
+
+# Shared recorder used by the receiver, processors and sessions
+recorder = LatencyRecorder()
+
+
+def timer_start():
+    """ Return a start timestamp, or 0 when recording is disabled """
+    return perf_counter_ns() if recorder.enabled else 0
+
+
+def timer_stop(start, stage, packet_id=None):
+    """ Record the time since timer_start() if recording was enabled at start """
+    if start:
+        recorder.record(stage, packet_id, perf_counter_ns() - start)
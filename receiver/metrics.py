@@ -0,0 +1,300 @@
+"""
+Receiver and uploader metrics, optionally served in Prometheus text format
+
+Counters are plain dict increments without locks: every counter is written
+from a single thread (the receive loop or the upload path), and the scrape
+thread only reads a snapshot. Gauges are either set directly or computed
+from a callback at scrape time.
+"""
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import threading
+import logging
+log = logging.getLogger(__name__)
+
+from receiver.game_version import get_packet_type_name
+from receiver.helpers import get_process_rss_bytes
+from receiver.latency import LatencyHistogram
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_METRICS_HOST = "127.0.0.1"
+
+
+def format_labels(label_names, label_values):
+    """ Render a Prometheus label set, e.g. {packet_type="lap"} """
+    if not label_names:
+        return ""
+    pairs = []
+    for name, value in zip(label_names, label_values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append('%s="%s"' % (name, value))
+    return "{%s}" % ",".join(pairs)
+
+
+class Counter:
+    """ Monotonic counter, optionally split by label values """
+    metric_type = "counter"
+
+    def __init__(self, name, help_text, label_names=(), label_formatters=None):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        # Optional per-label functions to turn stored keys into label values at scrape time,
+        # so the hot path can count raw packet IDs instead of names
+        self.label_formatters = label_formatters or {}
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        return self.values.get(label_values, 0)
+
+    def reset(self):
+        self.values = {}
+
+    def samples(self):
+        """ Return a list of (suffix, label names, label values, value) """
+        samples = []
+        for label_values, value in list(self.values.items()):
+            formatted_values = tuple(
+                self.label_formatters[name](label_value) if name in self.label_formatters else label_value
+                for name, label_value in zip(self.label_names, label_values)
+            )
+            samples.append(("", self.label_names, formatted_values, value))
+        return samples
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down
+    If a callback is set, it's called at scrape time and returns either a value,
+    or a dict of {label values tuple: value}
+    """
+    metric_type = "gauge"
+
+    def __init__(self, name, help_text, label_names=(), label_formatters=None, callback=None):
+        super(Gauge, self).__init__(name, help_text, label_names, label_formatters)
+        self.callback = callback
+
+    def set(self, value, *label_values):
+        self.values[label_values] = value
+
+    def samples(self):
+        if self.callback:
+            try:
+                result = self.callback()
+            except Exception as ex:
+                log.debug("Metrics callback for %s failed: %s", self.name, ex)
+                return []
+            if result is None:
+                return []
+            self.values = result if isinstance(result, dict) else {(): result}
+        return super(Gauge, self).samples()
+
+
+class Summary:
+    """ Latency summary backed by a LatencyHistogram of nanosecond values, exported in seconds """
+    metric_type = "summary"
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.histogram = LatencyHistogram()
+
+    def observe_ns(self, duration_ns):
+        self.histogram.record(duration_ns)
+
+    def reset(self):
+        self.histogram = LatencyHistogram()
+
+    def samples(self):
+        histogram = self.histogram
+        samples = []
+        if histogram.count:
+            for quantile in self.QUANTILES:
+                value = histogram.percentile(quantile * 100) / 1e9
+                samples.append(("", ("quantile",), (str(quantile),), value))
+        samples.append(("_sum", (), (), histogram.total / 1e9))
+        samples.append(("_count", (), (), histogram.count))
+        return samples
+
+
+class MetricsRegistry:
+    """ Holds all metrics by name and renders them in Prometheus text format """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        """ Register a metric; a metric with the same name gets replaced """
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, label_names=(), label_formatters=None):
+        return self.register(Counter(name, help_text, label_names, label_formatters))
+
+    def gauge(self, name, help_text, label_names=(), label_formatters=None, callback=None):
+        return self.register(Gauge(name, help_text, label_names, label_formatters, callback))
+
+    def summary(self, name, help_text):
+        return self.register(Summary(name, help_text))
+
+    def get(self, name):
+        return self.metrics.get(name)
+
+    def render(self):
+        lines = []
+        for name, metric in list(self.metrics.items()):
+            lines.append("# HELP %s %s" % (name, metric.help_text))
+            lines.append("# TYPE %s %s" % (name, metric.metric_type))
+            for suffix, label_names, label_values, value in metric.samples():
+                lines.append("%s%s%s %s" % (name, suffix, format_labels(label_names, label_values), value))
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        Picklable copy of all metrics, e.g. to send to another process
+        Returns {name: (type, help text, samples or, for summaries, the histogram)}
+        """
+        snapshot = {}
+        for name, metric in list(self.metrics.items()):
+            data = metric.histogram if isinstance(metric, Summary) else metric.samples()
+            snapshot[name] = (metric.metric_type, metric.help_text, data)
+        return snapshot
+
+
+class AggregatedRegistry:
+    """
+    Renders the sum of registry snapshots from several processes
+    Counters are summed, summary histograms are merged and gauges
+    (which may be ratios) are kept apart with a "worker" label
+    """
+
+    def __init__(self):
+        self.snapshots = {}
+
+    def update(self, worker_id, snapshot):
+        self.snapshots[worker_id] = snapshot
+
+    def render(self):
+        merged = {}
+        for worker_id, snapshot in sorted(self.snapshots.items(), key=lambda item: str(item[0])):
+            for name, (metric_type, help_text, data) in snapshot.items():
+                if name not in merged:
+                    merged[name] = (metric_type, help_text, LatencyHistogram() if metric_type == "summary" else {})
+                aggregate = merged[name][2]
+                if metric_type == "summary":
+                    aggregate.merge(data)
+                    continue
+                for suffix, label_names, label_values, value in data:
+                    if metric_type == "gauge":
+                        label_names, label_values = label_names + ("worker",), label_values + (worker_id,)
+                    key = (suffix, label_names, label_values)
+                    aggregate[key] = aggregate.get(key, 0) + value
+        lines = []
+        for name, (metric_type, help_text, aggregate) in merged.items():
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s %s" % (name, metric_type))
+            if metric_type == "summary":
+                summary = Summary(name, help_text)
+                summary.histogram = aggregate
+                samples = summary.samples()
+            else:
+                samples = [key + (value,) for key, value in aggregate.items()]
+            for suffix, label_names, label_values, value in samples:
+                lines.append("%s%s%s %s" % (name, suffix, format_labels(label_names, label_values), value))
+        return "\n".join(lines) + "\n"
+
+    def get_total(self, name):
+        """ Sum of all samples of a counter across snapshots """
+        return sum(
+            value
+            for snapshot in self.snapshots.values() if name in snapshot
+            for _, _, _, value in snapshot[name][2]
+        )
+
+
+# Shared registry and the metrics the receiver pipeline writes to
+REGISTRY = MetricsRegistry()
+
+PACKET_TYPE_LABEL = {"packet_type": get_packet_type_name}
+
+packets_received = REGISTRY.counter(
+    "f1laps_packets_received_total", "UDP packets received, by packet type",
+    ("packet_type",), PACKET_TYPE_LABEL)
+packets_decoded = REGISTRY.counter(
+    "f1laps_packets_decoded_total", "Packets successfully decoded by a game processor, by packet type",
+    ("packet_type",), PACKET_TYPE_LABEL)
+packet_decode_errors = REGISTRY.counter(
+    "f1laps_packet_decode_errors_total", "Packets that failed to decode, by packet type",
+    ("packet_type",), PACKET_TYPE_LABEL)
+unknown_packets = REGISTRY.counter(
+    "f1laps_unknown_packets_total", "Datagrams with an unknown packet format or game version")
+lap_syncs = REGISTRY.counter(
+    "f1laps_lap_syncs_total", "Individual lap syncs to F1Laps, by result", ("result",))
+session_syncs = REGISTRY.counter(
+    "f1laps_session_syncs_total", "Session syncs to F1Laps, by result", ("result",))
+upload_latency = REGISTRY.summary(
+    "f1laps_upload_latency_seconds", "Duration of F1Laps API calls")
+process_rss = REGISTRY.gauge(
+    "f1laps_process_resident_memory_bytes", "Resident set size of this process",
+    callback=get_process_rss_bytes)
+
+
+def record_sync_result(counter, success):
+    """ Count a sync as success or failure """
+    counter.inc("success" if success else "failure")
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """ Don't write every scrape to stderr """
+        log.debug("Metrics request: " + format, *args)
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetricsServer:
+    """ Serves a registry on http://host:port/metrics from a daemon thread """
+
+    def __init__(self, port, host=None, registry=None):
+        self.host = host or DEFAULT_METRICS_HOST
+        self.port = port
+        self.registry = registry or REGISTRY
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        handler = type("BoundMetricsRequestHandler", (MetricsRequestHandler,), {"registry": self.registry})
+        self.httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        # Port 0 picks a free port; store the actual one
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+        log.info("Serving metrics on http://%s:%s/metrics", self.host, self.port)
+        return self
+
+    def stop(self):
+        if not self.httpd:
+            return
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.httpd = None
+        log.info("Stopped metrics server")
@@ -1,4 +1,5 @@
 from lib.logger import log
+from receiver import events
 
 
 class PenaltyBase:
@@ -28,25 +29,17 @@ class PenaltyBase:
         """ Add a newly created Penalty to the current lap """
         # A penalty should always have a session, but just in case...
         if not self.session:
-            log.error("No session defined for %s" % self)
+            log.error("No session defined for %s", self)
             return None
-        # For F1 2021, lap_list is still a freestyle dict
-        # For F1 2022+, it's an array of a class
-        if self.session.game_version == "f12021":
-            lap = self.session.lap_list[self.lap_number]
-            # We might not have the penalties array yet, let's create it if not
-            if not lap.get("penalties"):
-                lap["penalties"] = []
-            lap["penalties"].append(self)
+        self.session.publish_event(events.PENALTY, penalty=self)
+        lap = self.session.lap_list.get(self.lap_number)
+        if lap:
+            lap.penalties.append(self)
         else:
-            lap = self.session.lap_list.get(self.lap_number)
-            if lap:
-                lap.penalties.append(self)
-            else:
-                # Penalty couldn't be added because lap doesn't exist
-                # Can happen e.g. when pausing mid-session and restarting
-                # We're not solving for this use case for now
-                log.info("Penalty couldn't be added to lap %s" % self.lap_number)
+            # Penalty couldn't be added because lap doesn't exist
+            # Can happen e.g. when pausing mid-session and restarting
+            # We're not solving for this use case for now
+            log.info("Penalty couldn't be added to lap %s", self.lap_number)
     
     def json_serialize(self):
         """ Convert object to JSON """
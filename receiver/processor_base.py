@@ -0,0 +1,56 @@
+from abc import ABC, abstractmethod
+import logging
+log = logging.getLogger(__name__)
+
+from receiver import latency, metrics
+from receiver.lap_telemetry_base import DEFAULT_SETTINGS
+from receiver.game_version import get_packet_id
+from receiver.sequence import PacketSequenceTracker
+
+
+class ProcessorBase(ABC):
+    """
+    Shared by the game processors: decodes each datagram with the game's packet table,
+    counts it, tracks frame gaps and times both stages, then hands the packet to process_packet()
+    Game processors implement unpack_udp_packet() and process_packet()
+    """
+    session = None
+    f1laps_api_key = None
+    telemetry_enabled = True
+    telemetry_settings = DEFAULT_SETTINGS
+    # For the log, e.g. "F1 2022"
+    game_name = None
+
+    def __init__(self, f1laps_api_key, enable_telemetry, telemetry_settings=None):
+        self.f1laps_api_key = f1laps_api_key
+        self.telemetry_enabled = enable_telemetry
+        # How the sessions' laps store telemetry (see receiver/lap_telemetry_base.py)
+        self.telemetry_settings = telemetry_settings or DEFAULT_SETTINGS
+        self.sequence_tracker = PacketSequenceTracker()
+        log.info("Started %s game processor", self.game_name)
+
+    @abstractmethod
+    def unpack_udp_packet(self, incoming_udp_packet):
+        """ The decoded packet, None for packet types the game's processor doesn't use """
+
+    def process(self, unpacked_packet):
+        unpack_start = latency.timer_start()
+        try:
+            packet = self.unpack_udp_packet(unpacked_packet)
+        except Exception as ex:
+            log.info("Couldn't unpack packet due to %s", ex)
+            metrics.packet_decode_errors.inc(get_packet_id(unpacked_packet))
+            packet = None
+        latency.timer_stop(unpack_start, latency.STAGE_UNPACK, packet.header.packetId if packet else None)
+        if not packet:
+            return
+        packet_id = packet.header.packetId
+        metrics.packets_decoded.inc(packet_id)
+        lost_packets = self.sequence_tracker.observe(packet_id, packet.header.frameIdentifier)
+        process_start = latency.timer_start()
+        self.process_packet(packet, lost_packets)
+        latency.timer_stop(process_start, latency.STAGE_PROCESS, packet_id)
+
+    @abstractmethod
+    def process_packet(self, packet, lost_packets):
+        """ Update the session with a decoded packet; lost_packets as returned by PacketSequenceTracker.observe """
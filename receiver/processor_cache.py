@@ -0,0 +1,79 @@
+"""
+LRU cache of live game processors with idle eviction
+
+Used to keep one processor per telemetry source, so that several games sending
+to the same port (e.g. a league host collecting drivers via UDP redirect) don't
+share session state.
+"""
+from collections import OrderedDict
+from time import monotonic
+import logging
+log = logging.getLogger(__name__)
+
+from receiver import metrics
+
+
+processors_evicted = metrics.REGISTRY.counter(
+    "f1laps_processors_evicted_total", "Game processors dropped from the processor cache, by reason", ("reason",))
+
+
+class ProcessorCache:
+    """ Maps a key to a processor; least recently used and idle processors are evicted """
+    MAX_PROCESSORS = 64
+    IDLE_TIMEOUT_SECONDS = 600
+    # Idle processors are looked for at most this often, not on every packet
+    EVICTION_INTERVAL_SECONDS = 10
+
+    def __init__(self, max_processors=MAX_PROCESSORS, idle_timeout=IDLE_TIMEOUT_SECONDS, keep_most_recent=False):
+        self.max_processors = max_processors
+        self.idle_timeout = idle_timeout
+        # Never evict the most recently used processor for being idle, e.g. to
+        # keep the session of a single player who paused the game
+        self.keep_most_recent = keep_most_recent
+        # key -> [processor, last seen]; ordered from least to most recently used
+        self.entries = OrderedDict()
+        self.last_eviction = monotonic()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, now=None):
+        """ Return the processor of key (or None), marking it as recently used """
+        now = monotonic() if now is None else now
+        if now - self.last_eviction >= self.EVICTION_INTERVAL_SECONDS:
+            self.evict_idle(now)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        entry[1] = now
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, processor, now=None):
+        """ Add a processor, evicting the least recently used one if the cache is full """
+        self.entries[key] = [processor, monotonic() if now is None else now]
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_processors:
+            evicted_key, _ = self.entries.popitem(last=False)
+            log.info("Evicted least recently used processor of %s", evicted_key)
+            processors_evicted.inc("lru")
+        return processor
+
+    def evict_idle(self, now=None):
+        """ Drop processors that haven't seen a packet for idle_timeout seconds """
+        now = monotonic() if now is None else now
+        self.last_eviction = now
+        # Least recently used first, so stop at the first one that's still active
+        while len(self.entries) > (1 if self.keep_most_recent else 0):
+            key, (processor, last_seen) = next(iter(self.entries.items()))
+            if now - last_seen < self.idle_timeout:
+                break
+            del self.entries[key]
+            log.info("Evicted processor of %s after %.0fs without packets", key, now - last_seen)
+            processors_evicted.inc("idle")
+
+    def processors(self):
+        return [entry[0] for entry in self.entries.values()]
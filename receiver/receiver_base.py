@@ -0,0 +1,357 @@
+import socket
+import weakref
+import sentry_sdk
+import platform
+import logging
+log = logging.getLogger(__name__)
+
+from receiver.f12020.processor import F12020Processor
+from receiver.f12021.processor import F12021Processor
+from receiver.f12022.processor import F12022Processor
+from receiver.helpers import get_local_ip
+from receiver.game_version import get_game_version, get_packet_id, get_session_uid
+from receiver.processor_cache import ProcessorCache
+from receiver.exception_breaker import ExceptionCircuitBreaker
+from receiver.redirect import RedirectFanout
+from receiver.capture import CaptureTarget
+from receiver import latency, metrics, events
+from receiver.lap_telemetry_base import TelemetrySettings
+from receiver.archive import ArchiveWriter
+from receiver.lap_store import LapStoreWriter
+from receiver.settings import get_settings
+import config
+
+DEFAULT_PORT = 20777
+SENTRY_DSN = "https://d00edba104864bee975f5f4a71025639@o615967.ingest.sentry.io/5854730"
+REDIRECT_HOST = "127.0.0.1"
+REDIRECT_PORT = 20975
+
+PROCESSOR_CLASSES = {
+    "f12020": F12020Processor,
+    "f12021": F12021Processor,
+    "f12022": F12022Processor,
+}
+GAME_VERSION_NAMES = {
+    "f12020": "F1 2020",
+    "f12021": "F1 2021",
+    "f12022": "F1 2022",
+}
+# We only run Sentry on select game versions, because old ones are not actively maintained
+SENTRY_GAME_VERSIONS = ("f12021", "f12022")
+
+# Receivers that haven't been stopped, whose sessions the f1laps_active_session_info gauge reports
+LIVE_RECEIVERS = weakref.WeakSet()
+
+
+def get_active_session_metric():
+    """ Labels of the active sessions of all live receivers for the f1laps_active_session_info gauge """
+    active_sessions = {}
+    for receiver in list(LIVE_RECEIVERS):
+        active_sessions.update(receiver.get_active_sessions())
+    return active_sessions
+
+
+metrics.REGISTRY.gauge("f1laps_active_session_info", "Currently active game session",
+                       ("game_version", "session_uid", "session_type", "track"), callback=get_active_session_metric)
+
+
+def get_socket_reuse_option():
+    # The SO_REUSEPORT setting allows us to reuse sockets
+    # Which is necessary when a user restarts sessions
+    # See https://stackoverflow.com/questions/14388706/how-do-so-reuseaddr-and-so-reuseport-differ for more details
+    # SO_REUSEPORT is what we want - you can immediately reuse a socket
+    # Windows doesn't know SO_REUSEPORT, and implemented SO_REUSEADDR as SO_REUSEPORT
+    user_os = platform.system()
+    if user_os == 'Windows':
+        return socket.SO_REUSEADDR
+    elif user_os == 'Darwin':  # i.e. Mac
+        return socket.SO_REUSEPORT
+    else:
+        # TBD - SO_REUSEPORT is what we want
+        # But some might not support it
+        # Could change to SO_REUSEADDR
+        return socket.SO_REUSEPORT
+
+
+def open_udp_socket(host_ip, host_port, use_udp_broadcast=False):
+    # Open and bind socket
+    new_socket = socket.socket(family=socket.AF_INET, type=socket.SOCK_DGRAM)
+    new_socket.setsockopt(socket.SOL_SOCKET, get_socket_reuse_option(), 1)
+    if use_udp_broadcast:
+        # Enable broadcasting mode
+        log.info("Using UDP broadcast mode")
+        new_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        new_socket.bind(("", host_port))
+    else:
+        log.info("Using UDP unicast mode")
+        new_socket.bind((host_ip, host_port))
+    log.debug("Socket opened and bound")
+    return new_socket
+
+
+class ReceiverBase:
+    """
+    Shared by the thread-based RaceReceiver and the asyncio-based AsyncRaceReceiver:
+    socket setup, Sentry, metrics and handing each datagram to the right game processor
+    """
+
+    def __init__(self, f1laps_api_key, settings=None, **options):
+        # Receiver options (see receiver/settings.py), keyword arguments override settings
+        self.settings = settings = get_settings(settings, **options)
+
+        # Network settings
+        self.host_ip = settings.host_ip or get_local_ip()
+        self.host_port = settings.host_port or int(DEFAULT_PORT)
+        self.use_udp_broadcast = settings.use_udp_broadcast
+
+        # Redirect Settings
+        # redirect_targets is a list of (host, port) or (host, port, packet types) tuples,
+        # or RedirectTargets; use_udp_redirect adds redirect_host:redirect_port to it
+        self.use_udp_redirect = settings.use_udp_redirect
+        self.redirect_host = settings.redirect_host or str(REDIRECT_HOST)
+        self.redirect_port = settings.redirect_port or int(REDIRECT_PORT)
+        redirect_targets = list(settings.redirect_targets or [])
+        if self.use_udp_redirect:
+            redirect_targets.insert(0, (self.redirect_host, self.redirect_port))
+        # Record every datagram to a capture file (see receiver/capture.py)
+        if settings.capture_path:
+            redirect_targets.append(CaptureTarget(settings.capture_path))
+        self.redirect_fanout = RedirectFanout(redirect_targets) if redirect_targets else None
+
+        log.info("*************************************************")
+        if self.use_udp_broadcast:
+            log.info("Set your F1 game telemetry settings to broadcast mode")
+            log.info("Set your F1 game telemetry settings port to: %s", self.host_port)
+        else:
+            log.info("Set your F1 game telemetry IP to:   %s", self.host_ip)
+            log.info("Set your F1 game telemetry port to: %s", self.host_port)
+
+        log.info("*************************************************")
+
+        if settings.demultiplex_sources:
+            log.info("Multi-source mode: each source address gets its own session")
+            log.info("*************************************************")
+
+        if self.redirect_fanout is not None:
+            log.info("UDP Port Redirection is Enabled")
+            for redirect_target in self.redirect_fanout.targets:
+                log.info("Redirection IP:Port: %s", redirect_target.name)
+            log.info("*************************************************")
+
+        # Get previously opened socket, or create new one
+        self.udp_socket = self.get_socket()
+
+        # Forward datagrams to the redirect targets from their own threads
+        if self.redirect_fanout is not None:
+            self.redirect_fanout.start()
+
+        # f1laps api key and settings
+        self.f1laps_api_key = f1laps_api_key
+        self.telemetry_enabled = settings.enable_telemetry
+
+        # game data processors
+        # Live processors are kept per game version, so switching games (or a redirect
+        # mixing game versions) doesn't throw away the other version's session.
+        # If several games send to this receiver, each source address and session
+        # gets its own processor instead (see process_udp_packet)
+        self.demultiplex_sources = settings.demultiplex_sources
+        if self.demultiplex_sources:
+            self.processor_cache = ProcessorCache()
+        else:
+            self.processor_cache = ProcessorCache(max_processors=len(PROCESSOR_CLASSES), keep_most_recent=True)
+        # Processor of the latest packet
+        self.processor = None
+        # Whether the latest datagram had an unknown game version, so a run of them is logged once
+        self.receiving_unknown_packets = False
+
+        # Sentry manager
+        # We only run Sentry on select game versions (SENTRY_GAME_VERSIONS)
+        # This flag allows us to be selective
+        self.sentry_running = False
+        # Deduplicates exceptions so a broken packet type can't flood Sentry
+        self.exception_breaker = ExceptionCircuitBreaker()
+
+        # How laps store telemetry, for every processor this receiver starts (see receiver/lap_telemetry_base.py)
+        self.telemetry_settings = telemetry_settings = TelemetrySettings.from_receiver_settings(settings)
+        if telemetry_settings.deferred_cleaning:
+            log.info("Deferred telemetry cleaning enabled")
+        if telemetry_settings.extra_channels:
+            log.info("Storing telemetry channels %s",
+                     ", ".join(channel.name for channel in telemetry_settings.channels))
+        if telemetry_settings.compression:
+            log.info("Compressing telemetry of completed laps")
+        if telemetry_settings.join_window is not None:
+            log.info("Joining lap and telemetry packets within %s frames", telemetry_settings.join_window)
+        if telemetry_settings.resample_step is not None:
+            log.info("Resampling lap telemetry every %sm", telemetry_settings.resample_step)
+        if telemetry_settings.decimation_frames is not None or telemetry_settings.decimation_ms is not None:
+            log.info("Decimating telemetry to every %s frames / %s ms",
+                     telemetry_settings.decimation_frames, telemetry_settings.decimation_ms)
+
+        # Local consumers of session and lap events, each on its own thread (see receiver/events.py)
+        # event_subscribers is a list of callbacks, or (callback, event types) tuples
+        self.event_subscribers = [
+            events.BUS.subscribe(*subscriber) if isinstance(subscriber, (tuple, list)) else events.BUS.subscribe(subscriber)
+            for subscriber in settings.event_subscribers or ()
+        ]
+
+        # Archive sessions, laps and penalties to a local SQLite database (see receiver/archive.py)
+        if settings.archive_path:
+            self.event_subscribers.append(events.BUS.subscribe(ArchiveWriter(settings.archive_path)))
+            log.info("Archiving sessions and laps to %s", settings.archive_path)
+
+        # Store completed laps' telemetry as memory-mappable arrays (see receiver/lap_store.py)
+        if settings.lap_store_path:
+            self.event_subscribers.append(events.BUS.subscribe(LapStoreWriter(settings.lap_store_path)))
+            log.info("Storing lap telemetry arrays in %s", settings.lap_store_path)
+
+        # Per-stage latency histograms (see receiver/latency.py)
+        if settings.enable_latency_histograms:
+            latency.recorder.enable(settings.latency_summary_interval)
+            log.info("Latency histograms enabled")
+
+        # Optional local Prometheus endpoint (see receiver/metrics.py)
+        LIVE_RECEIVERS.add(self)
+        self.metrics_server = None
+        if settings.metrics_port is not None:
+            self.metrics_server = metrics.MetricsServer(settings.metrics_port, settings.metrics_host).start()
+
+        log.info("Telemetry receiver started & ready for race data")
+
+    def start_sentry(self):
+        # Don't re-init if it's already running
+        if self.sentry_running:
+            return
+        # Actually enable Sentry
+        sentry_sdk.init(
+            SENTRY_DSN,
+            traces_sample_rate=0,
+            release=config.VERSION
+        )
+        sentry_sdk.set_context("machine", {
+            "system": platform.system(),
+            "release": platform.release()
+        })
+        sentry_sdk.set_context("api", {
+            "key": self.f1laps_api_key,
+            "telemetry_enabled": self.telemetry_enabled
+        })
+
+        # Set sentry to running so that we don't re-enable it each time
+        log.info("Initiated Sentry")
+        self.sentry_running = True
+
+    def get_socket(self):
+        return open_udp_socket(self.host_ip, self.host_port, self.use_udp_broadcast)
+
+    def get_socket_reuse_option(self):
+        return get_socket_reuse_option()
+
+    def get_processors(self):
+        """ All live processors """
+        return self.processor_cache.processors()
+
+    def get_active_sessions(self):
+        """ Labels of this receiver's active sessions for the f1laps_active_session_info gauge """
+        active_sessions = {}
+        for processor in self.get_processors():
+            session = processor.session
+            if not session:
+                continue
+            # The legacy F1 2020 session has neither game_version nor get_session_type()
+            session_type = session.get_session_type() if hasattr(session, "get_session_type") else session.session_type
+            active_sessions[(getattr(session, "game_version", "f12020"), session.session_udp_uid,
+                             session_type, session.get_track_name())] = 1
+        return active_sessions
+
+    def handle_udp_packet(self, incoming_udp_packet, source_address=None):
+        """ Process a datagram; exceptions are logged and reported, never raised """
+        try:
+            self.process_udp_packet(incoming_udp_packet, source_address)
+            if latency.recorder.enabled:
+                latency.recorder.maybe_log_summary()
+        except Exception as ex:
+            log.info("Unknown main receiver exception: %s", ex)
+            self.exception_breaker.capture(ex)
+
+    def process_udp_packet(self, incoming_udp_packet, source_address=None):
+        """ Pick the processor for the packet's game version (and source) and hand the packet to it """
+        packet_id = get_packet_id(incoming_udp_packet)
+        metrics.packets_received.inc(packet_id)
+        # Get game version -- None if unknown or not found
+        # Do this for every packet so that we can handle game switches in flight
+        version_start = latency.timer_start()
+        game_version = get_game_version(incoming_udp_packet)
+        latency.timer_stop(version_start, latency.STAGE_GAME_VERSION, packet_id)
+        if game_version not in PROCESSOR_CLASSES:
+            # The metric counts every unknown datagram, the log only says when they start
+            metrics.unknown_packets.inc()
+            if not self.receiving_unknown_packets:
+                log.info("Unknown packet or game version.")
+                self.receiving_unknown_packets = True
+            # Unknown datagrams still go to the last processor and the redirect, which decide what to do with them
+            processor = self.processor
+        else:
+            self.receiving_unknown_packets = False
+            if self.demultiplex_sources:
+                processor = self.get_source_processor(game_version, incoming_udp_packet, source_address)
+            else:
+                processor = self.get_processor(game_version)
+        if processor:
+            self.processor = processor
+            if self.redirect_fanout is not None:
+                self.redirect_fanout.forward(incoming_udp_packet)
+
+            processor.process(incoming_udp_packet)
+
+    def get_processor(self, game_version):
+        """ Single source: one processor per game version, kept until it goes idle """
+        processor = self.processor_cache.get(game_version)
+        # Only start processor if this game version has none yet
+        if processor is None and game_version in PROCESSOR_CLASSES:
+            processor = self.processor_cache.put(game_version, self.create_processor(game_version))
+        return processor
+
+    def get_source_processor(self, game_version, incoming_udp_packet, source_address):
+        """ Multiple sources: one processor per source address and session UID """
+        processor_class = PROCESSOR_CLASSES.get(game_version)
+        if not processor_class:
+            return None
+        key = (source_address, get_session_uid(incoming_udp_packet))
+        processor = self.processor_cache.get(key)
+        if not isinstance(processor, processor_class):
+            log.info("New telemetry source %s (session UID %s)", *key)
+            processor = self.processor_cache.put(key, self.create_processor(game_version))
+        return processor
+
+    def create_processor(self, game_version):
+        game_name = GAME_VERSION_NAMES[game_version]
+        log.info("Detected %s game version, starting %s processor.", game_name, game_name)
+        processor_class = PROCESSOR_CLASSES[game_version]
+        processor = processor_class(self.f1laps_api_key, self.telemetry_enabled, self.telemetry_settings)
+        if game_version in SENTRY_GAME_VERSIONS:
+            self.start_sentry()
+        return processor
+
+    def report_shutdown(self):
+        """ Log and report what's left when the receiver stops """
+        if latency.recorder.enabled:
+            latency.recorder.log_summary()
+        if self.sentry_running:
+            self.exception_breaker.flush()
+
+    def stop_metrics(self):
+        """ Stop reporting this receiver's sessions, and its metrics endpoint if it has one """
+        LIVE_RECEIVERS.discard(self)
+        if self.metrics_server:
+            self.metrics_server.stop()
+
+    def stop_redirect(self):
+        if self.redirect_fanout is not None:
+            self.redirect_fanout.stop()
+
+    def stop_event_subscribers(self):
+        """ Let this receiver's event subscribers handle what's queued, and remove them from the bus """
+        for subscriber in self.event_subscribers:
+            events.BUS.unsubscribe(subscriber)
+        self.event_subscribers = []
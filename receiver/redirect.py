@@ -0,0 +1,134 @@
+"""
+Forwards received datagrams to other telemetry apps
+
+Every target has its own socket, sender thread and bounded queue, so a slow or
+unreachable target only ever drops its own packets and never delays the receiver.
+"""
+import queue
+import socket
+import threading
+import logging
+log = logging.getLogger(__name__)
+
+from receiver.game_version import get_packet_id, get_packet_type_name, PACKET_ID_TO_NAME_MAP
+from receiver import metrics
+
+# Datagrams waiting to be sent to a target; further datagrams get dropped (and counted)
+REDIRECT_QUEUE_SIZE = 1024
+# How long stop() waits for a sender thread to send what's queued
+REDIRECT_STOP_TIMEOUT = 1
+
+PACKET_NAME_TO_ID_MAP = {name: packet_id for packet_id, name in PACKET_ID_TO_NAME_MAP.items()}
+
+redirected_packets = metrics.REGISTRY.counter(
+    "f1laps_redirected_packets_total", "Datagrams forwarded to redirect targets, by target", ("target",))
+redirect_dropped_packets = metrics.REGISTRY.counter(
+    "f1laps_redirect_dropped_packets_total", "Datagrams dropped because a redirect target's queue was full, by target",
+    ("target",))
+redirect_errors = metrics.REGISTRY.counter(
+    "f1laps_redirect_errors_total", "Failed sends to redirect targets, by target", ("target",))
+
+
+def get_packet_ids(packet_types):
+    """ Map packet type names (see PACKET_ID_TO_NAME_MAP) or ids to a set of ids; None means all """
+    if packet_types is None:
+        return None
+    packet_ids = set()
+    for packet_type in packet_types:
+        if isinstance(packet_type, int):
+            packet_ids.add(packet_type)
+        elif packet_type in PACKET_NAME_TO_ID_MAP:
+            packet_ids.add(PACKET_NAME_TO_ID_MAP[packet_type])
+        else:
+            raise ValueError("Unknown packet type %s" % packet_type)
+    return packet_ids
+
+
+class RedirectTarget:
+    """ One host:port to forward to, optionally only for some packet types """
+
+    def __init__(self, host, port, packet_types=None, queue_size=REDIRECT_QUEUE_SIZE):
+        self.host = host
+        self.port = int(port)
+        self.packet_ids = get_packet_ids(packet_types)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.name = "%s:%s" % (self.host, self.port)
+        self.socket = None
+        self.thread = None
+
+    def __repr__(self):
+        return "RedirectTarget(%s)" % self.name
+
+    def accepts(self, packet_id):
+        return self.packet_ids is None or packet_id in self.packet_ids
+
+    def start(self):
+        # Not bound, so the OS picks a free source port for every target
+        self.socket = socket.socket(family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        self.thread = threading.Thread(target=self.run, name="redirect-%s" % self.name, daemon=True)
+        self.thread.start()
+        return self
+
+    def offer(self, packet):
+        """ Queue a datagram for sending; never blocks """
+        try:
+            self.queue.put_nowait(packet)
+        except queue.Full:
+            redirect_dropped_packets.inc(self.name)
+
+    def run(self):
+        while True:
+            packet = self.queue.get()
+            if packet is None:
+                break
+            self.send(packet)
+        self.socket.close()
+
+    def send(self, packet):
+        try:
+            self.socket.sendto(packet, (self.host, self.port))
+            redirected_packets.inc(self.name)
+        except OSError as ex:
+            # e.g. unresolvable host, or ICMP port unreachable errors surfacing on Windows
+            redirect_errors.inc(self.name)
+            log.info("Could not redirect packet to %s: %s", self.name, ex)
+
+    def stop(self, timeout=REDIRECT_STOP_TIMEOUT):
+        """ Send what's queued (for up to timeout seconds) and close the socket """
+        if self.thread is None:
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            log.info("Redirect target %s is not keeping up, dropping its queued packets", self.name)
+            return
+        self.thread.join(timeout)
+
+
+class RedirectFanout:
+    """ Hands every datagram to the redirect targets that accept its packet type """
+
+    def __init__(self, targets):
+        self.targets = [target if isinstance(target, RedirectTarget) else RedirectTarget(*target)
+                        for target in targets]
+
+    def __len__(self):
+        return len(self.targets)
+
+    def start(self):
+        for target in self.targets:
+            log.info("Redirecting %s packets to %s",
+                     ", ".join(sorted(get_packet_type_name(packet_id) for packet_id in target.packet_ids))
+                     if target.packet_ids is not None else "all", target.name)
+            target.start()
+        return self
+
+    def forward(self, packet):
+        packet_id = get_packet_id(packet)
+        for target in self.targets:
+            if target.accepts(packet_id):
+                target.offer(packet)
+
+    def stop(self, timeout=REDIRECT_STOP_TIMEOUT):
+        for target in self.targets:
+            target.stop(timeout)
@@ -0,0 +1,177 @@
+"""
+Packet-loss and frame-gap detection based on header frame identifiers
+
+High-frequency packets (motion, lap, telemetry, car status) are sent every
+N game frames, where N depends on the in-game UDP rate. The tracker learns
+that stride per packet type and compares each new frameIdentifier against
+the last one to detect gaps (lost packets), duplicates and reordering.
+Large backwards jumps (flashbacks, restarts, new sessions) and large forward
+jumps (pauses, menus) re-baseline the tracker instead of counting as loss.
+"""
+from collections import deque
+import logging
+log = logging.getLogger(__name__)
+
+from receiver import metrics
+from receiver.game_version import get_packet_type_name
+
+
+# Packet IDs sent at the menu UDP rate; other packets are too sparse to track
+SEQUENCE_TRACKED_PACKET_IDS = (0, 2, 6, 7)
+
+PACKET_TYPE_LABEL = {"packet_type": get_packet_type_name}
+
+sequence_tracked_packets = metrics.REGISTRY.counter(
+    "f1laps_sequence_tracked_packets_total", "Packets checked for frame gaps, by packet type",
+    ("packet_type",), PACKET_TYPE_LABEL)
+frame_gap_lost_packets = metrics.REGISTRY.counter(
+    "f1laps_frame_gap_lost_packets_total", "Packets missing according to frame identifier gaps, by packet type",
+    ("packet_type",), PACKET_TYPE_LABEL)
+duplicate_packets = metrics.REGISTRY.counter(
+    "f1laps_duplicate_packets_total", "Packets repeating the previous frame identifier, by packet type",
+    ("packet_type",), PACKET_TYPE_LABEL)
+reordered_packets = metrics.REGISTRY.counter(
+    "f1laps_reordered_packets_total", "Packets arriving after a later frame of the same type, by packet type",
+    ("packet_type",), PACKET_TYPE_LABEL)
+
+
+def get_frame_gap_loss_ratio():
+    """
+    Share of tracked packets lost, per packet type (for the loss ratio gauge)
+    Counters stay monotonic, so late packets that were counted as lost are subtracted here
+    """
+    ratios = {}
+    for label_values, lost in list(frame_gap_lost_packets.values.items()):
+        lost = max(lost - reordered_packets.get(*label_values), 0)
+        total = sequence_tracked_packets.get(*label_values) + lost
+        if total:
+            ratios[label_values] = lost / total
+    return ratios
+
+
+metrics.REGISTRY.gauge(
+    "f1laps_frame_gap_loss_ratio", "Share of packets lost according to frame identifier gaps, by packet type",
+    ("packet_type",), PACKET_TYPE_LABEL, callback=get_frame_gap_loss_ratio)
+
+
+class PacketTypeSequence:
+    """ Sequence state of a single packet type """
+
+    def __init__(self, stride_window):
+        self.last_frame = None
+        self.stride = None
+        self.recent_deltas = deque(maxlen=stride_window)
+        self.received = 0
+        self.lost = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.resets = 0
+
+    def reset(self):
+        """ Re-baseline on the next packet; the learnt stride is kept """
+        self.last_frame = None
+        self.resets += 1
+
+
+class PacketSequenceTracker:
+    """ Tracks frame identifiers per packet type to detect lost, duplicate and reordered packets """
+    # Number of recent frame deltas used to learn the stride
+    STRIDE_WINDOW = 32
+    MIN_STRIDE_SAMPLES = 4
+    # A delta this many strides above normal counts as a gap
+    GAP_TOLERANCE = 1.5
+    # Packets arriving up to this many strides late count as reordered; earlier frames mean a reset
+    MAX_REORDER_STRIDES = 8
+    # Gaps of more than this many packets are a pause or a new session, not loss
+    MAX_GAP_PACKETS = 120
+
+    def __init__(self, tracked_packet_ids=SEQUENCE_TRACKED_PACKET_IDS):
+        self.sequences = {packet_id: PacketTypeSequence(self.STRIDE_WINDOW) for packet_id in tracked_packet_ids}
+
+    def observe(self, packet_id, frame_identifier):
+        """
+        Check a packet's frame identifier against the last one of its type
+        Returns the number of packets detected as lost right before this one, or -1 if this
+        late packet was counted as lost before (so callers can correct their own counts)
+        """
+        sequence = self.sequences.get(packet_id)
+        if sequence is None:
+            return 0
+        sequence.received += 1
+        sequence_tracked_packets.inc(packet_id)
+        last_frame = sequence.last_frame
+        if last_frame is None:
+            sequence.last_frame = frame_identifier
+            return 0
+        delta = frame_identifier - last_frame
+        stride = sequence.stride or 1
+
+        if delta == 0:
+            sequence.duplicates += 1
+            duplicate_packets.inc(packet_id)
+            return 0
+
+        if delta < 0:
+            if -delta <= stride * self.MAX_REORDER_STRIDES:
+                # A late packet we may already have counted as lost
+                sequence.reordered += 1
+                reordered_packets.inc(packet_id)
+                if sequence.lost:
+                    sequence.lost -= 1
+                    return -1
+                return 0
+            # Flashback, restart or new session: frame identifiers went back in time
+            log.debug("Frame identifier of %s packets went back from %s to %s, resetting sequence",
+                      get_packet_type_name(packet_id), last_frame, frame_identifier)
+            sequence.reset()
+            sequence.last_frame = frame_identifier
+            return 0
+
+        sequence.last_frame = frame_identifier
+        self.learn_stride(sequence, delta)
+        if sequence.stride is None or delta <= sequence.stride * self.GAP_TOLERANCE:
+            return 0
+        lost_packets = int(round(delta / sequence.stride)) - 1
+        if lost_packets > self.MAX_GAP_PACKETS:
+            # Game was paused or in a menu
+            sequence.resets += 1
+            return 0
+        sequence.lost += lost_packets
+        frame_gap_lost_packets.inc(packet_id, amount=lost_packets)
+        return lost_packets
+
+    def learn_stride(self, sequence, delta):
+        """ Use the median of recent deltas as the stride, so single gaps don't skew it """
+        sequence.recent_deltas.append(delta)
+        sample_count = len(sequence.recent_deltas)
+        if sample_count < self.MIN_STRIDE_SAMPLES:
+            return
+        # Compute once the first samples are in, then refresh once per window
+        if sequence.stride is None or sequence.received % self.STRIDE_WINDOW == 0:
+            sequence.stride = sorted(sequence.recent_deltas)[sample_count // 2]
+
+    def reset(self):
+        """ Re-baseline all packet types, e.g. after a flashback event """
+        for sequence in self.sequences.values():
+            sequence.reset()
+
+    def loss_rate(self, packet_id=None):
+        """ Share of packets lost, for one packet type or all tracked types """
+        sequences = [self.sequences[packet_id]] if packet_id is not None else self.sequences.values()
+        received = sum(sequence.received for sequence in sequences)
+        lost = sum(sequence.lost for sequence in sequences)
+        return lost / (received + lost) if (received + lost) else 0.0
+
+    def stats(self):
+        """ Counters per packet type name """
+        return {
+            get_packet_type_name(packet_id): {
+                "received": sequence.received,
+                "lost": sequence.lost,
+                "duplicates": sequence.duplicates,
+                "reordered": sequence.reordered,
+                "resets": sequence.resets,
+                "stride": sequence.stride,
+            }
+            for packet_id, sequence in self.sequences.items()
+        }
@@ -1,8 +1,11 @@
 import json
 
+from receiver import events
+
 class SessionBase:
     weather_ids = []
     telemetry_enabled = True
+    has_published_end = False
 
     def __str__(self):
         return "%s %s %s (ID %s-%s%s)" % (
@@ -26,6 +29,20 @@ class SessionBase:
         else:
             return 'wet' if has_wet_weather else 'dry'
 
+    def publish_event(self, event_type, **data):
+        """ Publish an event of this session to the event bus (see receiver/events.py) """
+        events.BUS.publish(event_type, self, **data)
+
+    def publish_end(self, reason):
+        """ 
+        Publish the session's end once, reason being "final_classification" or "replaced"
+        (by a session with another UDP ID)
+        """
+        if self.has_published_end:
+            return
+        self.has_published_end = True
+        self.publish_event(events.SESSION_ENDED, reason=reason)
+
     def get_lap_telemetry_data(self, lap_number):
         if self.telemetry_enabled:
             telemetry_data = self.telemetry.get_telemetry_api_dict(lap_number)
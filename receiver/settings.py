@@ -0,0 +1,88 @@
+"""
+Options of a receiver, in one object
+
+RaceReceiver, AsyncRaceReceiver and the sharding workers all take the same
+options; they get them as ReceiverSettings instead of copying each keyword
+argument into the next constructor:
+
+    settings = ReceiverSettings(host_port=20777, archive_path="laps.sqlite")
+    receiver = RaceReceiver(api_key, settings)
+
+Receivers also take the options as keyword arguments, which override the
+settings they're given. Settings are plain attributes, so they can be pickled
+into worker processes (see receiver/sharding.py).
+"""
+
+# Every option with its default
+DEFAULTS = {
+    "enable_telemetry": True,
+    # Network
+    "host_ip": None,
+    "host_port": None,
+    "use_udp_broadcast": False,
+    # Redirects: redirect_targets is a list of (host, port) or (host, port, packet types) tuples, or
+    # RedirectTargets; use_udp_redirect adds redirect_host:redirect_port to it (see receiver/redirect.py)
+    "redirect_host": None,
+    "redirect_port": None,
+    "use_udp_redirect": False,
+    "redirect_targets": None,
+    # Latency histograms (see receiver/latency.py) and the Prometheus endpoint (see receiver/metrics.py)
+    "enable_latency_histograms": False,
+    "latency_summary_interval": None,
+    "metrics_port": None,
+    "metrics_host": None,
+    # One session per source address (see receiver/processor_cache.py)
+    "demultiplex_sources": False,
+    # Lap telemetry (see receiver/lap_telemetry_base.py)
+    "defer_telemetry_cleaning": False,
+    "telemetry_resample_step": None,
+    "telemetry_resample_methods": None,
+    "telemetry_decimation_frames": None,
+    "telemetry_decimation_ms": None,
+    "telemetry_join_window": None,
+    "telemetry_extra_channels": None,
+    "compress_completed_laps": False,
+    # Local consumers: event callbacks (see receiver/events.py), archive, lap store and capture file
+    "event_subscribers": None,
+    "archive_path": None,
+    "lap_store_path": None,
+    "capture_path": None,
+}
+
+
+class ReceiverSettings:
+    """ A receiver's options, see DEFAULTS """
+
+    def __init__(self, **options):
+        for name, default in DEFAULTS.items():
+            setattr(self, name, default)
+        self.update(**options)
+
+    def __repr__(self):
+        changed = ["%s=%r" % (name, value) for name, value in self.as_dict().items() if value != DEFAULTS[name]]
+        return "ReceiverSettings(%s)" % ", ".join(changed)
+
+    def __eq__(self, other):
+        return isinstance(other, ReceiverSettings) and self.as_dict() == other.as_dict()
+
+    def update(self, **options):
+        for name, value in options.items():
+            if name not in DEFAULTS:
+                raise TypeError("Unknown receiver option %s" % name)
+            setattr(self, name, value)
+
+    def replace(self, **options):
+        """ A copy with some options changed """
+        settings = ReceiverSettings(**self.as_dict())
+        settings.update(**options)
+        return settings
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in DEFAULTS}
+
+
+def get_settings(settings=None, **options):
+    """ The given settings (or the defaults) with options overriding them, without changing settings """
+    if settings is None:
+        return ReceiverSettings(**options)
+    return settings.replace(**options) if options else settings
@@ -0,0 +1,376 @@
+"""
+Multi-process sharded ingest, for one server receiving a whole league lobby
+
+A ShardSupervisor spawns N worker processes, each running its own processors
+in multi-source mode (one session per source address). Datagrams get to the
+workers in one of two ways:
+
+- dispatcher (default, any OS): the supervisor owns the socket and forwards
+  each datagram over a pipe to the worker picked by a stable hash of its
+  source address, so a source stays on its worker even across restarts
+- reuseport (Linux only): every worker binds the port with SO_REUSEPORT and
+  the kernel spreads sources across them; cheaper, but adding or removing a
+  worker re-hashes sources onto other workers
+
+Workers send metrics snapshots to the supervisor, which serves their sum.
+Workers that die are respawned; restart() replaces them one at a time.
+"""
+import multiprocessing
+import os
+import platform
+import queue
+import signal
+import socket
+import struct
+import threading
+import zlib
+from time import monotonic
+import logging
+log = logging.getLogger(__name__)
+
+from receiver.helpers import get_local_ip
+from receiver.receiver import RaceReceiver
+from receiver.receiver_base import ReceiverBase, DEFAULT_PORT, open_udp_socket
+from receiver.settings import get_settings
+from receiver import metrics
+
+MODE_DISPATCHER = "dispatcher"
+MODE_REUSEPORT = "reuseport"
+# How often workers send metrics snapshots to the supervisor
+METRICS_SNAPSHOT_INTERVAL = 1
+# How long a worker may take to process its queue and sync before being terminated
+WORKER_STOP_TIMEOUT = 10
+# The dispatcher is the single funnel for a whole lobby, so give it room for bursts (capped by the OS)
+DISPATCHER_RECEIVE_BUFFER_BYTES = 4 * 1024 * 1024
+# Don't respawn a crashing worker in a tight loop
+WORKER_RESTART_BACKOFF_SECONDS = 1
+# Datagrams waiting to be written to a worker's pipe; further datagrams get dropped (and counted)
+WORKER_QUEUE_SIZE = 4096
+
+# Dispatched messages are the packed IPv4 source address followed by the datagram
+SOURCE_ADDRESS_PREFIX = struct.Struct("!4sH")
+# An empty message tells a dispatched worker to finish
+END_OF_STREAM = b""
+
+dispatched_packets = metrics.REGISTRY.counter(
+    "f1laps_shard_dispatched_packets_total", "Datagrams forwarded to worker processes, by worker", ("worker",))
+dispatch_errors = metrics.REGISTRY.counter(
+    "f1laps_shard_dispatch_errors_total", "Datagrams that couldn't be forwarded to a worker process")
+dispatch_dropped_packets = metrics.REGISTRY.counter(
+    "f1laps_shard_dropped_packets_total", "Datagrams dropped because a worker's queue was full, by worker",
+    ("worker",))
+worker_restarts = metrics.REGISTRY.counter(
+    "f1laps_shard_worker_restarts_total", "Worker processes respawned, by reason", ("reason",))
+
+
+def encode_datagram(incoming_udp_packet, source_address):
+    host, port = source_address
+    return SOURCE_ADDRESS_PREFIX.pack(socket.inet_aton(host), port) + incoming_udp_packet
+
+
+def decode_datagram(message):
+    """ Returns (datagram, source address) of a dispatched message """
+    host, port = SOURCE_ADDRESS_PREFIX.unpack_from(message)
+    return message[SOURCE_ADDRESS_PREFIX.size:], (socket.inet_ntoa(host), port)
+
+
+def get_shard(source_address, worker_count):
+    """ Stable worker index for a source address (unlike hash(), the same in every process) """
+    host, port = source_address
+    return zlib.crc32(("%s:%s" % (host, port)).encode()) % worker_count
+
+
+class DispatchedReceiver(ReceiverBase):
+    """ Worker receiver fed by the supervisor's dispatcher instead of its own socket """
+
+    def get_socket(self):
+        return None
+
+
+def run_worker(worker_id, mode, f1laps_api_key, settings, packet_connection, stop_event, metrics_queue,
+               snapshot_interval):
+    """ Entry point of a worker process """
+    # Ctrl+C goes to the whole process group; the supervisor decides how to stop us
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if mode == MODE_REUSEPORT:
+        receiver = RaceReceiver(f1laps_api_key, settings, run_as_daemon=True)
+        receiver.start()
+        metrics_queue.put((worker_id, metrics.REGISTRY.snapshot()))
+        while not stop_event.wait(snapshot_interval):
+            metrics_queue.put((worker_id, metrics.REGISTRY.snapshot()))
+        receiver.kill(timeout=WORKER_STOP_TIMEOUT)
+    else:
+        receiver = DispatchedReceiver(f1laps_api_key, settings)
+        metrics_queue.put((worker_id, metrics.REGISTRY.snapshot()))
+        next_snapshot = monotonic() + snapshot_interval
+        try:
+            while True:
+                if packet_connection.poll(snapshot_interval):
+                    message = packet_connection.recv_bytes()
+                    if message == END_OF_STREAM:
+                        break
+                    receiver.handle_udp_packet(*decode_datagram(message))
+                if monotonic() >= next_snapshot:
+                    metrics_queue.put((worker_id, metrics.REGISTRY.snapshot()))
+                    next_snapshot = monotonic() + snapshot_interval
+        except EOFError:
+            log.info("Worker %s lost its supervisor", worker_id)
+        receiver.report_shutdown()
+        receiver.stop_redirect()
+        receiver.stop_event_subscribers()
+    metrics_queue.put((worker_id, metrics.REGISTRY.snapshot()))
+    log.info("Worker %s finished", worker_id)
+
+
+class WorkerHandle:
+    """
+    Supervisor side of a worker process. In dispatcher mode, datagrams for the worker wait in a
+    bounded queue and a sender thread writes them to its pipe, so a slow worker only ever drops
+    its own datagrams and never delays the dispatcher.
+    """
+
+    def __init__(self, worker_id, process, connection, stop_event, queue_size=WORKER_QUEUE_SIZE):
+        self.worker_id = worker_id
+        self.process = process
+        self.connection = connection
+        self.stop_event = stop_event
+        self.started_at = monotonic()
+        self.queue = None
+        self.thread = None
+        if connection is not None:
+            self.queue = queue.Queue(maxsize=queue_size)
+            self.thread = threading.Thread(target=self.run, name="shard-sender-%s" % worker_id, daemon=True)
+            self.thread.start()
+
+    def offer(self, message):
+        """ Queue a dispatched message for the worker; never blocks """
+        if self.stop_event.is_set():
+            # Replaced by a new worker after the dispatcher picked this one
+            dispatch_errors.inc()
+            return
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            dispatch_dropped_packets.inc(self.worker_id)
+
+    def run(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                break
+            try:
+                self.connection.send_bytes(message)
+                dispatched_packets.inc(self.worker_id)
+            except OSError:
+                dispatch_errors.inc()
+        try:
+            self.connection.send_bytes(END_OF_STREAM)
+        except OSError:
+            pass
+
+    def end_stream(self):
+        """ Let the sender thread write what's queued, followed by the end of the stream """
+        self.stop_event.set()
+        if self.queue is None:
+            return
+        while True:
+            try:
+                self.queue.put_nowait(None)
+                return
+            except queue.Full:
+                # The worker isn't keeping up; make room for the end of the stream
+                try:
+                    self.queue.get_nowait()
+                    dispatch_dropped_packets.inc(self.worker_id)
+                except queue.Empty:
+                    pass
+
+
+class ShardSupervisor:
+    """ Spawns, monitors and restarts worker processes that ingest telemetry """
+
+    def __init__(self, f1laps_api_key, worker_count=None, settings=None, mode=MODE_DISPATCHER,
+                 snapshot_interval=METRICS_SNAPSHOT_INTERVAL, **options):
+        if mode not in (MODE_DISPATCHER, MODE_REUSEPORT):
+            raise ValueError("Unknown sharding mode %s" % mode)
+        if mode == MODE_REUSEPORT and platform.system() != "Linux":
+            # Elsewhere SO_REUSEPORT doesn't spread datagrams across sockets
+            raise ValueError("The reuseport sharding mode is only supported on Linux")
+        settings = get_settings(settings, **options)
+        # Every worker would append to the same file, interleaving their writes
+        for name in ("lap_store_path", "capture_path"):
+            if getattr(settings, name):
+                raise ValueError("%s isn't supported with sharding, workers can't share the file" % name)
+        self.mode = mode
+        self.worker_count = worker_count or os.cpu_count() or 1
+        self.host_ip = settings.host_ip or get_local_ip()
+        self.host_port = settings.host_port or int(DEFAULT_PORT)
+        self.use_udp_broadcast = settings.use_udp_broadcast
+        self.f1laps_api_key = f1laps_api_key
+        # Every worker forwards the sources it handles to the redirect targets, and runs its own event
+        # subscribers, so callbacks need to be picklable (e.g. module-level functions).
+        # Workers share the archive, SQLite serializes their writes.
+        # The supervisor serves the workers' metrics
+        self.worker_settings = settings.replace(host_ip=self.host_ip, host_port=self.host_port,
+                                                demultiplex_sources=True, metrics_port=None, metrics_host=None)
+        self.metrics_port = settings.metrics_port
+        self.metrics_host = settings.metrics_host
+        self.snapshot_interval = snapshot_interval
+        # Spawn (rather than fork) so workers start with a clean interpreter on every OS
+        self.context = multiprocessing.get_context("spawn")
+        self.metrics_queue = self.context.Queue()
+        self.registry = metrics.AggregatedRegistry()
+        self.metrics_server = None
+        self.workers = []
+        self.ready_workers = set()
+        self.udp_socket = None
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def start(self):
+        log.info("Starting %s %s workers", self.worker_count, self.mode)
+        if self.mode == MODE_DISPATCHER:
+            self.udp_socket = open_udp_socket(self.host_ip, self.host_port, self.use_udp_broadcast)
+            self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, DISPATCHER_RECEIVE_BUFFER_BYTES)
+            # A short timeout lets the dispatcher notice stop() without a wakeup socket
+            self.udp_socket.settimeout(0.2)
+        self.workers = [self.spawn_worker(worker_id) for worker_id in range(self.worker_count)]
+        targets = [self.monitor_workers]
+        if self.mode == MODE_DISPATCHER:
+            targets.append(self.dispatch_packets)
+        for target in targets:
+            thread = threading.Thread(target=target, name="shard-%s" % target.__name__, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        if self.metrics_port is not None:
+            self.metrics_server = metrics.MetricsServer(self.metrics_port, self.metrics_host, self.registry).start()
+        return self
+
+    def spawn_worker(self, worker_id):
+        receiving_connection, sending_connection = (None, None)
+        if self.mode == MODE_DISPATCHER:
+            receiving_connection, sending_connection = self.context.Pipe(duplex=False)
+        stop_event = self.context.Event()
+        process = self.context.Process(
+            target=run_worker, name="f1laps-worker-%s" % worker_id,
+            args=(worker_id, self.mode, self.f1laps_api_key, self.worker_settings, receiving_connection, stop_event,
+                  self.metrics_queue, self.snapshot_interval))
+        process.daemon = True
+        process.start()
+        if receiving_connection is not None:
+            # The worker has its own copy now
+            receiving_connection.close()
+        log.info("Started worker %s (pid %s)", worker_id, process.pid)
+        return WorkerHandle(worker_id, process, sending_connection, stop_event)
+
+    def stop_worker(self, worker, timeout=WORKER_STOP_TIMEOUT):
+        """ Let a worker process what it has queued and sync, then make sure it's gone """
+        worker.end_stream()
+        worker.process.join(timeout)
+        if worker.process.is_alive():
+            log.warning("Worker %s didn't stop within %ss, terminating it", worker.worker_id, timeout)
+            worker.process.terminate()
+            worker.process.join()
+        if worker.thread is not None:
+            # A terminated worker's pipe is broken, so the sender thread can't be stuck writing to it
+            worker.thread.join()
+        if worker.connection is not None:
+            worker.connection.close()
+
+    def restart(self):
+        """ Graceful rolling restart: replace the workers one at a time """
+        for worker_id in range(self.worker_count):
+            if self.stopping.is_set():
+                return
+            self.restart_worker(worker_id, reason="rolling")
+
+    def restart_worker(self, worker_id, reason):
+        # The new worker takes over before the old one stops, so no datagrams go unread;
+        # the sessions of the old worker's sources start over in the new one.
+        # Spawning takes a while, so it happens before taking the lock
+        new_worker = self.spawn_worker(worker_id)
+        with self.lock:
+            old_worker = self.workers[worker_id]
+            self.workers[worker_id] = new_worker
+        worker_restarts.inc(reason)
+        self.stop_worker(old_worker)
+
+    def dispatch_packets(self):
+        """ Forward datagrams to workers by source address (dispatcher mode) """
+        while not self.stopping.is_set():
+            try:
+                incoming_udp_packet, source_address = self.udp_socket.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError as ex:
+                if self.stopping.is_set():
+                    return
+                log.info("Dispatcher socket error: %s", ex)
+                continue
+            # Each worker's sender thread writes to its pipe, so a slow worker can't hold up the others
+            self.workers[get_shard(source_address, self.worker_count)].offer(
+                encode_datagram(incoming_udp_packet, source_address))
+
+    def monitor_workers(self):
+        """ Collect metrics snapshots and respawn workers that died """
+        while not self.stopping.is_set():
+            self.collect_metrics(timeout=0.5)
+            self.registry.update("supervisor", metrics.REGISTRY.snapshot())
+            with self.lock:
+                dead_workers = [
+                    worker for worker in self.workers
+                    if not worker.process.is_alive() and not self.stopping.is_set()
+                    and monotonic() - worker.started_at >= WORKER_RESTART_BACKOFF_SECONDS
+                ]
+            for worker in dead_workers:
+                log.warning("Worker %s exited with code %s, respawning it",
+                            worker.worker_id, worker.process.exitcode)
+                self.restart_worker(worker.worker_id, reason="crash")
+
+    def collect_metrics(self, timeout=0):
+        try:
+            worker_id, snapshot = self.metrics_queue.get(timeout=timeout)
+            while True:
+                self.registry.update(worker_id, snapshot)
+                self.ready_workers.add(worker_id)
+                worker_id, snapshot = self.metrics_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def wait_until_ready(self, timeout=30):
+        """ Wait until every worker has reported in once """
+        deadline = monotonic() + timeout
+        while len(self.ready_workers) < self.worker_count and monotonic() < deadline:
+            self.stopping.wait(0.05)
+        return len(self.ready_workers) >= self.worker_count
+
+    def stop(self):
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        for thread in self.threads:
+            thread.join()
+        if self.udp_socket is not None:
+            self.udp_socket.close()
+        for worker in self.workers:
+            self.stop_worker(worker)
+        # Final snapshots of the stopped workers
+        self.collect_metrics(timeout=0.5)
+        self.registry.update("supervisor", metrics.REGISTRY.snapshot())
+        if self.metrics_server:
+            self.metrics_server.stop()
+        log.info("Stopped all workers")
+
+    def run_forever(self):
+        """ Run until interrupted; on Mac/Linux, SIGHUP triggers a rolling restart """
+        self.start()
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda signum, frame: threading.Thread(target=self.restart, daemon=True).start())
+        try:
+            while not self.stopping.wait(1):
+                pass
+        except KeyboardInterrupt:
+            log.info("Stopping workers")
+        finally:
+            self.stop()
@@ -1,5 +1,5 @@
 """
-THIS IS AN OLD FILE THAT IS ONLY USED BY F12021 and F12022
+THIS IS AN OLD FILE THAT IS ONLY USED BY F12020
 """
 
 import logging
@@ -109,14 +109,14 @@ class TelemetryLapBase:
                     first_frame_distance_frame, first_frame_distance_values = frame_dict_sorted_by_distance[0]
                     first_frame_distance_value = first_frame_distance_values[KEY_INDEX_MAP["lap_distance"]] or 0
                     if self.session_type not in self.SESSION_TYPES_WITHOUT_OUTLAP and first_frame_distance_value < self.MAX_DISTANCE_COUNT_AS_NEW_LAP:
-                        log.info("Assuming an outlap started based on distance delta - killing all new frames (current distance %s, last distance %s, first frame distance %s)" % \
-                            (current_distance, self.last_lap_distance, first_frame_distance_value))
+                        log.info("Assuming an outlap started based on distance delta - killing all new frames (current distance %s, last distance %s, first frame distance %s)",
+                            current_distance, self.last_lap_distance, first_frame_distance_value)
                         self.remove_frame(frame_number)
                         # Important to return here to not set the last_lap_distance to the current_distance
                         return
                     else:
-                        log.info("Assuming a new lap started based on distance delta - killing all old frames (current distance %s, last distance %s, first frame distance %s)" % \
-                            (current_distance, self.last_lap_distance, first_frame_distance_value))
+                        log.info("Assuming a new lap started based on distance delta - killing all old frames (current distance %s, last distance %s, first frame distance %s)",
+                            current_distance, self.last_lap_distance, first_frame_distance_value)
                         self.frame_dict = {frame_number: frame}
         
         # Set the last distance value for future frames
@@ -135,11 +135,8 @@ class TelemetryLapBase:
                 self.frame_dict.pop(frame_id)
         # Reset last lap distance
         self.last_lap_distance = None
-        log.info("Removed frames that were flashbacked away (flbk to %s; max was %s; deleted %s)" % (
-            frame_id_flashed_back_to,
-            current_frame_max,
-            deleted_frame_count
-            ))
+        log.info("Removed frames that were flashbacked away (flbk to %s; max was %s; deleted %s)",
+            frame_id_flashed_back_to, current_frame_max, deleted_frame_count)
 
 
 class TelemetryBase:
@@ -186,9 +183,9 @@ class TelemetryBase:
 
     def start_new_lap(self, number):
         """ New lap started in game """
-        log.info("Telemetry: start new lap %s" % number)
+        log.info("Telemetry: start new lap %s", number)
         if number in self.lap_dict.keys():
-            log.info("TelemetryLap number %s already started" % number)
+            log.info("TelemetryLap number %s already started", number)
             return None
         # Update current lap number and add to dict
         self.current_lap_number = number
@@ -198,7 +195,7 @@ class TelemetryBase:
             for key in list(self.lap_dict):
                 if key != number and key != (number-1):
                     self.lap_dict.pop(key, None)
-                    log.info("Telemetry: deleted telemetry of lap %s" % key)
+                    log.info("Telemetry: deleted telemetry of lap %s", key)
 
     def process_flashback_event(self, frame_id_flashed_back_to):
         self.current_lap.process_flashback_event(frame_id_flashed_back_to)
@@ -208,4 +205,4 @@ class TelemetryBase:
         if self.lap_dict.get(lap_number):
             self.current_lap_number = lap_number
             self.lap_dict[lap_number] = self.TelemetryLapModel(lap_number, session_type=self.session_type)
-            log.info("Telemetry: dropped telemetry of lap %s" % lap_number)
+            log.info("Telemetry: dropped telemetry of lap %s", lap_number)
@@ -0,0 +1,145 @@
+"""
+Registry of the telemetry channels a lap can store
+
+Every channel declares the packet field it comes from, its fixed point
+(decimals), the array type code its column uses once the lap is completed
+(see receiver/telemetry_columns.py), how often it gets sampled and how it gets
+resampled onto a distance grid. The eight default channels are what F1Laps
+syncs; extra channels from the car telemetry packet can be enabled with the
+telemetry_extra_channels receiver option (see TelemetrySettings in
+receiver/lap_telemetry_base.py), which sizes the frames and columns of laps
+accordingly.
+"""
+from array import array
+
+from receiver.telemetry_resampling import RESAMPLE_LINEAR, RESAMPLE_HOLD
+
+PACKET_LAP = "lap"
+PACKET_TELEMETRY = "telemetry"
+
+# Signed types only, their two lowest values are used as markers (see telemetry_columns.py)
+CHANNEL_DTYPES = ("b", "h", "i", "q")
+
+# Car telemetry arrays are in this wheel order
+WHEELS = ("rear_left", "rear_right", "front_left", "front_right")
+
+
+class TelemetryChannel:
+    """ A telemetry value stored per frame """
+    __slots__ = ("name", "packet", "field", "field_index", "decimals", "dtype", "sample_every", "resample_method")
+
+    def __init__(self, name, packet, field, field_index=None, decimals=0, dtype="h", sample_every=1,
+                 resample_method=RESAMPLE_LINEAR):
+        if dtype not in CHANNEL_DTYPES:
+            raise ValueError("Channel %s: dtype must be one of %s, got %s" % (name, ", ".join(CHANNEL_DTYPES), dtype))
+        self.name = name
+        self.packet = packet
+        self.field = field
+        self.field_index = field_index
+        self.decimals = decimals
+        self.dtype = dtype
+        self.sample_every = sample_every
+        self.resample_method = resample_method
+
+    def __repr__(self):
+        return "TelemetryChannel(%s)" % self.name
+
+    @property
+    def itemsize(self):
+        """ Bytes per frame in a completed lap's column """
+        return array(self.dtype).itemsize
+
+    def read(self, packet_data):
+        """ Read this channel's value from the player's packet struct (e.g. CarTelemetryData) """
+        value = getattr(packet_data, self.field)
+        return value[self.field_index] if self.field_index is not None else value
+
+    def with_sampling(self, sample_every):
+        return TelemetryChannel(self.name, self.packet, self.field, self.field_index, self.decimals, self.dtype,
+                                sample_every, self.resample_method)
+
+
+# Synced to F1Laps, in the order of a frame's values
+DEFAULT_CHANNELS = (
+    TelemetryChannel("lap_distance", PACKET_LAP, "lapDistance", decimals=2, dtype="i"),
+    TelemetryChannel("lap_time", PACKET_LAP, "currentLapTimeInMS", dtype="i"),
+    TelemetryChannel("speed", PACKET_TELEMETRY, "speed"),
+    TelemetryChannel("brake", PACKET_TELEMETRY, "brake", decimals=3),
+    TelemetryChannel("throttle", PACKET_TELEMETRY, "throttle", decimals=3),
+    TelemetryChannel("gear", PACKET_TELEMETRY, "gear", dtype="b", resample_method=RESAMPLE_HOLD),
+    TelemetryChannel("steer", PACKET_TELEMETRY, "steer", decimals=3),
+    TelemetryChannel("drs", PACKET_TELEMETRY, "drs", dtype="b", resample_method=RESAMPLE_HOLD),
+)
+
+# Further car telemetry values; temperatures and pressures change slowly, so they're sampled less often
+EXTRA_CHANNELS = (
+    TelemetryChannel("engine_rpm", PACKET_TELEMETRY, "engineRPM"),
+    TelemetryChannel("engine_temperature", PACKET_TELEMETRY, "engineTemperature", sample_every=30),
+) + tuple(
+    TelemetryChannel("brake_temperature_%s" % wheel, PACKET_TELEMETRY, "brakesTemperature", index, sample_every=10)
+    for index, wheel in enumerate(WHEELS)
+) + tuple(
+    TelemetryChannel("tyre_surface_temperature_%s" % wheel, PACKET_TELEMETRY, "tyresSurfaceTemperature", index,
+                     sample_every=10)
+    for index, wheel in enumerate(WHEELS)
+) + tuple(
+    TelemetryChannel("tyre_inner_temperature_%s" % wheel, PACKET_TELEMETRY, "tyresInnerTemperature", index,
+                     sample_every=30)
+    for index, wheel in enumerate(WHEELS)
+) + tuple(
+    TelemetryChannel("tyre_pressure_%s" % wheel, PACKET_TELEMETRY, "tyresPressure", index, decimals=1,
+                     sample_every=30)
+    for index, wheel in enumerate(WHEELS)
+)
+
+CHANNEL_REGISTRY = {channel.name: channel for channel in DEFAULT_CHANNELS + EXTRA_CHANNELS}
+
+
+def get_channels(extra_channels=()):
+    """
+    The default channels plus the given extra ones: names, or (name, sample_every) to override
+    how often a channel gets sampled (every sample_every-th frame)
+    """
+    channels = list(DEFAULT_CHANNELS)
+    for extra_channel in extra_channels:
+        name, sample_every = extra_channel if isinstance(extra_channel, (tuple, list)) else (extra_channel, None)
+        channel = CHANNEL_REGISTRY.get(name)
+        if channel is None or channel in DEFAULT_CHANNELS:
+            raise ValueError("Unknown extra telemetry channel %s" % name)
+        if any(enabled.name == name for enabled in channels):
+            continue
+        if sample_every is not None:
+            if sample_every < 1:
+                raise ValueError("Channel %s: sample_every must be at least 1, got %s" % (name, sample_every))
+            channel = channel.with_sampling(sample_every)
+        channels.append(channel)
+    return channels
+
+
+def get_bytes_per_frame(channels):
+    """ Column bytes per frame of a completed lap, by channel """
+    return {channel.name: channel.itemsize for channel in channels}
+
+
+class ChannelSampler:
+    """ Reads the extra channels from one car's telemetry packets, each at its own sampling rate """
+
+    def __init__(self, channels):
+        self.channels = [channel for channel in channels
+                         if channel not in DEFAULT_CHANNELS and channel.packet == PACKET_TELEMETRY]
+        self.last_sampled_frames = {}
+
+    def __bool__(self):
+        return bool(self.channels)
+
+    def read(self, packet_data, frame_identifier):
+        """ Values of the channels that are due in this frame """
+        values = {}
+        last_sampled_frames = self.last_sampled_frames
+        for channel in self.channels:
+            last_frame = last_sampled_frames.get(channel.name)
+            # Frames going backwards (flashbacks, restarts) sample again
+            if last_frame is None or not 0 <= frame_identifier - last_frame < channel.sample_every:
+                values[channel.name] = channel.read(packet_data)
+                last_sampled_frames[channel.name] = frame_identifier
+        return values
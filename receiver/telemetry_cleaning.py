@@ -0,0 +1,114 @@
+"""
+Deferred cleaning of lap telemetry
+
+In deferred mode, LapTelemetryBase only stores its updates while the lap is
+running and cleans them when frame_dict is read. clean_frame() only acts on a
+few updates per lap (negative distances before the first line cross, garage
+exits, outlaps, flashbacks and frames popped before), so a pass finds the
+first of those: everything before it is merged without any checks, that update
+goes through clean_frame(), and the next pass starts after it. The result is the
+same as cleaning every frame as it arrives.
+
+The pass uses NumPy if it's installed, and a pure-Python loop otherwise.
+"""
+from itertools import islice
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Same fixed point as KEY_SCALE_MAP["lap_distance"] in lap_telemetry_base.py
+LAP_DISTANCE_SCALE = 100
+
+
+def is_flashback(update):
+    """ Pending updates are telemetry dicts, or the frame id of a flashback """
+    return not isinstance(update, dict)
+
+
+def find_first_cleaning_index(updates, frame_dict, last_lap_distance, frames_popped, max_new_lap_distance):
+    """
+    Find the first pending update that clean_frame() would act on, assuming nothing before it
+    was cleaned. Returns its index (len(updates) if there is none) and the last lap distance
+    clean_frame() would have stored right before it.
+    Distances (in frame_dict, last_lap_distance and max_new_lap_distance) are in fixed point.
+    """
+    if numpy is not None:
+        return find_first_cleaning_index_numpy(updates, frame_dict, last_lap_distance, frames_popped, max_new_lap_distance)
+    return find_first_cleaning_index_python(updates, frame_dict, last_lap_distance, frames_popped, max_new_lap_distance)
+
+
+def find_first_cleaning_index_python(updates, frame_dict, last_lap_distance, frames_popped, max_new_lap_distance):
+    frames_popped = set(frames_popped)
+    # Distance each frame has after the updates so far
+    frame_distances = {}
+    for index, update in enumerate(updates):
+        if is_flashback(update) or update["frame_identifier"] in frames_popped:
+            return index, last_lap_distance
+        frame_number = update["frame_identifier"]
+        if "lap_distance" in update:
+            distance = frame_distances[frame_number] = round(update["lap_distance"] * LAP_DISTANCE_SCALE)
+        elif frame_number in frame_distances:
+            distance = frame_distances[frame_number]
+        else:
+            frame = frame_dict.get(frame_number)
+            distance = frame[0] if frame else None
+        # Telemetry packets don't have a distance, and zero distances don't get cleaned either
+        if not distance:
+            continue
+        if distance < 0 or (last_lap_distance and last_lap_distance > distance and distance < max_new_lap_distance):
+            return index, last_lap_distance
+        last_lap_distance = distance
+    return len(updates), last_lap_distance
+
+
+def find_first_cleaning_index_numpy(updates, frame_dict, last_lap_distance, frames_popped, max_new_lap_distance):
+    frames_popped = set(frames_popped)
+    # Flashbacks and popped frames always need clean_frame(), only look at the updates before them
+    count = next((index for index, update in enumerate(updates)
+                  if is_flashback(update) or update["frame_identifier"] in frames_popped), len(updates))
+    if not count:
+        return 0, last_lap_distance
+    nan = numpy.nan
+    frame_numbers = numpy.fromiter((update["frame_identifier"] for update in islice(updates, count)),
+                                   dtype=numpy.int64, count=count)
+    # Quantized in Python, so that comparisons match clean_frame() exactly
+    own_distances = numpy.fromiter(
+        (round(update["lap_distance"] * LAP_DISTANCE_SCALE) if "lap_distance" in update else nan
+         for update in islice(updates, count)), dtype=float, count=count)
+    stored_distances = numpy.fromiter(
+        (frame_dict[frame_number][0] if frame_number in frame_dict and frame_dict[frame_number][0] is not None else nan
+         for frame_number in frame_numbers.tolist()), dtype=float, count=count)
+
+    # Telemetry-only updates have the distance of the last update of the same frame,
+    # or of the frame from before: forward fill within each frame number
+    positions = numpy.arange(count)
+    order = numpy.argsort(frame_numbers, kind="stable")
+    sorted_frames = frame_numbers[order]
+    sorted_distances = own_distances[order]
+    group_starts = numpy.maximum.accumulate(
+        numpy.where(numpy.concatenate(([True], sorted_frames[1:] != sorted_frames[:-1])), positions, 0))
+    last_set = numpy.maximum.accumulate(numpy.where(numpy.isnan(sorted_distances), -1, positions))
+    filled = numpy.where(last_set >= group_starts, sorted_distances[last_set.clip(0)], nan)
+    distances = numpy.empty(count)
+    distances[order] = filled
+    distances = numpy.where(numpy.isnan(distances), stored_distances, distances)
+
+    # Last lap distance before each update: the distance of the last update that had one
+    has_distance = ~numpy.isnan(distances) & (distances != 0)
+    last_with_distance = numpy.maximum.accumulate(numpy.where(has_distance, positions, -1))
+    previous = numpy.concatenate(([-1], last_with_distance[:-1]))
+    initial_distance = float(last_lap_distance) if last_lap_distance else nan
+    last_distances = numpy.where(previous >= 0, distances[previous.clip(0)], initial_distance)
+
+    with numpy.errstate(invalid="ignore"):
+        needs_cleaning = has_distance & ((distances < 0) | (
+            ~numpy.isnan(last_distances) & (last_distances > distances) & (distances < max_new_lap_distance)))
+    if needs_cleaning.any():
+        index = int(needs_cleaning.argmax())
+        last_distance = last_distances[index]
+    else:
+        index = count
+        last_distance = distances[last_with_distance[-1]] if last_with_distance[-1] >= 0 else nan
+    return index, (last_lap_distance if numpy.isnan(last_distance) else int(last_distance))
@@ -0,0 +1,177 @@
+"""
+Columnar storage of a completed lap's frames
+
+While a lap runs, its frames are lists in a dict, which cleaning needs. Once
+it's completed, the frames are packed into one array per channel, with each
+channel's type code (see receiver/telemetry_channels.py), plus an array of
+frame numbers. Missing values and -0.0 (which fixed point keeps for small
+negative values) are stored as the two lowest values of the type.
+
+Optionally, the arrays get compressed too (delta + zlib), and are decompressed
+for reading through a small cache of recently used laps.
+"""
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+import math
+import operator
+import threading
+import zlib
+
+FRAME_NUMBER_DTYPE = "q"
+# Differences between values can exceed a column's type
+DELTA_DTYPE = "q"
+COMPRESSION_LEVEL = 6
+# Decompressed laps kept around, e.g. for repeated session syncs
+DECOMPRESSED_LAP_CACHE_SIZE = 4
+
+
+def get_markers(dtype):
+    """ Values that stand for None and -0.0 in columns of this type """
+    null = -(1 << (8 * array(dtype).itemsize - 1))
+    return null, null + 1
+
+
+class TelemetryColumns:
+    """ A lap's frames, one array per channel """
+    __slots__ = ("frame_numbers", "columns")
+
+    def __init__(self, frame_numbers, columns):
+        self.frame_numbers = frame_numbers
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.frame_numbers)
+
+    @classmethod
+    def pack(cls, frame_dict, channels):
+        """ 
+        Pack fixed-point frames, raises OverflowError if a value doesn't fit its channel's type
+        and TypeError for values that aren't integers (or -0.0)
+        """
+        frame_numbers = array(FRAME_NUMBER_DTYPE, frame_dict)
+        columns = []
+        for index, channel in enumerate(channels):
+            null, negative_zero = get_markers(channel.dtype)
+            values = []
+            for frame in frame_dict.values():
+                value = frame[index]
+                if value is None:
+                    value = null
+                elif isinstance(value, float):
+                    if value or math.copysign(1, value) > 0:
+                        raise TypeError("%s value %s isn't fixed point" % (channel.name, value))
+                    value = negative_zero
+                elif value <= negative_zero:
+                    raise OverflowError("%s value %s is reserved in type %s" % (channel.name, value, channel.dtype))
+                values.append(value)
+            columns.append(array(channel.dtype, values))
+        return cls(frame_numbers, columns)
+
+    def unpack(self):
+        """ Frame dict of fixed-point frames """
+        return dict(self.iter_frames())
+
+    def iter_frames(self):
+        markers = [get_markers(column.typecode) for column in self.columns]
+        for row, frame_number in enumerate(self.frame_numbers):
+            frame = []
+            for column, (null, negative_zero) in zip(self.columns, markers):
+                value = column[row]
+                if value == null:
+                    value = None
+                elif value == negative_zero:
+                    value = -0.0
+                frame.append(value)
+            yield frame_number, frame
+
+    def nbytes(self):
+        """ Bytes held by the arrays """
+        return sum(column.itemsize * len(column) for column in self.columns + [self.frame_numbers])
+
+    def get_columns(self):
+        """ Columns to read frames from """
+        return self
+
+
+class CompressedColumns:
+    """ 
+    TelemetryColumns held as one zlib blob per array, of the differences between consecutive
+    values, which are mostly small for telemetry
+    """
+    __slots__ = ("frame_count", "typecodes", "blobs")
+
+    def __init__(self, frame_count, typecodes, blobs):
+        self.frame_count = frame_count
+        self.typecodes = typecodes
+        self.blobs = blobs
+
+    def __len__(self):
+        return self.frame_count
+
+    @classmethod
+    def compress(cls, columns, level=COMPRESSION_LEVEL):
+        arrays = [columns.frame_numbers] + columns.columns
+        blobs = []
+        for values in arrays:
+            values = values.tolist()
+            deltas = array(DELTA_DTYPE, values[:1])
+            deltas.extend(map(operator.sub, values[1:], values[:-1]))
+            blobs.append(zlib.compress(deltas.tobytes(), level))
+        return cls(len(columns), tuple(values.typecode for values in arrays), blobs)
+
+    def decompress(self):
+        arrays = []
+        for typecode, blob in zip(self.typecodes, self.blobs):
+            deltas = array(DELTA_DTYPE)
+            deltas.frombytes(zlib.decompress(blob))
+            arrays.append(array(typecode, accumulate(deltas)))
+        return TelemetryColumns(arrays[0], arrays[1:])
+
+    def unpack(self):
+        return self.decompress().unpack()
+
+    def nbytes(self):
+        """ Bytes held by the compressed blobs """
+        return sum(len(blob) for blob in self.blobs)
+
+    def get_columns(self):
+        """ Decompressed columns, from the cache of recently used laps """
+        return decompressed_laps.get(self)
+
+
+class DecompressedLapCache:
+    """ 
+    The most recently used decompressed laps
+    Locked, as event subscribers (e.g. the archive) read completed laps from their own threads
+    """
+
+    def __init__(self, size=DECOMPRESSED_LAP_CACHE_SIZE):
+        self.size = size
+        self.laps = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.laps)
+
+    def get(self, compressed_columns):
+        with self.lock:
+            columns = self.laps.get(compressed_columns)
+            if columns is not None:
+                self.laps.move_to_end(compressed_columns)
+                return columns
+            columns = compressed_columns.decompress()
+            if self.size:
+                self.laps[compressed_columns] = columns
+                while len(self.laps) > self.size:
+                    self.laps.popitem(last=False)
+            return columns
+
+    def resize(self, size):
+        with self.lock:
+            self.size = size
+            while len(self.laps) > size:
+                self.laps.popitem(last=False)
+
+
+decompressed_laps = DecompressedLapCache()
@@ -0,0 +1,78 @@
+"""
+Ingest-time decimation of telemetry frames
+
+Games often send at 60 Hz for other tools, while F1Laps traces only need a
+coarser rate. The decimator decides per frame, on the lap packet, whether the
+frame's telemetry gets stored: every frame_interval frames, or whenever the
+lap time moved on by time_interval_ms, and always for the first frame of a
+lap or sector. Stored frames hence always have the lap packet's distance; the
+telemetry packet of a frame is only stored if its lap packet was.
+Lap values (sector times, pit status, ...) are updated from every packet.
+Receivers set the intervals with the telemetry_decimation_frames and
+telemetry_decimation_ms options.
+"""
+from receiver import metrics
+
+decimated_frames = metrics.REGISTRY.counter(
+    "f1laps_decimated_frames_total", "Lap packet frames whose telemetry was dropped by ingest decimation")
+
+
+def get_decimator(frame_interval=None, time_interval_ms=None):
+    """ 
+    Decimator storing telemetry of every frame_interval-th frame and/or every time_interval_ms of lap time,
+    None if both are None (see TelemetrySettings in receiver/lap_telemetry_base.py)
+    """
+    if frame_interval is None and time_interval_ms is None:
+        return None
+    return TelemetryDecimator(frame_interval, time_interval_ms)
+
+
+class TelemetryDecimator:
+    """ Decides which frames of a single car's packet stream store telemetry """
+
+    def __init__(self, frame_interval=None, time_interval_ms=None):
+        self.frame_interval = frame_interval
+        self.time_interval_ms = time_interval_ms
+        self.reset()
+
+    def reset(self):
+        """ Start over, e.g. after a flashback """
+        self.lap_number = None
+        self.sector = None
+        self.last_kept_frame = None
+        self.last_kept_lap_time = None
+        # Frame whose telemetry packet gets stored
+        self.kept_frame = None
+
+    def keep_lap_frame(self, frame_identifier, lap_number, sector, lap_time_ms):
+        """ Whether to store this lap packet's telemetry (and that of its frame's telemetry packet) """
+        keep = lap_number != self.lap_number or sector != self.sector or self.last_kept_frame is None or \
+            self.is_due(frame_identifier, lap_time_ms)
+        self.lap_number = lap_number
+        self.sector = sector
+        if keep:
+            self.last_kept_frame = frame_identifier
+            self.last_kept_lap_time = lap_time_ms
+            self.kept_frame = frame_identifier
+        else:
+            self.kept_frame = None
+            decimated_frames.inc()
+        return keep
+
+    def is_due(self, frame_identifier, lap_time_ms):
+        # Frames or lap time going backwards (restarts, flashbacks) always get stored
+        if self.frame_interval is not None:
+            frames_passed = frame_identifier - self.last_kept_frame
+            if frames_passed < 0 or frames_passed >= self.frame_interval:
+                return True
+        if self.time_interval_ms is not None and lap_time_ms is not None:
+            if self.last_kept_lap_time is None:
+                return True
+            time_passed = lap_time_ms - self.last_kept_lap_time
+            if time_passed < 0 or time_passed >= self.time_interval_ms:
+                return True
+        return False
+
+    def keep_telemetry_frame(self, frame_identifier):
+        """ Whether to store a telemetry packet's values """
+        return frame_identifier == self.kept_frame
@@ -0,0 +1,73 @@
+"""
+Resampling of lap telemetry onto a lap distance grid
+
+Frames are stored per game frame, so their number depends on lap time and the
+game's UDP rate. Resampling interpolates every channel onto fixed lap distance
+steps (e.g. every 2 m), which makes the number of frames depend on track length
+only. Each channel is either interpolated linearly between the frames around a
+grid point, or holds the value of the last frame before it (for gear and DRS).
+
+Works on the fixed-point frames of LapTelemetryBase: interpolated values are
+rounded to the channel's fixed point again.
+"""
+
+RESAMPLE_LINEAR = "linear"
+RESAMPLE_HOLD = "hold"
+RESAMPLE_METHODS = (RESAMPLE_LINEAR, RESAMPLE_HOLD)
+
+
+def get_distance_samples(frame_dict, distance_index):
+    """ Frames in frame order that have a distance, with distances strictly increasing """
+    samples = []
+    last_distance = None
+    for frame_number in sorted(frame_dict):
+        frame = frame_dict[frame_number]
+        distance = frame[distance_index]
+        if distance is None or (last_distance is not None and distance <= last_distance):
+            continue
+        samples.append(frame)
+        last_distance = distance
+    return samples
+
+
+def interpolate(value_before, value_after, share):
+    if value_before is None or value_after is None:
+        return value_before if value_before is not None else value_after
+    return round(value_before + (value_after - value_before) * share)
+
+
+def resample_frames(frame_dict, step, distance_index, channel_methods):
+    """
+    Resample frames onto grid points every step (same fixed point as the distances).
+    channel_methods has the method of every frame value, in frame order.
+    Returns a frame dict keyed by grid point number (distance // step), in distance order.
+    """
+    samples = get_distance_samples(frame_dict, distance_index)
+    if not samples:
+        return {}
+    first_distance = samples[0][distance_index]
+    last_distance = samples[-1][distance_index]
+    resampled = {}
+    sample_index = 0
+    # First grid point at or after the first frame
+    grid_point = -(-first_distance // step)
+    while grid_point * step <= last_distance:
+        distance = grid_point * step
+        # Move to the last frame at or before this grid point
+        while sample_index + 1 < len(samples) and samples[sample_index + 1][distance_index] <= distance:
+            sample_index += 1
+        before = samples[sample_index]
+        after = samples[sample_index + 1] if sample_index + 1 < len(samples) else before
+        span = after[distance_index] - before[distance_index]
+        share = (distance - before[distance_index]) / span if span else 0
+        frame = []
+        for index, method in enumerate(channel_methods):
+            if index == distance_index:
+                frame.append(distance)
+            elif method == RESAMPLE_HOLD or not share:
+                frame.append(before[index])
+            else:
+                frame.append(interpolate(before[index], after[index], share))
+        resampled[grid_point] = frame
+        grid_point += 1
+    return resampled
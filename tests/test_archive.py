@@ -0,0 +1,113 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from receiver import archive, events
+from receiver.archive import ArchiveWriter
+from receiver.events import EventBus
+from receiver.f12022.penalty import F12022Penalty
+from receiver.f12022.session import F12022Session
+
+
+def build_session(session_uid, session_type=13, track_id=10, team_id=1):
+    session = F12022Session("key_123", True, session_uid, session_type, track_id, False, 90, 1, 5)
+    session.team_id = team_id
+    return session
+
+
+def complete_lap(bus, session, lap_number, sectors, is_valid=True):
+    lap = session.add_lap(lap_number)
+    lap.sector_1_ms, lap.sector_2_ms, lap.sector_3_ms = sectors
+    lap.is_valid = is_valid
+    lap.sector_1_tyre_wear_front_left = 1.5
+    lap.init_telemetry()
+    lap.telemetry.update({"frame_identifier": 1000, "lap_distance": 10.0, "speed": 300})
+    lap.finish_telemetry()
+    bus.publish(events.LAP_COMPLETED, session, lap_number=lap_number, lap=lap)
+    return lap
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "archive.sqlite")
+        self.bus = EventBus()
+        self.writer = self.bus.subscribe(ArchiveWriter(self.path))
+
+    def tearDown(self):
+        self.bus.stop()
+        shutil.rmtree(self.directory)
+
+    def get_connection(self):
+        # Wait for the writer to archive what's published
+        self.bus.unsubscribe(self.writer)
+        connection = archive.open_archive(self.path)
+        self.addCleanup(connection.close)
+        return connection
+
+    def test_archives_sessions_laps_and_penalties(self):
+        session = build_session(2 ** 64 - 1)
+        self.bus.publish(events.SESSION_STARTED, session)
+        complete_lap(self.bus, session, 1, (30000, 40000, 35000))
+        complete_lap(self.bus, session, 2, (29000, 40000, 35000), is_valid=False)
+        penalty = F12022Penalty()
+        penalty.lap_number, penalty.penalty_type, penalty.session = 2, 5, session
+        self.bus.publish(events.PENALTY, session, penalty=penalty)
+        session.finish_position = 3
+        self.bus.publish(events.SESSION_ENDED, session, reason="final_classification")
+        connection = self.get_connection()
+
+        sessions = connection.execute("SELECT * FROM sessions").fetchall()
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual((sessions[0]["session_uid"], sessions[0]["track"], sessions[0]["session_type"]),
+                         (str(2 ** 64 - 1), "Spa", "time_trial"))
+        self.assertEqual((sessions[0]["end_reason"], sessions[0]["finish_position"]), ("final_classification", 3))
+        laps = archive.get_laps(connection, "Spa")
+        self.assertEqual([(lap["lap_number"], lap["lap_time_ms"], lap["is_valid"]) for lap in laps],
+                         [(2, 104000, 0), (1, 105000, 1)])
+        self.assertEqual(laps[1]["sector_1_tyre_wear_front_left"], 1.5)
+        self.assertEqual(archive.get_lap_telemetry(connection, laps[1]["id"]),
+                         {"1000": [10.0, None, 300, None, None, None, None, None]})
+        penalties = connection.execute("SELECT lap_number, penalty_type FROM penalties").fetchall()
+        self.assertEqual([tuple(penalty) for penalty in penalties], [(2, 5)])
+
+    def test_best_lap(self):
+        time_trial, race = build_session(1), build_session(2, session_type=10, team_id=2)
+        complete_lap(self.bus, time_trial, 1, (30000, 40000, 35000))
+        complete_lap(self.bus, time_trial, 2, (30000, 40000, 34000))
+        complete_lap(self.bus, time_trial, 3, (20000, 40000, 34000), is_valid=False)
+        complete_lap(self.bus, race, 1, (29000, 39000, 34000))
+        # Without sector 3, a lap has no lap time
+        complete_lap(self.bus, race, 2, (29000, 39000, None))
+        connection = self.get_connection()
+        best_lap = archive.get_best_lap(connection, "Spa", "time_trial")
+        self.assertEqual((best_lap["lap_number"], best_lap["lap_time_ms"]), (2, 104000))
+        self.assertEqual(archive.get_best_lap(connection, "Spa")["lap_time_ms"], 102000)
+        self.assertEqual(archive.get_best_lap(connection, "Spa", team_id=2)["session_type"], "race")
+        self.assertIsNone(archive.get_best_lap(connection, "Monza"))
+
+    def test_completed_lap_gets_replaced(self):
+        session = build_session(1)
+        complete_lap(self.bus, session, 1, (30000, 40000, 35000))
+        # e.g. sector 3 recomputed from the final classification
+        complete_lap(self.bus, session, 1, (30000, 40000, 34500))
+        laps = archive.get_laps(self.get_connection())
+        self.assertEqual([lap["lap_time_ms"] for lap in laps], [104500])
+
+    def test_stops_at_sentinel_within_batch(self):
+        self.bus.unsubscribe(self.writer)
+        writer = ArchiveWriter(self.path)
+        session = build_session(1)
+        writer.queue.put(events.Event(events.SESSION_STARTED, session, {}))
+        writer.queue.put(None)
+        writer.queue.put(events.Event(events.SESSION_STARTED, build_session(2), {}))
+        # Runs on this thread, so it has to return
+        writer.run()
+        connection = self.get_connection()
+        sessions = connection.execute("SELECT session_uid FROM sessions").fetchall()
+        self.assertEqual([session["session_uid"] for session in sessions], ["1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+from unittest import TestCase
+from unittest.mock import patch
+import asyncio
+import socket
+
+from receiver.async_receiver import AsyncRaceReceiver
+
+
+def get_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        return free_socket.getsockname()[1]
+
+
+class AsyncRaceReceiverTest(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.receiver = AsyncRaceReceiver("api_key", host_ip="127.0.0.1", host_port=get_free_port())
+
+    def tearDown(self):
+        self.loop.close()
+
+    def send_packets(self, count):
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for index in range(count):
+            sender.sendto(b"packet %d" % index, ("127.0.0.1", self.receiver.host_port))
+        sender.close()
+
+    @patch.object(AsyncRaceReceiver, "process_udp_packet")
+    def test_processes_packets_in_order(self, mock_process):
+        async def run():
+            async with self.receiver:
+                self.send_packets(5)
+                for _ in range(200):
+                    if mock_process.call_count == 5:
+                        break
+                    await asyncio.sleep(0.01)
+        self.loop.run_until_complete(run())
+        self.assertEqual([call[0][0] for call in mock_process.call_args_list],
+                         [b"packet %d" % index for index in range(5)])
+        self.assertEqual(self.receiver.udp_socket.fileno(), -1)
+
+    @patch.object(AsyncRaceReceiver, "process_udp_packet")
+    def test_stop_processes_queued_packets(self, mock_process):
+        async def run():
+            await self.receiver.start()
+            self.receiver.enqueue_packet(b"first")
+            self.receiver.enqueue_packet(b"second")
+            await self.receiver.stop()
+        self.loop.run_until_complete(run())
+        self.assertEqual(mock_process.call_count, 2)
+
+    @patch.object(AsyncRaceReceiver, "process_udp_packet", side_effect=ValueError("bad packet"))
+    def test_exceptions_do_not_stop_the_receiver(self, mock_process):
+        async def run():
+            await self.receiver.start()
+            self.receiver.enqueue_packet(b"first")
+            self.receiver.enqueue_packet(b"second")
+            await self.receiver.stop()
+        self.loop.run_until_complete(run())
+        self.assertEqual(mock_process.call_count, 2)
+
+    def test_stop_before_start_closes_metrics_server(self):
+        receiver = AsyncRaceReceiver("api_key", host_ip="127.0.0.1", host_port=get_free_port(), metrics_port=0,
+                                     metrics_host="127.0.0.1")
+        metrics_server = receiver.metrics_server
+        self.loop.run_until_complete(receiver.stop())
+        self.assertIsNone(metrics_server.httpd)
+        self.assertEqual(receiver.udp_socket.fileno(), -1)
+        self.loop.run_until_complete(self.receiver.stop())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+from unittest import TestCase, skipIf
+import ctypes
+import os
+import shutil
+import socket
+import tempfile
+import time
+
+from benchmarks.synthetic import build_f12022_stream, build_session_packet, build_lap_packet, set_header
+from receiver import capture
+from receiver.capture import CaptureTarget, iter_blocks, iter_records
+from receiver.f12022 import capture_decoder
+from receiver.f12022.packets.car_status import PacketCarStatusData
+from receiver.f12022.packets.car_damage import PacketCarDamageData
+from receiver.f12022.packets.lap import PacketLapData
+from receiver.f12022.packets.telemetry import PacketCarTelemetryData
+from receiver.receiver import RaceReceiver
+
+
+def build_car_status_packet(frame_identifier):
+    packet = PacketCarStatusData()
+    set_header(packet, 7, 1, frame_identifier)
+    for car_index, car_status in enumerate(packet.carStatusData):
+        car_status.fuelInTank = 100 - frame_identifier / 100 - car_index
+        car_status.actualTyreCompound = 16 + car_index % 3
+        car_status.vehicleFiaFlags = -1
+    return bytes(packet)
+
+
+def build_car_damage_packet(frame_identifier, player_car_index=3):
+    packet = PacketCarDamageData()
+    set_header(packet, 10, 1, frame_identifier)
+    packet.header.playerCarIndex = player_car_index
+    for car_index, car_damage in enumerate(packet.carDamageData):
+        car_damage.tyresWear[:] = [frame_identifier / 1000 + car_index + tyre for tyre in range(4)]
+        car_damage.frontLeftWingDamage = car_index
+    return bytes(packet)
+
+
+class CaptureTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "race.f1cap")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_capture(self, packets, packet_types=None):
+        target = CaptureTarget(self.path, packet_types, queue_size=len(packets) + 1).start()
+        for packet in packets:
+            target.offer(packet)
+        target.stop(timeout=None)
+        return target
+
+    def test_records_roundtrip(self):
+        packets = build_f12022_stream(40)
+        before = time.time()
+        self.write_capture(packets[:30])
+        # Appends to an existing capture
+        self.write_capture(packets[30:])
+        records = list(iter_records(self.path))
+        self.assertEqual([packet for _, packet in records], packets)
+        self.assertTrue(all(before <= received_at <= time.time() for received_at, _ in records))
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as capture_file:
+            capture_file.write(b"not a capture")
+        with self.assertRaises(ValueError):
+            list(iter_records(self.path))
+
+    def test_blocks_carry_over_partial_records(self):
+        packets = build_f12022_stream(40)
+        self.write_capture(packets)
+        # Cut off in the middle of the last record, as if the receiver died while writing it
+        with open(self.path, "r+b") as capture_file:
+            capture_file.truncate(os.path.getsize(self.path) - 100)
+        read_packets = []
+        for mapping, offsets in iter_blocks(self.path, block_size=1000):
+            read_packets.extend(mapping[start + capture.RECORD_HEADER.size:end]
+                                for start, end in zip(offsets, offsets[1:]))
+        self.assertEqual(read_packets, packets[:-1])
+        self.assertEqual([packet for _, packet in iter_records(self.path)], packets[:-1])
+
+    def test_receiver_records_capture(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as free_socket:
+            free_socket.bind(("127.0.0.1", 0))
+            port = free_socket.getsockname()[1]
+        receiver = RaceReceiver("api_key", host_ip="127.0.0.1", host_port=port, capture_path=self.path)
+        receiver.start()
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        packets = [build_session_packet(1, 1), build_lap_packet(1, 2, 1, 10.0, 1000)]
+        try:
+            for packet in packets:
+                sender.sendto(packet, ("127.0.0.1", port))
+            deadline = time.time() + 2
+            while time.time() < deadline and \
+                    os.path.getsize(self.path) < len(capture.CAPTURE_MAGIC) + sum(map(len, packets)):
+                time.sleep(0.01)
+        finally:
+            sender.close()
+            receiver.kill(timeout=2)
+        self.assertEqual([packet for _, packet in iter_records(self.path)], packets)
+
+
+@skipIf(capture_decoder.numpy is None, "NumPy isn't installed")
+class CaptureDecoderTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "race.f1cap")
+        self.packets = build_f12022_stream(200)
+        for frame_identifier in range(1, 201, 10):
+            self.packets.append(build_car_status_packet(frame_identifier))
+            # Spectating in frame 101
+            self.packets.append(build_car_damage_packet(frame_identifier, 255 if frame_identifier == 101 else 3))
+        # Packets of other games, and datagrams too short for their type, are skipped
+        self.packets.append(b"\xe5\x07" + build_lap_packet(1, 300, 2, 5.0, 100)[2:])
+        self.packets.append(build_lap_packet(1, 301, 2, 5.0, 100)[:500])
+        self.packets.append(b"\xe6\x07")
+        target = CaptureTarget(self.path, queue_size=len(self.packets)).start()
+        for packet in self.packets:
+            target.offer(packet)
+        target.stop(timeout=None)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def get_structures(self, packet_class, packet_id):
+        return [packet_class.from_buffer_copy(packet) for packet in self.packets
+                if len(packet) >= ctypes.sizeof(packet_class) and packet[5] == packet_id and packet[:2] == b"\xe6\x07"]
+
+    def test_dtypes_match_packet_structures(self):
+        for packet_id, (packet_class, cars_field) in capture_decoder.CAR_PACKETS.items():
+            dtype = capture_decoder.PACKET_DTYPES[packet_id]
+            self.assertEqual(dtype.itemsize, ctypes.sizeof(packet_class))
+            self.assertEqual(dtype[cars_field].shape, (22,))
+            car_class = dict(packet_class._fields_)[cars_field]._type_
+            self.assertEqual(dtype[cars_field].base.itemsize, ctypes.sizeof(car_class))
+
+    def test_decodes_every_car(self):
+        # Small blocks, so packets of one type come from several blocks
+        decoded = capture_decoder.decode_capture(self.path, block_size=5000)
+        for name, packet_class, packet_id, fields in (
+                ("lap", PacketLapData, 2, ("lapDistance", "currentLapNum", "currentLapTimeInMS")),
+                ("telemetry", PacketCarTelemetryData, 6, ("speed", "throttle", "gear", "tyresPressure")),
+                ("car_status", PacketCarStatusData, 7, ("fuelInTank", "actualTyreCompound", "vehicleFiaFlags")),
+                ("car_damage", PacketCarDamageData, 10, ("tyresWear", "frontLeftWingDamage"))):
+            structures = self.get_structures(packet_class, packet_id)
+            packets = decoded[name]
+            self.assertEqual(len(packets), len(structures))
+            self.assertEqual(packets.frame_identifier.tolist(),
+                             [structure.header.frameIdentifier for structure in structures])
+            self.assertEqual(packets.session_uid.tolist(), [structure.header.sessionUID for structure in structures])
+            cars_field = capture_decoder.CAR_PACKETS[packet_id][1]
+            for field in fields:
+                column = packets.column(field)
+                self.assertEqual(column.shape[:2], (len(structures), 22))
+                expected = [[getattr(car, field) for car in getattr(structure, cars_field)] for structure in structures]
+                if column.ndim == 3:
+                    expected = [[list(values) for values in cars] for cars in expected]
+                self.assertEqual(column.tolist(), expected)
+
+    def test_player_car(self):
+        decoded = capture_decoder.decode_capture(self.path, ["car_damage", 6])
+        self.assertEqual(sorted(decoded), ["car_damage", "telemetry"])
+        self.assertEqual(decoded["telemetry"].player("speed").tolist()[:3], [150, 151, 152])
+        # Player car 3, no player car while spectating; values line up with the packets
+        car_damage = decoded["car_damage"]
+        wing_damage = car_damage.player("frontLeftWingDamage")
+        self.assertEqual(wing_damage.tolist(), [3] * 10 + [None] + [3] * 9)
+        self.assertEqual(len(wing_damage), len(car_damage.frame_identifier))
+        self.assertEqual(car_damage.frame_identifier[~wing_damage.mask].tolist(),
+                         [frame_identifier for frame_identifier in range(1, 201, 10) if frame_identifier != 101])
+        tyres_wear = car_damage.player("tyresWear")
+        self.assertEqual(tyres_wear.shape, (20, 4))
+        self.assertEqual(tyres_wear.mask.tolist(), [[False] * 4] * 10 + [[True] * 4] + [[False] * 4] * 9)
+
+    def test_iterates_blocks(self):
+        blocks = list(capture_decoder.iter_decoded(self.path, ["telemetry"], block_size=20000))
+        self.assertGreater(len(blocks), 1)
+        self.assertEqual(sum(len(block["telemetry"]) for block in blocks), 200)
+
+    def test_rejects_other_packet_types(self):
+        with self.assertRaises(ValueError):
+            capture_decoder.decode_capture(self.path, ["session"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+from unittest import TestCase
+from unittest.mock import patch
+import threading
+import time
+
+from benchmarks.synthetic import build_session_packet, build_lap_packet
+from receiver import events
+from receiver.events import EventBus, Subscriber, delivered_events, dropped_events, subscriber_errors, \
+    subscriber_lag
+from receiver.f12022.penalty import F12022Penalty
+from receiver.f12022.processor import F12022Processor
+from receiver.lap_base import LapSnapshot
+from receiver.receiver import RaceReceiver
+
+
+class BlockedSubscriber(Subscriber):
+    """ A subscriber whose callback hangs until released, like a stalled export """
+
+    def __init__(self, *args, **kwargs):
+        super(BlockedSubscriber, self).__init__(lambda event: self.released.wait(), *args, **kwargs)
+        self.released = threading.Event()
+
+
+class EventBusTest(TestCase):
+    def setUp(self):
+        self.bus = EventBus()
+        self.received = []
+
+    def tearDown(self):
+        self.bus.stop()
+
+    def collect(self, event):
+        self.received.append(event)
+
+    def test_publish_without_subscribers(self):
+        self.bus.publish(events.LAP_STARTED, lap_number=1)
+        self.assertEqual(self.bus.get_queue_depths(), {})
+
+    def test_subscribers_get_their_event_types(self):
+        subscriber = self.bus.subscribe(self.collect, [events.LAP_COMPLETED], name="laps")
+        delivered_before = delivered_events.get("laps", events.LAP_COMPLETED)
+        self.bus.publish(events.LAP_STARTED, lap_number=2)
+        self.bus.publish(events.LAP_COMPLETED, "session", lap_number=1)
+        self.bus.unsubscribe(subscriber)
+        self.assertEqual(len(self.bus), 0)
+        self.assertEqual([(event.event_type, event.session, event.data) for event in self.received],
+                         [(events.LAP_COMPLETED, "session", {"lap_number": 1})])
+        self.assertEqual(delivered_events.get("laps", events.LAP_COMPLETED) - delivered_before, 1)
+        self.assertGreaterEqual(subscriber_lag.get("laps"), 0)
+        self.assertFalse(subscriber.thread)
+
+    def test_unknown_event_type(self):
+        with self.assertRaises(ValueError):
+            self.bus.subscribe(self.collect, ["lap_finished"])
+
+    def test_blocked_subscriber_does_not_delay_others(self):
+        blocked_subscriber = BlockedSubscriber(name="blocked", queue_size=2)
+        self.bus.subscribe(blocked_subscriber)
+        subscriber = self.bus.subscribe(self.collect, name="collector")
+        dropped_before = dropped_events.get("blocked")
+        try:
+            publish_start = time.monotonic()
+            for lap_number in range(10):
+                self.bus.publish(events.LAP_STARTED, lap_number=lap_number)
+            self.assertLess(time.monotonic() - publish_start, 0.5)
+            # At most one event in flight and two queued
+            self.assertGreaterEqual(dropped_events.get("blocked") - dropped_before, 7)
+            self.assertEqual(self.bus.get_queue_depths()[("blocked",)], 2)
+        finally:
+            blocked_subscriber.released.set()
+        self.bus.unsubscribe(subscriber)
+        self.assertEqual([event.data["lap_number"] for event in self.received], list(range(10)))
+
+    def test_failing_subscriber_keeps_running(self):
+        def fail(event):
+            raise ValueError("broken export")
+        errors_before = subscriber_errors.get("fail")
+        subscriber = self.bus.subscribe(fail)
+        self.bus.publish(events.FLASHBACK)
+        self.bus.publish(events.FLASHBACK)
+        self.bus.unsubscribe(subscriber)
+        self.assertEqual(subscriber_errors.get("fail") - errors_before, 2)
+
+
+class SessionEventsTest(TestCase):
+    def setUp(self):
+        self.received = []
+        self.subscriber = events.BUS.subscribe(self.received.append, name="session_events")
+
+    def tearDown(self):
+        events.BUS.stop()
+
+    def get_received(self):
+        events.BUS.unsubscribe(self.subscriber)
+        return [(event.event_type, event.session.session_udp_uid, event.data.get("lap_number"))
+                for event in self.received]
+
+    def test_f12022_session_events(self):
+        processor = F12022Processor("api_key", True)
+        for packet in (build_session_packet(1, 1), build_lap_packet(1, 2, 1, 10.0, 1000),
+                       build_lap_packet(1, 3, 2, 5.0, 16), build_session_packet(2, 4)):
+            processor.process(packet)
+        self.assertEqual(self.get_received(), [
+            (events.SESSION_STARTED, 1, None),
+            (events.LAP_STARTED, 1, 1),
+            (events.LAP_STARTED, 1, 2),
+            (events.LAP_COMPLETED, 1, 1),
+            (events.SESSION_ENDED, 1, None),
+            (events.SESSION_STARTED, 2, None),
+        ])
+        self.assertEqual(self.received[4].data, {"reason": "replaced"})
+        # Subscribers get a snapshot of the lap, taken when it was completed
+        lap, snapshot = self.received[3].session.lap_list[1], self.received[3].data["lap"]
+        self.assertIsInstance(snapshot, LapSnapshot)
+        self.assertEqual((snapshot.lap_number, snapshot.values["sector_1_ms"]), (1, lap.sector_1_ms))
+
+    def test_lap_snapshot_keeps_published_values(self):
+        subscriber = events.BUS.subscribe(BlockedSubscriber(name="blocked"))
+        self.addCleanup(subscriber.released.set)
+        processor = F12022Processor("api_key", True)
+        for packet in (build_session_packet(1, 1), build_lap_packet(1, 2, 1, 10.0, 1000)):
+            processor.process(packet)
+        lap = processor.session.lap_list[1]
+        frames = lap.telemetry.frame_dict
+        events.BUS.publish(events.LAP_COMPLETED, processor.session, lap_number=1, lap=lap)
+        # The packet path goes on changing the lap while subscribers are busy
+        lap.is_valid, lap.pit_status = False, 1
+        lap.telemetry.update({"frame_identifier": 3, "lap_distance": 20.0, "speed": 250})
+        self.get_received()
+        snapshot = self.received[-1].data["lap"]
+        self.assertTrue(snapshot.values["is_valid"])
+        self.assertNotEqual(snapshot.metadata["pit_status"], 1)
+        self.assertEqual(snapshot.telemetry.frame_dict, frames)
+        self.assertEqual(len(lap.telemetry.frame_dict), len(frames) + 1)
+
+    def test_penalty_event(self):
+        processor = F12022Processor("api_key", True)
+        processor.process(build_session_packet(1, 1))
+        penalty = F12022Penalty()
+        penalty.lap_number = 1
+        penalty.session = processor.session
+        penalty.add_to_lap()
+        self.assertEqual(self.get_received()[-1], (events.PENALTY, 1, None))
+        self.assertIs(self.received[-1].data["penalty"], penalty)
+
+
+@patch.object(RaceReceiver, "start_sentry")
+class RaceReceiverEventsTest(TestCase):
+    def test_receiver_stops_its_subscribers(self, mock_sentry):
+        received = []
+        receiver = RaceReceiver("api_key", host_ip="127.0.0.1", host_port=0,
+                                event_subscribers=[(received.append, [events.SESSION_STARTED])])
+        subscriber = receiver.event_subscribers[0]
+        self.assertIn(subscriber, events.BUS.subscribers)
+        receiver.handle_udp_packet(build_session_packet(1, 1), ("127.0.0.1", 20777))
+        receiver.kill()
+        self.assertNotIn(subscriber, events.BUS.subscribers)
+        self.assertEqual([event.event_type for event in received], [events.SESSION_STARTED])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from receiver.exception_breaker import ExceptionCircuitBreaker, get_exception_fingerprint
+
+
+def raise_key_error():
+    {}["missing"]
+
+
+def raise_value_error():
+    raise ValueError("bad packet")
+
+
+def caught(function):
+    try:
+        function()
+    except Exception as ex:
+        return ex
+
+
+@patch("receiver.exception_breaker.sentry_sdk")
+@patch("receiver.exception_breaker.monotonic")
+class ExceptionCircuitBreakerTest(TestCase):
+    def test_fingerprint_uses_type_and_innermost_frame(self, mock_monotonic, mock_sentry):
+        fingerprint = get_exception_fingerprint(caught(raise_key_error))
+        self.assertEqual(fingerprint[0], "KeyError")
+        self.assertEqual(fingerprint[1], "test_exception_breaker.py")
+        self.assertEqual(fingerprint, get_exception_fingerprint(caught(raise_key_error)))
+        self.assertNotEqual(fingerprint, get_exception_fingerprint(caught(raise_value_error)))
+
+    def test_sends_first_events_per_window_only(self, mock_monotonic, mock_sentry):
+        mock_monotonic.return_value = 0
+        breaker = ExceptionCircuitBreaker(window_seconds=60, max_events_per_window=2)
+        results = [breaker.capture(caught(raise_key_error)) for _ in range(100)]
+        self.assertEqual(results.count(True), 2)
+        self.assertEqual(mock_sentry.capture_exception.call_count, 2)
+
+    def test_other_fingerprints_are_not_affected(self, mock_monotonic, mock_sentry):
+        mock_monotonic.return_value = 0
+        breaker = ExceptionCircuitBreaker(window_seconds=60, max_events_per_window=1)
+        for _ in range(10):
+            breaker.capture(caught(raise_key_error))
+        self.assertTrue(breaker.capture(caught(raise_value_error)))
+
+    def test_next_window_reports_suppressed_count(self, mock_monotonic, mock_sentry):
+        mock_monotonic.return_value = 0
+        breaker = ExceptionCircuitBreaker(window_seconds=60, max_events_per_window=1)
+        for _ in range(5):
+            breaker.capture(caught(raise_key_error))
+        mock_monotonic.return_value = 61
+        self.assertTrue(breaker.capture(caught(raise_key_error)))
+        scope = mock_sentry.push_scope.return_value.__enter__.return_value
+        scope.set_extra.assert_called_with("suppressed_occurrences", 4)
+
+    def test_flush_reports_pending_suppressed_counts(self, mock_monotonic, mock_sentry):
+        mock_monotonic.return_value = 0
+        breaker = ExceptionCircuitBreaker(window_seconds=60, max_events_per_window=1)
+        for _ in range(3):
+            breaker.capture(caught(raise_key_error))
+        breaker.flush()
+        mock_sentry.capture_message.assert_called_once()
+        self.assertIn("Suppressed 2 occurrences of KeyError", mock_sentry.capture_message.call_args[0][0])
+        breaker.flush()
+        mock_sentry.capture_message.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
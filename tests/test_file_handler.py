@@ -1,5 +1,8 @@
 from unittest import TestCase
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+import os
+import shutil
+import tempfile
 
 from lib.file_handler import ConfigFile, get_path_executable_parent, get_path_temporary
 
@@ -8,6 +11,13 @@ class FileHandlerTest(TestCase):
     def setUp(self):
         self.user_api_key_input = "vettel4tw"
         self.config = ConfigFile()
+        # Write the config file to a temporary directory, not next to the code
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        config_path = patch("lib.file_handler.get_path_executable_parent",
+                            lambda file_name: os.path.join(self.directory, file_name))
+        config_path.start()
+        self.addCleanup(config_path.stop)
 
     def test_get(self):
         # Clean any old values
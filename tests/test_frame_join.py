@@ -0,0 +1,113 @@
+from unittest import TestCase
+
+from benchmarks.synthetic import build_f12022_stream
+from receiver.lap_telemetry_base import TelemetrySettings
+from receiver.f12022.processor import F12022Processor
+from receiver.f12022.telemetry import F12022LapTelemetry
+from receiver.frame_join import FrameJoinBuffer
+
+
+def lap_half(frame_number, lap_distance=10.0):
+    return {"frame_identifier": frame_number, "lap_distance": lap_distance, "lap_time": 100}
+
+
+def telemetry_half(frame_number):
+    return {"frame_identifier": frame_number, "speed": 300, "gear": 7}
+
+
+class FrameJoinBufferTest(TestCase):
+    def test_joins_halves(self):
+        join_buffer = FrameJoinBuffer(10)
+        self.assertIsNone(join_buffer.add(lap_half(1000)))
+        self.assertEqual(join_buffer.add(telemetry_half(1000)),
+                         {"frame_identifier": 1000, "lap_distance": 10.0, "lap_time": 100, "speed": 300, "gear": 7})
+        # Telemetry first works too
+        self.assertIsNone(join_buffer.add(telemetry_half(1001)))
+        self.assertEqual(join_buffer.add(lap_half(1001))["speed"], 300)
+        self.assertEqual(len(join_buffer), 0)
+
+    def test_complete_updates_pass_through(self):
+        join_buffer = FrameJoinBuffer(10)
+        update = dict(lap_half(1000), speed=200)
+        self.assertIs(join_buffer.add(update), update)
+
+    def test_duplicate_half_keeps_latest_values(self):
+        join_buffer = FrameJoinBuffer(10)
+        join_buffer.add(lap_half(1000, 10.0))
+        join_buffer.add(lap_half(1000, 11.0))
+        self.assertEqual(join_buffer.add(telemetry_half(1000))["lap_distance"], 11.0)
+
+    def test_evicts_stale_halves(self):
+        join_buffer = FrameJoinBuffer(5)
+        join_buffer.add(lap_half(1000))
+        join_buffer.add(telemetry_half(1001))
+        join_buffer.add(lap_half(1005))
+        self.assertEqual(len(join_buffer), 3)
+        join_buffer.add(lap_half(1006))
+        self.assertEqual(list(join_buffer.pending), [1001, 1005, 1006])
+        self.assertEqual(join_buffer.orphans, {"lap": 0, "telemetry": 1})
+        join_buffer.add(lap_half(1010))
+        self.assertEqual(join_buffer.orphans, {"lap": 1, "telemetry": 1})
+        join_buffer.flush()
+        self.assertEqual(len(join_buffer), 0)
+        self.assertEqual(join_buffer.orphans, {"lap": 1, "telemetry": 4})
+
+    def test_size_is_bounded(self):
+        join_buffer = FrameJoinBuffer(5)
+        # Frame ids going backwards (e.g. a restart) don't make older entries stale
+        for frame_number in range(2000, 1000, -1):
+            join_buffer.add(lap_half(frame_number))
+            self.assertLessEqual(len(join_buffer), 10)
+
+    def test_discard_from(self):
+        join_buffer = FrameJoinBuffer(10)
+        for frame_number in range(1000, 1005):
+            join_buffer.add(lap_half(frame_number))
+        join_buffer.discard_from(1002)
+        self.assertEqual(list(join_buffer.pending), [1000, 1001])
+        self.assertEqual(join_buffer.orphans, {"lap": 0, "telemetry": 0})
+
+
+JOIN_SETTINGS = TelemetrySettings(join_window=10)
+
+
+class LapTelemetryJoinTest(TestCase):
+    def test_only_complete_frames_are_stored(self):
+        telemetry = F12022LapTelemetry(1, 10, JOIN_SETTINGS)
+        telemetry.update(lap_half(1000, 10.0))
+        self.assertEqual(telemetry.frame_dict, {})
+        telemetry.update(telemetry_half(1000))
+        # Lost lap packet
+        telemetry.update(telemetry_half(1001))
+        telemetry.update(lap_half(1002, 12.0))
+        telemetry.update(telemetry_half(1002))
+        self.assertEqual(telemetry.frame_dict, {
+            1000: [10.0, 100, 300, None, None, 7, None, None],
+            1002: [12.0, 100, 300, None, None, 7, None, None],
+        })
+        telemetry.finish()
+        self.assertEqual(telemetry.join_buffer.orphans, {"lap": 1, "telemetry": 0})
+
+    def test_flashback_discards_halves(self):
+        telemetry = F12022LapTelemetry(1, 10, JOIN_SETTINGS)
+        telemetry.update(dict(lap_half(1000, 10.0), speed=200))
+        telemetry.update(lap_half(1001, 11.0))
+        telemetry.process_flashback_event(1001)
+        telemetry.update(telemetry_half(1001))
+        self.assertEqual(list(telemetry.frame_dict), [1000])
+
+    def test_processor_stores_complete_frames(self):
+        processor = F12022Processor("api_key", True, JOIN_SETTINGS)
+        # Every 10th telemetry packet gets lost
+        for index, packet in enumerate(build_f12022_stream(90)):
+            if packet[5] != 6 or index % 10:
+                processor.process(packet)
+        frame_dict = processor.session.lap_list[1].telemetry.frame_dict
+        self.assertTrue(70 < len(frame_dict) < 90)
+        for frame in frame_dict.values():
+            self.assertIsNotNone(frame[0])
+            self.assertIsNotNone(frame[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
-from receiver.game_version import parse_game_version_from_udp_packet
+from receiver.game_version import parse_game_version_from_udp_packet, get_game_version
 
 
 class GameVersionTest(TestCase):
@@ -19,5 +19,10 @@ class GameVersionTest(TestCase):
         self.assertEqual(game_version, None)
 
 
+    def test_get_game_version(self):
+        self.assertEqual(get_game_version((2021).to_bytes(2, "little") + bytes(22)), "f12021")
+        self.assertEqual(get_game_version((2019).to_bytes(2, "little") + bytes(22)), None)
+        self.assertEqual(get_game_version(b""), None)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
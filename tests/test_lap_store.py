@@ -0,0 +1,98 @@
+from unittest import TestCase, skipIf
+import os
+import shutil
+import tempfile
+
+from receiver import events, lap_store
+from receiver.events import EventBus
+from receiver.f12022.session import F12022Session
+from receiver.lap_store import LapStore, LapStoreWriter
+
+
+def complete_lap(bus, session, lap_number, frame_count=50):
+    lap = session.add_lap(lap_number)
+    lap.sector_1_ms, lap.sector_2_ms, lap.sector_3_ms = 30000, 40000, 35000
+    lap.init_telemetry()
+    for frame_number in range(1000, 1000 + frame_count):
+        lap.telemetry.update({"frame_identifier": frame_number, "lap_distance": (frame_number - 1000) * 7.5,
+                              "speed": 200 + frame_number % 50, "steer": -0.0001, "gear": 4})
+    lap.finish_telemetry()
+    bus.publish(events.LAP_COMPLETED, session, lap_number=lap_number, lap=lap)
+    return lap
+
+
+class LapStoreTest(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.bus = EventBus()
+        self.writer = self.bus.subscribe(LapStoreWriter(self.path))
+        self.session = F12022Session("key_123", True, 123, 13, 10, False, 90, 1, 5, team_id=3)
+
+    def tearDown(self):
+        self.bus.stop()
+        shutil.rmtree(self.path)
+
+    def write_laps(self, *lap_numbers):
+        laps = [complete_lap(self.bus, self.session, lap_number) for lap_number in lap_numbers]
+        # Wait for the writer to store them
+        self.bus.unsubscribe(self.writer)
+        return laps
+
+    def test_stores_lap_channels(self):
+        self.write_laps(1)
+        store = LapStore(self.path)
+        self.assertEqual(len(store), 1)
+        stored_lap = store.laps[0]
+        self.assertEqual(stored_lap.session["track"], "Spa")
+        self.assertEqual(stored_lap.lap["sector_3_time_ms"], 35000)
+        self.assertNotIn("telemetry_data_string", stored_lap.lap)
+        self.assertEqual(stored_lap.channel_names[:3], ["lap_distance", "lap_time", "speed"])
+        speed = stored_lap.channel("speed", use_numpy=False)
+        self.assertEqual((speed.format, len(speed)), ("h", 50))
+        self.assertEqual(list(stored_lap.channel("frame_number", use_numpy=False)), list(range(1000, 1050)))
+
+    def test_values_without_numpy(self):
+        lap, = self.write_laps(1)
+        stored_lap = LapStore(self.path).laps[0]
+        numpy = lap_store.numpy
+        lap_store.numpy = None
+        try:
+            # The same values as the lap's frames, including None and -0.0
+            frames = list(lap.telemetry.frame_dict.values())
+            for index, name in enumerate(stored_lap.channel_names):
+                self.assertEqual(repr(stored_lap.values(name)), repr([frame[index] for frame in frames]))
+            self.assertEqual(stored_lap.values("lap_distance")[:2], [0.0, 7.5])
+        finally:
+            lap_store.numpy = numpy
+
+    @skipIf(lap_store.numpy is None, "NumPy isn't installed")
+    def test_numpy_views(self):
+        self.write_laps(1)
+        stored_lap = LapStore(self.path).laps[0]
+        speed = stored_lap.channel("speed")
+        self.assertEqual(speed.dtype.char, "h")
+        self.assertFalse(speed.flags.owndata)
+        values = stored_lap.values("brake")
+        self.assertTrue(lap_store.numpy.isnan(values).all())
+        self.assertEqual(list(stored_lap.values("lap_distance")[:2]), [0.0, 7.5])
+
+    def test_find_and_refresh(self):
+        self.write_laps(1, 2)
+        store = LapStore(self.path)
+        self.assertEqual([lap.lap["lap_number"] for lap in store.find(track="Spa", lap_number=2)], [2])
+        self.assertEqual(store.find(track="Monza"), [])
+        # A lap written while the store is open, and an index line the writer is halfway through
+        self.writer = self.bus.subscribe(LapStoreWriter(self.path))
+        self.write_laps(3)
+        with open(os.path.join(self.path, lap_store.INDEX_FILE_NAME), "a") as index_file:
+            index_file.write('{"frame_count": ')
+        store.refresh()
+        self.assertEqual([lap.lap["lap_number"] for lap in store], [1, 2, 3])
+        self.assertEqual(list(store.laps[2].channel("frame_number", use_numpy=False))[:1], [1000])
+
+    def test_empty_store(self):
+        self.assertEqual(len(LapStore(os.path.join(self.path, "missing"))), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
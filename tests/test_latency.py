@@ -0,0 +1,84 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from receiver import latency
+from receiver.latency import LatencyHistogram, LatencyRecorder
+
+
+class LatencyHistogramTest(TestCase):
+    def test_record_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 11):
+            histogram.record(value)
+        self.assertEqual(histogram.count, 10)
+        self.assertEqual(histogram.min, 1)
+        self.assertEqual(histogram.max, 10)
+        self.assertEqual(histogram.percentile(50), 5)
+        self.assertEqual(histogram.percentile(100), 10)
+
+    def test_percentile_relative_error_is_bounded(self):
+        histogram = LatencyHistogram()
+        for value in range(1000, 1000001, 1000):
+            histogram.record(value)
+        p50 = histogram.percentile(50)
+        p99 = histogram.percentile(99)
+        self.assertAlmostEqual(p50, 500000, delta=500000 / 2 ** LatencyHistogram.SUB_BUCKET_BITS)
+        self.assertAlmostEqual(p99, 990000, delta=990000 / 2 ** LatencyHistogram.SUB_BUCKET_BITS)
+        self.assertGreaterEqual(p50, 500000)
+
+    def test_empty_histogram(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(50), None)
+        self.assertEqual(histogram.summary()["count"], 0)
+
+    def test_merge(self):
+        histogram_1 = LatencyHistogram()
+        histogram_2 = LatencyHistogram()
+        histogram_1.record(10)
+        histogram_2.record(5000)
+        histogram_1.merge(histogram_2)
+        self.assertEqual(histogram_1.count, 2)
+        self.assertEqual(histogram_1.min, 10)
+        self.assertEqual(histogram_1.max, 5000)
+
+
+class LatencyRecorderTest(TestCase):
+    def test_dump_groups_by_stage_and_packet_type(self):
+        recorder = LatencyRecorder(enabled=True)
+        recorder.record(latency.STAGE_UNPACK, 2, 1500)
+        recorder.record(latency.STAGE_UNPACK, 6, 2500)
+        recorder.record(latency.STAGE_SYNC, None, 100000)
+        dumped = recorder.dump()
+        self.assertEqual(set(dumped[latency.STAGE_UNPACK]), {"lap", "telemetry"})
+        self.assertEqual(dumped[latency.STAGE_UNPACK]["lap"]["count"], 1)
+        self.assertEqual(dumped[latency.STAGE_SYNC]["all"]["max"], 100000)
+
+    def test_timer_helpers_do_nothing_when_disabled(self):
+        with patch.object(latency, "recorder", LatencyRecorder(enabled=False)):
+            start = latency.timer_start()
+            self.assertEqual(start, 0)
+            latency.timer_stop(start, latency.STAGE_PROCESS, 2)
+            self.assertEqual(latency.recorder.histograms, {})
+
+    def test_timer_helpers_record_when_enabled(self):
+        with patch.object(latency, "recorder", LatencyRecorder(enabled=True)):
+            start = latency.timer_start()
+            latency.timer_stop(start, latency.STAGE_PROCESS, 2)
+            self.assertEqual(latency.recorder.histograms[(latency.STAGE_PROCESS, 2)].count, 1)
+
+    @patch("receiver.latency.monotonic")
+    def test_maybe_log_summary_respects_interval(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        recorder = LatencyRecorder(enabled=True, summary_interval=60)
+        recorder.record(latency.STAGE_RECV, 2, 1000)
+        with patch.object(recorder, "log_summary") as mock_log_summary:
+            mock_monotonic.return_value = 130
+            recorder.maybe_log_summary()
+            mock_log_summary.assert_not_called()
+            mock_monotonic.return_value = 161
+            recorder.maybe_log_summary()
+            mock_log_summary.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+from unittest import TestCase
+import logging
+import queue
+
+from lib.logger import AsyncQueueHandler, RateLimitFilter
+
+
+def make_record(msg, args=(), created=0, name="test", level=logging.INFO, **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.created = created
+    record.__dict__.update(extra)
+    return record
+
+
+class RateLimitFilterTest(TestCase):
+    def test_burst_then_suppress(self):
+        rate_limit_filter = RateLimitFilter(interval=10, burst=3)
+        results = [rate_limit_filter.filter(make_record("Lap %s", (i,), created=1)) for i in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+
+    def test_different_messages_are_limited_separately(self):
+        rate_limit_filter = RateLimitFilter(interval=10, burst=1)
+        self.assertTrue(rate_limit_filter.filter(make_record("Lap %s", (1,))))
+        self.assertTrue(rate_limit_filter.filter(make_record("Session %s", (1,))))
+        self.assertFalse(rate_limit_filter.filter(make_record("Lap %s", (2,))))
+
+    def test_reports_suppressed_count_when_window_reopens(self):
+        rate_limit_filter = RateLimitFilter(interval=10, burst=1)
+        rate_limit_filter.filter(make_record("Lap %s", (1,), created=0))
+        rate_limit_filter.filter(make_record("Lap %s", (2,), created=1))
+        rate_limit_filter.filter(make_record("Lap %s", (3,), created=2))
+        record = make_record("Lap %s", (4,), created=11)
+        self.assertTrue(rate_limit_filter.filter(record))
+        self.assertEqual(record.getMessage(), "Lap 4 (2 similar messages suppressed)")
+
+    def test_suppressed_count_escapes_messages_without_args(self):
+        rate_limit_filter = RateLimitFilter(interval=10, burst=1)
+        rate_limit_filter.filter(make_record("100% done", created=0))
+        rate_limit_filter.filter(make_record("100% done", created=1))
+        record = make_record("100% done", created=20)
+        rate_limit_filter.filter(record)
+        self.assertEqual(record.getMessage(), "100% done (1 similar messages suppressed)")
+
+    def test_rate_limit_key_and_opt_out(self):
+        rate_limit_filter = RateLimitFilter(interval=10, burst=1)
+        self.assertTrue(rate_limit_filter.filter(make_record("A", rate_limit_key="shared")))
+        self.assertFalse(rate_limit_filter.filter(make_record("B", rate_limit_key="shared")))
+        for _ in range(3):
+            self.assertTrue(rate_limit_filter.filter(make_record("WPMAP %s", (1,), rate_limit=False)))
+
+
+class AsyncQueueHandlerTest(TestCase):
+    def test_leaves_formatting_to_the_listener(self):
+        handler = AsyncQueueHandler(queue.Queue())
+        record = make_record("Lap %s", (1,))
+        handler.handle(record)
+        queued = handler.queue.get_nowait()
+        self.assertIs(queued, record)
+        self.assertEqual(queued.args, (1,))
+
+    def test_formats_mutable_args_in_the_calling_thread(self):
+        handler = AsyncQueueHandler(queue.Queue())
+        lap = {"lap_number": 1}
+        handler.handle(make_record("Lap %s, sector %s", (lap, 2)))
+        # The lap changes before the listener formats the record
+        lap["lap_number"] = 2
+        queued = handler.queue.get_nowait()
+        self.assertEqual(queued.getMessage(), "Lap {'lap_number': 1}, sector 2")
+        self.assertIsNone(queued.args)
+
+    def test_leaves_exceptions_to_the_listener(self):
+        handler = AsyncQueueHandler(queue.Queue())
+        error = ValueError("broken packet")
+        handler.handle(make_record("Couldn't unpack packet due to %s", (error,)))
+        queued = handler.queue.get_nowait()
+        self.assertEqual(queued.args, (error,))
+        self.assertEqual(queued.getMessage(), "Couldn't unpack packet due to broken packet")
+
+    def test_counts_and_reports_dropped_records(self):
+        handler = AsyncQueueHandler(queue.Queue(maxsize=1))
+        handler.handle(make_record("first"))
+        handler.handle(make_record("second"))
+        handler.handle(make_record("third"))
+        self.assertEqual(handler.dropped_records, 2)
+        self.assertEqual(handler.queue.get_nowait().getMessage(), "first")
+        handler.handle(make_record("fourth"))
+        self.assertEqual(handler.queue.get_nowait().getMessage(), "Dropped 2 log records because the log queue was full")
+        # The queue only had room for the drop report
+        self.assertEqual(handler.dropped_records, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
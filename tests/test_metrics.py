@@ -0,0 +1,98 @@
+from unittest import TestCase
+from urllib.request import urlopen
+
+from receiver.metrics import AggregatedRegistry, MetricsRegistry, MetricsServer, format_labels
+from receiver.game_version import get_packet_type_name
+
+
+class MetricsRegistryTest(TestCase):
+    def test_counter_render(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("test_packets_total", "Packets", ("packet_type",),
+                                   {"packet_type": get_packet_type_name})
+        counter.inc(2)
+        counter.inc(2)
+        counter.inc(6)
+        self.assertEqual(counter.get(2), 2)
+        rendered = registry.render()
+        self.assertIn("# TYPE test_packets_total counter", rendered)
+        self.assertIn('test_packets_total{packet_type="lap"} 2', rendered)
+        self.assertIn('test_packets_total{packet_type="telemetry"} 1', rendered)
+
+    def test_counter_without_labels(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("test_unknown_total", "Unknown")
+        counter.inc()
+        counter.inc(amount=4)
+        self.assertIn("test_unknown_total 5", registry.render())
+
+    def test_gauge_callback(self):
+        registry = MetricsRegistry()
+        registry.gauge("test_rss_bytes", "RSS", callback=lambda: 1024)
+        registry.gauge("test_session_info", "Session", ("session_uid",), callback=lambda: {("uid_1",): 1})
+        rendered = registry.render()
+        self.assertIn("test_rss_bytes 1024", rendered)
+        self.assertIn('test_session_info{session_uid="uid_1"} 1', rendered)
+
+    def test_gauge_callback_exception_is_skipped(self):
+        registry = MetricsRegistry()
+        registry.gauge("test_broken", "Broken", callback=lambda: 1 / 0)
+        self.assertIn("# TYPE test_broken gauge", registry.render())
+
+    def test_summary_render(self):
+        registry = MetricsRegistry()
+        summary = registry.summary("test_upload_latency_seconds", "Upload latency")
+        summary.observe_ns(2000000000)
+        rendered = registry.render()
+        self.assertIn('test_upload_latency_seconds{quantile="0.5"}', rendered)
+        self.assertIn("test_upload_latency_seconds_sum 2.0", rendered)
+        self.assertIn("test_upload_latency_seconds_count 1", rendered)
+
+    def test_format_labels_escapes_quotes(self):
+        self.assertEqual(format_labels(("track",), ('Spa "Francorchamps"',)), '{track="Spa \\"Francorchamps\\""}')
+
+
+class AggregatedRegistryTest(TestCase):
+    def get_worker_registry(self, packets, rss):
+        registry = MetricsRegistry()
+        registry.counter("test_packets_total", "Packets", ("packet_type",),
+                         {"packet_type": get_packet_type_name}).inc(2, amount=packets)
+        registry.gauge("test_rss_bytes", "RSS", callback=lambda: rss)
+        registry.summary("test_upload_latency_seconds", "Upload latency").observe_ns(packets * 1000000000)
+        return registry
+
+    def test_sums_counters_and_keeps_gauges_per_worker(self):
+        aggregated = AggregatedRegistry()
+        aggregated.update(0, self.get_worker_registry(3, 100).snapshot())
+        aggregated.update(1, self.get_worker_registry(4, 200).snapshot())
+        rendered = aggregated.render()
+        self.assertIn('test_packets_total{packet_type="lap"} 7', rendered)
+        self.assertIn('test_rss_bytes{worker="0"} 100', rendered)
+        self.assertIn('test_rss_bytes{worker="1"} 200', rendered)
+        self.assertIn("test_upload_latency_seconds_count 2", rendered)
+        self.assertEqual(aggregated.get_total("test_packets_total"), 7)
+
+    def test_update_replaces_a_workers_snapshot(self):
+        aggregated = AggregatedRegistry()
+        aggregated.update(0, self.get_worker_registry(3, 100).snapshot())
+        aggregated.update(0, self.get_worker_registry(5, 100).snapshot())
+        self.assertEqual(aggregated.get_total("test_packets_total"), 5)
+
+
+class MetricsServerTest(TestCase):
+    def test_serves_prometheus_text(self):
+        registry = MetricsRegistry()
+        registry.counter("test_served_total", "Served").inc()
+        server = MetricsServer(0, registry=registry).start()
+        try:
+            response = urlopen("http://127.0.0.1:%s/metrics" % server.port, timeout=5)
+            body = response.read().decode("utf-8")
+            self.assertEqual(response.status, 200)
+            self.assertIn("text/plain", response.headers["Content-Type"])
+            self.assertIn("test_served_total 1", body)
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
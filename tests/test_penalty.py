@@ -14,8 +14,8 @@ class PenaltyBaseTest(TestCase):
         penalty_1.lap_number = 1
         penalty_1.session = session
         penalty_1.add_to_lap()
-        self.assertTrue(session.lap_list[1]["penalties"])
-        self.assertTrue(penalty_1 in penalty_1.session.lap_list[1]["penalties"])
+        self.assertTrue(session.lap_list[1].penalties)
+        self.assertTrue(penalty_1 in penalty_1.session.lap_list[1].penalties)
     
     def test_add_to_lap_f12022(self):
         session = F12022Session("key_123", True, "uid_123", 10, 1, False, 90, 1, 5)
@@ -0,0 +1,21 @@
+from unittest import TestCase
+
+from receiver.processor_base import ProcessorBase
+
+
+class IncompleteProcessor(ProcessorBase):
+    """ A game processor without process_packet() """
+    game_name = "F1 Test"
+
+    def unpack_udp_packet(self, incoming_udp_packet):
+        return None
+
+
+class ProcessorBaseTest(TestCase):
+    def test_incomplete_processor_fails_to_start(self):
+        with self.assertRaises(TypeError):
+            IncompleteProcessor("api_key", True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from receiver.processor_cache import ProcessorCache
+
+
+class ProcessorCacheTest(TestCase):
+    def test_get_and_put(self):
+        cache = ProcessorCache()
+        self.assertIsNone(cache.get("source_1", now=0))
+        processor = object()
+        cache.put("source_1", processor, now=0)
+        self.assertIs(cache.get("source_1", now=1), processor)
+        self.assertIn("source_1", cache)
+
+    def test_evicts_least_recently_used(self):
+        cache = ProcessorCache(max_processors=2)
+        cache.put("source_1", "processor_1", now=0)
+        cache.put("source_2", "processor_2", now=1)
+        # Using source_1 makes source_2 the least recently used
+        cache.get("source_1", now=2)
+        cache.put("source_3", "processor_3", now=3)
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn("source_2", cache)
+        self.assertEqual(cache.processors(), ["processor_1", "processor_3"])
+
+    def test_evicts_idle_processors(self):
+        cache = ProcessorCache(idle_timeout=60)
+        cache.put("source_1", "processor_1", now=0)
+        cache.put("source_2", "processor_2", now=50)
+        cache.evict_idle(now=70)
+        self.assertNotIn("source_1", cache)
+        self.assertIn("source_2", cache)
+
+    def test_keep_most_recent_survives_idle_eviction(self):
+        cache = ProcessorCache(idle_timeout=60, keep_most_recent=True)
+        cache.put("f12021", "processor_1", now=0)
+        cache.put("f12022", "processor_2", now=10)
+        cache.evict_idle(now=1000)
+        self.assertNotIn("f12021", cache)
+        self.assertIn("f12022", cache)
+
+    def test_get_evicts_idle_processors_periodically(self):
+        cache = ProcessorCache(idle_timeout=60)
+        cache.put("source_1", "processor_1", now=0)
+        cache.last_eviction = 0
+        self.assertIsNone(cache.get("source_1", now=100))
+
+
+if __name__ == '__main__':
+    unittest.main()
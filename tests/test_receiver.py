@@ -0,0 +1,202 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+import socket
+import time
+
+from benchmarks.synthetic import build_f12022_stream
+from receiver import metrics
+from receiver.receiver import RaceReceiver
+from receiver.settings import ReceiverSettings
+
+
+def get_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        return free_socket.getsockname()[1]
+
+
+def get_session_uids(gauge):
+    """ Session UIDs the f1laps_active_session_info gauge reports """
+    return {label_values[1] for _, _, label_values, _ in gauge.samples()}
+
+
+class RaceReceiverShutdownTest(TestCase):
+    def get_receiver(self):
+        return RaceReceiver("api_key", host_ip="127.0.0.1", host_port=get_free_port())
+
+    def test_kill_wakes_up_idle_receiver(self):
+        receiver = self.get_receiver()
+        receiver.start()
+        # Give the thread time to block in select()
+        time.sleep(0.05)
+        kill_start = time.monotonic()
+        receiver.kill(timeout=2)
+        self.assertFalse(receiver.is_alive())
+        self.assertLess(time.monotonic() - kill_start, 0.5)
+        self.assertEqual(receiver.udp_socket.fileno(), -1)
+        self.assertEqual(receiver.wakeup_receive_socket.fileno(), -1)
+
+    def test_kill_before_start_closes_sockets(self):
+        receiver = self.get_receiver()
+        receiver.kill()
+        self.assertEqual(receiver.udp_socket.fileno(), -1)
+        receiver.start()
+        receiver.join(2)
+        self.assertFalse(receiver.is_alive())
+
+    def test_settings_and_options(self):
+        settings = ReceiverSettings(host_ip="127.0.0.1", host_port=get_free_port(), demultiplex_sources=True)
+        receiver = RaceReceiver("api_key", settings, enable_telemetry=False)
+        receiver.kill()
+        self.assertEqual((receiver.host_ip, receiver.host_port), (settings.host_ip, settings.host_port))
+        self.assertTrue(receiver.demultiplex_sources)
+        # Options override the settings without changing them
+        self.assertFalse(receiver.telemetry_enabled)
+        self.assertTrue(settings.enable_telemetry)
+        with self.assertRaises(TypeError):
+            ReceiverSettings(host_adress="127.0.0.1")
+
+    def test_processes_packets_until_killed(self):
+        receiver = self.get_receiver()
+        with patch.object(RaceReceiver, "process_udp_packet") as mock_process:
+            receiver.start()
+            sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                for _ in range(3):
+                    sender.sendto(b"packet", ("127.0.0.1", receiver.host_port))
+                deadline = time.monotonic() + 2
+                while mock_process.call_count < 3 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            finally:
+                sender.close()
+                receiver.kill(timeout=2)
+        self.assertEqual(mock_process.call_count, 3)
+        self.assertFalse(receiver.is_alive())
+
+
+@patch.object(RaceReceiver, "start_sentry")
+class RaceReceiverSourcesTest(TestCase):
+    def process_streams(self, receiver, sources):
+        # Two drivers in the same online session send interleaved streams
+        streams = [build_f12022_stream(90, session_uid=42) for _ in sources]
+        for packets in zip(*streams):
+            for source_address, packet in zip(sources, packets):
+                receiver.process_udp_packet(packet, source_address)
+
+    def test_demultiplex_sources(self, mock_sentry):
+        receiver = RaceReceiver("api_key", host_ip="127.0.0.1", host_port=get_free_port(), demultiplex_sources=True)
+        try:
+            self.process_streams(receiver, [("10.0.0.1", 20777), ("10.0.0.2", 20777)])
+        finally:
+            receiver.kill()
+        processors = receiver.get_processors()
+        self.assertEqual(len(processors), 2)
+        self.assertIsNot(processors[0].session, processors[1].session)
+        for processor in processors:
+            lap = processor.session.lap_list[1]
+            self.assertEqual(len(lap.telemetry.frame_dict), 90)
+
+    def test_single_source_shares_processor(self, mock_sentry):
+        receiver = RaceReceiver("api_key", host_ip="127.0.0.1", host_port=get_free_port())
+        try:
+            self.process_streams(receiver, [("10.0.0.1", 20777), ("10.0.0.2", 20777)])
+        finally:
+            receiver.kill()
+        self.assertEqual(len(receiver.get_processors()), 1)
+
+    def test_defer_telemetry_cleaning(self, mock_sentry):
+        receiver = RaceReceiver("api_key", host_ip="127.0.0.1", host_port=get_free_port(),
+                                defer_telemetry_cleaning=True)
+        try:
+            self.process_streams(receiver, [("10.0.0.1", 20777)])
+        finally:
+            receiver.kill()
+        telemetry = receiver.processor.session.lap_list[1].telemetry
+        self.assertTrue(telemetry.pending_updates)
+        self.assertEqual(len(telemetry.frame_dict), 90)
+        self.assertEqual(telemetry.pending_updates, [])
+
+    def test_telemetry_settings_are_per_receiver(self, mock_sentry):
+        receiver = RaceReceiver("api_key", host_ip="127.0.0.1", host_port=get_free_port(),
+                                defer_telemetry_cleaning=True, telemetry_extra_channels=["engine_rpm"])
+        # Started later, with the default settings
+        other_receiver = RaceReceiver("api_key", host_ip="127.0.0.1", host_port=get_free_port())
+        try:
+            self.process_streams(receiver, [("10.0.0.1", 20777)])
+            self.process_streams(other_receiver, [("10.0.0.1", 20777)])
+        finally:
+            receiver.kill()
+            other_receiver.kill()
+        telemetry = receiver.processor.session.lap_list[1].telemetry
+        self.assertTrue(telemetry.deferred_cleaning)
+        self.assertEqual(len(telemetry.channels), 9)
+        self.assertTrue(all(len(frame) == 9 for frame in telemetry.frame_dict.values()))
+        other_telemetry = other_receiver.processor.session.lap_list[1].telemetry
+        self.assertFalse(other_telemetry.deferred_cleaning)
+        self.assertTrue(all(len(frame) == 8 for frame in other_telemetry.frame_dict.values()))
+
+
+    def test_game_version_switch_keeps_processors(self, mock_sentry):
+        receiver = RaceReceiver("api_key", host_ip="127.0.0.1", host_port=get_free_port())
+        packets = build_f12022_stream(90, session_uid=42)
+        # An F1 2021 game sending through the same redirect
+        f12021_packet = (2021).to_bytes(2, "little") + packets[1][2:]
+        try:
+            for packet in packets[:90]:
+                receiver.process_udp_packet(packet)
+            f12022_processor = receiver.processor
+            receiver.process_udp_packet(f12021_packet)
+            for packet in packets[90:]:
+                receiver.process_udp_packet(packet)
+        finally:
+            receiver.kill()
+        processors = receiver.get_processors()
+        self.assertEqual(len(processors), 2)
+        self.assertIs(receiver.processor, f12022_processor)
+        self.assertEqual(len(f12022_processor.session.lap_list[1].telemetry.frame_dict), 90)
+
+    def test_active_sessions_of_live_receivers(self, mock_sentry):
+        receivers = [RaceReceiver("api_key", host_ip="127.0.0.1", host_port=get_free_port()) for _ in range(2)]
+        gauge = metrics.REGISTRY.get("f1laps_active_session_info")
+        try:
+            for session_uid, receiver in zip((4101, 4102), receivers):
+                for packet in build_f12022_stream(10, session_uid=session_uid):
+                    receiver.process_udp_packet(packet)
+            self.assertLessEqual({4101, 4102}, get_session_uids(gauge))
+            # A stopped receiver's sessions aren't reported anymore
+            receivers[0].kill()
+            self.assertNotIn(4101, get_session_uids(gauge))
+            self.assertIn(4102, get_session_uids(gauge))
+        finally:
+            for receiver in receivers:
+                receiver.kill()
+        self.assertFalse({4101, 4102} & get_session_uids(gauge))
+
+    def test_unknown_packets_go_to_last_processor(self, mock_sentry):
+        receiver = RaceReceiver("api_key", host_ip="127.0.0.1", host_port=get_free_port())
+        packets = build_f12022_stream(10)
+        unknown_packet = (2019).to_bytes(2, "little") + packets[1][2:]
+        try:
+            # Nothing to hand it to before the game version is known
+            receiver.process_udp_packet(unknown_packet)
+            self.assertIsNone(receiver.processor)
+            for packet in packets:
+                receiver.process_udp_packet(packet)
+            receiver.redirect_fanout = MagicMock()
+            with patch.object(receiver.processor, "process") as process:
+                receiver.process_udp_packet(unknown_packet)
+            # A run of unknown datagrams is logged once, when it starts
+            with patch("receiver.receiver_base.log") as log:
+                receiver.process_udp_packet(unknown_packet)
+                receiver.process_udp_packet(unknown_packet)
+                receiver.process_udp_packet(packets[-1])
+                receiver.process_udp_packet(unknown_packet)
+        finally:
+            receiver.kill()
+        process.assert_called_once_with(unknown_packet)
+        self.assertEqual(receiver.redirect_fanout.forward.call_count, 5)
+        self.assertEqual(log.info.call_count, 1)
+        self.assertEqual(len(receiver.get_processors()), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+from unittest import TestCase
+from unittest.mock import patch
+import socket
+import threading
+import time
+
+from benchmarks.synthetic import build_session_packet, build_lap_packet
+from receiver.redirect import RedirectFanout, RedirectTarget, get_packet_ids, redirect_dropped_packets
+from receiver.receiver import RaceReceiver
+
+
+def open_listener():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.settimeout(2)
+    return listener
+
+
+class BlockedRedirectTarget(RedirectTarget):
+    """ A target whose sends hang until released, like one behind a stalled network """
+
+    def __init__(self, *args, **kwargs):
+        super(BlockedRedirectTarget, self).__init__(*args, **kwargs)
+        self.released = threading.Event()
+
+    def send(self, packet):
+        self.released.wait()
+
+
+class RedirectFanoutTest(TestCase):
+    def setUp(self):
+        self.listeners = [open_listener(), open_listener()]
+
+    def tearDown(self):
+        for listener in self.listeners:
+            listener.close()
+
+    def get_address(self, index):
+        return self.listeners[index].getsockname()
+
+    def test_get_packet_ids(self):
+        self.assertIsNone(get_packet_ids(None))
+        self.assertEqual(get_packet_ids(["session", "lap", 6]), {1, 2, 6})
+        with self.assertRaises(ValueError):
+            get_packet_ids(["laps"])
+
+    def test_forwards_to_all_targets_with_filters(self):
+        fanout = RedirectFanout([self.get_address(0), self.get_address(1) + (["lap"],)]).start()
+        session_packet, lap_packet = build_session_packet(1, 1), build_lap_packet(1, 2, 1, 10.0, 1000)
+        try:
+            fanout.forward(session_packet)
+            fanout.forward(lap_packet)
+            self.assertEqual(self.listeners[0].recv(2048), session_packet)
+            self.assertEqual(self.listeners[0].recv(2048), lap_packet)
+            self.assertEqual(self.listeners[1].recv(2048), lap_packet)
+        finally:
+            fanout.stop()
+        self.listeners[1].settimeout(0.05)
+        with self.assertRaises(socket.timeout):
+            self.listeners[1].recv(2048)
+
+    def test_blocked_target_does_not_delay_others(self):
+        blocked_target = BlockedRedirectTarget("127.0.0.1", 9, queue_size=2)
+        fanout = RedirectFanout([blocked_target, self.get_address(0)]).start()
+        packet = build_lap_packet(1, 2, 1, 10.0, 1000)
+        dropped_before = redirect_dropped_packets.get(blocked_target.name)
+        try:
+            forward_start = time.monotonic()
+            for _ in range(10):
+                fanout.forward(packet)
+            self.assertLess(time.monotonic() - forward_start, 0.5)
+            # At most one packet in flight and two queued
+            self.assertGreaterEqual(redirect_dropped_packets.get(blocked_target.name) - dropped_before, 7)
+            for _ in range(10):
+                self.assertEqual(self.listeners[0].recv(2048), packet)
+        finally:
+            blocked_target.released.set()
+            fanout.stop()
+        self.assertFalse(blocked_target.thread.is_alive())
+        self.assertEqual(blocked_target.socket.fileno(), -1)
+
+    def test_stop_without_start(self):
+        RedirectFanout([self.get_address(0)]).stop()
+
+
+@patch.object(RaceReceiver, "start_sentry")
+class RaceReceiverRedirectTest(TestCase):
+    def test_receiver_forwards_to_redirect_targets(self, mock_sentry):
+        listeners = [open_listener(), open_listener()]
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as free_socket:
+            free_socket.bind(("127.0.0.1", 0))
+            port = free_socket.getsockname()[1]
+        receiver = RaceReceiver("api_key", host_ip="127.0.0.1", host_port=port, use_udp_redirect=True,
+                                redirect_host="127.0.0.1", redirect_port=listeners[0].getsockname()[1],
+                                redirect_targets=[listeners[1].getsockname() + (["session"],)])
+        receiver.start()
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        session_packet, lap_packet = build_session_packet(1, 1), build_lap_packet(1, 2, 1, 10.0, 1000)
+        try:
+            sender.sendto(session_packet, ("127.0.0.1", port))
+            sender.sendto(lap_packet, ("127.0.0.1", port))
+            self.assertEqual(listeners[0].recv(2048), session_packet)
+            self.assertEqual(listeners[0].recv(2048), lap_packet)
+            self.assertEqual(listeners[1].recv(2048), session_packet)
+        finally:
+            sender.close()
+            receiver.kill(timeout=2)
+            for listener in listeners:
+                listener.close()
+        self.assertFalse(any(target.thread.is_alive() for target in receiver.redirect_fanout.targets))
+
+
+if __name__ == '__main__':
+    unittest.main()
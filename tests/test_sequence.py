@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from receiver.sequence import PacketSequenceTracker
+
+LAP_PACKET_ID = 2
+TELEMETRY_PACKET_ID = 6
+
+
+class PacketSequenceTrackerTest(TestCase):
+    def feed(self, tracker, frames, packet_id=LAP_PACKET_ID):
+        return [tracker.observe(packet_id, frame) for frame in frames]
+
+    def test_no_loss_on_regular_stride(self):
+        tracker = PacketSequenceTracker()
+        lost = self.feed(tracker, range(1000, 1100, 3))
+        self.assertEqual(sum(lost), 0)
+        self.assertEqual(tracker.sequences[LAP_PACKET_ID].stride, 3)
+        self.assertEqual(tracker.loss_rate(), 0.0)
+
+    def test_gap_is_detected_in_strides(self):
+        tracker = PacketSequenceTracker()
+        self.feed(tracker, range(1000, 1020, 2))
+        # Frames 1020, 1022 and 1024 are missing
+        self.assertEqual(tracker.observe(LAP_PACKET_ID, 1026), 3)
+        self.assertEqual(tracker.sequences[LAP_PACKET_ID].lost, 3)
+        self.assertAlmostEqual(tracker.loss_rate(LAP_PACKET_ID), 3 / 14)
+
+    def test_duplicate(self):
+        tracker = PacketSequenceTracker()
+        self.feed(tracker, [1000, 1001, 1001])
+        self.assertEqual(tracker.sequences[LAP_PACKET_ID].duplicates, 1)
+
+    def test_reordered_packet_recovers_loss(self):
+        tracker = PacketSequenceTracker()
+        self.feed(tracker, range(1000, 1010))
+        self.assertEqual(tracker.observe(LAP_PACKET_ID, 1011), 1)
+        # The late packet corrects the loss counted before
+        self.assertEqual(tracker.observe(LAP_PACKET_ID, 1010), -1)
+        sequence = tracker.sequences[LAP_PACKET_ID]
+        self.assertEqual(sequence.reordered, 1)
+        self.assertEqual(sequence.lost, 0)
+        self.assertEqual(sequence.last_frame, 1011)
+
+    def test_flashback_resets_sequence(self):
+        tracker = PacketSequenceTracker()
+        self.feed(tracker, range(5000, 5010))
+        # Flashback to 4000: a big jump back is a reset, not reordering
+        self.assertEqual(tracker.observe(LAP_PACKET_ID, 4000), 0)
+        self.assertEqual(tracker.observe(LAP_PACKET_ID, 4001), 0)
+        sequence = tracker.sequences[LAP_PACKET_ID]
+        self.assertEqual(sequence.resets, 1)
+        self.assertEqual(sequence.reordered, 0)
+        self.assertEqual(sequence.lost, 0)
+
+    def test_pause_is_not_loss(self):
+        tracker = PacketSequenceTracker()
+        self.feed(tracker, range(1000, 1010))
+        self.assertEqual(tracker.observe(LAP_PACKET_ID, 50000), 0)
+        self.assertEqual(tracker.sequences[LAP_PACKET_ID].lost, 0)
+
+    def test_packet_types_are_independent(self):
+        tracker = PacketSequenceTracker()
+        self.feed(tracker, range(1000, 1010), LAP_PACKET_ID)
+        self.feed(tracker, range(1000, 1010, 2), TELEMETRY_PACKET_ID)
+        self.assertEqual(tracker.observe(LAP_PACKET_ID, 1010), 0)
+        self.assertEqual(tracker.observe(TELEMETRY_PACKET_ID, 1014), 2)
+
+    def test_untracked_packet_type_is_ignored(self):
+        tracker = PacketSequenceTracker()
+        self.assertEqual(tracker.observe(3, 1000), 0)
+        self.assertNotIn("event", tracker.stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+from unittest import TestCase
+import socket
+import threading
+import time
+
+from benchmarks.synthetic import build_f12022_stream
+from receiver import metrics
+from receiver.sharding import ShardSupervisor, WorkerHandle, END_OF_STREAM, encode_datagram, decode_datagram, \
+    get_shard
+
+
+def get_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        return free_socket.getsockname()[1]
+
+
+class ShardingHelpersTest(TestCase):
+    def test_encode_decode_datagram(self):
+        message = encode_datagram(b"packet", ("10.0.0.7", 20777))
+        self.assertEqual(decode_datagram(message), (b"packet", ("10.0.0.7", 20777)))
+
+    def test_get_shard_is_stable(self):
+        shards = [get_shard(("10.0.0.%s" % host, 20777), 4) for host in range(20)]
+        self.assertEqual(shards, [get_shard(("10.0.0.%s" % host, 20777), 4) for host in range(20)])
+        self.assertTrue(all(0 <= shard < 4 for shard in shards))
+        self.assertGreater(len(set(shards)), 1)
+
+
+class SlowConnection:
+    """ Pipe end of a worker that reads once released """
+
+    def __init__(self):
+        self.released = threading.Event()
+        self.messages = []
+
+    def send_bytes(self, message):
+        self.released.wait()
+        self.messages.append(message)
+
+
+class WorkerHandleTest(TestCase):
+    def test_slow_worker_drops_instead_of_blocking(self):
+        connection = SlowConnection()
+        worker = WorkerHandle(0, None, connection, threading.Event(), queue_size=2)
+        start = time.monotonic()
+        for index in range(10):
+            worker.offer(b"packet %d" % index)
+        self.assertLess(time.monotonic() - start, 0.5)
+        connection.released.set()
+        worker.end_stream()
+        worker.thread.join(2)
+        # At most one message was being written and two waited in the queue, in order
+        self.assertEqual(connection.messages[-1], END_OF_STREAM)
+        sent = connection.messages[:-1]
+        self.assertLessEqual(len(sent), 3)
+        self.assertEqual(sent, sorted(sent))
+        # Nothing gets queued once the stream ended
+        worker.offer(b"late")
+        self.assertTrue(worker.queue.empty())
+
+
+class ShardSupervisorTest(TestCase):
+    def send_streams(self, port, source_count=4, frame_count=30):
+        senders = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(source_count)]
+        streams = [build_f12022_stream(frame_count, session_uid=42) for _ in senders]
+        try:
+            for packets in zip(*streams):
+                for sender, packet in zip(senders, packets):
+                    sender.sendto(packet, ("127.0.0.1", port))
+                time.sleep(0.001)
+        finally:
+            for sender in senders:
+                sender.close()
+        return sum(len(stream) for stream in streams)
+
+    def wait_for_total(self, supervisor, expected, timeout=10):
+        """ Packets received by the workers, leaving out what this process counted in other tests """
+        local_registry = metrics.AggregatedRegistry()
+        local_registry.update("supervisor", metrics.REGISTRY.snapshot())
+        already_counted = local_registry.get_total("f1laps_packets_received_total")
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if supervisor.registry.get_total("f1laps_packets_received_total") - already_counted >= expected:
+                break
+            time.sleep(0.05)
+        return supervisor.registry.get_total("f1laps_packets_received_total") - already_counted
+
+    def test_dispatches_to_workers_and_restarts_them(self):
+        port = get_free_port()
+        supervisor = ShardSupervisor("api_key", worker_count=2, host_ip="127.0.0.1", host_port=port,
+                                     snapshot_interval=0.1)
+        supervisor.start()
+        try:
+            self.assertTrue(supervisor.wait_until_ready())
+            sent = self.send_streams(port)
+            self.assertEqual(self.wait_for_total(supervisor, sent), sent)
+
+            old_pid = supervisor.workers[0].process.pid
+            supervisor.restart_worker(0, reason="test")
+            self.assertNotEqual(supervisor.workers[0].process.pid, old_pid)
+            self.assertTrue(supervisor.workers[0].process.is_alive())
+        finally:
+            supervisor.stop()
+        self.assertFalse(any(worker.process.is_alive() for worker in supervisor.workers))
+
+    def test_rejects_files_workers_would_share(self):
+        for option in ("lap_store_path", "capture_path"):
+            with self.assertRaises(ValueError):
+                ShardSupervisor("api_key", worker_count=2, host_ip="127.0.0.1", **{option: "shared"})
+
+    def test_worker_settings(self):
+        supervisor = ShardSupervisor("api_key", worker_count=2, host_ip="127.0.0.1", metrics_port=9000,
+                                     telemetry_join_window=2)
+        self.assertEqual(supervisor.metrics_port, 9000)
+        settings = supervisor.worker_settings
+        self.assertEqual((settings.host_ip, settings.host_port), ("127.0.0.1", supervisor.host_port))
+        self.assertEqual(settings.telemetry_join_window, 2)
+        self.assertTrue(settings.demultiplex_sources)
+        self.assertIsNone(settings.metrics_port)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import json
+from array import array
+from unittest import TestCase
+
+from benchmarks.synthetic import build_f12022_stream
+from receiver import lap_telemetry_base
+from receiver.lap_telemetry_base import TelemetrySettings
+from receiver.f12022.packets.telemetry import CarTelemetryData
+from receiver.f12022.processor import F12022Processor
+from receiver.f12022.telemetry import F12022LapTelemetry
+from receiver.telemetry_channels import get_channels, get_bytes_per_frame, ChannelSampler, TelemetryChannel, \
+    DEFAULT_CHANNELS, PACKET_TELEMETRY
+from receiver.telemetry_columns import TelemetryColumns
+
+
+class TelemetryChannelsTest(TestCase):
+    def test_default_channels_match_frames(self):
+        self.assertEqual([channel.name for channel in DEFAULT_CHANNELS], list(lap_telemetry_base.KEY_INDEX_MAP))
+        self.assertEqual([channel.decimals for channel in DEFAULT_CHANNELS],
+                         list(lap_telemetry_base.KEY_ROUND_MAP.values()))
+
+    def test_get_channels(self):
+        channels = get_channels(["engine_rpm", ("brake_temperature_front_left", 5), "engine_rpm"])
+        self.assertEqual([channel.name for channel in channels[8:]], ["engine_rpm", "brake_temperature_front_left"])
+        self.assertEqual(channels[9].sample_every, 5)
+        self.assertEqual(channels[9].field_index, 2)
+        for extra_channels in (["rpm"], ["speed"], [("engine_rpm", 0)]):
+            with self.assertRaises(ValueError):
+                get_channels(extra_channels)
+        with self.assertRaises(ValueError):
+            TelemetryChannel("rpm", PACKET_TELEMETRY, "engineRPM", dtype="H")
+
+    def test_bytes_per_frame(self):
+        bytes_per_frame = get_bytes_per_frame(get_channels(["engine_rpm"]))
+        self.assertEqual(bytes_per_frame["lap_distance"], 4)
+        self.assertEqual(bytes_per_frame["gear"], 1)
+        self.assertEqual(bytes_per_frame["engine_rpm"], 2)
+
+    def test_sampler(self):
+        car_data = CarTelemetryData()
+        car_data.engineRPM = 11000
+        car_data.brakesTemperature[2] = 650
+        sampler = ChannelSampler(get_channels(["engine_rpm", ("brake_temperature_front_left", 3)]))
+        sampled = [sampler.read(car_data, frame_number) for frame_number in range(100, 105)]
+        self.assertEqual(sampled[0], {"engine_rpm": 11000, "brake_temperature_front_left": 650})
+        self.assertEqual(sampled[1], {"engine_rpm": 11000})
+        self.assertEqual(sampled[3], {"engine_rpm": 11000, "brake_temperature_front_left": 650})
+        # Flashback
+        self.assertEqual(sampler.read(car_data, 90), {"engine_rpm": 11000, "brake_temperature_front_left": 650})
+        self.assertFalse(ChannelSampler(DEFAULT_CHANNELS))
+
+
+class ExtraChannelsTest(TestCase):
+    def test_frames_are_sized_by_channels(self):
+        settings = TelemetrySettings(["engine_rpm", "tyre_pressure_front_left"])
+        telemetry = F12022LapTelemetry(1, 10, settings)
+        telemetry.update({"frame_identifier": 1000, "lap_distance": 10.0, "speed": 300, "engine_rpm": 11000,
+                          "tyre_pressure_front_left": 23.4})
+        # Laps with other channels don't change the maps of this one
+        default_telemetry = F12022LapTelemetry(1, 10)
+        default_telemetry.update({"frame_identifier": 1000, "lap_distance": 10.0, "speed": 300})
+        telemetry.update({"frame_identifier": 1001, "lap_distance": 11.0, "tyre_pressure_front_left": 23.5})
+        self.assertEqual(telemetry.frame_dict, {1000: [10.0, None, 300, None, None, None, None, None, 11000, 23.4],
+                                                1001: [11.0, None, None, None, None, None, None, None, None, 23.5]})
+        self.assertEqual(default_telemetry.frame_dict, {1000: [10.0, None, 300, None, None, None, None, None]})
+        self.assertEqual(len(lap_telemetry_base.KEY_INDEX_MAP), 8)
+        self.assertEqual(settings.key_index_map["tyre_pressure_front_left"], 9)
+
+    def test_processor_stores_extra_channels(self):
+        settings = TelemetrySettings(["engine_rpm", ("tyre_surface_temperature_rear_left", 10)])
+        processor = F12022Processor("api_key", True, settings)
+        for packet in build_f12022_stream(30):
+            processor.process(packet)
+        frames = processor.session.lap_list[1].telemetry.frame_dict
+        self.assertTrue(all(frame[8] == 0 for frame in frames.values()))
+        self.assertEqual([frame_number for frame_number, frame in frames.items() if frame[9] is not None], [1, 11, 21])
+
+    def test_sync_has_default_channels_only(self):
+        laps = []
+        for settings in (None, TelemetrySettings(["engine_rpm"])):
+            processor = F12022Processor("api_key", True, settings)
+            for packet in build_f12022_stream(30):
+                processor.process(packet)
+            laps.append(processor.session.lap_list[1])
+        default_lap, extra_lap = laps
+        # F1Laps gets the same telemetry with or without extra channels, local consumers get them all
+        self.assertEqual(extra_lap.get_telemetry_string(), default_lap.get_telemetry_string())
+        self.assertEqual(extra_lap.json_serialize()["telemetry_data_string"], default_lap.get_telemetry_string())
+        frames = json.loads(extra_lap.get_telemetry_string(all_channels=True))
+        self.assertTrue(all(len(frame) == 9 for frame in frames.values()))
+        self.assertEqual(default_lap.get_telemetry_string(all_channels=True), default_lap.get_telemetry_string())
+
+
+class TelemetryColumnsTest(TestCase):
+    def test_pack_and_unpack(self):
+        frame_dict = {1000: [1000, 50, 300, -0.0, 1000, 7, -500, None], 1001: [1050, None, 301, 0, 0, -1, 0, 1]}
+        columns = TelemetryColumns.pack(frame_dict, DEFAULT_CHANNELS)
+        self.assertEqual(columns.frame_numbers, array("q", [1000, 1001]))
+        self.assertEqual(columns.columns[0].typecode, "i")
+        self.assertEqual(columns.nbytes(), 2 * (8 + 4 + 4 + 2 + 2 + 2 + 1 + 2 + 1))
+        unpacked = columns.unpack()
+        self.assertEqual(repr(unpacked), repr(frame_dict))
+
+    def test_pack_fails_on_values_that_dont_fit(self):
+        with self.assertRaises(OverflowError):
+            TelemetryColumns.pack({1000: [0, 0, 0, 0, 0, 200, 0, 0]}, DEFAULT_CHANNELS)
+        with self.assertRaises(OverflowError):
+            TelemetryColumns.pack({1000: [0, 0, 0, 0, 0, -128, 0, 0]}, DEFAULT_CHANNELS)
+        with self.assertRaises(TypeError):
+            TelemetryColumns.pack({1000: [0, 50.5, 0, 0, 0, 0, 0, 0]}, DEFAULT_CHANNELS)
+
+    def test_completed_lap_is_packed(self):
+        telemetry = F12022LapTelemetry(lap_number=1, session_type=10)
+        for frame_number in range(1000, 1100):
+            telemetry.update({"frame_identifier": frame_number, "lap_distance": frame_number - 999.5,
+                              "lap_time": frame_number, "speed": 200, "steer": -0.0001, "gear": 4})
+        frame_dict = telemetry.frame_dict
+        telemetry.finish()
+        self.assertEqual(telemetry._frame_dict, {})
+        self.assertEqual(len(telemetry.columns), 100)
+        self.assertEqual(repr(telemetry.frame_dict), repr(frame_dict))
+        self.assertTrue(telemetry.has_frames())
+        # Updating a completed lap unpacks it again
+        telemetry.update({"frame_identifier": 1100, "lap_distance": 101.0})
+        self.assertIsNone(telemetry.columns)
+        self.assertEqual(len(telemetry.frame_dict), 101)
+
+    def test_lap_that_doesnt_fit_stays_unpacked(self):
+        telemetry = F12022LapTelemetry(lap_number=1, session_type=10)
+        telemetry.update({"frame_identifier": 1000, "lap_distance": 1.0, "lap_time": 50.5})
+        telemetry.finish()
+        self.assertIsNone(telemetry.columns)
+        self.assertEqual(telemetry.frame_dict, {1000: [1.0, 50.5, None, None, None, None, None, None]})
+
+
+if __name__ == '__main__':
+    unittest.main()
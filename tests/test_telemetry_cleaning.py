@@ -0,0 +1,144 @@
+import random
+from unittest import TestCase, skipIf
+
+from receiver import telemetry_cleaning
+from receiver.lap_telemetry_base import LapTelemetryBase, TelemetrySettings
+from receiver.telemetry_cleaning import find_first_cleaning_index_python, find_first_cleaning_index_numpy
+
+
+def build_random_stream(rng, frame_count=300):
+    """
+    Lap and telemetry updates (and flashbacks) like a game sends them, with the odd
+    pre-line negative distances, garage exit, restart, lost or reordered packet and flashback
+    """
+    stream = []
+    frame = rng.randint(0, 1000)
+    distance = rng.choice([-300.0, -50.0, 10.0, 150.0, 4200.0])
+    for _ in range(frame_count):
+        frame += 1
+        roll = rng.random()
+        if roll < 0.02:
+            # Garage exit or line cross: distance drops to the start of the lap
+            distance = rng.uniform(0, 250)
+        elif roll < 0.03:
+            # Back behind the line
+            distance = rng.uniform(-200, -1)
+        elif roll < 0.04:
+            # Restart from a higher distance
+            distance = rng.uniform(3000, 5000)
+        elif roll < 0.05:
+            # Flashback, the game continues from the frame it went back to
+            frame -= rng.randint(1, 30)
+            stream.append(frame)
+        else:
+            distance += rng.uniform(0, 60)
+        lap_update = {"frame_identifier": frame, "lap_distance": distance, "lap_time": rng.uniform(0, 90000)}
+        telemetry_update = {"frame_identifier": frame, "speed": rng.randint(0, 330), "throttle": rng.random(),
+                            "gear": rng.randint(0, 8)}
+        roll = rng.random()
+        if roll < 0.05:
+            updates = [telemetry_update]
+        elif roll < 0.1:
+            updates = [lap_update]
+        elif roll < 0.15:
+            updates = [telemetry_update, lap_update]
+        else:
+            updates = [lap_update, telemetry_update]
+        if rng.random() < 0.02:
+            # Duplicate of an earlier frame
+            updates.append({"frame_identifier": frame - rng.randint(1, 5), "lap_distance": rng.uniform(-10, 300)})
+        stream.extend(updates)
+    return stream
+
+
+DEFERRED_SETTINGS = TelemetrySettings(deferred_cleaning=True)
+
+
+def run_stream(stream, session_type, deferred, read_every=None):
+    telemetry = LapTelemetryBase(1, session_type, DEFERRED_SETTINGS if deferred else None)
+    for index, update in enumerate(stream):
+        if isinstance(update, dict):
+            telemetry.update(dict(update))
+        else:
+            telemetry.process_flashback_event(update)
+        if read_every and index % read_every == 0:
+            telemetry.frame_dict
+    return telemetry
+
+
+class CountingLapTelemetry(LapTelemetryBase):
+    __slots__ = ("cleaned",)
+
+    def __init__(self, lap_number, session_type=None, settings=None):
+        super(CountingLapTelemetry, self).__init__(lap_number, session_type, settings)
+        self.cleaned = []
+
+    def clean_frame(self, frame_number):
+        self.cleaned.append(frame_number)
+        super(CountingLapTelemetry, self).clean_frame(frame_number)
+
+
+class DeferredCleaningTest(TestCase):
+
+    def assert_same_telemetry(self, telemetry, expected):
+        self.assertEqual(list(telemetry.frame_dict.items()), list(expected.frame_dict.items()))
+        self.assertEqual(telemetry.last_lap_distance, expected.last_lap_distance)
+        self.assertEqual(telemetry.frames_popped_list, expected.frames_popped_list)
+
+    def test_updates_are_stored_until_read(self):
+        telemetry = LapTelemetryBase(1, 10, DEFERRED_SETTINGS)
+        telemetry.update({"frame_identifier": 1000, "lap_distance": -100, "speed": 300})
+        telemetry.update({"frame_identifier": 1001, "lap_distance": 13, "speed": 301})
+        telemetry.process_flashback_event(1002)
+        self.assertEqual(len(telemetry.pending_updates), 3)
+        self.assertEqual(telemetry.frame_dict, {1001: [13, None, 301, None, None, None, None, None]})
+        self.assertEqual(telemetry.pending_updates, [])
+        self.assertEqual(telemetry.last_lap_distance, None)
+
+    def test_only_cleans_updates_that_need_it(self):
+        telemetry = CountingLapTelemetry(1, 10, DEFERRED_SETTINGS)
+        for frame in range(1, 1001):
+            telemetry.update({"frame_identifier": frame, "lap_distance": frame * 5.0, "speed": 300})
+            if frame == 10:
+                telemetry.process_flashback_event(5)
+        telemetry.update({"frame_identifier": 1001, "lap_distance": -10.0, "speed": 300})
+        telemetry.apply_pending_updates()
+        # Only the frame before the line is cleaned (resetting the lap), every frame after the flashback is merged
+        self.assertEqual(telemetry.cleaned, [1001])
+        self.assertEqual(telemetry.frame_dict, {})
+
+    def test_matches_frame_by_frame_cleaning(self):
+        rng = random.Random(2021)
+        for _ in range(200):
+            stream = build_random_stream(rng)
+            session_type = rng.choice([None, 1, 5, 10, 13])
+            expected = run_stream(stream, session_type, deferred=False)
+            self.assert_same_telemetry(run_stream(stream, session_type, deferred=True), expected)
+            # Reading frame_dict mid-lap (e.g. a session sync) doesn't change the result
+            read_every = rng.randint(1, 50)
+            self.assert_same_telemetry(run_stream(stream, session_type, deferred=True, read_every=read_every), expected)
+
+    def test_matches_frame_by_frame_cleaning_python(self):
+        numpy = telemetry_cleaning.numpy
+        telemetry_cleaning.numpy = None
+        try:
+            self.test_matches_frame_by_frame_cleaning()
+        finally:
+            telemetry_cleaning.numpy = numpy
+
+    @skipIf(telemetry_cleaning.numpy is None, "NumPy isn't installed")
+    def test_numpy_and_python_find_the_same_index(self):
+        rng = random.Random(22)
+        for _ in range(200):
+            stream = build_random_stream(rng, frame_count=rng.randint(1, 100))
+            frame_dict = {update["frame_identifier"]: [rng.choice([None, 0, 55.5, 4000]), None, None, None, None, None, None, None]
+                          for update in stream[:5] if isinstance(update, dict)}
+            last_lap_distance = rng.choice([None, 0, 100, 5000])
+            frames_popped = [update["frame_identifier"] for update in stream[:50:17] if isinstance(update, dict)]
+            self.assertEqual(
+                find_first_cleaning_index_numpy(stream, frame_dict, last_lap_distance, frames_popped, 200),
+                find_first_cleaning_index_python(stream, frame_dict, last_lap_distance, frames_popped, 200))
+
+
+if __name__ == '__main__':
+    unittest.main()
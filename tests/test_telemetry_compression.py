@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+from receiver.lap_telemetry_base import TelemetrySettings
+from receiver.f12022.telemetry import F12022LapTelemetry
+from receiver.telemetry_channels import DEFAULT_CHANNELS
+from receiver.telemetry_columns import TelemetryColumns, CompressedColumns, DecompressedLapCache, \
+    decompressed_laps
+
+
+def build_columns(frame_count=500):
+    frame_dict = {frame_number: [frame_number * 150, frame_number * 16, 200 + frame_number % 7, -0.0, 1000,
+                                 -1 if frame_number == 1000 else 4, -(frame_number % 3), None]
+                  for frame_number in range(1000, 1000 + frame_count)}
+    return frame_dict, TelemetryColumns.pack(frame_dict, DEFAULT_CHANNELS)
+
+
+class CompressedColumnsTest(TestCase):
+    def test_compress_and_decompress(self):
+        frame_dict, columns = build_columns()
+        compressed = CompressedColumns.compress(columns)
+        self.assertEqual(len(compressed), 500)
+        self.assertLess(compressed.nbytes(), columns.nbytes() / 4)
+        decompressed = compressed.decompress()
+        self.assertEqual([values.typecode for values in decompressed.columns],
+                         [values.typecode for values in columns.columns])
+        self.assertEqual(repr(compressed.unpack()), repr(frame_dict))
+
+    def test_decompressed_lap_cache(self):
+        cache = DecompressedLapCache(size=2)
+        laps = [CompressedColumns.compress(build_columns(10)[1]) for _ in range(3)]
+        first_columns = cache.get(laps[0])
+        self.assertIs(cache.get(laps[0]), first_columns)
+        cache.get(laps[1])
+        cache.get(laps[0])
+        # The least recently used lap gets evicted
+        cache.get(laps[2])
+        self.assertEqual(list(cache.laps), [laps[0], laps[2]])
+        cache.resize(1)
+        self.assertEqual(list(cache.laps), [laps[2]])
+        cache.resize(0)
+        cache.get(laps[1])
+        self.assertEqual(len(cache), 0)
+
+
+class CompressedLapTest(TestCase):
+    def test_completed_lap_is_compressed(self):
+        telemetry = F12022LapTelemetry(1, 10, TelemetrySettings(compression=True))
+        for frame_number in range(1000, 1100):
+            telemetry.update({"frame_identifier": frame_number, "lap_distance": frame_number - 999.5,
+                              "lap_time": frame_number, "speed": 200, "steer": -0.0001, "gear": 4})
+        frame_dict = telemetry.frame_dict
+        telemetry.finish()
+        self.assertIsInstance(telemetry.columns, CompressedColumns)
+        self.assertEqual(len(telemetry.columns), 100)
+        self.assertEqual(repr(telemetry.frame_dict), repr(frame_dict))
+        self.assertIn(telemetry.columns, decompressed_laps.laps)
+        # Updating a completed lap decompresses it again
+        telemetry.update({"frame_identifier": 1100, "lap_distance": 101.0})
+        self.assertIsNone(telemetry.columns)
+        self.assertEqual(len(telemetry.frame_dict), 101)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+from benchmarks.synthetic import build_f12022_stream
+from receiver.f12022.processor import F12022Processor
+from receiver.lap_telemetry_base import TelemetrySettings
+from receiver.telemetry_decimation import TelemetryDecimator
+
+
+class TelemetryDecimatorTest(TestCase):
+    def test_frame_interval(self):
+        decimator = TelemetryDecimator(frame_interval=3)
+        kept = [frame for frame in range(100, 110) if decimator.keep_lap_frame(frame, 1, 0, None)]
+        self.assertEqual(kept, [100, 103, 106, 109])
+
+    def test_time_interval(self):
+        decimator = TelemetryDecimator(time_interval_ms=50)
+        kept = [frame for frame in range(100, 110) if decimator.keep_lap_frame(frame, 1, 0, (frame - 100) * 16)]
+        self.assertEqual(kept, [100, 104, 108])
+
+    def test_lap_and_sector_boundaries_are_kept(self):
+        decimator = TelemetryDecimator(frame_interval=10)
+        self.assertTrue(decimator.keep_lap_frame(100, 1, 0, 1000))
+        self.assertFalse(decimator.keep_lap_frame(101, 1, 0, 1016))
+        self.assertTrue(decimator.keep_lap_frame(102, 1, 1, 1032))
+        self.assertFalse(decimator.keep_lap_frame(103, 1, 1, 1048))
+        self.assertTrue(decimator.keep_lap_frame(104, 2, 0, 0))
+        # Flashback to an earlier frame
+        self.assertTrue(decimator.keep_lap_frame(90, 2, 0, 500))
+
+    def test_telemetry_of_kept_frames_only(self):
+        decimator = TelemetryDecimator(frame_interval=2)
+        self.assertFalse(decimator.keep_telemetry_frame(100))
+        decimator.keep_lap_frame(100, 1, 0, None)
+        self.assertTrue(decimator.keep_telemetry_frame(100))
+        decimator.keep_lap_frame(101, 1, 0, None)
+        self.assertFalse(decimator.keep_telemetry_frame(101))
+
+    def test_settings(self):
+        self.assertIsNone(TelemetrySettings().get_decimator())
+        self.assertEqual(TelemetrySettings(decimation_frames=3).get_decimator().frame_interval, 3)
+        with self.assertRaises(ValueError):
+            TelemetrySettings(decimation_ms=0)
+
+    def test_processor_stores_complete_decimated_frames(self):
+        processor = F12022Processor("api_key", True, TelemetrySettings(decimation_frames=3))
+        for packet in build_f12022_stream(90):
+            processor.process(packet)
+        frame_dict = processor.session.lap_list[1].telemetry.frame_dict
+        self.assertEqual(sorted(frame_dict), list(range(1, 91, 3)))
+        for frame in frame_dict.values():
+            # Distance from the lap packet, speed from the telemetry packet
+            self.assertIsNotNone(frame[0])
+            self.assertIsNotNone(frame[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
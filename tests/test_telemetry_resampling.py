@@ -0,0 +1,97 @@
+from unittest import TestCase
+
+from receiver.lap_telemetry_base import TelemetrySettings
+from receiver.f12022.telemetry import F12022LapTelemetry
+from receiver.f12022.session import F12022Session
+from receiver.telemetry_resampling import resample_frames, RESAMPLE_LINEAR, RESAMPLE_HOLD
+
+
+class ResampleFramesTest(TestCase):
+    def test_resample_frames(self):
+        frame_dict = {
+            1000: [150, 10, 100, 3],
+            1001: [450, 30, 200, 4],
+            # Not moving: doesn't count
+            1002: [450, 40, 0, 4],
+            1003: [650, 50, None, 5],
+        }
+        resampled = resample_frames(frame_dict, 200, 0, [RESAMPLE_LINEAR, RESAMPLE_LINEAR, RESAMPLE_LINEAR, RESAMPLE_HOLD])
+        self.assertEqual(resampled, {
+            1: [200, 13, 117, 3],
+            2: [400, 27, 183, 3],
+            # Missing values hold the value that's there
+            3: [600, 45, 200, 4],
+        })
+
+    def test_resample_frames_in_frame_order(self):
+        # Out of order, frames without distance or with a distance lower than before are skipped
+        frame_dict = {1002: [300, 2], 1000: [100, 0], 1001: [None, 1], 1003: [200, 3]}
+        resampled = resample_frames(frame_dict, 100, 0, [RESAMPLE_LINEAR, RESAMPLE_LINEAR])
+        self.assertEqual(resampled, {1: [100, 0], 2: [200, 1], 3: [300, 2]})
+
+    def test_resample_no_frames(self):
+        self.assertEqual(resample_frames({}, 200, 0, [RESAMPLE_LINEAR]), {})
+        self.assertEqual(resample_frames({1000: [None, 1]}, 200, 0, [RESAMPLE_LINEAR, RESAMPLE_LINEAR]), {})
+
+
+class LapTelemetryResamplingTest(TestCase):
+    def get_telemetry(self, frame_count, settings=None):
+        telemetry = F12022LapTelemetry(1, 10, settings)
+        for frame_number in range(frame_count):
+            telemetry.update({"frame_identifier": frame_number, "lap_distance": frame_number * 0.75,
+                              "lap_time": frame_number * 16, "speed": 200 + frame_number % 2, "brake": 0.0,
+                              "throttle": 1.0, "gear": 5 + frame_number % 2, "steer": 0.125, "drs": 0})
+        return telemetry
+
+    def test_resample(self):
+        telemetry = self.get_telemetry(9)
+        telemetry.resample(2)
+        self.assertTrue(telemetry.resampled)
+        self.assertEqual(telemetry.frame_dict, {
+            0: [0.0, 0, 200, 0.0, 1.0, 5, 0.125, 0],
+            1: [2.0, 43, 201, 0.0, 1.0, 5, 0.125, 0],
+            2: [4.0, 85, 201, 0.0, 1.0, 6, 0.125, 0],
+            3: [6.0, 128, 200, 0.0, 1.0, 5, 0.125, 0],
+        })
+
+    def test_frame_count_depends_on_distance_only(self):
+        # Twice the UDP rate over the same distance
+        telemetry = self.get_telemetry(4000)
+        denser_telemetry = self.get_telemetry(8000)
+        for frame_number, frame in denser_telemetry._frame_dict.items():
+            frame[0] = frame[0] // 2
+        telemetry.resample(2)
+        denser_telemetry.resample(2)
+        self.assertEqual(len(telemetry.frame_dict), 1500)
+        self.assertEqual(len(denser_telemetry.frame_dict), 1500)
+
+    def test_finish_resamples_when_enabled(self):
+        telemetry = self.get_telemetry(9)
+        telemetry.finish()
+        self.assertFalse(telemetry.resampled)
+        self.assertEqual(len(telemetry.frame_dict), 9)
+        telemetry = self.get_telemetry(9, TelemetrySettings(resample_step=3, resample_methods={"speed": RESAMPLE_HOLD}))
+        telemetry.finish()
+        self.assertTrue(telemetry.resampled)
+        self.assertEqual([frame[2] for frame in telemetry.frame_dict.values()], [200, 200, 200])
+
+    def test_settings_validate(self):
+        with self.assertRaises(ValueError):
+            TelemetrySettings(resample_step=0)
+        with self.assertRaises(ValueError):
+            TelemetrySettings(resample_step=2, resample_methods={"rpm": RESAMPLE_HOLD})
+        with self.assertRaises(ValueError):
+            TelemetrySettings(resample_step=2, resample_methods={"speed": "cubic"})
+
+    def test_session_resamples_completed_lap(self):
+        session = F12022Session("key_123", True, "uid_123", 10, 1, False, 90, 1, 5,
+                                telemetry_settings=TelemetrySettings(resample_step=2))
+        lap = session.get_lap(1)
+        lap.telemetry = self.get_telemetry(9, lap.telemetry_settings)
+        session.get_lap(2)
+        self.assertTrue(lap.telemetry.resampled)
+        self.assertEqual(len(lap.telemetry.frame_dict), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
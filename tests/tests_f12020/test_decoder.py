@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+from receiver.f12020.decoder import unpack_udp_packet, PacketSessionData, PacketLapData, \
+                                    PacketCarTelemetryData, PlayerCarPacket
+
+
+PLAYER_CAR_INDEX = 5
+
+
+def set_header(packet, packet_id, frame_identifier=1):
+    packet.header.packetFormat = 2020
+    packet.header.packetVersion = 1
+    packet.header.packetId = packet_id
+    packet.header.sessionUID = 2020
+    packet.header.frameIdentifier = frame_identifier
+    packet.header.playerCarIndex = PLAYER_CAR_INDEX
+
+
+def build_lap_packet(lap_number=1, frame_identifier=1):
+    packet = PacketLapData()
+    set_header(packet, 2, frame_identifier)
+    for index, lap_data in enumerate(packet.lapData):
+        lap_data.currentLapNum = lap_number if index == PLAYER_CAR_INDEX else 99
+        lap_data.carPosition = index + 1
+        lap_data.currentLapTime = 12.5
+        lap_data.lapDistance = 250.0
+    return bytes(packet)
+
+
+class DecoderTest(TestCase):
+    def test_decodes_player_car_only(self):
+        packet = unpack_udp_packet(build_lap_packet(lap_number=3))
+        self.assertIsInstance(packet, PlayerCarPacket)
+        self.assertEqual(packet.header.frameIdentifier, 1)
+        self.assertEqual(list(packet.lapData), [PLAYER_CAR_INDEX])
+        lap_data = packet.lapData[packet.header.playerCarIndex]
+        self.assertEqual(lap_data.currentLapNum, 3)
+        self.assertEqual(lap_data.carPosition, PLAYER_CAR_INDEX + 1)
+        self.assertEqual(lap_data.currentLapTime, 12.5)
+
+    def test_decodes_telemetry_player_car(self):
+        telemetry_packet = PacketCarTelemetryData()
+        set_header(telemetry_packet, 6)
+        telemetry_packet.carTelemetryData[PLAYER_CAR_INDEX].speed = 312
+        telemetry_packet.carTelemetryData[PLAYER_CAR_INDEX].gear = -1
+        packet = unpack_udp_packet(bytes(telemetry_packet))
+        self.assertEqual(packet.carTelemetryData[PLAYER_CAR_INDEX].speed, 312)
+        self.assertEqual(packet.carTelemetryData[PLAYER_CAR_INDEX].gear, -1)
+
+    def test_decodes_whole_session_packet(self):
+        session_packet = PacketSessionData()
+        set_header(session_packet, 1)
+        session_packet.trackId = 7
+        session_packet.weather = 2
+        packet = unpack_udp_packet(bytes(session_packet))
+        self.assertIsInstance(packet, PacketSessionData)
+        self.assertEqual((packet.trackId, packet.weather), (7, 2))
+
+    def test_skips_unused_packet_types(self):
+        motion_packet = bytearray(build_lap_packet())
+        motion_packet[5] = 0
+        self.assertIsNone(unpack_udp_packet(bytes(motion_packet)))
+
+    def test_bad_size_raises(self):
+        with self.assertRaises(ValueError):
+            unpack_udp_packet(build_lap_packet()[:-1])
+
+    def test_bad_player_car_index_raises(self):
+        packet = bytearray(build_lap_packet())
+        packet[22] = 255
+        with self.assertRaises(ValueError):
+            unpack_udp_packet(bytes(packet))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from receiver import metrics
+from receiver.f12020.decoder import PacketSessionData
+from receiver.f12020.processor import F12020Processor
+from tests.tests_f12020.test_decoder import set_header, build_lap_packet, PLAYER_CAR_INDEX
+
+
+def build_session_packet():
+    packet = PacketSessionData()
+    set_header(packet, 1)
+    packet.trackId = 10
+    packet.sessionType = 12
+    packet.weather = 1
+    return bytes(packet)
+
+
+class F12020ProcessorTest(TestCase):
+    def test_ignores_packets_before_session(self):
+        processor = F12020Processor("api_key", True)
+        processor.process(build_lap_packet())
+        self.assertIsNone(processor.session)
+
+    def test_creates_session_and_processes_laps(self):
+        processor = F12020Processor("api_key", False)
+        processor.process(build_session_packet())
+        self.assertEqual(processor.session.track_id, 10)
+        self.assertEqual(processor.session.get_track_name(), "Spa")
+        self.assertEqual(processor.session.f1laps_api_key, "api_key")
+        self.assertFalse(processor.session.telemetry_enabled)
+        processor.process(build_lap_packet(lap_number=1, frame_identifier=2))
+        self.assertEqual(processor.session.lap_number_current, 1)
+        self.assertEqual(processor.session.lap_list[1]["car_race_position"], PLAYER_CAR_INDEX + 1)
+        self.assertEqual(processor.session.lap_list[1]["sector_3_time_ms"], 12500)
+
+    def test_bad_packet_is_ignored(self):
+        processor = F12020Processor("api_key", True)
+        processor.process(build_session_packet()[:-1])
+        self.assertIsNone(processor.session)
+
+    def test_counts_packets_like_other_games(self):
+        processor = F12020Processor("api_key", True)
+        decode_errors = metrics.packet_decode_errors.get(1)
+        processor.process(build_session_packet()[:-1])
+        self.assertEqual(metrics.packet_decode_errors.get(1), decode_errors + 1)
+        processor.process(build_lap_packet(frame_identifier=2))
+        processor.process(build_lap_packet(frame_identifier=3))
+        self.assertEqual(processor.sequence_tracker.sequences[2].received, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
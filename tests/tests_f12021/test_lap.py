@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from receiver.f12021.lap import F12021Lap, F12021LapTelemetry
+from receiver.f12021.penalty import F12021Penalty
+
+
+class F12021LapTests(TestCase):
+
+    def test_init_starts_telemetry(self):
+        lap = F12021Lap(1, session_type=10, telemetry_enabled=True)
+        self.assertTrue(isinstance(lap.telemetry, F12021LapTelemetry))
+        self.assertEqual(lap.telemetry.lap_number, 1)
+        self.assertEqual(lap.telemetry.session_type, 10)
+        lap.update_telemetry(1000, speed=300, lap_distance=50)
+        self.assertEqual(lap.telemetry.frame_dict, {1000: [50, None, 300, None, None, None, None, None]})
+
+    def test_slots(self):
+        lap = F12021Lap(1, session_type=10, telemetry_enabled=True)
+        with self.assertRaises(AttributeError):
+            lap.has_been_sent_to_f1laps = True
+
+    def test_get_telemetry_string(self):
+        lap = F12021Lap(1, session_type=10, telemetry_enabled=True)
+        # No frames yet
+        self.assertEqual(lap.get_telemetry_string(), None)
+        lap.update_telemetry(1000, speed=300, lap_distance=50.0)
+        self.assertEqual(lap.get_telemetry_string(), '{"1000": [50.0, null, 300, null, null, null, null, null]}')
+        lap.telemetry_enabled = False
+        self.assertEqual(lap.get_telemetry_string(), None)
+
+    def test_process_flashback_event(self):
+        lap = F12021Lap(1, session_type=10, telemetry_enabled=True)
+        penalty = F12021Penalty()
+        penalty.frame_id = 1002
+        lap.penalties.append(penalty)
+        lap.update_telemetry(1000, speed=300, lap_distance=50)
+        lap.update_telemetry(1001, speed=301, lap_distance=51)
+        lap.update_telemetry(1002, speed=302, lap_distance=52)
+        lap.process_flashback_event(1001)
+        self.assertEqual(lap.telemetry.frame_dict, {1000: [50, None, 300, None, None, None, None, None]})
+        self.assertEqual(lap.penalties, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
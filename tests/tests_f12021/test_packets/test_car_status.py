@@ -11,9 +11,9 @@ class PacketParticipantsDataTest(TestCase):
         packet = MockPacketCarStatusData()
         session = F12021Session(123)
         session.start_new_lap(1)
-        self.assertEqual(session.lap_list, {1: {}})
+        self.assertEqual(session.lap_list[1].tyre_compound_visual, None)
         session = packet.process(session)
-        self.assertEqual(session.lap_list, {1: {'tyre_compound_visual': 6}})
+        self.assertEqual(session.lap_list[1].tyre_compound_visual, 6)
     
 
 
@@ -12,8 +12,8 @@ class PacketEventDataTest(TestCase):
         session = MagicMock()
         packet = MockPacketFlashbackEventData()
         session = packet.process(session)
-        self.assertEqual(session.telemetry.process_flashback_event.call_count, 1)
-        session.telemetry.process_flashback_event.assert_called_with(113)
+        self.assertEqual(session.get_current_lap().process_flashback_event.call_count, 1)
+        session.get_current_lap().process_flashback_event.assert_called_with(113)
     
     def test_process_penalty(self):
         session = F12021Session(123)
@@ -21,7 +21,7 @@ class PacketEventDataTest(TestCase):
         packet = MockPacketPenaltyEventData()
         # Calling the submethod to verify penalty
         packet.process_pentalty(session)
-        penalty = session.lap_list[3]["penalties"][0]
+        penalty = session.lap_list[3].penalties[0]
         self.assertEqual(penalty.penalty_type, 5)
         self.assertEqual(penalty.lap_number, 3)
         self.assertEqual(penalty.frame_id, 123)
@@ -31,7 +31,7 @@ class PacketEventDataTest(TestCase):
         packet = MockPacketFlashbackEventData()
         packet.eventStringCode = b"VETL"
         session = packet.process(session)
-        self.assertEqual(session.telemetry.process_flashback_event.call_count, 0)
+        self.assertEqual(session.get_current_lap().process_flashback_event.call_count, 0)
 
 
 if __name__ == '__main__':
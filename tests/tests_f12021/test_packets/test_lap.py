@@ -3,9 +3,22 @@ from unittest.mock import MagicMock, patch
 
 from receiver.f12021.packets.lap import PacketLapData, LapData
 from receiver.f12021.session import F12021Session
+from receiver.f12021.lap import F12021Lap
 
 
 MOCK_LAP_NUMBER = 2
+LAP_FIELDS = ('lap_number', 'car_race_position', 'is_valid', 'pit_status', 'sector_1_ms', 'sector_2_ms', 'sector_3_ms')
+
+
+def make_lap(lap_number, **values):
+    lap = F12021Lap(lap_number, session_type=None, telemetry_enabled=True)
+    for key, value in values.items():
+        setattr(lap, key, value)
+    return lap
+
+
+def lap_values(lap_list):
+    return {lap_number: {key: getattr(lap, key) for key in LAP_FIELDS} for lap_number, lap in lap_list.items()}
 
 
 class PacketLapDataTest(TestCase):
@@ -15,12 +28,12 @@ class PacketLapDataTest(TestCase):
         session.complete_lap_v2 = MagicMock()
         # Start new lap 2 so that we only test update, not create
         session.start_new_lap(MOCK_LAP_NUMBER)
-        session.lap_list = {MOCK_LAP_NUMBER: {'car_race_position': 5, 'is_valid': True, 'pit_status': 1}}
+        session.lap_list = {MOCK_LAP_NUMBER: make_lap(MOCK_LAP_NUMBER, car_race_position=5, pit_status=1)}
         packet = MockPacketLapData()
         session = packet.process(session)
-        self.assertEqual(session.lap_list, 
+        self.assertEqual(lap_values(session.lap_list), 
                          {MOCK_LAP_NUMBER: {'car_race_position': 10, 'is_valid': True, 'lap_number': 2, 'pit_status': 1, 'sector_1_ms': 1000, 'sector_2_ms': 543, 'sector_3_ms': None}})
-        self.assertEqual(session.telemetry.lap_dict[MOCK_LAP_NUMBER].frame_dict, {2345: [4321, 1543.0, None, None, None, None, None, None]})
+        self.assertEqual(session.lap_list[MOCK_LAP_NUMBER].telemetry.frame_dict, {2345: [4321, 1543.0, None, None, None, None, None, None]})
         self.assertEqual(session.complete_lap_v2.call_count, 0)
 
     def test_process_new_lap(self):
@@ -28,9 +41,9 @@ class PacketLapDataTest(TestCase):
         session.complete_lap_v2 = MagicMock()
         packet = MockPacketLapData()
         session = packet.process(session)
-        self.assertEqual(session.lap_list, 
+        self.assertEqual(lap_values(session.lap_list), 
                          {MOCK_LAP_NUMBER: {'car_race_position': 10, 'is_valid': True, 'lap_number': 2, 'pit_status': 0, 'sector_1_ms': 1000, 'sector_2_ms': 543, 'sector_3_ms': None}})
-        self.assertEqual(session.telemetry.lap_dict[MOCK_LAP_NUMBER].frame_dict, {2345: [4321, 1543.0, None, None, None, None, None, None]})
+        self.assertEqual(session.lap_list[MOCK_LAP_NUMBER].telemetry.frame_dict, {2345: [4321, 1543.0, None, None, None, None, None, None]})
         self.assertEqual(session.complete_lap_v2.call_count, 1)
 
     def test_process_new_lap_with_previous(self):
@@ -39,13 +52,13 @@ class PacketLapDataTest(TestCase):
         # Start new lap 1 so that we test updating previous
         prev_lap_num = MOCK_LAP_NUMBER - 1
         session.start_new_lap(prev_lap_num)
-        session.lap_list[prev_lap_num] = {'sector_1_ms': 500, 'sector_2_ms': 400}
+        session.lap_list[prev_lap_num] = make_lap(prev_lap_num, sector_1_ms=500, sector_2_ms=400)
         packet = MockPacketLapData()
         session = packet.process(session)
-        self.assertEqual(session.lap_list, 
-                         {prev_lap_num: {'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 300},
+        self.assertEqual(lap_values(session.lap_list), 
+                         {prev_lap_num: {'car_race_position': None, 'is_valid': True, 'lap_number': 1, 'pit_status': None, 'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 300},
                           MOCK_LAP_NUMBER: {'car_race_position': 10, 'is_valid': True, 'lap_number': 2, 'pit_status': 0, 'sector_1_ms': 1000, 'sector_2_ms': 543, 'sector_3_ms': None}})
-        self.assertEqual(session.telemetry.lap_dict[MOCK_LAP_NUMBER].frame_dict, {2345: [4321, 1543.0, None, None, None, None, None, None]})
+        self.assertEqual(session.lap_list[MOCK_LAP_NUMBER].telemetry.frame_dict, {2345: [4321, 1543.0, None, None, None, None, None, None]})
         self.assertEqual(session.complete_lap_v2.call_count, 1)
 
     def test_update_current_lap(self):
@@ -53,24 +66,24 @@ class PacketLapDataTest(TestCase):
         session.start_new_lap(MOCK_LAP_NUMBER)
         packet = MockPacketLapData()
         session = packet.update_current_lap(session)
-        self.assertEqual(session.lap_list, 
+        self.assertEqual(lap_values(session.lap_list), 
                          {MOCK_LAP_NUMBER: {'car_race_position': 10, 'is_valid': True, 'lap_number': 2, 'pit_status': 0, 'sector_1_ms': 1000, 'sector_2_ms': 543, 'sector_3_ms': None}})
         packet.lapData[0].currentLapInvalid = 1
         packet.lapData[0].carPosition = 9
         packet.lapData[0].pitStatus = 0
         packet.lapData[0].currentLapTimeInMS = 2000
         session = packet.update_current_lap(session)
-        self.assertEqual(session.lap_list, 
+        self.assertEqual(lap_values(session.lap_list), 
                          {MOCK_LAP_NUMBER: {'car_race_position': 9, 'is_valid': False, 'lap_number': 2, 'pit_status': 0, 'sector_1_ms': 1000, 'sector_2_ms': 543, 'sector_3_ms': 457}})
 
     def test_update_telemetry(self):
         session = F12021Session(123)
-        session.telemetry.start_new_lap(MOCK_LAP_NUMBER)
+        session.start_new_lap(MOCK_LAP_NUMBER)
         packet = MockPacketLapData()
         # Revert back to default, other tests might have overwritten it
         packet.lapData[0].currentLapTimeInMS = 1543
         session = packet.update_telemetry(session)
-        self.assertEqual(session.telemetry.lap_dict[MOCK_LAP_NUMBER].frame_dict, {2345: [4321, 1543.0, None, None, None, None, None, None]})
+        self.assertEqual(session.lap_list[MOCK_LAP_NUMBER].telemetry.frame_dict, {2345: [4321, 1543.0, None, None, None, None, None, None]})
 
     def test_is_inlap_race_distance_mid(self):
         session = F12021Session(123)
@@ -86,7 +99,7 @@ class PacketLapDataTest(TestCase):
 
     def test_is_inlap_race_distance_low_with_sectors(self):
         session = F12021Session(123)
-        session.lap_list[MOCK_LAP_NUMBER] = {'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 100}
+        session.lap_list[MOCK_LAP_NUMBER] = make_lap(MOCK_LAP_NUMBER, sector_1_ms=500, sector_2_ms=400, sector_3_ms=100)
         packet = MockPacketOutLapData()
         is_outlap = packet.is_race_inlap(session, MOCK_LAP_NUMBER)
         self.assertEqual(is_outlap, True)
@@ -95,27 +108,27 @@ class PacketLapDataTest(TestCase):
         # First, test race (type 10), which should not process inlap
         session = F12021Session(123)
         session.session_type = 10
-        session.lap_list[MOCK_LAP_NUMBER] = {'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 100}
+        session.lap_list[MOCK_LAP_NUMBER] = make_lap(MOCK_LAP_NUMBER, sector_1_ms=500, sector_2_ms=400, sector_3_ms=100)
         session.complete_lap_v2 = MagicMock()
         session.start_new_lap = MagicMock()
         packet = MockPacketOutLapData()
         packet.update_telemetry = MagicMock()
         packet.process(session)
-        self.assertEqual(session.lap_list, 
-                         {MOCK_LAP_NUMBER: {'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 300}})
+        self.assertEqual(lap_values(session.lap_list), 
+                         {MOCK_LAP_NUMBER: {'car_race_position': None, 'is_valid': True, 'lap_number': 2, 'pit_status': None, 'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 300}})
         self.assertEqual(session.complete_lap_v2.call_count, 1)
         self.assertEqual(session.start_new_lap.call_count, 0)
         self.assertEqual(packet.update_telemetry.call_count, 0)
         # Second, test time trial (type 13), which should process "inlap"
         session = F12021Session(123)
         session.session_type = 13
-        session.lap_list[MOCK_LAP_NUMBER] = {'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 100}
+        session.lap_list[MOCK_LAP_NUMBER] = make_lap(MOCK_LAP_NUMBER, sector_1_ms=500, sector_2_ms=400, sector_3_ms=100)
         session.complete_lap_v2 = MagicMock()
         session.start_new_lap = MagicMock()
         packet = MockPacketOutLapData()
         packet.update_telemetry = MagicMock()
         packet.process(session)
-        self.assertEqual(session.lap_list, 
+        self.assertEqual(lap_values(session.lap_list), 
                          {MOCK_LAP_NUMBER: {'sector_1_ms': 0, 'sector_2_ms': 0, 'sector_3_ms': None, 'lap_number': 2, 'car_race_position': 10, 'pit_status': 0, 'is_valid': True}})
         self.assertEqual(session.complete_lap_v2.call_count, 0)
         self.assertEqual(session.start_new_lap.call_count, 0)
@@ -124,13 +137,13 @@ class PacketLapDataTest(TestCase):
     def test_process_inlap_time_trial(self):
         session = F12021Session(123)
         session.session_type = 13 # time trial
-        session.lap_list[MOCK_LAP_NUMBER] = {'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 100}
+        session.lap_list[MOCK_LAP_NUMBER] = make_lap(MOCK_LAP_NUMBER, sector_1_ms=500, sector_2_ms=400, sector_3_ms=100)
         session.complete_lap_v2 = MagicMock()
         session.start_new_lap = MagicMock()
         packet = MockPacketOutLapData()
         packet.update_telemetry = MagicMock()
         packet.process(session)
-        self.assertEqual(session.lap_list, 
+        self.assertEqual(lap_values(session.lap_list), 
                          {MOCK_LAP_NUMBER: {'car_race_position': 10, 'is_valid': True, 'lap_number': 2, 'pit_status': 0, 'sector_1_ms': 0, 'sector_2_ms': 0, 'sector_3_ms': None}})
         self.assertEqual(session.complete_lap_v2.call_count, 0)
         self.assertEqual(session.start_new_lap.call_count, 0)
@@ -139,13 +152,13 @@ class PacketLapDataTest(TestCase):
     def test_process_inlap_quali_with_pit(self):
         session = F12021Session(123)
         session.session_type = 5 # Q1
-        session.lap_list[MOCK_LAP_NUMBER] = {'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 100}
+        session.lap_list[MOCK_LAP_NUMBER] = make_lap(MOCK_LAP_NUMBER, sector_1_ms=500, sector_2_ms=400, sector_3_ms=100)
         session.complete_lap_v2 = MagicMock()
         session.start_new_lap = MagicMock()
         packet = MockPacketQualiOutLapData()
         packet.update_telemetry = MagicMock()
         packet.process(session)
-        self.assertEqual(session.lap_list[MOCK_LAP_NUMBER], {'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 100})
+        self.assertEqual(lap_values(session.lap_list)[MOCK_LAP_NUMBER], {'car_race_position': None, 'is_valid': True, 'lap_number': 2, 'pit_status': None, 'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 100})
         self.assertEqual(session.complete_lap_v2.call_count, 1)
         self.assertEqual(session.start_new_lap.call_count, 0)
         self.assertEqual(packet.update_telemetry.call_count, 0)
@@ -153,7 +166,7 @@ class PacketLapDataTest(TestCase):
         packet = MockPacketLapData()
         packet.update_telemetry = MagicMock()
         packet.process(session)
-        self.assertEqual(session.lap_list, 
+        self.assertEqual(lap_values(session.lap_list), 
                          {MOCK_LAP_NUMBER: {'car_race_position': 10, 'is_valid': True, 'lap_number': 2, 'pit_status': 0, 'sector_1_ms': 1000, 'sector_2_ms': 543, 'sector_3_ms': None}})
         self.assertEqual(session.complete_lap_v2.call_count, 1)
         self.assertEqual(session.start_new_lap.call_count, 0)
@@ -162,14 +175,14 @@ class PacketLapDataTest(TestCase):
 
     def test_packet_should_update_lap(self):
         session = F12021Session(123)
-        session.lap_list[MOCK_LAP_NUMBER] = {'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 100}
+        session.lap_list[MOCK_LAP_NUMBER] = make_lap(MOCK_LAP_NUMBER, sector_1_ms=500, sector_2_ms=400, sector_3_ms=100)
         packet = MockPacketOutLapData()
         self.assertEqual(packet.packet_should_update_lap(session, MOCK_LAP_NUMBER), False)
 
     def test_packet_should_update_lap_time_trial(self):
         session = F12021Session(123)
         session.session_type = 13 # time trial
-        session.lap_list[MOCK_LAP_NUMBER] = {'sector_1_ms': 500, 'sector_2_ms': 400, 'sector_3_ms': 100}
+        session.lap_list[MOCK_LAP_NUMBER] = make_lap(MOCK_LAP_NUMBER, sector_1_ms=500, sector_2_ms=400, sector_3_ms=100)
         packet = MockPacketOutLapData()
         self.assertEqual(packet.packet_should_update_lap(session, MOCK_LAP_NUMBER), True)
 
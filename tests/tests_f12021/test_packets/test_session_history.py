@@ -1,9 +1,25 @@
+import ctypes
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
+from receiver.f12021.packets.base import PacketHeader
+from receiver.f12021.packets.helpers import unpack_udp_packet
 from receiver.f12021.packets.session_history import PacketSessionHistoryData, LapHistoryData, TyreStintsHistoryData
 from receiver.f12021.session import F12021Session
 
+
+PLAYER_CAR_INDEX = 19
+
+
+def build_session_history_packet(car_index, laps):
+    """ UDP bytes of a session history packet, laps is a list of (lap time, S1, S2, S3) """
+    header = PacketHeader(packetFormat=2021, packetId=11, playerCarIndex=PLAYER_CAR_INDEX)
+    packet = PacketSessionHistoryData(header=header, carIdx=car_index, numLaps=len(laps), numTyreStints=1)
+    lap_history = (LapHistoryData * 100)(*[LapHistoryData(*lap) for lap in laps])
+    tyre_stints = (TyreStintsHistoryData * 8)(TyreStintsHistoryData(255, 16, 16))
+    return bytes(packet) + bytes(lap_history) + bytes(tyre_stints)
+
+
 class PacketSessionHistoryDataTest(TestCase):
 
     def test_is_current_player(self):
@@ -11,38 +27,89 @@ class PacketSessionHistoryDataTest(TestCase):
         self.assertEqual(packet.is_current_player(), True)
         packet.carIdx = 10
         self.assertEqual(packet.is_current_player(), False)
-        
 
-if __name__ == '__main__':
-    unittest.main()
+    def test_unpack_lap_history_on_demand(self):
+        raw_packet = build_session_history_packet(PLAYER_CAR_INDEX, [(60000, 10000, 20000, 30000), (33333, 11111, 22222, 0)])
+        self.assertEqual(len(raw_packet), 1155)
+        packet = unpack_udp_packet(raw_packet)
+        self.assertTrue(isinstance(packet, PacketSessionHistoryData))
+        self.assertEqual(ctypes.sizeof(packet), 31)
+        self.assertEqual(packet.numLaps, 2)
+        self.assertEqual(packet.get_lap_history(1).lapTimeInMS, 60000)
+        self.assertEqual(packet.get_lap_history(2).sector2TimeInMS, 22222)
+        # Only laps the packet has data for
+        self.assertEqual(packet.get_lap_history(0), None)
+        self.assertEqual(packet.get_lap_history(3), None)
 
+    def test_unpack_short_packet(self):
+        raw_packet = build_session_history_packet(PLAYER_CAR_INDEX, [(60000, 10000, 20000, 30000)])
+        # Too short for the lap history slots, even though the summary is complete
+        with self.assertRaises(ValueError):
+            PacketSessionHistoryData.unpack(raw_packet[:-1])
 
-class MockLapHistoryData_1(LapHistoryData):
-    lapTimeInMS = 60000
-    sector1TimeInMS = 10000
-    sector2TimeInMS = 20000
-    sector3TimeInMS = 30000
+    def test_update_laps_reconciles_sector_3(self):
+        session = F12021Session(123)
+        for lap_number, sector_1_ms, sector_2_ms, sector_3_ms in [(1, 10000, 20000, 29000), (2, 11111, 22222, 30000), (3, 12000, None, None)]:
+            session.start_new_lap(lap_number)
+            session.lap_list[lap_number].sector_1_ms = sector_1_ms
+            session.lap_list[lap_number].sector_2_ms = sector_2_ms
+            session.lap_list[lap_number].sector_3_ms = sector_3_ms
+        raw_packet = build_session_history_packet(PLAYER_CAR_INDEX, [
+            (60000, 10000, 20000, 30000),
+            (63333, 11111, 22222, 30000),
+            (0, 12000, 0, 0),
+        ])
+        unpack_udp_packet(raw_packet).process(session)
+        self.assertEqual(session.lap_list[1].sector_3_ms, 30000)
+        self.assertEqual(session.lap_list[2].sector_3_ms, 30000)
+        # Current lap is left alone
+        self.assertEqual(session.lap_list[3].sector_3_ms, None)
 
-class MockLapHistoryData_2(LapHistoryData):
-    lapTimeInMS = 33333
-    sector1TimeInMS = 11111
-    sector2TimeInMS = 22222
-    sector3TimeInMS = 0
+    def test_update_laps_decodes_new_laps_only(self):
+        session = F12021Session(123)
+        for lap_number in [1, 2, 3]:
+            session.start_new_lap(lap_number)
+            session.lap_list[lap_number].sector_1_ms = 10000
+            session.lap_list[lap_number].sector_2_ms = 20000
+        raw_packet = build_session_history_packet(PLAYER_CAR_INDEX, [(60000, 10000, 20000, 30000), (0, 0, 0, 0)])
+        get_lap_history = unpack_udp_packet(raw_packet).get_lap_history
+        with patch.object(PacketSessionHistoryData, 'get_lap_history', wraps=get_lap_history) as mock_get_lap_history:
+            for _ in range(3):
+                unpack_udp_packet(raw_packet).process(session)
+        # Lap 1 once, lap 2 on every packet until the game has its lap time
+        self.assertEqual([call.args[0] for call in mock_get_lap_history.call_args_list], [1, 2, 2, 2])
+        self.assertEqual(session.reconciled_lap_numbers, {1})
+        self.assertEqual(session.lap_list[1].sector_3_ms, 30000)
 
-class MockTyreStintsHistoryData_1(TyreStintsHistoryData):
-    endLap = 1
-    tyreActualCompound = 16
-    tyreVisualCompound = 16
+    def test_update_laps_skips_mismatching_laps(self):
+        session = F12021Session(123)
+        for lap_number in [1, 2]:
+            session.start_new_lap(lap_number)
+            session.lap_list[lap_number].sector_1_ms = 10000
+            session.lap_list[lap_number].sector_2_ms = 20000
+        session.lap_list[1].sector_3_ms = 29000
+        raw_packet = build_session_history_packet(PLAYER_CAR_INDEX, [(60000, 10001, 20000, 29999), (0, 0, 0, 0)])
+        unpack_udp_packet(raw_packet).process(session)
+        self.assertEqual(session.lap_list[1].sector_3_ms, 29000)
+
+    def test_process_other_car(self):
+        session = F12021Session(123)
+        session.start_new_lap(1)
+        session.lap_list[1].sector_1_ms = 10000
+        session.lap_list[1].sector_2_ms = 20000
+        session.start_new_lap(2)
+        packet = unpack_udp_packet(build_session_history_packet(3, [(60000, 10000, 20000, 30000), (0, 0, 0, 0)]))
+        with patch.object(PacketSessionHistoryData, 'get_lap_history') as mock_get_lap_history:
+            packet.process(session)
+        self.assertEqual(mock_get_lap_history.call_count, 0)
+        self.assertEqual(session.lap_list[1].sector_3_ms, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
 
-class MockTyreStintsHistoryData_2(TyreStintsHistoryData):
-    endLap = 255
-    tyreActualCompound = 17
-    tyreVisualCompound = 17
 
 class MockPacketSessionHistoryData(PacketSessionHistoryData):
     header = MagicMock(playerCarIndex=19)
     carIdx = 19
     numLaps = 2
-    lapHistoryData = [MockLapHistoryData_1, MockLapHistoryData_2]
-    tyreStintsHistoryData = [MockTyreStintsHistoryData_1, MockTyreStintsHistoryData_2]
-
@@ -9,10 +9,10 @@ class PacketCarTelemetryDataTest(TestCase):
 
     def test_update_telemetry(self):
         session = F12021Session(123)
-        session.telemetry.start_new_lap(1)
+        session.start_new_lap(1)
         packet = MockPacketCarTelemetryData()
         session = packet.update_telemetry(session)
-        self.assertEqual(session.telemetry.lap_dict[1].frame_dict, {2345: [None, None, 111, 0, 0.82, 6, 0.21, 0]})
+        self.assertEqual(session.lap_list[1].telemetry.frame_dict, {2345: [None, None, 111, 0, 0.82, 6, 0.21, 0]})
 
 
 if __name__ == '__main__':
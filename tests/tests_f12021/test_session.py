@@ -32,15 +32,40 @@ class F12021SessionTest(TestCase):
         session = F12021Session(123)
         # Test lap not found
         self.assertEqual(session.lap_should_be_sent_to_f1laps(1), False)
-        session.lap_list = {1: {1: {'lap_number': 1, 'sector_1_ms': 11111, 'sector_2_ms': 22222, 'tyre_compound_visual': 16}}}
+        session.start_new_lap(1)
+        session.lap_list[1].sector_1_ms = 11111
+        session.lap_list[1].sector_2_ms = 22222
         # Test lap doesnt have all sectors
         self.assertEqual(session.lap_should_be_sent_to_f1laps(1), False)
-        session.lap_list = {1: {'lap_number': 1, 'sector_1_ms': 11111, 'sector_2_ms': 22222, 'sector_3_ms': 33333, 'tyre_compound_visual': 16}}
+        session.lap_list[1].sector_3_ms = 33333
         # Test success case
         self.assertEqual(session.lap_should_be_sent_to_f1laps(1), True)
         # Test lap was already sent to F1Laps
         self.assertEqual(session.lap_should_be_sent_to_f1laps(1), False)
 
+    def test_start_new_lap_and_get_current_lap(self):
+        session = F12021Session(123)
+        session.session_type = 10
+        self.assertEqual(session.get_current_lap(), None)
+        session.start_new_lap(1)
+        session.start_new_lap(2)
+        self.assertEqual(session.get_current_lap(), session.lap_list[2])
+        self.assertEqual(session.lap_list[2].session_type, 10)
+        self.assertEqual(session.lap_list[2].telemetry.lap_number, 2)
+
+    def test_drop_lap_data(self):
+        session = F12021Session(123)
+        session.start_new_lap(1)
+        session.lap_list[1].sector_1_ms = 11111
+        session.lap_list[1].update_telemetry(1000, speed=300, lap_distance=50)
+        session.drop_lap_data(1)
+        # Lap is kept, but reset including its telemetry
+        self.assertEqual(session.lap_list[1].sector_1_ms, None)
+        self.assertEqual(session.lap_list[1].telemetry.frame_dict, {})
+        # Laps that don't exist don't get created
+        session.drop_lap_data(2)
+        self.assertEqual(list(session.lap_list), [1])
+
     def test_lap_should_be_sent_as_session(self):
         session = F12021Session(123)
         self.assertEqual(session.lap_should_be_sent_as_session(), False)
@@ -56,7 +81,11 @@ class F12021SessionTest(TestCase):
         session.track_id = 10
         session.team_id = 2
         session.session_type = 13
-        session.lap_list = {1: {'lap_number': 1, 'sector_1_ms': 11111, 'sector_2_ms': 22222, 'sector_3_ms': 33333, 'tyre_compound_visual': 16}}
+        session.start_new_lap(1)
+        session.lap_list[1].sector_1_ms = 11111
+        session.lap_list[1].sector_2_ms = 22222
+        session.lap_list[1].sector_3_ms = 33333
+        session.lap_list[1].tyre_compound_visual = 16
         self.assertEqual(session.send_lap_to_f1laps(1), None)
         mock_api.assert_called_with(track_id=10, team_id=2, conditions='dry', game_mode='time_trial', sector_1_time=11111, sector_2_time=22222, sector_3_time=33333, setup_data={}, is_valid=True, telemetry_data_string=None)
 
@@ -99,19 +128,39 @@ class F12021SessionTest(TestCase):
         # Empty array without laps
         self.assertEqual(session.get_f1laps_lap_times_list(), [])
         # Add lap
-        session.lap_list = {1: {'lap_number': 1, 'sector_1_ms': 11111, 'sector_2_ms': 22222, 'sector_3_ms': 33333}}
+        session.start_new_lap(1)
+        session.lap_list[1].sector_1_ms = 11111
+        session.lap_list[1].sector_2_ms = 22222
+        # Skip laps without all sectors
+        self.assertEqual(session.get_f1laps_lap_times_list(), [])
+        session.lap_list[1].sector_3_ms = 33333
         self.assertEqual(session.get_f1laps_lap_times_list(), [{'lap_number': 1, 'sector_1_time_ms': 11111, 'sector_2_time_ms': 22222, 'sector_3_time_ms': 33333, 'car_race_position': None, 'pit_status': None, 'tyre_compound_visual': None, 'telemetry_data_string': None, 'penalties': []}])
         # With penalty
         penalty = F12021Penalty()
         penalty.penalty_type = 1
-        session.lap_list[1]['penalties'] = [penalty,]
+        session.lap_list[1].penalties = [penalty,]
         self.assertEqual(session.get_f1laps_lap_times_list(), [{'lap_number': 1, 'sector_1_time_ms': 11111, 'sector_2_time_ms': 22222, 'sector_3_time_ms': 33333, 'car_race_position': None, 'pit_status': None, 'tyre_compound_visual': None, 'telemetry_data_string': None, 'penalties': [{'frame_id': penalty.frame_id, 'penalty_type': 1, 'infringement_type': None, 'vehicle_index': None, 'other_vehicle_index': None, 'time_spent_gained': None, 'lap_number': None, 'places_gained': None}]}])
         # With telemetry
-        session.telemetry_enabled = True
-        telemetry = MagicMock()
-        telemetry.get_telemetry_api_dict.return_value = "justasamplestring"
-        session.telemetry = telemetry
-        self.assertEqual(session.get_f1laps_lap_times_list(), [{'lap_number': 1, 'sector_1_time_ms': 11111, 'sector_2_time_ms': 22222, 'sector_3_time_ms': 33333, 'car_race_position': None, 'pit_status': None, 'tyre_compound_visual': None, 'telemetry_data_string': '"justasamplestring"', 'penalties': [{'frame_id': penalty.frame_id, 'penalty_type': 1, 'infringement_type': None, 'vehicle_index': None, 'other_vehicle_index': None, 'time_spent_gained': None, 'lap_number': None, 'places_gained': None}]}])   
+        session.lap_list[1].telemetry_enabled = True
+        session.lap_list[1].telemetry.frame_dict = {1000: [5.0, 50, None, None, None, None, None, None]}
+        self.assertEqual(session.get_f1laps_lap_times_list(), [{'lap_number': 1, 'sector_1_time_ms': 11111, 'sector_2_time_ms': 22222, 'sector_3_time_ms': 33333, 'car_race_position': None, 'pit_status': None, 'tyre_compound_visual': None, 'telemetry_data_string': '{"1000": [5.0, 50, null, null, null, null, null, null]}', 'penalties': [{'frame_id': penalty.frame_id, 'penalty_type': 1, 'infringement_type': None, 'vehicle_index': None, 'other_vehicle_index': None, 'time_spent_gained': None, 'lap_number': None, 'places_gained': None}]}])   
+
+    def test_session_sync_payload_shape(self):
+        """ Every completed lap gets synced, with the telemetry of the last two laps only """
+        session = F12021Session(123)
+        for lap_number in range(1, 6):
+            session.start_new_lap(lap_number)
+            lap = session.lap_list[lap_number]
+            lap.sector_1_ms, lap.sector_2_ms, lap.sector_3_ms = 30000, 30000, 30000
+            lap.update_telemetry(lap_number * 1000, speed=300, lap_distance=50.0)
+        lap_times = session.get_f1laps_lap_times_list()
+        self.assertEqual([lap["lap_number"] for lap in lap_times], [1, 2, 3, 4, 5])
+        self.assertEqual([lap["telemetry_data_string"] for lap in lap_times], [None, None, None,
+            '{"4000": [50.0, null, 300, null, null, null, null, null]}',
+            '{"5000": [50.0, null, 300, null, null, null, null, null]}'])
+        self.assertEqual(set(lap_times[0]), {"lap_number", "sector_1_time_ms", "sector_2_time_ms", "sector_3_time_ms",
+                                             "car_race_position", "pit_status", "tyre_compound_visual",
+                                             "telemetry_data_string", "penalties"})
 
     def test_get_classification_list(self):
         """ 
@@ -1,75 +1,90 @@
 from unittest import TestCase
 
-from receiver.f12021.telemetry import F12021Telemetry
-from receiver.telemetry_base import KEY_INDEX_MAP
+from receiver.f12021.lap import F12021LapTelemetry
+from receiver.f12021.session import F12021Session
 
 
-class F12021TelemetryTests(TestCase):
+class F12021SessionTelemetryTests(TestCase):
 
     def test_start_telemetry_old_lap(self):
         """ 
-        Assert that when we attempt to start Telemetry for a lap that was already collected,
-        we don't do it.
-        This happens when the Session History Packet starts Telemetry, but is significantly delayed by 1+ laps
-        And hence attempts to start an old lap
+        Assert that when a lap that was already collected gets started again (e.g. by a delayed packet),
+        the current lap keeps its telemetry
         """
-        telemetry = F12021Telemetry()
-        # start new lap
-        telemetry.start_new_lap(1)
-        self.assertEqual(telemetry.current_lap_number, 1)
-        self.assertEqual(telemetry.lap_dict[1].number, 1)
-        # start new lap
-        telemetry.start_new_lap(2)
-        self.assertEqual(telemetry.current_lap_number, 2)
-        self.assertEqual(telemetry.lap_dict[2].number, 2)
-        # attempt old lap
-        telemetry.start_new_lap(1)
-        self.assertEqual(telemetry.current_lap_number, 2)
-        self.assertEqual(telemetry.lap_dict[2].number, 2)
+        session = F12021Session(123)
+        session.start_new_lap(1)
+        session.start_new_lap(2)
+        session.lap_list[2].update_telemetry(1000, speed=300, lap_distance=50)
+        session.start_new_lap(1)
+        self.assertEqual(session.get_current_lap().lap_number, 2)
+        self.assertEqual(session.get_current_lap().telemetry.frame_dict,
+                         {1000: [50, None, 300, None, None, None, None, None]})
+
+    def test_keeps_telemetry_of_current_and_previous_lap(self):
+        session = F12021Session(123)
+        for lap_number in range(1, 5):
+            session.start_new_lap(lap_number)
+            session.lap_list[lap_number].update_telemetry(lap_number * 1000, speed=300, lap_distance=50)
+        self.assertEqual([lap_number for lap_number, lap in session.lap_list.items() if lap.telemetry], [3, 4])
+        # Laps without telemetry are still synced, without a telemetry string
+        self.assertIsNone(session.lap_list[1].get_telemetry_string())
 
     def test_process_flashback_event(self):
-        telemetry = F12021Telemetry()
-        telemetry.start_new_lap(1)
-        telemetry.set(1000, speed=300, lap_distance=50)
-        telemetry.set(1001, speed=301, lap_distance=51)
-        telemetry.set(1002, speed=302, lap_distance=52)
-        telemetry.set(1003, speed=303, lap_distance=53)
-        self.assertEqual(telemetry.current_lap.last_lap_distance, 53)
-        self.assertEqual(telemetry.current_lap.frame_dict, {
+        session = F12021Session(123)
+        session.start_new_lap(1)
+        lap = session.get_current_lap()
+        for frame_number in range(1000, 1004):
+            lap.update_telemetry(frame_number, speed=frame_number - 700, lap_distance=frame_number - 950)
+        lap.process_flashback_event(1001)
+        self.assertEqual(lap.telemetry.frame_dict, {1000: [50, None, 300, None, None, None, None, None]})
+        self.assertEqual(lap.telemetry.last_lap_distance, None)
+        lap.update_telemetry(1001, speed=301, lap_distance=52)
+        self.assertEqual(lap.telemetry.last_lap_distance, 52)
+
+
+class F12021LapTelemetryTests(TestCase):
+
+    def set(self, telemetry, frame_number, **values):
+        values["frame_identifier"] = frame_number
+        telemetry.update(values)
+
+    def test_process_flashback_event(self):
+        telemetry = F12021LapTelemetry(1)
+        self.set(telemetry, 1000, speed=300, lap_distance=50)
+        self.set(telemetry, 1001, speed=301, lap_distance=51)
+        self.set(telemetry, 1002, speed=302, lap_distance=52)
+        self.set(telemetry, 1003, speed=303, lap_distance=53)
+        self.assertEqual(telemetry.last_lap_distance, 53)
+        self.assertEqual(telemetry.frame_dict, {
             1000: [50, None, 300, None, None, None, None, None],
             1001: [51, None, 301, None, None, None, None, None],
             1002: [52, None, 302, None, None, None, None, None],
             1003: [53, None, 303, None, None, None, None, None],
         })
         telemetry.process_flashback_event(1001)
-        self.assertEqual(telemetry.current_lap.frame_dict, {
+        self.assertEqual(telemetry.frame_dict, {
             1000: [50, None, 300, None, None, None, None, None],
         })
-        self.assertEqual(telemetry.current_lap.last_lap_distance, None)
-        telemetry.set(1001, speed=301, lap_distance=52)
-        self.assertEqual(telemetry.current_lap.last_lap_distance, 52)
-
-
-class F12021TelemetryLapTests(TestCase):
+        self.assertEqual(telemetry.last_lap_distance, None)
+        self.set(telemetry, 1001, speed=301, lap_distance=52)
+        self.assertEqual(telemetry.last_lap_distance, 52)
 
     def test_clean_frame_outlap_pre_line_negative_distances(self):
         """ 
         In an outlap, when the lap distance is negative, clean any negative distance frames 
         """
-        telemetry = F12021Telemetry()
-        telemetry.start_new_lap(1)
-        tl = telemetry.current_lap
-        telemetry.set(1000, speed=300, lap_distance=-100)
-        telemetry.set(1001, speed=301, lap_distance=-99)
-        telemetry.set(1002, speed=302, lap_distance=-98)
-        self.assertEqual(tl.frame_dict, {})
-        telemetry.set(1003, speed=303, lap_distance=13)
-        self.assertEqual(tl.frame_dict, {
+        telemetry = F12021LapTelemetry(1)
+        self.set(telemetry, 1000, speed=300, lap_distance=-100)
+        self.set(telemetry, 1001, speed=301, lap_distance=-99)
+        self.set(telemetry, 1002, speed=302, lap_distance=-98)
+        self.assertEqual(telemetry.frame_dict, {})
+        self.set(telemetry, 1003, speed=303, lap_distance=13)
+        self.assertEqual(telemetry.frame_dict, {
             1003: [13, None, 303, None, None, None, None, None],
         })
-        telemetry.set(1004, speed=304, lap_distance=14)
-        telemetry.set(1005, speed=305, lap_distance=15)
-        self.assertEqual(tl.frame_dict, {
+        self.set(telemetry, 1004, speed=304, lap_distance=14)
+        self.set(telemetry, 1005, speed=305, lap_distance=15)
+        self.assertEqual(telemetry.frame_dict, {
             1003: [13, None, 303, None, None, None, None, None],
             1004: [14, None, 304, None, None, None, None, None],
             1005: [15, None, 305, None, None, None, None, None],
@@ -79,24 +94,22 @@ class F12021TelemetryLapTests(TestCase):
         """ 
         In an outlap, when the lap distance is positive, clean any positive distance frames pre line
         """
-        telemetry = F12021Telemetry()
-        telemetry.start_new_lap(1)
-        tl = telemetry.current_lap
-        telemetry.set(1000, speed=300, lap_distance=4400)
-        telemetry.set(1001, speed=301, lap_distance=4401)
-        telemetry.set(1002, speed=302, lap_distance=4402)
-        self.assertEqual(tl.frame_dict, {
+        telemetry = F12021LapTelemetry(1)
+        self.set(telemetry, 1000, speed=300, lap_distance=4400)
+        self.set(telemetry, 1001, speed=301, lap_distance=4401)
+        self.set(telemetry, 1002, speed=302, lap_distance=4402)
+        self.assertEqual(telemetry.frame_dict, {
             1000: [4400, None, 300, None, None, None, None, None],
             1001: [4401, None, 301, None, None, None, None, None],
             1002: [4402, None, 302, None, None, None, None, None],
         })
-        telemetry.set(1003, speed=303, lap_distance=13)
-        self.assertEqual(tl.frame_dict, {
+        self.set(telemetry, 1003, speed=303, lap_distance=13)
+        self.assertEqual(telemetry.frame_dict, {
             1003: [13, None, 303, None, None, None, None, None],
         })
-        telemetry.set(1004, speed=304, lap_distance=14)
-        telemetry.set(1005, speed=305, lap_distance=15)
-        self.assertEqual(tl.frame_dict, {
+        self.set(telemetry, 1004, speed=304, lap_distance=14)
+        self.set(telemetry, 1005, speed=305, lap_distance=15)
+        self.assertEqual(telemetry.frame_dict, {
             1003: [13, None, 303, None, None, None, None, None],
             1004: [14, None, 304, None, None, None, None, None],
             1005: [15, None, 305, None, None, None, None, None],
@@ -106,28 +119,24 @@ class F12021TelemetryLapTests(TestCase):
         """ 
         Same as above, but without a first lap distance because the first frame didn't get a lap packet in time
         """
-        telemetry = F12021Telemetry()
-        telemetry.start_new_lap(1)
-        tl = telemetry.current_lap
-        tl.last_lap_distance = 4500 # greater than distance we set next
-        telemetry.set(1000, speed=300)
-        telemetry.set(1001, speed=300, lap_distance=100)
-        self.assertEqual(tl.frame_dict, {1000: [None, None, 300, None, None, None, None, None]})
+        telemetry = F12021LapTelemetry(1)
+        telemetry.last_lap_distance = 4500 # greater than distance we set next
+        self.set(telemetry, 1000, speed=300)
+        self.set(telemetry, 1001, speed=300, lap_distance=100)
+        self.assertEqual(telemetry.frame_dict, {1000: [None, None, 300, None, None, None, None, None]})
 
     def test_clean_frame_inlap_post_line_positive_distances(self):
         """ 
         In an inlap after race end, when the lap distance is positive, clean any new frames
         """
-        telemetry = F12021Telemetry()
-        telemetry.start_new_lap(1)
-        tl = telemetry.current_lap
-        telemetry.set( 100, speed=297, lap_distance=13)
-        telemetry.set( 101, speed=298, lap_distance=14)
-        telemetry.set( 102, speed=299, lap_distance=15)
-        telemetry.set(1000, speed=300, lap_distance=4400)
-        telemetry.set(1001, speed=301, lap_distance=4401)
-        telemetry.set(1002, speed=302, lap_distance=4402)
-        self.assertEqual(tl.frame_dict, {
+        telemetry = F12021LapTelemetry(1)
+        self.set(telemetry, 100, speed=297, lap_distance=13)
+        self.set(telemetry, 101, speed=298, lap_distance=14)
+        self.set(telemetry, 102, speed=299, lap_distance=15)
+        self.set(telemetry, 1000, speed=300, lap_distance=4400)
+        self.set(telemetry, 1001, speed=301, lap_distance=4401)
+        self.set(telemetry, 1002, speed=302, lap_distance=4402)
+        self.assertEqual(telemetry.frame_dict, {
              100: [  13, None, 297, None, None, None, None, None],
              101: [  14, None, 298, None, None, None, None, None],
              102: [  15, None, 299, None, None, None, None, None],
@@ -135,10 +144,10 @@ class F12021TelemetryLapTests(TestCase):
             1001: [4401, None, 301, None, None, None, None, None],
             1002: [4402, None, 302, None, None, None, None, None],
         })
-        telemetry.set(1003, speed=303, lap_distance=13)
-        telemetry.set(1004, speed=304, lap_distance=14)
-        telemetry.set(1005, speed=305, lap_distance=15)
-        self.assertEqual(tl.frame_dict, {
+        self.set(telemetry, 1003, speed=303, lap_distance=13)
+        self.set(telemetry, 1004, speed=304, lap_distance=14)
+        self.set(telemetry, 1005, speed=305, lap_distance=15)
+        self.assertEqual(telemetry.frame_dict, {
              100: [  13, None, 297, None, None, None, None, None],
              101: [  14, None, 298, None, None, None, None, None],
              102: [  15, None, 299, None, None, None, None, None],
@@ -147,3 +156,6 @@ class F12021TelemetryLapTests(TestCase):
             1002: [4402, None, 302, None, None, None, None, None],
         })
 
+
+if __name__ == '__main__':
+    unittest.main()
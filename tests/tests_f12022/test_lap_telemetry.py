@@ -1,4 +1,6 @@
 from unittest import TestCase
+import random
+import struct
 
 from receiver.f12022.telemetry import F12022LapTelemetry
 
@@ -88,6 +90,29 @@ class F12022LapTelemetryTest(TestCase):
         self.assertEqual(len(telemetry.frame_dict), 1)
         self.assertEqual(telemetry.last_lap_distance, None)
 
+    def test_frames_are_stored_in_fixed_point(self):
+        telemetry = F12022LapTelemetry(lap_number=1, session_type=11)
+        telemetry.update({"frame_identifier": 1000, "lap_distance": 12.345678, "lap_time": 50, "speed": 300,
+                          "brake": 0.12345, "throttle": 1.0, "gear": 7, "steer": -0.5004, "drs": 1})
+        self.assertEqual(telemetry._frame_dict, {1000: [1235, 50, 300, 123, 1000, 7, -500, 1]})
+        self.assertEqual(telemetry.frame_dict, {1000: [12.35, 50, 300, 0.123, 1.0, 7, -0.5, 1]})
+        self.assertEqual(telemetry.last_lap_distance, 12.35)
+
+    def test_dequantized_values_match_rounding(self):
+        # The game sends 32 bit floats
+        rng = random.Random(22)
+        to_float32 = lambda value: struct.unpack("<f", struct.pack("<f", value))[0]
+        for frame_number in range(1000, 3000):
+            values = {"lap_distance": to_float32(rng.uniform(0, 7000)), "brake": to_float32(rng.random()),
+                      "throttle": to_float32(rng.random()), "steer": to_float32(rng.uniform(-1, 1))}
+            expected = [round(values["lap_distance"], 2), None, None, round(values["brake"], 3),
+                        round(values["throttle"], 3), None, round(values["steer"], 3), None]
+            telemetry = F12022LapTelemetry(lap_number=1, session_type=11)
+            telemetry.update(dict(values, frame_identifier=frame_number))
+            self.assertEqual(telemetry.get_frame(frame_number), [round(values["lap_distance"] * 100), None, None,
+                round(values["brake"] * 1000), round(values["throttle"] * 1000), None, round(values["steer"] * 1000) or (-0.0 if values["steer"] < 0 else 0), None])
+            self.assertEqual(repr(telemetry.frame_dict[frame_number]), repr(expected))
+
     
 
 if __name__ == '__main__':
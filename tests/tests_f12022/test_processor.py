@@ -217,6 +217,31 @@ class F12022SessionTest(TestCase):
         processor.session.get_current_lap().telemetry.last_lap_distance = 1001
         self.assertTrue(processor.process_motion_packet(packet_data))
 
+    def test_update_lap_data_quality(self):
+        processor = F12022Processor("key_123", True)
+        processor.session = F12022Session("key_123", True, "uid_123", 10, 1, False, 90, 1, 5)
+        lap = processor.session.add_lap(1)
+        # Lap and telemetry packets count towards the lap's data quality
+        processor.update_lap_data_quality(2, 0)
+        processor.update_lap_data_quality(6, 1)
+        # Other packet types don't
+        processor.update_lap_data_quality(7, 5)
+        self.assertEqual(lap.packets_received, 2)
+        self.assertEqual(lap.packets_lost, 1)
+        self.assertEqual(lap.get_data_quality(), 0.667)
+
+    def test_reordered_packet_corrects_lap_data_quality(self):
+        processor = F12022Processor("key_123", True)
+        processor.session = F12022Session("key_123", True, "uid_123", 10, 1, False, 90, 1, 5)
+        lap = processor.session.add_lap(1)
+        for frame_identifier in list(range(1000, 1010)) + [1011, 1010]:
+            lost_packets = processor.sequence_tracker.observe(2, frame_identifier)
+            processor.update_lap_data_quality(2, lost_packets)
+        # 1010 was counted as lost when 1011 came in, and then arrived late
+        self.assertEqual(lap.packets_received, 12)
+        self.assertEqual(lap.packets_lost, 0)
+        self.assertEqual(lap.get_data_quality(), 1.0)
+
     
     
 